@@ -11,6 +11,8 @@ from datetime import datetime, timedelta, timezone
 
 from services.ai_service import ai_service
 from services.websocket_service import connection_manager
+from services.admin_directory import admin_directory
+from services.user_cache import user_cache
 from server import User, require_role, UserRole, db
 from server import Event, Announcement, AdminAction
 
@@ -168,6 +170,9 @@ async def perform_bulk_operation(
 
                 if action == "update":
                     result = await db.users.update_many(query, {"$set": update_data})
+                    await user_cache.users_changed()
+                    if "role" in update_data:
+                        await admin_directory.reconcile()
                     return {
                         "success": True,
                         "operation": "user_update",
@@ -176,6 +181,8 @@ async def perform_bulk_operation(
                     }
                 elif action == "delete":
                     result = await db.users.delete_many(query)
+                    await user_cache.users_changed()
+                    await admin_directory.reconcile()
                     return {"success": True, "operation": "user_delete", "deleted_count": result.deleted_count}
 
             return {"success": False, "error": "Operation not implemented"}
@@ -452,6 +459,9 @@ async def _bulk_user_operation_from_ai(parameters: Dict[str, Any], admin_id: str
 
         if operation == "update":
             result = await db.users.update_many(criteria, {"$set": updates})
+            await user_cache.users_changed()
+            if "role" in updates:
+                await admin_directory.reconcile()
             return {"success": True, "modified_count": result.modified_count, "matched_count": result.matched_count}
         else:
             return {"success": False, "error": "Unsupported bulk operation"}
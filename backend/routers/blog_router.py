@@ -196,8 +196,10 @@ async def build_link_pyramid(content: str, category: str, current_blog_id: Optio
     return enhanced_content
 
 
-async def generate_blog_with_ai(request: BlogGenerateRequest, user_name: str) -> Dict[str, Any]:
-    """Generate blog content using AI"""
+async def generate_blog_with_ai(
+    request: BlogGenerateRequest, user_name: str, lane: str = "interactive"
+) -> Dict[str, Any]:
+    """Generate blog content using AI; scheduled generation runs on the background lane"""
 
     # Build the AI prompt
     topic = request.topic or "BIGO Live hosting tips and strategies"
@@ -245,7 +247,9 @@ Format the response as JSON with these fields:
     try:
         messages = [{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}]
 
-        response = await ai_service.chat_completion(messages=messages, temperature=0.8, max_completion_tokens=2048)
+        response = await ai_service.chat_completion(
+            messages=messages, temperature=0.8, max_completion_tokens=2048, lane=lane, call_site="blog_generate"
+        )
 
         # Check if AI request was successful
         if not response.get("success"):
@@ -1,4 +1,6 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, UploadFile, File, WebSocket, WebSocketDisconnect
+from fastapi import (
+    FastAPI, APIRouter, HTTPException, Depends, Query, Request, UploadFile, File, WebSocket, WebSocketDisconnect
+)
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.responses import StreamingResponse
 from dotenv import load_dotenv
@@ -11,11 +13,9 @@ from pydantic import BaseModel, Field, EmailStr
 from typing import List, Optional, Dict, Any, AsyncGenerator
 import uuid
 from datetime import datetime, timezone, timedelta
-from passlib.context import CryptContext
 import jwt
 from enum import Enum
 import json
-import aiofiles
 import openpyxl
 
 # from groq import AsyncGroq  # deprecated direct client, now via REST in ai_service
@@ -26,10 +26,33 @@ from contextlib import asynccontextmanager
 # Email imports removed - not used in current implementation
 
 # Import new services
+from services.admin_directory import admin_directory
+from services.audition_storage import UploadFormatError, UploadTooLarge, audition_storage, request_chunks
 from services.ai_service import ai_service
 from services.websocket_service import connection_manager
 from services.lead_scanner_service import lead_scanner_service
 from services.blog_scheduler_service import blog_scheduler
+from services.singleflight import SingleFlight, singleflight_stats
+from services.ai_scheduler import BACKGROUND, BATCH
+from services.http_client import http_client
+from services.index_manager import ensure_indexes, index_drift
+from services.circuit_breaker import breaker_stats
+from services.context_builder import PromptTemplate, build_context, estimate_tokens
+from services.knowledge_cache import knowledge_cache
+from services.knowledge_index import knowledge_index
+from services.knowledge_ingest import (
+    KNOWLEDGE_BULK_MAX_BYTES,
+    ensure_ingest_indexes,
+    ingest as ingest_knowledge,
+    parse_ndjson,
+)
+from services.knowledge_passages import backfill_passages, ensure_passage_indexes, search_passages
+from services.voice_service import voice_service
+from services.password_hasher import password_hasher
+from services.settings_store import settings_store
+from services.tutorial_library import tutorial_library
+from services.user_cache import user_cache
+from services.usage_meter import ROLLUP_DIMENSIONS, UsageAttributionMiddleware, set_usage_user
 
 # Note: Routers will be imported later after models are defined to avoid circular imports
 
@@ -53,10 +76,27 @@ async def lifespan(app: FastAPI):
     # Set database reference for AI service
     ai_service.set_db(db)
 
+    # In-memory settings snapshot (Groq key etc.), kept in sync across workers
+    settings_store.set_db(db)
+    await settings_store.start()
+
+    # Authenticated-user cache; role/status/profile writes in any worker bump the users version
+    user_cache.set_db(db)
+    try:
+        await user_cache.start()
+    except Exception as e:
+        logging.getLogger(__name__).warning(f"Could not start user cache: {e}")
+
+    # Declared indexes for the hot collections (services/index_manager.py); drift is logged, never dropped
+    try:
+        await ensure_indexes(db)
+    except Exception as e:
+        logging.getLogger(__name__).warning(f"Could not apply index specs: {e}")
+
     try:
         admin = await db.users.find_one({"bigo_id": "Admin"})
         if not admin:
-            hashed = hash_password("admin333")
+            hashed = await hash_password("admin333")
             user = User(bigo_id="Admin", email="admin@lvlup.ca", name="admin", role=UserRole.ADMIN)
             doc = user.dict()
             doc["password"] = hashed
@@ -65,8 +105,12 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logging.getLogger(__name__).error(f"Failed to seed admin: {e}")
 
-    # ensure admins collection exists and is synced before serving
-    await sync_admins_collection(rebuild=False)
+    # Admins collection and in-memory admin roster, reconciled before serving and then periodically
+    admin_directory.set_db(db)
+    try:
+        await admin_directory.start()
+    except Exception as e:
+        logging.getLogger(__name__).error(f"Admins sync failed: {e}")
 
     # Create text index on BIGO knowledge base for search
     try:
@@ -79,78 +123,67 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logging.getLogger(__name__).warning(f"Could not create bigo_knowledge text index: {e}")
 
-    # Create indexes for blogs collection
+    # Passage rows let the Mongo search path fetch matching sections instead of whole documents
+    try:
+        await ensure_ingest_indexes(db)
+        await ensure_passage_indexes(db)
+        await backfill_passages(db)
+    except Exception as e:
+        logging.getLogger(__name__).warning(f"Could not prepare bigo_knowledge passages: {e}")
+
+    # In-process BM25 + vector index used by search_bigo_knowledge (Mongo text search is the fallback)
+    knowledge_index.set_db(db)
+    try:
+        await knowledge_index.start()
+    except Exception as e:
+        logging.getLogger(__name__).warning(f"Could not build knowledge index, using Mongo text search: {e}")
+
+    # Search result cache, invalidated whenever the knowledge base version or the index changes
+    knowledge_cache.set_dependencies(db, knowledge_index)
     try:
-        await db.blogs.create_index([("slug", 1)], unique=True)
-        await db.blogs.create_index([("status", 1)])
-        await db.blogs.create_index([("category", 1)])
-        await db.blogs.create_index([("published_at", -1)])
-        logging.getLogger(__name__).info("Created indexes on blogs collection")
+        await knowledge_cache.start()
     except Exception as e:
-        logging.getLogger(__name__).warning(f"Could not create blogs indexes: {e}")
+        logging.getLogger(__name__).warning(f"Could not start knowledge search cache: {e}")
+
+    # TTL + key indexes for the AI response cache second level
+    await ai_service.response_cache.ensure_indexes()
 
     # Initialize blog scheduler
     blog_scheduler.set_dependencies(db, ai_service)
     await blog_scheduler.start()
     logging.getLogger(__name__).info("Blog scheduler started")
 
+    # Background workers for conversation memory compaction
+    await ai_service.compaction_queue.start()
+
+    # Buffered LLM usage accounting and daily token budgets
+    await ai_service.usage_meter.start()
+
+    # Academy tutorial library; curated topics are pre-generated in the background
+    tutorial_library.set_dependencies(db, ai_service)
+    await tutorial_library.ensure_indexes()
+    await tutorial_library.start()
+
+    # Open keep-alive connections to the AI/voice upstreams before the first request
+    await http_client.warm_up([ai_service.chat_url, voice_service.base_url])
+
     yield
     # shutdown code
+    await ai_service.compaction_queue.stop()
+    await tutorial_library.stop()
+    await knowledge_cache.stop()
+    await knowledge_index.stop()
+    await ai_service.usage_meter.stop()
+    await admin_directory.stop()
+    await user_cache.stop()
+    await settings_store.stop()
     await blog_scheduler.stop()
-    # Close AI service session to release resources
-    await ai_service.close_session()
+    # Close pooled outbound HTTP connections
+    await http_client.close()
+    password_hasher.close()
     client.close()
 
 
-# Admins collection sync and rebuild
-async def sync_admins_collection(rebuild: bool = False):
-    """
-    Sync admins collection from users collection.
-    Optimized to batch operations for better performance.
-    """
-    try:
-        if rebuild:
-            await db.admins.delete_many({})
-        
-        # Fetch all admin/owner users at once (more efficient than cursor iteration)
-        # Using reasonable limit of 500 - if more admins needed, increase this value
-        admin_users = await db.users.find({"role": {"$in": ["admin", "owner"]}}).to_list(500)
-        
-        if not admin_users:
-            logging.getLogger(__name__).info("No admin users found to sync")
-            return
-        
-        # Prepare bulk operations for better performance
-        from pymongo import UpdateOne
-        bulk_ops = []
-        
-        for u in admin_users:
-            admin_doc = {
-                "id": u.get("admin_id") or str(uuid.uuid4()),
-                "user_id": u["id"],
-                "bigo_id": u.get("bigo_id"),
-                "email": u.get("email"),
-                "name": u.get("name"),
-                "role": u.get("role"),
-                "permissions": u.get("permissions")
-                or ["manage_users", "manage_events", "manage_announcements", "view_analytics"],
-                "created_at": u.get("created_at") or datetime.now(timezone.utc),
-            }
-            bulk_ops.append(
-                UpdateOne({"user_id": u["id"]}, {"$set": admin_doc}, upsert=True)
-            )
-        
-        # Execute all updates in a single bulk operation
-        if bulk_ops:
-            result = await db.admins.bulk_write(bulk_ops, ordered=False)
-            logging.getLogger(__name__).info(
-                f"Admins collection synced: {result.upserted_count} inserted, "
-                f"{result.modified_count} modified"
-            )
-    except Exception as e:
-        logging.getLogger(__name__).error(f"Admins sync failed: {e}")
-
-
 # Create the main app without a prefix
 app = FastAPI(
     lifespan=lifespan,
@@ -167,7 +200,6 @@ api_router = APIRouter(prefix="/api")
 
 # Security
 security = HTTPBearer()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # JWT Secret - MUST be set via environment variable in production
 JWT_SECRET = os.environ.get("JWT_SECRET")
@@ -519,12 +551,9 @@ class BigoKnowledge(BaseModel):
 
 
 # Helper functions
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
-
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+async def hash_password(password: str) -> str:
+    """bcrypt runs on the password hasher's worker pool, keeping the event loop free"""
+    return await password_hasher.hash(password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -546,33 +575,63 @@ def clean_mongo_doc(doc: Dict[str, Any]) -> Dict[str, Any]:
     return cleaned
 
 
-async def search_bigo_knowledge(query: str, limit: int = 5) -> List[Dict[str, Any]]:
-    """Search BIGO knowledge base using text search with optimized projection"""
+def stream_chat_events(events: AsyncGenerator[Dict[str, Any], None], fmt: str = "sse") -> StreamingResponse:
+    """Send chat events to the client as server-sent events (default) or NDJSON"""
+    if fmt not in ("sse", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be 'sse' or 'ndjson'")
+
+    async def body() -> AsyncGenerator[str, None]:
+        async for event in events:
+            data = json.dumps(event, default=str)
+            yield f"data: {data}\n\n" if fmt == "sse" else data + "\n"
+
+    media_type = "text/event-stream" if fmt == "sse" else "application/x-ndjson"
+    # X-Accel-Buffering stops nginx from holding deltas back until the response completes
+    return StreamingResponse(
+        body(), media_type=media_type, headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# Bursts of hosts asking the same question share one knowledge base query
+knowledge_search_flight = SingleFlight("search_bigo_knowledge", key_fn=knowledge_cache.make_key)
+
+
+async def search_bigo_knowledge(query: str, limit: int = 5, snippets: bool = False) -> List[Dict[str, Any]]:
+    """
+    Search BIGO knowledge base with the in-process BM25 + vector index, falling back to Mongo text search.
+    Repeated questions are answered from the knowledge search cache until the knowledge base changes.
+    """
+    if not query.strip():
+        return []
+    key = knowledge_cache.make_key(query, limit, snippets)
+    cached = knowledge_cache.get(key)
+    if cached is not None:
+        return cached
+    stamp = knowledge_cache.stamp()
+    results = await _search_bigo_knowledge(query, limit, snippets)
+    # An empty fallback result may be a Mongo error; only index answers are cached when empty
+    if results or knowledge_index.ready:
+        knowledge_cache.put(key, results, stamp)
+    return results
+
+
+@knowledge_search_flight.wrap
+async def _search_bigo_knowledge(query: str, limit: int = 5, snippets: bool = False) -> List[Dict[str, Any]]:
+    if knowledge_index.ready:
+        try:
+            return knowledge_index.hybrid_search(query, limit, snippets)
+        except Exception as e:
+            logging.getLogger(__name__).error(f"Knowledge index search error: {e}")
+    knowledge_index.note_fallback()
+    return await search_bigo_knowledge_text(query, limit)
+
+
+async def search_bigo_knowledge_text(query: str, limit: int = 5) -> List[Dict[str, Any]]:
+    """Search BIGO knowledge passages using Mongo text search, reading only the matching passages"""
     try:
         if not query.strip():
             return []
-
-        # Use MongoDB text search with projection to reduce data transfer
-        # Only fetch fields we need (id, url, title, content, tags)
-        results = (
-            await db.bigo_knowledge.find(
-                {"$text": {"$search": query}}, 
-                {
-                    "score": {"$meta": "textScore"},
-                    "id": 1,
-                    "url": 1,
-                    "title": 1,
-                    "content": 1,
-                    "tags": 1,
-                    "_id": 0  # Exclude MongoDB _id for cleaner response
-                }
-            )
-            .sort([("score", {"$meta": "textScore"})])
-            .limit(limit)
-            .to_list(limit)
-        )
-
-        return results
+        return await search_passages(db, query, limit)
     except Exception as e:
         logging.getLogger(__name__).error(f"BIGO knowledge search error: {e}")
         return []
@@ -585,10 +644,17 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid token")
 
-        user = await db.users.find_one({"id": user_id})
+        # Repeat callers are served from the user cache without a database round trip
+        user = user_cache.get(user_id)
         if user is None:
-            raise HTTPException(status_code=401, detail="User not found")
-        return User(**user)
+            version = user_cache.version
+            doc = await db.users.find_one({"id": user_id})
+            if doc is None:
+                raise HTTPException(status_code=401, detail="User not found")
+            user = User(**doc)
+            user_cache.put(user_id, user, version)
+        set_usage_user(user_id)
+        return user
     except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
@@ -602,6 +668,17 @@ def require_role(required_roles: List[UserRole]):
     return role_checker
 
 
+def require_permission(permission: str):
+    """Admin/owner whose admin directory entry grants `permission`, checked against the in-memory roster"""
+
+    def permission_checker(current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.OWNER]))):
+        if admin_directory.loaded and not admin_directory.has_permission(current_user.id, permission):
+            raise HTTPException(status_code=403, detail="Insufficient permissions")
+        return current_user
+
+    return permission_checker
+
+
 # Advanced BIGO Live Bean/Tier System Data
 # Using a function to lazy-load this data to avoid loading on every module import
 def get_bigo_tier_system():
@@ -839,7 +916,10 @@ Provide helpful admin-focused responses about:
 Be concise and actionable."""
 
             result = await ai_service.chat_completion(
-                messages=[{"role": "user", "content": admin_prompt}], temperature=0.7, max_completion_tokens=500
+                messages=[{"role": "user", "content": admin_prompt}],
+                temperature=0.7,
+                max_completion_tokens=500,
+                call_site="admin_assistant",
             )
             if result.get("success"):
                 return result.get("content", "Admin assistant unavailable")
@@ -887,12 +967,15 @@ async def execute_admin_action(action_type: str, action_data: Dict[str, Any], ad
                 if user_id and action:
                     if action == "promote":
                         await db.users.update_one({"id": user_id}, {"$set": {"role": "coach"}})
+                        await admin_directory.role_changed({"id": user_id, "role": "coach"})
                     elif action == "suspend":
                         await db.users.update_one({"id": user_id}, {"$set": {"status": "suspended"}})
                     elif action == "activate":
                         await db.users.update_one({"id": user_id}, {"$set": {"status": "active"}})
                     processed += 1
 
+            if processed:
+                await user_cache.users_changed()
             return {"success": True, "message": f"Processed {processed} user management actions"}
 
         elif action_type == "system_announcement":
@@ -927,6 +1010,8 @@ async def search_influencers(platform: str, keywords: List[str], min_followers:
             ],
             temperature=0.3,
             max_completion_tokens=1200,
+            lane=BATCH,
+            call_site="influencer_search",
         )
         if not ai.get("success"):
             return []
@@ -980,6 +1065,8 @@ Keep it under 200 words and professional but exciting."""
             ],
             temperature=0.7,
             max_completion_tokens=800,
+            lane=BACKGROUND,
+            call_site="outreach_email",
         )
         if not ai.get("success"):
             return "We couldn't generate the email right now. Please try again."
@@ -1029,6 +1116,7 @@ from motor.motor_asyncio import AsyncIOMotorGridFSBucket
 import mimetypes
 
 gridfs_bucket = AsyncIOMotorGridFSBucket(db, bucket_name="audition_videos")
+audition_storage.set_bucket(gridfs_bucket)
 
 
 class AuditionUploadInit(BaseModel):
@@ -1054,6 +1142,84 @@ class EventRSVP(BaseModel):
     responded_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 
+def _stored_chunk_bytes(upload_rec: dict, chunk_index: int) -> Optional[int]:
+    """Bytes recorded for a chunk index by an earlier attempt, None if it was never stored"""
+    chunk = (upload_rec.get("chunks") or {}).get(str(chunk_index))
+    return chunk["bytes"] if chunk else None
+
+
+async def store_audition_chunk(request: Request, upload_rec: dict, chunk_index: int, metadata: dict) -> dict:
+    upload_id = upload_rec["id"]
+    gridfs_filename = f"{upload_id}_{upload_rec['filename']}"
+    # A retried index replaces the earlier attempt, so its bytes are not counted twice
+    previous = _stored_chunk_bytes(upload_rec, chunk_index)
+    try:
+        stored = await audition_storage.store(
+            f"{gridfs_filename}:{chunk_index}",
+            request_chunks(request),
+            metadata={"upload_id": upload_id, "chunk_index": chunk_index, "type": "chunk", **metadata},
+            max_bytes=max(MAX_VIDEO_BYTES - upload_rec.get("received_bytes", 0) + (previous or 0), 0),
+        )
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail="File too large (max 500MB)")
+    except UploadFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # The update only applies if the chunk entry is still the one the delta was computed from; a
+    # concurrent retry of the same index moves it, and the delta is recomputed from a fresh read
+    for _ in range(5):
+        result = await db.audition_uploads.update_one(
+            {
+                "id": upload_id,
+                f"chunks.{chunk_index}.bytes": previous if previous is not None else {"$exists": False},
+            },
+            {
+                "$inc": {"received_bytes": stored.length - (previous or 0)},
+                "$set": {f"chunks.{chunk_index}": {"bytes": stored.length, "sha256": stored.sha256}},
+            },
+        )
+        if result.matched_count:
+            break
+        upload_rec = await db.audition_uploads.find_one({"id": upload_id}, {"_id": 0, "chunks": 1})
+        if upload_rec is None:
+            raise HTTPException(status_code=404, detail="Upload session not found")
+        previous = _stored_chunk_bytes(upload_rec, chunk_index)
+    else:
+        logger.warning(f"Could not record chunk {chunk_index} of audition upload {upload_id}")
+    return {"message": "Chunk received", "chunk_index": chunk_index, "bytes": stored.length, "sha256": stored.sha256}
+
+
+async def compose_audition_upload(upload_rec: dict, metadata: dict) -> str:
+    """
+    Pipe the stored chunks, in order, into the final GridFS file and drop the chunks. Returns the
+    final file name. The final file's size and sha256 are recorded on the upload session
+    """
+    upload_id = upload_rec["id"]
+    gridfs_filename = f"{upload_id}_{upload_rec['filename']}"
+    chunks = await audition_storage.chunk_files(gridfs_filename, upload_id)
+    if not chunks:
+        raise HTTPException(status_code=400, detail="No chunks found")
+    try:
+        stored = await audition_storage.store(
+            gridfs_filename,
+            audition_storage.read_files(c["_id"] for c in chunks),
+            metadata={
+                "upload_id": upload_id,
+                "content_type": upload_rec.get("content_type"),
+                "type": "final",
+                **metadata,
+            },
+        )
+    except Exception as e:
+        logger.error(f"Could not assemble audition upload {upload_id}: {e}")
+        raise HTTPException(status_code=500, detail="Could not assemble the uploaded video")
+    await audition_storage.delete_chunks(gridfs_filename, upload_id)
+    await db.audition_uploads.update_one(
+        {"id": upload_id},
+        {"$set": {"size": stored.length, "sha256": stored.sha256, "completed_at": datetime.now(timezone.utc)}},
+    )
+    return gridfs_filename
+
+
 # AUTH-REQUIRED audition endpoints
 @api_router.post("/audition/upload/init")
 async def audition_upload_init_auth(meta: AuditionUploadInitAuth, current_user: User = Depends(get_current_user)):
@@ -1102,44 +1268,19 @@ async def audition_upload_init_auth(meta: AuditionUploadInitAuth, current_user:
 
 @api_router.post("/audition/upload/chunk")
 async def audition_upload_chunk_auth(
+    request: Request,
     upload_id: str = Query(...),
     chunk_index: int = Query(...),
-    chunk: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
 ):
+    """
+    Store one chunk. The body is either multipart/form-data with the bytes in a "chunk" field or the
+    raw chunk bytes; either way it is piped into GridFS as it arrives, never written to local disk
+    """
     upload_rec = await db.audition_uploads.find_one({"id": upload_id, "user_id": current_user.id})
     if not upload_rec:
         raise HTTPException(status_code=404, detail="Upload session not found")
-    gridfs_filename = f"{upload_id}_{upload_rec['filename']}"
-    tmp_path = os.path.join(tempfile.gettempdir(), f"{gridfs_filename}_{chunk_index}.part")
-    try:
-        async with aiofiles.open(tmp_path, "wb") as f:
-            while True:
-                data = await chunk.read(1024 * 1024)
-                if not data:
-                    break
-                await f.write(data)
-        with open(tmp_path, "rb") as fsrc:
-            await gridfs_bucket.upload_from_stream(
-                filename=f"{gridfs_filename}:{chunk_index}",
-                source=fsrc,
-                metadata={
-                    "upload_id": upload_id,
-                    "chunk_index": chunk_index,
-                    "type": "chunk",
-                    "user_id": current_user.id,
-                },
-            )
-        try:
-            size = os.path.getsize(tmp_path)
-        except Exception:
-            size = 0
-        await db.audition_uploads.update_one({"id": upload_id}, {"$inc": {"received_bytes": size}})
-    finally:
-        try:
-            os.remove(tmp_path)
-        except Exception:
-            pass
+    return await store_audition_chunk(request, upload_rec, chunk_index, {"user_id": current_user.id})
 
 
 @api_router.post("/audition/upload/complete")
@@ -1147,66 +1288,7 @@ async def audition_upload_complete_auth(upload_id: str = Query(...), current_use
     upload_rec = await db.audition_uploads.find_one({"id": upload_id, "user_id": current_user.id})
     if not upload_rec:
         raise HTTPException(status_code=404, detail="Upload session not found")
-    gridfs_filename = f"{upload_id}_{upload_rec['filename']}"
-
-    # Compose final file
-    chunks = []
-    async for file in gridfs_bucket.find(
-        {"filename": {"$regex": f"^{gridfs_filename}:"}, "metadata.upload_id": upload_id}
-    ):
-        chunks.append({"id": file._id, "filename": file.filename})
-    if not chunks:
-        raise HTTPException(status_code=400, detail="No chunks found")
-
-    def idx(name: str):
-        try:
-            return int(name.split(":")[-1])
-        except Exception:
-            return 0
-
-    chunks.sort(key=lambda c: idx(c["filename"]))
-
-    try:
-        final_tmp = os.path.join(tempfile.gettempdir(), f"{gridfs_filename}.final")
-        with open(final_tmp, "wb") as fout:
-            for c in chunks:
-                try:
-                    stream = await gridfs_bucket.open_download_stream_by_name(c["filename"])
-                    if stream:
-                        while True:
-                            b = await stream.read(1024 * 1024)
-                            if not b:
-                                break
-                            fout.write(b)
-                        await stream.close()
-                except Exception as e:
-                    logger.error(f"Error processing chunk {c['filename']}: {e}")
-                    continue
-        with open(final_tmp, "rb") as fin:
-            await gridfs_bucket.upload_from_stream(
-                filename=gridfs_filename,
-                source=fin,
-                metadata={
-                    "upload_id": upload_id,
-                    "content_type": upload_rec.get("content_type"),
-                    "type": "final",
-                    "user_id": current_user.id,
-                },
-            )
-    finally:
-        try:
-            os.remove(final_tmp)
-        except Exception:
-            pass
-
-    # Clean chunk parts
-    async for file in gridfs_bucket.find(
-        {"filename": {"$regex": f"^{gridfs_filename}:"}, "metadata.upload_id": upload_id}
-    ):
-        try:
-            await gridfs_bucket.delete(file._id)
-        except Exception:
-            pass
+    gridfs_filename = await compose_audition_upload(upload_rec, {"user_id": current_user.id})
 
     # Link to submission
     final_url = f"gridfs://auditions/byname/{gridfs_filename}"
@@ -1254,7 +1336,9 @@ async def public_onboarding_chat(req: OnboardingChatRequest):
     )
     try:
         messages = [{"role": "system", "content": system_prompt}, {"role": "user", "content": msg}]
-        ai_resp = await ai_service.chat_completion(messages, temperature=0.6, max_completion_tokens=500)
+        ai_resp = await ai_service.chat_completion(
+            messages, temperature=0.6, max_completion_tokens=500, call_site="public_onboarding_chat"
+        )
         if not ai_resp.get("success"):
             raise HTTPException(status_code=500, detail=ai_resp.get("error", "AI error"))
         text = ai_resp.get("content", "")
@@ -1342,44 +1426,11 @@ async def audition_upload_init(meta: AuditionUploadInit):
 
 
 @api_router.post("/public/audition/upload/chunk")
-async def audition_upload_chunk(
-    upload_id: str = Query(...), chunk_index: int = Query(...), chunk: UploadFile = File(...)
-):
+async def audition_upload_chunk(request: Request, upload_id: str = Query(...), chunk_index: int = Query(...)):
     upload_rec = await db.audition_uploads.find_one({"id": upload_id})
     if not upload_rec:
         raise HTTPException(status_code=404, detail="Upload session not found")
-
-    # Append chunk to GridFS file stream named by upload_id
-    gridfs_filename = f"{upload_id}_{upload_rec['filename']}"
-    # We store each chunk as a temp file then append via GridFS upload_from_stream
-    tmp_path = os.path.join(tempfile.gettempdir(), f"{gridfs_filename}_{chunk_index}.part")
-    try:
-        async with aiofiles.open(tmp_path, "wb") as f:
-            while True:
-                data = await chunk.read(1024 * 1024)
-                if not data:
-                    break
-                await f.write(data)
-
-        # Save chunk into GridFS as separate file chunk refs
-        with open(tmp_path, "rb") as fsrc:
-            await gridfs_bucket.upload_from_stream(
-                filename=f"{gridfs_filename}:{chunk_index}",
-                source=fsrc,
-                metadata={"upload_id": upload_id, "chunk_index": chunk_index, "type": "chunk"},
-            )
-        # increment received bytes based on actual chunk file size
-        try:
-            size = os.path.getsize(tmp_path)
-        except Exception:
-            size = 0
-        await db.audition_uploads.update_one({"id": upload_id}, {"$inc": {"received_bytes": size}})
-    finally:
-        try:
-            os.remove(tmp_path)
-        except Exception:
-            pass
-    return {"message": "Chunk received"}
+    return await store_audition_chunk(request, upload_rec, chunk_index, {})
 
 
 @api_router.post("/public/audition/upload/complete")
@@ -1389,67 +1440,7 @@ async def audition_upload_complete(upload_id: str = Query(...)):
         raise HTTPException(status_code=404, detail="Upload session not found")
 
     # Reassemble by streaming all chunk files in order into final GridFS file
-    gridfs_filename = f"{upload_id}_{upload_rec['filename']}"
-
-    # List chunk files stored in GridFS
-    chunks = []
-    async for file in gridfs_bucket.find(
-        {"filename": {"$regex": f"^{gridfs_filename}:"}, "metadata.upload_id": upload_id}
-    ):
-        chunks.append({"id": file._id, "filename": file.filename})
-    if not chunks:
-        raise HTTPException(status_code=400, detail="No chunks found")
-
-    # Sort by chunk index
-    def idx(name: str):
-        try:
-            return int(name.split(":")[-1])
-        except Exception:
-            return 0
-
-    chunks.sort(key=lambda c: idx(c["filename"]))
-
-    # Create final file
-    # Compose final file into GridFS by filename (no ObjectId tracking)
-    try:
-        # Create a pipe via temporary file to compose
-        final_tmp = os.path.join(tempfile.gettempdir(), f"{gridfs_filename}.final")
-        with open(final_tmp, "wb") as fout:
-            for c in chunks:
-                # download each chunk and append
-                try:
-                    stream = await gridfs_bucket.open_download_stream_by_name(c["filename"])
-                    if stream:
-                        while True:
-                            b = await stream.read(1024 * 1024)
-                            if not b:
-                                break
-                            fout.write(b)
-                        await stream.close()
-                except Exception as e:
-                    logger.error(f"Error processing chunk {c['filename']}: {e}")
-                    continue
-        # upload composed file
-        with open(final_tmp, "rb") as fin:
-            await gridfs_bucket.upload_from_stream(
-                filename=gridfs_filename,
-                source=fin,
-                metadata={"upload_id": upload_id, "content_type": upload_rec.get("content_type"), "type": "final"},
-            )
-    finally:
-        try:
-            os.remove(final_tmp)
-        except Exception:
-            pass
-
-    # Clean up chunk files
-    async for file in gridfs_bucket.find(
-        {"filename": {"$regex": f"^{gridfs_filename}:"}, "metadata.upload_id": upload_id}
-    ):
-        try:
-            await gridfs_bucket.delete(file._id)
-        except Exception:
-            pass
+    gridfs_filename = await compose_audition_upload(upload_rec, {})
 
     # Link to submission
     # Store URL by filename to avoid ObjectId usage
@@ -1646,7 +1637,7 @@ async def register(user_data: UserCreate):
 
     passcode_benefits = AGENCY_CODES.get(user_data.passcode, {"discord_access": False, "role": "host"})
 
-    hashed_password = hash_password(user_data.password)
+    hashed_password = await hash_password(user_data.password)
 
     user = User(
         bigo_id=user_data.bigo_id,
@@ -1661,31 +1652,48 @@ async def register(user_data: UserCreate):
     user_dict["password"] = hashed_password
 
     await db.users.insert_one(user_dict)
+    # The new user's first authenticated request is served from the cache
+    user_cache.put(user.id, user)
 
     access_token = create_access_token(data={"sub": user.id})
 
-    # sync admins table after inserting user (covers admin/owner)
-    await sync_admins_collection(rebuild=False)
+    # Only admin/owner signups touch the admins collection; the account exists either way, and the
+    # periodic reconcile picks up a row that could not be written here
+    try:
+        await admin_directory.role_changed(user_dict, new_user=True)
+    except Exception as e:
+        logging.getLogger(__name__).error(f"Admins sync failed for new user {user.id}: {e}")
 
     return {"access_token": access_token, "token_type": "bearer", "user": user}
 
 
 @api_router.post("/auth/register/admin/rebuild")
 async def rebuild_admins(current_user: User = Depends(require_role([UserRole.OWNER, UserRole.ADMIN]))):
-    await sync_admins_collection(rebuild=True)
+    await admin_directory.reconcile(rebuild=True)
     return {"message": "Admins collection rebuilt"}
 
 
+@api_router.get("/admin/directory")
+async def get_admin_directory(current_user: User = Depends(require_permission("manage_users"))):
+    """Admin roster served from memory, with event and reconciliation counters"""
+    return {"admins": admin_directory.admins(), "stats": admin_directory.stats()}
+
+
 @api_router.post("/auth/login")
 async def login(login_data: UserLogin):
     user_doc = await db.users.find_one({"bigo_id": login_data.bigo_id})
     if not user_doc:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    if not verify_password(login_data.password, user_doc["password"]):
+    valid, new_hash = await password_hasher.verify(login_data.password, user_doc["password"])
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    if new_hash:
+        # Stored hash predates the current work factor; upgrade it while the plaintext is at hand
+        await db.users.update_one({"id": user_doc["id"]}, {"$set": {"password": new_hash}})
 
     user = User(**user_doc)
+    user_cache.put(user.id, user)
     access_token = create_access_token(data={"sub": user.id})
 
     return {"access_token": access_token, "token_type": "bearer", "user": user}
@@ -1697,8 +1705,8 @@ async def get_me(current_user: User = Depends(get_current_user)):
 
 
 # Enhanced AI Routes with Groq
-@api_router.post("/ai/chat")
-async def ai_chat(chat_data: dict, current_user: User = Depends(get_current_user)):
+def _parse_ai_chat_request(chat_data: dict, current_user: User) -> Dict[str, Any]:
+    """Validate the fields shared by /ai/chat and its streaming variant"""
     message = chat_data.get("message", "").strip()
     chat_type = chat_data.get("chat_type", "strategy_coach")
     use_research = bool(chat_data.get("use_research", False))
@@ -1710,7 +1718,11 @@ async def ai_chat(chat_data: dict, current_user: User = Depends(get_current_user
     if use_research and current_user.role not in ["owner", "admin"]:
         raise HTTPException(status_code=403, detail="Research mode requires admin")
 
-    # Route to specialized prompts
+    return {"message": message, "chat_type": chat_type}
+
+
+def _build_ai_chat_messages(message: str, chat_type: str, current_user: User) -> List[Dict[str, str]]:
+    """Route to specialized prompts"""
     if chat_type == "admin_assistant":
         admin_prompt = f"""You are an Admin Assistant for Level Up Agency BIGO Live platform.
 
@@ -1723,9 +1735,30 @@ Provide helpful admin-focused responses about:
 - Strategy recommendations
 
 Be concise and actionable."""
+        return [{"role": "user", "content": admin_prompt}]
+
+    return ai_service.build_bigo_strategy_messages(
+        message,
+        user_context={
+            "tier": getattr(current_user, "tier", None),
+            "beans": getattr(current_user, "beans", 0),
+            "role": current_user.role,
+        },
+    )
+
+
+@api_router.post("/ai/chat")
+async def ai_chat(chat_data: dict, current_user: User = Depends(get_current_user)):
+    parsed = _parse_ai_chat_request(chat_data, current_user)
+    message = parsed["message"]
+    chat_type = parsed["chat_type"]
 
+    if chat_type == "admin_assistant":
         ai_res = await ai_service.chat_completion(
-            messages=[{"role": "user", "content": admin_prompt}], temperature=0.7, max_completion_tokens=500
+            messages=_build_ai_chat_messages(message, chat_type, current_user),
+            temperature=0.7,
+            max_completion_tokens=500,
+            call_site="admin_assistant",
         )
         if not ai_res.get("success"):
             raise HTTPException(status_code=500, detail=ai_res.get("error", "AI error"))
@@ -1745,6 +1778,34 @@ Be concise and actionable."""
     return {"response": ai_text, "chat_type": chat_type}
 
 
+@api_router.post("/ai/chat/stream")
+async def ai_chat_stream(chat_data: dict, format: str = Query("sse"), current_user: User = Depends(get_current_user)):
+    """Streaming variant of /ai/chat; the chat record is stored once the stream completes"""
+    parsed = _parse_ai_chat_request(chat_data, current_user)
+    message = parsed["message"]
+    chat_type = parsed["chat_type"]
+    messages = _build_ai_chat_messages(message, chat_type, current_user)
+    # Metered under the same call sites as the blocking /ai/chat
+    call_site = "admin_assistant" if chat_type == "admin_assistant" else "bigo_strategy"
+
+    async def events() -> AsyncGenerator[Dict[str, Any], None]:
+        async for event in ai_service.chat_completion_stream(
+            messages, temperature=0.7, max_completion_tokens=500, call_site=call_site
+        ):
+            if event["type"] == "delta":
+                yield event
+            elif event["type"] == "error":
+                yield {"type": "error", "error": event.get("error", "AI error")}
+                return
+            else:
+                ai_text = event["content"]
+                chat_record = AIChat(user_id=current_user.id, message=message, ai_response=ai_text, chat_type=chat_type)
+                await db.ai_chats.insert_one(chat_record.dict())
+                yield {"type": "done", "response": ai_text, "chat_type": chat_type}
+
+    return stream_chat_events(events(), format)
+
+
 @api_router.get("/ai/models")
 async def list_groq_models(current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.OWNER]))):
     res = await ai_service.list_models()
@@ -1753,6 +1814,99 @@ async def list_groq_models(current_user: User = Depends(require_role([UserRole.A
     return res.get("data", [])
 
 
+@api_router.get("/admin/ai/cache/stats")
+async def get_ai_cache_stats(current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.OWNER]))):
+    """AI response cache hit/miss counters per call site"""
+    return ai_service.response_cache.stats()
+
+
+@api_router.get("/admin/ai/coalescing/stats")
+async def get_ai_coalescing_stats(current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.OWNER]))):
+    """How many identical in-flight requests were collapsed into a shared upstream call"""
+    return singleflight_stats()
+
+
+@api_router.get("/admin/ai/scheduler/stats")
+async def get_ai_scheduler_stats(current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.OWNER]))):
+    """Per-lane queue depth, queue wait, retries and learned Groq rate-limit budgets"""
+    return ai_service.scheduler.stats()
+
+
+@api_router.get("/admin/ai/routing/stats")
+async def get_ai_routing_stats(current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.OWNER]))):
+    """Model tier, latency and token usage per chat completion call site"""
+    return ai_service.model_router.stats()
+
+
+@api_router.get("/admin/ai/usage")
+async def get_ai_usage(
+    group_by: str = Query("endpoint", description=f"Comma-separated subset of {', '.join(ROLLUP_DIMENSIONS)}"),
+    days: int = Query(1, ge=1, le=90),
+    endpoint: Optional[str] = None,
+    call_site: Optional[str] = None,
+    user_id: Optional[str] = None,
+    model: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.OWNER])),
+):
+    """LLM token, call and latency rollups over the last `days` days, biggest consumers first"""
+    dimensions = [d.strip() for d in group_by.split(",") if d.strip()]
+    unknown = [d for d in dimensions if d not in ROLLUP_DIMENSIONS]
+    if not dimensions or unknown:
+        raise HTTPException(status_code=400, detail=f"group_by must be a subset of {', '.join(ROLLUP_DIMENSIONS)}")
+    filters = {"endpoint": endpoint, "call_site": call_site, "user_id": user_id, "model": model}
+    rows = await ai_service.usage_meter.rollup(dimensions, days=days, filters=filters, limit=limit)
+    return {"rows": rows, "meter": ai_service.usage_meter.stats()}
+
+
+@api_router.get("/admin/ai/compaction/stats")
+async def get_ai_compaction_stats(current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.OWNER]))):
+    """Conversation compaction queue depth, retries and failures"""
+    return await ai_service.compaction_queue.stats()
+
+
+@api_router.get("/admin/knowledge/index/stats")
+async def get_knowledge_index_stats(current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.OWNER]))):
+    """Knowledge index size (BM25 terms and vectors), refresh watermark, Mongo fallbacks and cache hit rate"""
+    return {**knowledge_index.stats(), "cache": knowledge_cache.stats()}
+
+
+@api_router.get("/admin/http/stats")
+async def get_http_client_stats(current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.OWNER]))):
+    """Outbound connection pools and per-upstream connect / TTFB / total timings"""
+    return http_client.stats()
+
+
+@api_router.get("/admin/settings-store/stats")
+async def get_settings_store_stats(current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.OWNER]))):
+    """How the in-memory settings snapshot is kept current and when it last changed"""
+    return settings_store.stats()
+
+
+@api_router.get("/admin/indexes")
+async def get_index_drift(current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.OWNER]))):
+    """Declared indexes missing from MongoDB, indexes whose options differ and indexes no spec describes"""
+    return await index_drift(db)
+
+
+@api_router.get("/admin/password-hasher/stats")
+async def get_password_hasher_stats(current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.OWNER]))):
+    """bcrypt work factor, worker pool size, calls in flight and hashes upgraded on login"""
+    return password_hasher.stats()
+
+
+@api_router.get("/admin/audition-storage/stats")
+async def get_audition_storage_stats(current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.OWNER]))):
+    """Files and bytes streamed into GridFS, throughput, aborted uploads and uploads in flight"""
+    return audition_storage.stats()
+
+
+@api_router.get("/admin/user-cache/stats")
+async def get_user_cache_stats(current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.OWNER]))):
+    """Authenticated-user cache hit rate, size and the users version it is stamped with"""
+    return user_cache.stats()
+
+
 @api_router.get("/ai/chat/history")
 async def get_ai_chat_history(current_user: User = Depends(get_current_user)):
     chats = await db.ai_chats.find({"user_id": current_user.id}).sort("created_at", -1).limit(50).to_list(50)
@@ -1831,7 +1985,11 @@ async def generate_quiz(
     )
     try:
         ai = await ai_service.chat_completion(
-            [{"role": "user", "content": prompt}], temperature=0.5, max_completion_tokens=1200
+            [{"role": "user", "content": prompt}],
+            temperature=0.5,
+            max_completion_tokens=1200,
+            lane=BATCH,
+            call_site="quiz_generate",
         )
         if not ai.get("success"):
             raise HTTPException(status_code=500, detail=ai.get("error", "AI error"))
@@ -2580,6 +2738,7 @@ async def review_submission(
         task = await db.tasks.find_one({"id": submission["task_id"]})
         if task:
             await db.users.update_one({"id": submission["user_id"]}, {"$inc": {"total_points": task["points"]}})
+            user_cache.invalidate(submission["user_id"])
 
             point_entry = PointLedger(
                 user_id=submission["user_id"],
@@ -2639,6 +2798,7 @@ async def attempt_quiz(quiz_id: str, answers: List[int], current_user: User = De
 
     if passed:
         await db.users.update_one({"id": current_user.id}, {"$inc": {"total_points": quiz["points"]}})
+        user_cache.invalidate(current_user.id)
 
         point_entry = PointLedger(
             user_id=current_user.id,
@@ -2804,7 +2964,9 @@ async def redeem_reward(reward_id: str, current_user: User = Depends(get_current
     if not reward:
         raise HTTPException(status_code=404, detail="Reward not found")
 
-    if current_user.total_points < reward["cost_points"]:
+    # The balance is read live; the cached principal may predate a recent points change
+    balance = await db.users.find_one({"id": current_user.id}, {"_id": 0, "total_points": 1})
+    if (balance or {}).get("total_points", 0) < reward["cost_points"]:
         raise HTTPException(status_code=400, detail="Insufficient points")
 
     redemption = Redemption(user_id=current_user.id, reward_id=reward_id)
@@ -2812,6 +2974,7 @@ async def redeem_reward(reward_id: str, current_user: User = Depends(get_current
     await db.redemptions.insert_one(redemption.dict())
 
     await db.users.update_one({"id": current_user.id}, {"$inc": {"total_points": -reward["cost_points"]}})
+    user_cache.invalidate(current_user.id)
 
     point_entry = PointLedger(
         user_id=current_user.id,
@@ -3019,17 +3182,12 @@ async def get_voice_voices(current_user: User = Depends(get_current_user)):
 
 
 # Admin assistant router endpoints (moved to /api/admin-assistant)
-@api_router.post("/admin-assistant/chat")
-async def admin_assistant_chat(
-    chat_data: dict, current_user: User = Depends(require_role([UserRole.OWNER, UserRole.ADMIN]))
-):
-    """Enhanced intelligent Admin assistant chat endpoint with structured action extraction"""
-    message = chat_data.get("message", "")
-    context = chat_data.get("context", {})
+ACTION_JSON_MARKER = "ACTION_JSON:"
 
-    try:
-        # Enhanced intelligent admin prompt with BIGO platform knowledge
-        admin_prompt = f"""You are an intelligent AI Admin Assistant for Level Up Agency, \
+
+def _build_admin_assistant_prompt(message: str, context: Any, current_user: User) -> str:
+    """Enhanced intelligent admin prompt with BIGO platform knowledge"""
+    return f"""You are an intelligent AI Admin Assistant for Level Up Agency, \
 a BIGO Live host management platform.
 
 You have deep knowledge of:
@@ -3104,10 +3262,45 @@ Would you like detailed metrics for specific hosts?"
 
 Now respond to the admin's query intelligently and professionally."""
 
+
+def _split_action_json(ai_response: str):
+    """Extract action JSON if present; returns (response_text, action, payload)"""
+    action = None
+    payload = None
+
+    if ACTION_JSON_MARKER in ai_response:
+        parts = ai_response.split(ACTION_JSON_MARKER)
+        response_text = parts[0].strip()
+        try:
+            action_json_str = parts[1].strip()
+            action_data = json.loads(action_json_str)
+            action = action_data.get("action")
+            payload = action_data.get("payload", {})
+        except (json.JSONDecodeError, IndexError) as e:
+            logging.getLogger(__name__).warning(f"Failed to parse action JSON: {e}")
+            response_text = ai_response
+    else:
+        response_text = ai_response
+
+    return response_text, action, payload
+
+
+@api_router.post("/admin-assistant/chat")
+async def admin_assistant_chat(
+    chat_data: dict, current_user: User = Depends(require_role([UserRole.OWNER, UserRole.ADMIN]))
+):
+    """Enhanced intelligent Admin assistant chat endpoint with structured action extraction"""
+    message = chat_data.get("message", "")
+    context = chat_data.get("context", {})
+
+    try:
+        admin_prompt = _build_admin_assistant_prompt(message, context, current_user)
+
         result = await ai_service.chat_completion(
             messages=[{"role": "user", "content": admin_prompt}],
             temperature=0.7,
             max_completion_tokens=700,  # Increased for more comprehensive responses
+            call_site="admin_assistant",
         )
 
         if not result.get("success"):
@@ -3115,23 +3308,7 @@ Now respond to the admin's query intelligently and professionally."""
 
         ai_response = result.get("content", "Admin assistant is currently unavailable.")
 
-        # Extract action JSON if present
-        action = None
-        payload = None
-
-        if "ACTION_JSON:" in ai_response:
-            parts = ai_response.split("ACTION_JSON:")
-            response_text = parts[0].strip()
-            try:
-                action_json_str = parts[1].strip()
-                action_data = json.loads(action_json_str)
-                action = action_data.get("action")
-                payload = action_data.get("payload", {})
-            except (json.JSONDecodeError, IndexError) as e:
-                logging.getLogger(__name__).warning(f"Failed to parse action JSON: {e}")
-                response_text = ai_response
-        else:
-            response_text = ai_response
+        response_text, action, payload = _split_action_json(ai_response)
 
         # Return structured response
         return {
@@ -3154,6 +3331,62 @@ Now respond to the admin's query intelligently and professionally."""
         }
 
 
+@api_router.post("/admin-assistant/chat/stream")
+async def admin_assistant_chat_stream(
+    chat_data: dict,
+    format: str = Query("sse"),
+    current_user: User = Depends(require_role([UserRole.OWNER, UserRole.ADMIN])),
+):
+    """
+    Streaming admin assistant chat. Natural-language text is forwarded as it arrives;
+    anything after the ACTION_JSON marker is held back and parsed at stream end.
+    """
+    message = chat_data.get("message", "")
+    context = chat_data.get("context", {})
+    admin_prompt = _build_admin_assistant_prompt(message, context, current_user)
+
+    async def events() -> AsyncGenerator[Dict[str, Any], None]:
+        full_text = ""
+        forwarded = 0
+        async for event in ai_service.chat_completion_stream(
+            [{"role": "user", "content": admin_prompt}],
+            temperature=0.7,
+            max_completion_tokens=700,
+            call_site="admin_assistant",
+        ):
+            if event["type"] == "delta":
+                full_text += event["content"]
+                marker_at = full_text.find(ACTION_JSON_MARKER)
+                if marker_at >= 0:
+                    safe_end = marker_at
+                else:
+                    # Hold back a possible partial marker at the tail of the buffer
+                    safe_end = len(full_text) - (len(ACTION_JSON_MARKER) - 1)
+                if safe_end > forwarded:
+                    yield {"type": "delta", "content": full_text[forwarded:safe_end]}
+                    forwarded = safe_end
+            elif event["type"] == "error":
+                logging.getLogger(__name__).error(f"Admin assistant stream error: {event.get('error')}")
+                yield {"type": "error", "error": event.get("error", "AI error")}
+                return
+            else:
+                full_text = event["content"] or "Admin assistant is currently unavailable."
+                response_text, action, payload = _split_action_json(full_text)
+                if ACTION_JSON_MARKER not in full_text and len(full_text) > forwarded:
+                    yield {"type": "delta", "content": full_text[forwarded:]}
+                yield {
+                    "type": "done",
+                    "response": response_text,
+                    "action": action,
+                    "payload": payload,
+                    "context": context,
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                    "user_id": current_user.id,
+                }
+
+    return stream_chat_events(events(), format)
+
+
 # ============================================
 # ADMIN SETTINGS ENDPOINTS
 # ============================================
@@ -3225,8 +3458,8 @@ async def update_groq_key(
             upsert=True,
         )
 
-        # Clear AI service cache to reload new key
-        ai_service.clear_key_cache()
+        # Other workers pick the new key up from the settings watcher
+        settings_store.apply("groq_api_key", new_key)
 
         return {
             "success": True,
@@ -3246,9 +3479,8 @@ async def update_groq_key(
 # ============================================
 
 
-@api_router.post("/ai/chat/with-memory")
-async def ai_chat_with_memory(chat_data: dict, current_user: User = Depends(get_current_user)):
-    """AI chat with conversational memory"""
+async def _prepare_memory_chat(chat_data: dict, current_user: User) -> Dict[str, Any]:
+    """Validate the request and assemble the prompt from stored conversation memory"""
     message = chat_data.get("message", "").strip()
     session_id = chat_data.get("session_id") or str(uuid.uuid4())
     chat_type = chat_data.get("chat_type", "strategy_coach")
@@ -3261,50 +3493,73 @@ async def ai_chat_with_memory(chat_data: dict, current_user: User = Depends(get_
     if use_research and current_user.role not in ["owner", "admin"]:
         raise HTTPException(status_code=403, detail="Research mode requires admin")
 
-    try:
-        # Get memory context
-        memory = await ai_service.get_memory_context(current_user.id, session_id)
+    # Get memory context
+    memory = await ai_service.get_memory_context(current_user.id, session_id)
+
+    # Build messages with memory
+    messages = []
+
+    # Add long-term memory as system context if available
+    if memory.get("long_term_summary"):
+        messages.append({"role": "system", "content": f"User background: {memory['long_term_summary']}"})
+
+    # Add conversation summary if available
+    if memory.get("summary"):
+        messages.append({"role": "system", "content": f"Previous conversation: {memory['summary']}"})
+
+    # Add recent messages
+    for msg in memory.get("messages", []):
+        messages.append({"role": msg["role"], "content": msg["content"]})
+
+    # Add current message
+    messages.append({"role": "user", "content": message})
+
+    return {
+        "message": message,
+        "session_id": session_id,
+        "chat_type": chat_type,
+        "messages": messages,
+        "has_memory": len(memory.get("messages", [])) > 0,
+    }
 
-        # Build messages with memory
-        messages = []
 
-        # Add long-term memory as system context if available
-        if memory.get("long_term_summary"):
-            messages.append({"role": "system", "content": f"User background: {memory['long_term_summary']}"})
+async def _record_memory_chat(prepared: Dict[str, Any], ai_text: str, current_user: User):
+    """Persist a completed memory chat turn to conversation memory and chat history"""
+    # Save conversation turn
+    await ai_service.save_conversation_turn(current_user.id, prepared["session_id"], prepared["message"], ai_text)
 
-        # Add conversation summary if available
-        if memory.get("summary"):
-            messages.append({"role": "system", "content": f"Previous conversation: {memory['summary']}"})
+    # Save to ai_chats for history
+    chat_record = AIChat(
+        user_id=current_user.id,
+        message=prepared["message"],
+        ai_response=ai_text,
+        chat_type=prepared["chat_type"],
+        session_id=prepared["session_id"],
+    )
+    await db.ai_chats.insert_one(chat_record.dict())
 
-        # Add recent messages
-        for msg in memory.get("messages", []):
-            messages.append({"role": msg["role"], "content": msg["content"]})
 
-        # Add current message
-        messages.append({"role": "user", "content": message})
+@api_router.post("/ai/chat/with-memory")
+async def ai_chat_with_memory(chat_data: dict, current_user: User = Depends(get_current_user)):
+    """AI chat with conversational memory"""
+    try:
+        prepared = await _prepare_memory_chat(chat_data, current_user)
 
         # Get AI response
-        result = await ai_service.chat_completion(messages=messages)
+        result = await ai_service.chat_completion(messages=prepared["messages"], call_site="memory_chat")
 
         if not result.get("success"):
             raise HTTPException(status_code=500, detail=result.get("error", "AI error"))
 
         ai_text = result.get("content", "")
 
-        # Save conversation turn
-        await ai_service.save_conversation_turn(current_user.id, session_id, message, ai_text)
-
-        # Save to ai_chats for history
-        chat_record = AIChat(
-            user_id=current_user.id, message=message, ai_response=ai_text, chat_type=chat_type, session_id=session_id
-        )
-        await db.ai_chats.insert_one(chat_record.dict())
+        await _record_memory_chat(prepared, ai_text, current_user)
 
         return {
             "response": ai_text,
-            "session_id": session_id,
-            "chat_type": chat_type,
-            "has_memory": len(memory.get("messages", [])) > 0,
+            "session_id": prepared["session_id"],
+            "chat_type": prepared["chat_type"],
+            "has_memory": prepared["has_memory"],
         }
     except HTTPException:
         raise
@@ -3313,6 +3568,40 @@ async def ai_chat_with_memory(chat_data: dict, current_user: User = Depends(get_
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@api_router.post("/ai/chat/with-memory/stream")
+async def ai_chat_with_memory_stream(
+    chat_data: dict, format: str = Query("sse"), current_user: User = Depends(get_current_user)
+):
+    """Streaming AI chat with conversational memory; memory is saved when the stream completes"""
+    try:
+        prepared = await _prepare_memory_chat(chat_data, current_user)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"AI chat with memory error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def events() -> AsyncGenerator[Dict[str, Any], None]:
+        async for event in ai_service.chat_completion_stream(prepared["messages"], call_site="memory_chat"):
+            if event["type"] == "delta":
+                yield event
+            elif event["type"] == "error":
+                yield {"type": "error", "error": event.get("error", "AI error")}
+                return
+            else:
+                ai_text = event["content"]
+                await _record_memory_chat(prepared, ai_text, current_user)
+                yield {
+                    "type": "done",
+                    "response": ai_text,
+                    "session_id": prepared["session_id"],
+                    "chat_type": prepared["chat_type"],
+                    "has_memory": prepared["has_memory"],
+                }
+
+    return stream_chat_events(events(), format)
+
+
 @api_router.delete("/ai/chat/memory/{session_id}")
 async def clear_conversation_memory(session_id: str, current_user: User = Depends(get_current_user)):
     """Clear conversation memory for a session"""
@@ -3458,9 +3747,72 @@ async def get_beangenie_data(current_user: User = Depends(get_current_user)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@api_router.post("/beangenie/chat")
-async def beangenie_chat(chat_data: dict, current_user: User = Depends(get_current_user)):
-    """BeanGenie AI chat with BIGO-only responses and source citations"""
+# Static BeanGenie system prompt, parsed once; knowledge sources and user context are filled in per request
+BEANGENIE_SYSTEM_PROMPT = PromptTemplate(
+    """You are BeanGenie™, the ultimate BIGO Live expert AI coach with deep knowledge of the platform. You have been extensively trained on BIGO Live data and strategies.
+
+CORE EXPERTISE AREAS:
+- BIGO Bean/Diamond currency system and monetization
+- Tier rankings (S1-S25) and progression strategies
+- PK Battle tactics and competitive streaming
+- Audience engagement and community building
+- Streaming schedules and optimization
+- Gift strategies and revenue maximization
+- Content creation and planning
+- Technical setup and equipment
+- Host training and career development
+
+CRITICAL RULES:
+1. ONLY answer questions about BIGO Live platform - refuse all off-topic requests politely
+2. ALWAYS use information from the provided knowledge sources below
+3. CITE sources using [1], [2], etc. inline in your response
+4. End response with "Sources:" section listing all citations
+5. Be concise yet comprehensive - target 200-300 words
+6. Address user respectfully as "Boss" or "Master"
+7. Provide actionable, specific advice based on user's tier/context
+8. Use BIGO Live terminology correctly (beans, diamonds, PK, tier, etc.)
+
+PROVIDED BIGO KNOWLEDGE SOURCES:
+{sources_context}
+
+LEVEL UP AGENCY PAY TIER SYSTEM:
+🥉 BRONZE (S1-S5) - $500-1000/month (Part-time, 20hrs/week, learning phase)
+🥈 SILVER (S6-S10) - $1000-2000/month (Full-time, 40hrs/week, growing audience)
+🥇 GOLD (S11-S15) - $2000-5000/month (Professional, 60hrs/week, established host)
+💎 DIAMOND (S16+) - $5000+/month (Elite, 80hrs/week, top-tier host)
+
+CURRENT USER CONTEXT:
+- Role: {role}{context_info}{panel_info}
+
+RESPONSE STRATEGY:
+1. Acknowledge the question and user's context
+2. Provide specific, actionable answer using source knowledge
+3. Include concrete examples and numbers where applicable
+4. Cite sources inline [1], [2] for credibility
+5. Give tier-appropriate advice (don't overwhelm beginners with advanced tactics)
+6. End with motivational encouragement
+7. Conclude with "Sources:" section
+
+INTELLIGENCE PRINCIPLES:
+- Synthesize information from multiple sources when relevant
+- Adapt advice to user's current tier and experience level
+- Provide progressive strategies (what to do now vs. later)
+- Reference specific BIGO features, numbers, and systems
+- Balance motivation with realistic, practical guidance
+- Show deep understanding of BIGO Live ecosystem
+
+If the question is NOT about BIGO Live, respond: "I'm specialized in BIGO Live coaching, Boss. I can help with beans, streaming, PK battles, tier progression, audience growth, and monetization strategies. What BIGO topic would you like to discuss?"
+
+Remember: You are the world's leading BIGO Live expert. Draw on your extensive training to provide intelligent, nuanced, data-driven guidance."""
+)
+
+
+async def _prepare_beangenie_chat(chat_data: dict) -> Dict[str, Any]:
+    """
+    Shared BeanGenie pre-processing for the blocking and streaming endpoints.
+    Returns {"reply": {...}} when no LLM call is needed, otherwise the prompt
+    messages plus the knowledge results used for citations.
+    """
     message = chat_data.get("message", "").strip()
     session_id = chat_data.get("session_id", str(uuid.uuid4()))
     active_context = chat_data.get("active_context")
@@ -3470,35 +3822,39 @@ async def beangenie_chat(chat_data: dict, current_user: User = Depends(get_curre
     if not message:
         raise HTTPException(status_code=400, detail="Message required")
 
-    try:
-        # Step 1: Classify intent before doing knowledge search
-        intent_result = await ai_service.classify_intent(message)
+    # Step 1: Classify intent before doing knowledge search
+    intent_result = await ai_service.classify_intent(message)
 
-        # Step 2: Handle greetings and casual messages with friendly redirect
-        if intent_result["intent"] in ["greeting", "casual"] and not intent_result["is_bigo_related"]:
-            return {
+    # Step 2: Handle greetings and casual messages with friendly redirect
+    if intent_result["intent"] in ["greeting", "casual"] and not intent_result["is_bigo_related"]:
+        return {
+            "reply": {
                 "response": intent_result["suggested_response"],
                 "sources": [],
                 "session_id": session_id,
                 "intent": intent_result["intent"],
             }
+        }
 
-        # Step 3: Handle off-topic questions with gentle redirect
-        if intent_result["intent"] == "off_topic" and not intent_result["is_bigo_related"]:
-            return {
+    # Step 3: Handle off-topic questions with gentle redirect
+    if intent_result["intent"] == "off_topic" and not intent_result["is_bigo_related"]:
+        return {
+            "reply": {
                 "response": intent_result["suggested_response"],
                 "sources": [],
                 "session_id": session_id,
                 "intent": "off_topic",
             }
+        }
 
-        # Step 4: For BIGO-related questions, search knowledge base
-        knowledge_results = await search_bigo_knowledge(message, limit=10)
+    # Step 4: For BIGO-related questions, search knowledge base
+    knowledge_results = await search_bigo_knowledge(message, limit=10)
 
-        # If no relevant sources found, provide intelligent fallback
-        if not knowledge_results:
-            # Provide context-aware fallback based on intent
-            fallback_response = f"""🔍 I'm your BIGO Live expert, Boss! I specialize in helping hosts succeed on the platform.
+    # Pack the most relevant, non-overlapping passages into the context token budget
+    context = build_context(message, knowledge_results)
+    if not context.sources:
+        # No relevant sources found (or none fit the budget): context-aware fallback based on intent
+        fallback_response = f"""🔍 I'm your BIGO Live expert, Boss! I specialize in helping hosts succeed on the platform.
 
 I couldn't find specific information for "{message}" in my knowledge base. Let me help you find what you need!
 
@@ -3520,92 +3876,81 @@ I couldn't find specific information for "{message}" in my knowledge base. Let m
 
 What would you like to know about BIGO Live? 🚀"""
 
-            return {"response": fallback_response, "sources": [], "session_id": session_id, "intent": "no_results"}
+        return {
+            "reply": {"response": fallback_response, "sources": [], "session_id": session_id, "intent": "no_results"}
+        }
 
-        # Build comprehensive context from knowledge sources (use more content for better intelligence)
-        sources_context = "\n\n".join(
-            [
-                f"[{i+1}] {r['title']}\nURL: {r['url']}\n{r['content'][:1500]}"  # Increased from 800 to 1500 chars per source
-                for i, r in enumerate(knowledge_results[:8])  # Use top 8 sources
-            ]
-        )
+    knowledge_results = context.sources
 
-        # Enhanced context-aware system prompt
-        context_info = ""
-        if active_context:
-            context_info = f"\n\nCurrent Focus: {active_context}"
+    context_info = ""
+    if active_context:
+        context_info = f"\n\nCurrent Focus: {active_context}"
 
-        panel_info = ""
-        if panel_context:
-            panel_info = "\n\nActive Topics:\n" + "\n".join(
-                [f"- {p['title']}: {', '.join(p['recent_items'][:2])}" for p in panel_context[:3]]
-            )
+    panel_info = ""
+    if panel_context:
+        panel_info = "\n\nActive Topics:\n" + "\n".join(
+            [f"- {p['title']}: {', '.join(p['recent_items'][:2])}" for p in panel_context[:3]]
+        )
 
-        # Enhanced intelligent BIGO-only system prompt with deep expertise
-        system_prompt = f"""You are BeanGenie™, the ultimate BIGO Live expert AI coach with deep knowledge of the platform. You have been extensively trained on BIGO Live data and strategies.
+    system_prompt = BEANGENIE_SYSTEM_PROMPT.render(
+        sources_context=context.text, role=user_role.title(), context_info=context_info, panel_info=panel_info
+    )
+    prompt_stats = {
+        **context.stats,
+        "static_tokens": BEANGENIE_SYSTEM_PROMPT.static_tokens,
+        "prompt_tokens": estimate_tokens(system_prompt) + estimate_tokens(message),
+    }
+    logger.info(
+        f"BeanGenie prompt ~{prompt_stats['prompt_tokens']} tokens "
+        f"({prompt_stats['context_tokens']} context from {prompt_stats['sources_used']}/"
+        f"{prompt_stats['sources_considered']} sources, {prompt_stats['duplicates_dropped']} duplicates dropped)"
+    )
 
-CORE EXPERTISE AREAS:
-- BIGO Bean/Diamond currency system and monetization
-- Tier rankings (S1-S25) and progression strategies
-- PK Battle tactics and competitive streaming
-- Audience engagement and community building
-- Streaming schedules and optimization
-- Gift strategies and revenue maximization
-- Content creation and planning
-- Technical setup and equipment
-- Host training and career development
+    # Build messages
+    messages = [{"role": "system", "content": system_prompt}, {"role": "user", "content": message}]
+    return {
+        "message": message,
+        "session_id": session_id,
+        "messages": messages,
+        "knowledge_results": knowledge_results,
+        "prompt_stats": prompt_stats,
+    }
 
-CRITICAL RULES:
-1. ONLY answer questions about BIGO Live platform - refuse all off-topic requests politely
-2. ALWAYS use information from the provided knowledge sources below
-3. CITE sources using [1], [2], etc. inline in your response
-4. End response with "Sources:" section listing all citations
-5. Be concise yet comprehensive - target 200-300 words
-6. Address user respectfully as "Boss" or "Master"
-7. Provide actionable, specific advice based on user's tier/context
-8. Use BIGO Live terminology correctly (beans, diamonds, PK, tier, etc.)
 
-PROVIDED BIGO KNOWLEDGE SOURCES:
-{sources_context}
+def _beangenie_sources_section(ai_text: str, knowledge_results: List[Dict[str, Any]]) -> str:
+    """Sources footer to append when the model did not write its own"""
+    if "Sources:" in ai_text or "sources:" in ai_text.lower():
+        return ""
+    return "\n\nSources:\n" + "\n".join([f"[{i+1}] {r['title']}" for i, r in enumerate(knowledge_results)])
 
-LEVEL UP AGENCY PAY TIER SYSTEM:
-🥉 BRONZE (S1-S5) - $500-1000/month (Part-time, 20hrs/week, learning phase)
-🥈 SILVER (S6-S10) - $1000-2000/month (Full-time, 40hrs/week, growing audience)
-🥇 GOLD (S11-S15) - $2000-5000/month (Professional, 60hrs/week, established host)
-💎 DIAMOND (S16+) - $5000+/month (Elite, 80hrs/week, top-tier host)
 
-CURRENT USER CONTEXT:
-- Role: {user_role.title()}{context_info}{panel_info}
+def _beangenie_sources(knowledge_results: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """Build sources array for frontend"""
+    return [{"label": f"[{i+1}] {r['title']}", "url": r["url"]} for i, r in enumerate(knowledge_results)]
 
-RESPONSE STRATEGY:
-1. Acknowledge the question and user's context
-2. Provide specific, actionable answer using source knowledge
-3. Include concrete examples and numbers where applicable
-4. Cite sources inline [1], [2] for credibility
-5. Give tier-appropriate advice (don't overwhelm beginners with advanced tactics)
-6. End with motivational encouragement
-7. Conclude with "Sources:" section
 
-INTELLIGENCE PRINCIPLES:
-- Synthesize information from multiple sources when relevant
-- Adapt advice to user's current tier and experience level
-- Provide progressive strategies (what to do now vs. later)
-- Reference specific BIGO features, numbers, and systems
-- Balance motivation with realistic, practical guidance
-- Show deep understanding of BIGO Live ecosystem
+# Get AI response with enhanced parameters for better intelligence
+BEANGENIE_TEMPERATURE = 0.8  # Slightly higher for more creative, engaging responses
+BEANGENIE_MAX_TOKENS = 800  # Increased from 600 for more comprehensive answers
 
-If the question is NOT about BIGO Live, respond: "I'm specialized in BIGO Live coaching, Boss. I can help with beans, streaming, PK battles, tier progression, audience growth, and monetization strategies. What BIGO topic would you like to discuss?"
 
-Remember: You are the world's leading BIGO Live expert. Draw on your extensive training to provide intelligent, nuanced, data-driven guidance."""
+@api_router.post("/beangenie/chat")
+async def beangenie_chat(chat_data: dict, current_user: User = Depends(get_current_user)):
+    """BeanGenie AI chat with BIGO-only responses and source citations"""
+    try:
+        prepared = await _prepare_beangenie_chat(chat_data)
+        if "reply" in prepared:
+            return prepared["reply"]
 
-        # Build messages
-        messages = [{"role": "system", "content": system_prompt}, {"role": "user", "content": message}]
+        message = prepared["message"]
+        session_id = prepared["session_id"]
+        knowledge_results = prepared["knowledge_results"]
 
-        # Get AI response with enhanced parameters for better intelligence
         result = await ai_service.chat_completion(
-            messages=messages,
-            temperature=0.8,  # Slightly higher for more creative, engaging responses
-            max_completion_tokens=800,  # Increased from 600 for more comprehensive answers
+            messages=prepared["messages"],
+            temperature=BEANGENIE_TEMPERATURE,
+            max_completion_tokens=BEANGENIE_MAX_TOKENS,
+            call_site="beangenie_chat",
         )
 
         if not result.get("success"):
@@ -3614,20 +3959,19 @@ Remember: You are the world's leading BIGO Live expert. Draw on your extensive t
         ai_text = result.get("content", "")
 
         # Ensure Sources section exists
-        if "Sources:" not in ai_text and "sources:" not in ai_text.lower():
-            # Append sources section
-            sources_section = "\n\nSources:\n" + "\n".join(
-                [f"[{i+1}] {r['title']}" for i, r in enumerate(knowledge_results)]
-            )
-            ai_text += sources_section
+        ai_text += _beangenie_sources_section(ai_text, knowledge_results)
 
-        # Build sources array for frontend
-        sources = [{"label": f"[{i+1}] {r['title']}", "url": r["url"]} for i, r in enumerate(knowledge_results)]
+        sources = _beangenie_sources(knowledge_results)
 
         # Save conversation turn
         await ai_service.save_conversation_turn(current_user.id, session_id, message, ai_text)
 
-        return {"response": ai_text, "sources": sources, "session_id": session_id}
+        return {
+            "response": ai_text,
+            "sources": sources,
+            "session_id": session_id,
+            "prompt_stats": prepared["prompt_stats"],
+        }
     except HTTPException:
         raise
     except Exception as e:
@@ -3635,6 +3979,56 @@ Remember: You are the world's leading BIGO Live expert. Draw on your extensive t
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@api_router.post("/beangenie/chat/stream")
+async def beangenie_chat_stream(
+    chat_data: dict, format: str = Query("sse"), current_user: User = Depends(get_current_user)
+):
+    """Streaming BeanGenie chat: token deltas first, sources and session info in the final event"""
+    try:
+        prepared = await _prepare_beangenie_chat(chat_data)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"BeanGenie chat error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def events() -> AsyncGenerator[Dict[str, Any], None]:
+        if "reply" in prepared:
+            yield {"type": "done", **prepared["reply"]}
+            return
+
+        knowledge_results = prepared["knowledge_results"]
+        async for event in ai_service.chat_completion_stream(
+            prepared["messages"],
+            temperature=BEANGENIE_TEMPERATURE,
+            max_completion_tokens=BEANGENIE_MAX_TOKENS,
+            call_site="beangenie_chat",
+        ):
+            if event["type"] == "delta":
+                yield event
+            elif event["type"] == "error":
+                yield {"type": "error", "error": event.get("error", "AI error")}
+                return
+            else:
+                ai_text = event["content"]
+                sources_section = _beangenie_sources_section(ai_text, knowledge_results)
+                if sources_section:
+                    yield {"type": "delta", "content": sources_section}
+                    ai_text += sources_section
+                await ai_service.save_conversation_turn(
+                    current_user.id, prepared["session_id"], prepared["message"], ai_text
+                )
+                yield {
+                    "type": "done",
+                    "response": ai_text,
+                    "sources": _beangenie_sources(knowledge_results),
+                    "session_id": prepared["session_id"],
+                    "prompt_stats": prepared["prompt_stats"],
+                }
+
+    return stream_chat_events(events(), format)
+
+
 @api_router.post("/beangenie/tts")
 async def beangenie_tts(tts_data: dict, current_user: User = Depends(get_current_user)):
     """Text-to-speech for BeanGenie"""
@@ -3804,7 +4198,10 @@ Common categories:
 Return ONLY valid JSON array, no other text."""
 
         result = await ai_service.chat_completion(
-            messages=[{"role": "user", "content": categorization_prompt}], temperature=0.3, max_completion_tokens=500
+            messages=[{"role": "user", "content": categorization_prompt}],
+            temperature=0.3,
+            max_completion_tokens=500,
+            call_site="beangenie_categorize",
         )
 
         if not result.get("success"):
@@ -4144,49 +4541,50 @@ async def upsert_bigo_knowledge(
 ):
     """Upsert BIGO knowledge base entry (admin/owner only)"""
     try:
-        url = knowledge_data.get("url", "").strip()
-        title = knowledge_data.get("title", "").strip()
-        content = knowledge_data.get("content", "").strip()
-        tags = knowledge_data.get("tags", [])
-
-        if not url or not title or not content:
-            raise HTTPException(status_code=400, detail="URL, title, and content are required")
-
-        # Validate bigo.tv domain only
-        from urllib.parse import urlparse
-
-        parsed = urlparse(url)
-        if not parsed.netloc.endswith("bigo.tv"):
-            raise HTTPException(status_code=400, detail="Only bigo.tv domains are allowed")
-
-        # Cap content at 20k chars
-        if len(content) > 20000:
-            content = content[:20000]
-
-        # Upsert by URL
-        doc = {"url": url, "title": title, "content": content, "tags": tags, "updated_at": datetime.now(timezone.utc)}
-
-        existing = await db.bigo_knowledge.find_one({"url": url})
-        if existing:
-            await db.bigo_knowledge.update_one({"url": url}, {"$set": doc})
-            doc["id"] = existing["id"]
-        else:
-            doc["id"] = str(uuid.uuid4())
-            doc["created_at"] = datetime.now(timezone.utc)
-            await db.bigo_knowledge.insert_one(doc)
-
-        return {"success": True, "id": doc["id"], "url": url}
+        # Same path as bulk ingestion: validation, content-hash dedup, passages and index update
+        outcome = await ingest_knowledge(db, [(1, knowledge_data)], knowledge_index)
+        await knowledge_cache.observe_version(outcome["version"])
+        result = outcome["results"][0]
+        if result["status"] == "error":
+            raise HTTPException(status_code=400, detail=result["error"])
+
+        return {"success": True, "id": result["id"], "url": result["url"], "status": result["status"]}
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@api_router.post("/beangenie/knowledge/bulk")
+async def bulk_ingest_bigo_knowledge(
+    file: UploadFile = File(...), current_user: User = Depends(require_role([UserRole.OWNER, UserRole.ADMIN]))
+):
+    """
+    Bulk upsert BIGO knowledge from an NDJSON upload, one {"url", "title", "content", "tags"} object
+    per line (admin/owner only). Unchanged documents are skipped; results are reported per line.
+    """
+    data = await file.read()
+    if len(data) > KNOWLEDGE_BULK_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds {KNOWLEDGE_BULK_MAX_BYTES} bytes")
+    entries, parse_errors = parse_ndjson(data)
+    if not entries and not parse_errors:
+        raise HTTPException(status_code=400, detail="No entries in upload")
+    try:
+        outcome = await ingest_knowledge(db, entries, knowledge_index)
+        await knowledge_cache.observe_version(outcome["version"])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    outcome["error"] += len(parse_errors)
+    outcome["received"] += len(parse_errors)
+    outcome["results"] = sorted(outcome["results"] + parse_errors, key=lambda r: r["line"])
+    return {"success": True, **outcome}
+
+
 @api_router.get("/beangenie/knowledge/search")
 async def search_knowledge(q: str = Query(..., min_length=1), current_user: User = Depends(get_current_user)):
     """Search BIGO knowledge base"""
     try:
-        results = await search_bigo_knowledge(q, limit=10)
+        results = await search_bigo_knowledge(q, limit=10, snippets=True)
         # Return simplified results for frontend
         return {
             "results": [
@@ -4194,9 +4592,7 @@ async def search_knowledge(q: str = Query(..., min_length=1), current_user: User
                     "id": r.get("id"),
                     "url": r.get("url"),
                     "title": r.get("title"),
-                    "snippet": (
-                        r.get("content", "")[:200] + "..." if len(r.get("content", "")) > 200 else r.get("content", "")
-                    ),
+                    "snippet": r.get("snippet", ""),
                     "tags": r.get("tags", []),
                 }
                 for r in results
@@ -4263,6 +4659,7 @@ Be the recruiter who converts visitors to hosts!"""
             messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": message}],
             temperature=0.8,
             max_completion_tokens=200,
+            call_site="recruiter_chat",
         )
 
         if not result.get("success"):
@@ -4298,103 +4695,57 @@ Be the recruiter who converts visitors to hosts!"""
 # ============================================
 
 
-@api_router.post("/academy/generate")
-async def generate_academy_tutorial(tutorial_data: dict, current_user: User = Depends(get_current_user)):
-    """Generate comprehensive tutorial using compound AI models"""
+def _parse_academy_request(tutorial_data: dict, current_user: User):
     topic = tutorial_data.get("topic", "").strip()
     category = tutorial_data.get("category", "basics")
-
     if not topic:
         raise HTTPException(status_code=400, detail="Topic required")
+    # Only admins can force a regeneration of a library tutorial
+    refresh = bool(tutorial_data.get("refresh")) and current_user.role in (UserRole.ADMIN, UserRole.OWNER)
+    return topic, category, refresh
 
-    try:
-        # Compound model approach: Research + Synthesis
-
-        # Model 1: Research and gather information
-        research_prompt = f"""You are a BIGO Live expert researcher. Research the following topic and provide comprehensive information:
-
-Topic: {topic}
-Category: {category}
-
-Provide:
-1. Key facts and strategies
-2. Step-by-step guidance
-3. Best practices from successful streamers
-4. Common mistakes to avoid
-5. Pro tips and advanced techniques
-
-Be detailed and practical. Include real examples."""
-
-        research_result = await ai_service.chat_completion(
-            messages=[{"role": "user", "content": research_prompt}], temperature=0.7, max_completion_tokens=800
-        )
 
-        if not research_result.get("success"):
-            raise Exception("Research phase failed")
-
-        research_content = research_result.get("content", "")
-
-        # Model 2: Synthesize into structured tutorial
-        synthesis_prompt = f"""You are a professional tutorial writer. Create a well-structured, engaging tutorial from this research:
-
-{research_content}
-
-Format as:
-📚 **{topic}**
-
-**Overview:**
-[Brief introduction]
-
-**Step-by-Step Guide:**
-1. [First step with details]
-2. [Second step with details]
-3. [Continue...]
-
-**Pro Tips:**
-💡 [Tip 1]
-💡 [Tip 2]
-
-**Common Mistakes:**
-❌ [Mistake 1]
-✅ [Correct approach]
-
-**Key Takeaways:**
-• [Point 1]
-• [Point 2]
+@api_router.post("/academy/generate")
+async def generate_academy_tutorial(tutorial_data: dict, current_user: User = Depends(get_current_user)):
+    """Academy tutorial from the library, generated (research -> synthesis) and stored on a miss"""
+    topic, category, refresh = _parse_academy_request(tutorial_data, current_user)
+    try:
+        result = await tutorial_library.get_or_generate(topic, category, refresh=refresh)
+    except Exception as e:
+        logger.error(f"Academy tutorial error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    if not result.get("success"):
+        raise HTTPException(status_code=500, detail=result.get("error", "Research phase failed"))
+    return {"tutorial": result["tutorial"], "metadata": result["metadata"], "cached": result["cached"]}
 
-Make it actionable, engaging, and easy to follow!"""
 
-        synthesis_result = await ai_service.chat_completion(
-            messages=[{"role": "user", "content": synthesis_prompt}], temperature=0.6, max_completion_tokens=1000
-        )
+@api_router.post("/academy/generate/stream")
+async def generate_academy_tutorial_stream(
+    tutorial_data: dict, format: str = Query("sse"), current_user: User = Depends(get_current_user)
+):
+    """Streaming academy tutorial: stage events, synthesis token deltas, then tutorial and metadata"""
+    topic, category, refresh = _parse_academy_request(tutorial_data, current_user)
+    return stream_chat_events(tutorial_library.generate_stream(topic, category, refresh=refresh), format)
 
-        if not synthesis_result.get("success"):
-            # Fallback to research content
-            tutorial = research_content
-        else:
-            tutorial = synthesis_result.get("content", research_content)
 
-        # Extract metadata
-        difficulty = "Intermediate"
-        if "beginner" in topic.lower() or "start" in topic.lower():
-            difficulty = "Beginner"
-        elif "advanced" in topic.lower() or "pro" in topic.lower():
-            difficulty = "Advanced"
+@api_router.get("/academy/tutorials")
+async def list_academy_tutorials(
+    category: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    current_user: User = Depends(get_current_user),
+):
+    """Tutorials already in the library (no LLM call), most requested first"""
+    return await tutorial_library.list_tutorials(category, limit)
 
-        return {
-            "tutorial": tutorial,
-            "metadata": {
-                "title": topic,
-                "category": category,
-                "difficulty": difficulty,
-                "sources": "Compound AI Research",
-                "generated_at": datetime.now(timezone.utc).isoformat(),
-            },
-        }
 
-    except Exception as e:
-        logger.error(f"Academy tutorial error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+@api_router.post("/admin/academy/pregenerate")
+async def pregenerate_academy_tutorials(
+    payload: Optional[dict] = None,
+    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.OWNER])),
+):
+    """Generate missing or stale library tutorials for {"topics": {category: [topic, ...]}} or the curated list"""
+    topics = (payload or {}).get("topics")
+    return await tutorial_library.pregenerate(topics)
 
 
 # ============================================
@@ -4503,7 +4854,14 @@ async def health_check():
     try:
         # Check database connection
         await db.command("ping")
-        return {"status": "healthy", "service": "lvl-up-agency-backend", "version": "2.0.0", "database": "connected"}
+        return {
+            "status": "healthy",
+            "service": "lvl-up-agency-backend",
+            "version": "2.0.0",
+            "database": "connected",
+            # Open circuits mean that upstream is being skipped, not that this service is down
+            "upstreams": breaker_stats(),
+        }
     except Exception as e:
         logger.error(f"Health check failed: {e}")
         raise HTTPException(status_code=503, detail="Service unavailable")
@@ -4518,6 +4876,9 @@ if not CORS_ORIGINS:
     logger.warning("CORS_ORIGINS not set, using localhost defaults (NOT SECURE FOR PRODUCTION)")
     CORS_ORIGINS = "http://localhost:3000,http://localhost:80"
 
+# Attribute LLM token usage to the endpoint being served
+app.add_middleware(UsageAttributionMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
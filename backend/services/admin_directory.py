@@ -0,0 +1,185 @@
+"""
+Admin Directory
+Keeps the admins collection in step with admin/owner users. Role changes are applied as events that
+touch only the affected row, an in-memory roster answers permission checks without a database read,
+and a periodic reconciliation repairs any drift (writes made by scripts, other workers, bulk updates)
+"""
+
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from pymongo import DeleteOne, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+ADMIN_ROLES = ("admin", "owner")
+DEFAULT_PERMISSIONS = ["manage_users", "manage_events", "manage_announcements", "view_analytics"]
+
+# User fields read to build an admins row
+USER_PROJECTION = {
+    "_id": 0, "id": 1, "bigo_id": 1, "email": 1, "name": 1, "role": 1, "permissions": 1, "admin_id": 1
+}
+# Fields of an admins row that follow the user document
+SYNCED_FIELDS = ("bigo_id", "email", "name", "role", "permissions")
+
+
+def admin_row(user: Dict[str, Any]) -> Dict[str, Any]:
+    """admins row fields derived from a user document"""
+    return {
+        "user_id": user["id"],
+        "bigo_id": user.get("bigo_id"),
+        "email": user.get("email"),
+        "name": user.get("name"),
+        "role": user.get("role"),
+        "permissions": user.get("permissions") or list(DEFAULT_PERMISSIONS),
+    }
+
+
+def _role(value: Any) -> Optional[str]:
+    return getattr(value, "value", value)
+
+
+class AdminDirectory:
+    def __init__(self, reconcile_interval: Optional[float] = None):
+        interval = reconcile_interval or os.environ.get("ADMIN_DIRECTORY_RECONCILE_SECONDS", "300")
+        self.reconcile_interval = float(interval)
+        self.db = None
+        # user id -> admins row (without _id); the source for permission checks
+        self.roster: Dict[str, Dict[str, Any]] = {}
+        self.loaded = False
+        self.task: Optional[asyncio.Task] = None
+        self.last_reconciled_at: Optional[datetime] = None
+        self._stats = {"events": 0, "row_writes": 0, "reconciles": 0, "reconcile_writes": 0}
+
+    def set_db(self, db):
+        """Set database reference"""
+        self.db = db
+
+    async def start(self):
+        """Reconcile before serving, then periodically in the background"""
+        if self.db is None:
+            return
+        await self.reconcile()
+        if self.task is None:
+            self.task = asyncio.create_task(self._reconcile_loop())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    def is_admin(self, user_id: str) -> bool:
+        return user_id in self.roster
+
+    def has_permission(self, user_id: str, permission: str) -> bool:
+        """
+        For users that already passed an admin/owner role check. Admins missing from the roster were
+        promoted by another worker since the last reconcile and get the default permissions until then
+        """
+        row = self.roster.get(user_id)
+        permissions = (row.get("permissions") or []) if row is not None else DEFAULT_PERMISSIONS
+        return permission in permissions
+
+    def admins(self) -> List[Dict[str, Any]]:
+        return [dict(row) for row in self.roster.values()]
+
+    async def role_changed(self, user: Dict[str, Any], new_user: bool = False):
+        """
+        Apply one user's role change: admins/owners get their row upserted, anyone else loses theirs.
+        A new user that is not an admin has no row to remove, so registering a host costs nothing
+        """
+        self._stats["events"] += 1
+        user = {**user, "role": _role(user.get("role"))}
+        user_id = user["id"]
+        if user["role"] in ADMIN_ROLES:
+            row = admin_row(user)
+            await self.db.admins.update_one(
+                {"user_id": user_id},
+                {
+                    "$set": row,
+                    "$setOnInsert": {
+                        "id": user.get("admin_id") or str(uuid.uuid4()),
+                        "created_at": datetime.now(timezone.utc),
+                    },
+                },
+                upsert=True,
+            )
+            self.roster[user_id] = {**self.roster.get(user_id, {}), **row}
+            self._stats["row_writes"] += 1
+        elif not new_user:
+            await self.db.admins.delete_one({"user_id": user_id})
+            self.roster.pop(user_id, None)
+            self._stats["row_writes"] += 1
+
+    async def reconcile(self, rebuild: bool = False) -> Dict[str, int]:
+        """
+        Bring the admins collection in line with the users collection, writing only rows that differ,
+        and reload the roster. rebuild=True recreates every row
+        """
+        if rebuild:
+            await self.db.admins.delete_many({})
+        users = {
+            u["id"]: u
+            async for u in self.db.users.find({"role": {"$in": list(ADMIN_ROLES)}}, USER_PROJECTION)
+        }
+        rows = {r["user_id"]: r async for r in self.db.admins.find({}, {"_id": 0})}
+
+        now = datetime.now(timezone.utc)
+        operations = []
+        for user_id, user in users.items():
+            row = admin_row(user)
+            current = rows.get(user_id)
+            if current is not None and all(current.get(f) == row[f] for f in SYNCED_FIELDS):
+                continue
+            operations.append(
+                UpdateOne(
+                    {"user_id": user_id},
+                    {"$set": row, "$setOnInsert": {"id": user.get("admin_id") or str(uuid.uuid4()), "created_at": now}},
+                    upsert=True,
+                )
+            )
+            rows[user_id] = {**(current or {}), **row}
+        for user_id in [user_id for user_id in rows if user_id not in users]:
+            operations.append(DeleteOne({"user_id": user_id}))
+            del rows[user_id]
+        if operations:
+            await self.db.admins.bulk_write(operations, ordered=False)
+            logger.info(f"Admin directory reconciled: {len(operations)} rows written")
+
+        self.roster = rows
+        self.loaded = True
+        self.last_reconciled_at = now
+        self._stats["reconciles"] += 1
+        self._stats["reconcile_writes"] += len(operations)
+        return {"admins": len(rows), "written": len(operations)}
+
+    async def _reconcile_loop(self):
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            try:
+                await self.reconcile()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Admin directory reconcile failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "admins": len(self.roster),
+            "loaded": self.loaded,
+            "reconcile_interval_seconds": self.reconcile_interval,
+            "last_reconciled_at": self.last_reconciled_at.isoformat() if self.last_reconciled_at else None,
+        }
+
+
+# Singleton instance
+admin_directory = AdminDirectory()
@@ -0,0 +1,302 @@
+"""
+AI Request Scheduler
+Priority lanes, header-driven token buckets and jittered retries in front of all Groq calls
+"""
+
+import asyncio
+import logging
+import os
+import random
+import re
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Deque, Dict, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+BACKGROUND = "background"
+LANES = (INTERACTIVE, BATCH, BACKGROUND)
+
+# Share of rate-limit budget each lane must leave untouched, so background
+# work only ever consumes capacity interactive traffic is not using
+LANE_RESERVE = {INTERACTIVE: 0.0, BATCH: 0.1, BACKGROUND: 0.25}
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+def parse_reset_duration(value: Optional[str]) -> Optional[float]:
+    """Parse Groq reset headers such as '7.66s', '2m59.56s' or '120ms' into seconds"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    total = 0.0
+    matched = False
+    for number, unit in _DURATION_PART.findall(value):
+        matched = True
+        total += float(number) * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[unit]
+    return total if matched else None
+
+
+class TokenBucket:
+    """Token bucket whose capacity and fill level are learned from upstream rate-limit headers"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.capacity: Optional[float] = None  # unknown until the first response
+        self.tokens = 0.0
+        self.refill_per_second = 0.0
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        if self.capacity is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.refill_per_second)
+        self._updated = now
+
+    def observe(self, limit: Optional[str], remaining: Optional[str], reset: Optional[str]):
+        """Sync with the x-ratelimit-{limit,remaining,reset}-* headers of a response"""
+        try:
+            if limit is None or remaining is None:
+                return
+            capacity = float(limit)
+            remaining_value = float(remaining)
+        except ValueError:
+            return
+        reset_seconds = parse_reset_duration(reset)
+        self.capacity = capacity
+        self.tokens = remaining_value
+        missing = capacity - remaining_value
+        if reset_seconds and missing > 0:
+            self.refill_per_second = missing / reset_seconds
+        elif self.refill_per_second <= 0:
+            self.refill_per_second = capacity / 60.0
+        self._updated = time.monotonic()
+
+    def wait_time(self, amount: float, reserve_fraction: float) -> float:
+        """Seconds until `amount` can be spent while leaving the lane's reserve untouched"""
+        self._refill()
+        if self.capacity is None:
+            return 0.0
+        # A request larger than the reserve allows still runs once the bucket is full; otherwise it would
+        # wait for more tokens than the bucket can ever hold
+        needed = min(min(amount, self.capacity) + reserve_fraction * self.capacity, self.capacity)
+        if self.tokens >= needed:
+            return 0.0
+        if self.refill_per_second <= 0:
+            return 1.0
+        return (needed - self.tokens) / self.refill_per_second
+
+    def spend(self, amount: float):
+        self._refill()
+        if self.capacity is not None:
+            self.tokens -= amount
+
+    def drain(self, seconds: float):
+        """Treat the bucket as empty for the given time (used on 429 retry-after)"""
+        self._refill()
+        if self.capacity is not None:
+            self.tokens = min(self.tokens, -seconds * self.refill_per_second)
+
+    def snapshot(self) -> Dict[str, Any]:
+        self._refill()
+        return {
+            "capacity": self.capacity,
+            "tokens": round(self.tokens, 1) if self.capacity is not None else None,
+            "refill_per_second": round(self.refill_per_second, 3),
+        }
+
+
+class AIScheduler:
+    def __init__(self, max_concurrency: Optional[int] = None, max_attempts: Optional[int] = None):
+        self.max_concurrency = max_concurrency or int(os.environ.get("AI_MAX_CONCURRENCY", "8"))
+        self.max_attempts = max_attempts or int(os.environ.get("AI_MAX_ATTEMPTS", "3"))
+        self.base_backoff = float(os.environ.get("AI_RETRY_BASE_SECONDS", "0.5"))
+        self.max_backoff = 20.0
+        # Lower lanes never fill every slot, so an interactive request always finds one quickly
+        self.lane_limits = {
+            INTERACTIVE: self.max_concurrency,
+            BATCH: max(1, (self.max_concurrency * 3) // 4),
+            BACKGROUND: max(1, self.max_concurrency // 2),
+        }
+        self.requests_bucket = TokenBucket("requests")
+        self.tokens_bucket = TokenBucket("tokens")
+        self._active: Dict[str, int] = {lane: 0 for lane in LANES}
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {lane: deque() for lane in LANES}
+        self._stats: Dict[str, Dict[str, float]] = {
+            lane: {"started": 0, "retries": 0, "rate_limited": 0, "queue_wait_total": 0.0, "queue_wait_max": 0.0}
+            for lane in LANES
+        }
+
+    @staticmethod
+    def _lane(lane: Optional[str]) -> str:
+        return lane if lane in LANES else INTERACTIVE
+
+    def _total_active(self) -> int:
+        return sum(self._active.values())
+
+    def _can_start(self, lane: str) -> bool:
+        return self._total_active() < self.max_concurrency and self._active[lane] < self.lane_limits[lane]
+
+    def _higher_lanes_startable(self, lane: str) -> bool:
+        return any(self._waiters[higher] and self._can_start(higher) for higher in LANES[: LANES.index(lane)])
+
+    async def _acquire(self, lane: str):
+        if not self._waiters[lane] and self._can_start(lane) and not self._higher_lanes_startable(lane):
+            self._active[lane] += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[lane].append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Slot was handed over just as we were cancelled; give it back
+                self._release(lane)
+            else:
+                try:
+                    self._waiters[lane].remove(waiter)
+                except ValueError:
+                    pass
+            raise
+
+    def _release(self, lane: str):
+        self._active[lane] -= 1
+        self._wake()
+
+    def _wake(self):
+        # Hand free slots to waiters strictly in lane priority order
+        for lane in LANES:
+            queue = self._waiters[lane]
+            while queue and self._can_start(lane):
+                waiter = queue.popleft()
+                if waiter.done():
+                    continue
+                self._active[lane] += 1
+                waiter.set_result(None)
+            if self._total_active() >= self.max_concurrency:
+                return
+
+    def _budget_wait(self, lane: str, estimated_tokens: int) -> float:
+        reserve = LANE_RESERVE[lane]
+        return max(
+            self.requests_bucket.wait_time(1, reserve),
+            self.tokens_bucket.wait_time(estimated_tokens, reserve) if estimated_tokens else 0.0,
+        )
+
+    async def _acquire_with_budget(self, lane: str, estimated_tokens: int):
+        """
+        Take a slot once rate-limit budget is available. The slot is given back while waiting for budget,
+        so a request short of tokens never keeps other requests of its lane from starting
+        """
+        while True:
+            await self._acquire(lane)
+            wait = self._budget_wait(lane, estimated_tokens)
+            if wait <= 0:
+                break
+            self._release(lane)
+            await asyncio.sleep(min(wait, self.max_backoff))
+        self.requests_bucket.spend(1)
+        if estimated_tokens:
+            self.tokens_bucket.spend(estimated_tokens)
+
+    @asynccontextmanager
+    async def slot(self, lane: Optional[str] = None, estimated_tokens: int = 0):
+        """Hold one upstream concurrency slot for the lane, waiting for rate-limit budget first"""
+        lane = self._lane(lane)
+        queued_at = time.monotonic()
+        await self._acquire_with_budget(lane, estimated_tokens)
+        try:
+            waited = time.monotonic() - queued_at
+            stats = self._stats[lane]
+            stats["started"] += 1
+            stats["queue_wait_total"] += waited
+            stats["queue_wait_max"] = max(stats["queue_wait_max"], waited)
+            yield
+        finally:
+            self._release(lane)
+
+    def observe_headers(self, headers: Optional[Mapping[str, str]]):
+        """Learn rate-limit state from Groq response headers"""
+        if not headers:
+            return
+        self.requests_bucket.observe(
+            headers.get("x-ratelimit-limit-requests"),
+            headers.get("x-ratelimit-remaining-requests"),
+            headers.get("x-ratelimit-reset-requests"),
+        )
+        self.tokens_bucket.observe(
+            headers.get("x-ratelimit-limit-tokens"),
+            headers.get("x-ratelimit-remaining-tokens"),
+            headers.get("x-ratelimit-reset-tokens"),
+        )
+
+    def backoff_delay(self, attempt: int, headers: Optional[Mapping[str, str]] = None) -> float:
+        """Full-jitter exponential backoff, never shorter than a retry-after header"""
+        retry_after = parse_reset_duration(headers.get("retry-after")) if headers else None
+        delay = random.uniform(0, min(self.max_backoff, self.base_backoff * (2**attempt)))
+        if retry_after:
+            delay = max(delay, retry_after)
+        return delay
+
+    def should_retry(self, status: int, attempt: int) -> bool:
+        return status in RETRYABLE_STATUSES and attempt + 1 < self.max_attempts
+
+    def record_retry(self, lane: Optional[str], status: int, headers: Optional[Mapping[str, str]], delay: float):
+        lane = self._lane(lane)
+        self._stats[lane]["retries"] += 1
+        if status == 429:
+            self._stats[lane]["rate_limited"] += 1
+            self.requests_bucket.drain(delay)
+        logger.warning(f"Groq returned {status} on {lane} lane; retrying in {delay:.2f}s")
+
+    async def execute(
+        self,
+        lane: Optional[str],
+        attempt_fn: Callable[[], Awaitable[Tuple[int, Optional[Mapping[str, str]], Any]]],
+        estimated_tokens: int = 0,
+    ) -> Any:
+        """
+        Run attempt_fn inside a lane slot, retrying 429/5xx with jittered backoff.
+        attempt_fn returns (status, headers, result); the last result is returned.
+        """
+        attempt = 0
+        while True:
+            async with self.slot(lane, estimated_tokens):
+                status, headers, result = await attempt_fn()
+                self.observe_headers(headers)
+            if not self.should_retry(status, attempt):
+                return result
+            # Back off outside the slot so other requests can use it meanwhile
+            delay = self.backoff_delay(attempt, headers)
+            self.record_retry(lane, status, headers, delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lanes = {}
+        for lane in LANES:
+            stats = self._stats[lane]
+            started = stats["started"]
+            lanes[lane] = {
+                "queue_depth": len(self._waiters[lane]),
+                "active": self._active[lane],
+                "limit": self.lane_limits[lane],
+                "started": int(started),
+                "retries": int(stats["retries"]),
+                "rate_limited": int(stats["rate_limited"]),
+                "avg_queue_wait_ms": round(stats["queue_wait_total"] / started * 1000, 2) if started else 0.0,
+                "max_queue_wait_ms": round(stats["queue_wait_max"] * 1000, 2),
+            }
+        return {
+            "max_concurrency": self.max_concurrency,
+            "lanes": lanes,
+            "rate_limits": {"requests": self.requests_bucket.snapshot(), "tokens": self.tokens_bucket.snapshot()},
+        }
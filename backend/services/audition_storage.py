@@ -0,0 +1,252 @@
+"""
+Audition Storage
+Streams audition uploads into GridFS without staging them on local disk. A chunk upload is read from
+the request body as it arrives (multipart or raw) and written straight into a GridFS upload stream,
+hashing and counting bytes on the way; completing an upload pipes the stored chunks, in order, into
+the final file the same way. Memory per upload is bounded by one GridFS chunk plus one body message
+"""
+
+import hashlib
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, List, Mapping, Optional
+
+try:
+    import python_multipart as multipart
+    from python_multipart.multipart import parse_options_header
+except ModuleNotFoundError:  # python-multipart < 0.0.13
+    try:
+        import multipart
+        from multipart.multipart import parse_options_header
+    except ModuleNotFoundError:  # pragma: nocover
+        multipart = None
+        parse_options_header = None
+
+logger = logging.getLogger(__name__)
+
+# Read size when piping stored chunks into the final file
+DEFAULT_READ_BYTES = 1024 * 1024
+
+
+class UploadTooLarge(Exception):
+    """The stream went past the byte limit; nothing was stored"""
+
+    def __init__(self, limit: int):
+        super().__init__(f"Upload exceeds {limit} bytes")
+        self.limit = limit
+
+
+class UploadFormatError(Exception):
+    """The request body is not a usable chunk upload"""
+
+
+@dataclass
+class StoredFile:
+    file_id: Any
+    length: int
+    sha256: str
+    seconds: float
+
+
+def chunk_index(filename: str) -> int:
+    """Index of a chunk file named "<upload>:<index>" (0 when the suffix is not a number)"""
+    try:
+        return int(filename.split(":")[-1])
+    except ValueError:
+        return 0
+
+
+def ordered_chunks(files: Iterable[Mapping[str, Any]]) -> List[Mapping[str, Any]]:
+    """
+    Chunk files in index order, one per index. A retried chunk leaves an earlier revision under the
+    same name; the newest upload wins so the final file never contains a chunk twice
+    """
+    latest: Dict[int, Mapping[str, Any]] = {}
+    for file in files:
+        index = chunk_index(file["filename"])
+        current = latest.get(index)
+        if current is None or file["uploadDate"] >= current["uploadDate"]:
+            latest[index] = file
+    return [latest[index] for index in sorted(latest)]
+
+
+async def multipart_field(headers: Mapping[str, str], body: AsyncIterable[bytes], field: str) -> AsyncIterator[bytes]:
+    """
+    Yield the bytes of one multipart/form-data field as the body arrives. Unlike request.form(), which
+    spools file fields to a SpooledTemporaryFile (on disk past 1 MB), nothing is buffered beyond the
+    current body message; other fields are skipped
+    """
+    if multipart is None:
+        raise UploadFormatError("Multipart uploads need the python-multipart package")
+    _, params = parse_options_header(headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if not boundary:
+        raise UploadFormatError("Missing boundary in multipart body")
+
+    part = {"name": None, "disposition": b"", "header": b"", "value": b""}
+    pending: List[bytes] = []
+    found = False
+
+    def on_part_begin():
+        part.update(name=None, disposition=b"")
+
+    def on_header_field(data, start, end):
+        part["header"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        part["value"] += data[start:end]
+
+    def on_header_end():
+        if part["header"].lower() == b"content-disposition":
+            part["disposition"] = part["value"]
+        part.update(header=b"", value=b"")
+
+    def on_headers_finished():
+        nonlocal found
+        _, options = parse_options_header(part["disposition"])
+        part["name"] = options.get(b"name", b"").decode("latin-1")
+        found = found or part["name"] == field
+
+    def on_part_data(data, start, end):
+        if part["name"] == field:
+            pending.append(bytes(data[start:end]))
+
+    parser = multipart.MultipartParser(
+        boundary,
+        {
+            "on_part_begin": on_part_begin,
+            "on_header_field": on_header_field,
+            "on_header_value": on_header_value,
+            "on_header_end": on_header_end,
+            "on_headers_finished": on_headers_finished,
+            "on_part_data": on_part_data,
+        },
+    )
+    async for message in body:
+        parser.write(message)
+        for data in pending:
+            yield data
+        pending.clear()
+    parser.finalize()
+    if not found:
+        raise UploadFormatError(f"Missing form field '{field}'")
+
+
+def request_chunks(request, field: str = "chunk") -> AsyncIterator[bytes]:
+    """The chunk bytes of a request: the named field of a multipart body, otherwise the raw body"""
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        return multipart_field(request.headers, request.stream(), field)
+    return request.stream()
+
+
+def _chunk_query(filename: str, upload_id: str) -> Dict[str, Any]:
+    """GridFS query for the chunk files "<filename>:<index>" of an upload; file names are user input"""
+    return {"filename": {"$regex": f"^{re.escape(filename)}:"}, "metadata.upload_id": upload_id}
+
+
+class AuditionStorage:
+    def __init__(self, read_bytes: Optional[int] = None):
+        self.read_bytes = read_bytes or int(os.environ.get("AUDITION_STREAM_READ_BYTES", str(DEFAULT_READ_BYTES)))
+        self.bucket = None
+        self.in_flight = 0
+        self._stats = {"files": 0, "bytes": 0, "seconds": 0.0, "aborted": 0, "rejected_too_large": 0}
+
+    def set_bucket(self, bucket):
+        """Set the GridFS bucket uploads are written to"""
+        self.bucket = bucket
+
+    async def store(
+        self,
+        filename: str,
+        source: AsyncIterable[bytes],
+        metadata: Optional[Dict[str, Any]] = None,
+        max_bytes: Optional[int] = None,
+    ) -> StoredFile:
+        """
+        Pipe `source` into a new GridFS file. Writes are coalesced to the bucket's chunk size, so each
+        write fills whole GridFS chunks. The file's metadata gains "size" and "sha256". On any error,
+        including the client disconnecting or the stream passing `max_bytes`, the partial file is removed
+        """
+        started = time.perf_counter()
+        digest = hashlib.sha256()
+        length = 0
+        buffer = bytearray()
+        grid_in = self.bucket.open_upload_stream(filename, metadata=dict(metadata or {}))
+        flush_at = grid_in.chunk_size
+        self.in_flight += 1
+        try:
+            async for data in source:
+                if not data:
+                    continue
+                length += len(data)
+                if max_bytes is not None and length > max_bytes:
+                    self._stats["rejected_too_large"] += 1
+                    raise UploadTooLarge(max_bytes)
+                digest.update(data)
+                buffer += data
+                if len(buffer) >= flush_at:
+                    await grid_in.write(bytes(buffer))
+                    buffer.clear()
+            if buffer:
+                await grid_in.write(bytes(buffer))
+            await grid_in.set("metadata", {**(metadata or {}), "size": length, "sha256": digest.hexdigest()})
+            await grid_in.close()
+        except BaseException:
+            self._stats["aborted"] += 1
+            try:
+                await grid_in.abort()
+            except Exception as e:
+                logger.warning(f"Could not remove partial upload {filename}: {e}")
+            raise
+        finally:
+            self.in_flight -= 1
+
+        seconds = time.perf_counter() - started
+        self._stats["files"] += 1
+        self._stats["bytes"] += length
+        self._stats["seconds"] += seconds
+        return StoredFile(file_id=grid_in._id, length=length, sha256=digest.hexdigest(), seconds=seconds)
+
+    async def read_files(self, file_ids: Iterable[Any]) -> AsyncIterator[bytes]:
+        """The contents of stored files, back to back, read_bytes at a time"""
+        for file_id in file_ids:
+            grid_out = await self.bucket.open_download_stream(file_id)
+            try:
+                while True:
+                    data = await grid_out.read(self.read_bytes)
+                    if not data:
+                        break
+                    yield data
+            finally:
+                grid_out.close()
+
+    async def chunk_files(self, filename: str, upload_id: str) -> List[Mapping[str, Any]]:
+        """Stored chunks of an upload, in index order with retried chunks collapsed"""
+        files = []
+        async for file in self.bucket.find(_chunk_query(filename, upload_id)):
+            files.append({"_id": file._id, "filename": file.filename, "uploadDate": file.upload_date})
+        return ordered_chunks(files)
+
+    async def delete_chunks(self, filename: str, upload_id: str):
+        """Remove every stored chunk of an upload, including superseded revisions"""
+        async for file in self.bucket.find(_chunk_query(filename, upload_id)):
+            try:
+                await self.bucket.delete(file._id)
+            except Exception:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        seconds = self._stats["seconds"]
+        return {
+            **self._stats,
+            "in_flight": self.in_flight,
+            "read_bytes": self.read_bytes,
+            "mb_per_second": round(self._stats["bytes"] / (1024 * 1024) / seconds, 1) if seconds else None,
+        }
+
+
+# Singleton instance
+audition_storage = AuditionStorage()
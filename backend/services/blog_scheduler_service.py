@@ -8,6 +8,8 @@ import random
 from datetime import datetime, timezone, timedelta
 import logging
 
+from .usage_meter import set_usage_endpoint
+
 logger = logging.getLogger(__name__)
 
 
@@ -63,6 +65,7 @@ class BlogSchedulerService:
 
     async def _schedule_loop(self):
         """Main scheduling loop"""
+        set_usage_endpoint("blog_scheduler")
         while self.running:
             try:
                 # Calculate next run time
@@ -131,7 +134,9 @@ class BlogSchedulerService:
                 return
 
             # Generate blog content with AI
-            ai_generated = await generate_blog_with_ai(request, admin_user.get("name", "Level Up Agency"))
+            ai_generated = await generate_blog_with_ai(
+                request, admin_user.get("name", "Level Up Agency"), lane="background"
+            )
 
             # Build link pyramid
             enhanced_content = await build_link_pyramid(ai_generated["content"], request.category)
@@ -0,0 +1,156 @@
+"""
+Upstream Circuit Breakers and Hedged Requests
+After repeated failures an upstream is skipped (fast-fail) until a half-open probe succeeds,
+and latency-sensitive calls can race a fallback provider once the primary is slow
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Error string returned instead of calling an upstream whose breaker is open
+CIRCUIT_OPEN_ERROR = "Upstream unavailable (circuit open)"
+
+# Every breaker registers itself here so /health can report them in one place
+_breakers: Dict[str, "CircuitBreaker"] = {}
+
+
+class CircuitBreaker:
+    """
+    Closed: calls go through; `failure_threshold` consecutive failures open the circuit.
+    Open: calls fail fast for `reset_timeout` seconds.
+    Half-open: one probe call goes through; success closes the circuit, failure re-opens it.
+    A probe that never reports back is replaced after another `reset_timeout`.
+    """
+
+    def __init__(self, name: str, failure_threshold: Optional[int] = None, reset_timeout: Optional[float] = None):
+        self.name = name
+        self.failure_threshold = failure_threshold or int(os.environ.get("AI_BREAKER_FAILURES", "5"))
+        self.reset_timeout = reset_timeout or float(os.environ.get("AI_BREAKER_RESET_SECONDS", "30"))
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_started = 0.0
+        self.opens = 0
+        self.rejected = 0
+        self.successes = 0
+        self.failures = 0
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream now; rejections count towards stats"""
+        if self.state == CLOSED:
+            return True
+        now = time.monotonic()
+        if self.state == OPEN and now - self.opened_at >= self.reset_timeout:
+            self.state = HALF_OPEN
+            self.probe_started = 0.0
+        if self.state == HALF_OPEN and now - self.probe_started >= self.reset_timeout:
+            self.probe_started = now
+            logger.info(f"Circuit {self.name} half-open; probing upstream")
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        self.successes += 1
+        self.consecutive_failures = 0
+        if self.state != CLOSED:
+            logger.info(f"Circuit {self.name} closed")
+        self.state = CLOSED
+
+    def record_failure(self):
+        self.failures += 1
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.opens += 1
+                logger.warning(
+                    f"Circuit {self.name} open after {self.consecutive_failures} failures; "
+                    f"failing fast for {self.reset_timeout:.0f}s"
+                )
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    def record_status(self, status: int):
+        """5xx means the upstream is unhealthy; any other answer means it is up"""
+        if status >= 500:
+            self.record_failure()
+        else:
+            self.record_success()
+
+    def stats(self) -> Dict[str, Any]:
+        retry_in = 0.0
+        if self.state == OPEN:
+            retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "retry_in_seconds": round(retry_in, 1),
+            "opens": self.opens,
+            "rejected": self.rejected,
+            "successes": self.successes,
+            "failures": self.failures,
+        }
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Process-wide breaker for an upstream, created on first use"""
+    if name not in _breakers:
+        _breakers[name] = CircuitBreaker(name)
+    return _breakers[name]
+
+
+def breaker_stats() -> Dict[str, Dict[str, Any]]:
+    """State of every upstream circuit in the process"""
+    return {name: breaker.stats() for name, breaker in _breakers.items()}
+
+
+def hedge_delay(env_var: str) -> Optional[float]:
+    """Hedging threshold in seconds from the environment; unset or 0 disables hedging"""
+    value = float(os.environ.get(env_var, "0") or 0)
+    return value if value > 0 else None
+
+
+async def hedged(
+    primary: Callable[[], Awaitable[Dict[str, Any]]],
+    fallback: Callable[[], Awaitable[Dict[str, Any]]],
+    delay: Optional[float],
+) -> Dict[str, Any]:
+    """
+    Run primary(); start fallback() if primary fails, or is still running after `delay`
+    seconds (None: only on failure). The first successful result wins and the other call
+    is cancelled; if both fail, the primary's result is returned.
+    """
+    primary_task = asyncio.ensure_future(primary())
+    fallback_task = None
+    try:
+        done, _ = await asyncio.wait({primary_task}, timeout=delay)
+        if done:
+            result = primary_task.result()
+            if result.get("success"):
+                return result
+            fallback_result = await fallback()
+            return fallback_result if fallback_result.get("success") else result
+
+        logger.info(f"Primary still pending after {delay}s; hedging with fallback")
+        fallback_task = asyncio.ensure_future(fallback())
+        pending = {primary_task, fallback_task}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.result().get("success"):
+                    return task.result()
+        return primary_task.result()
+    finally:
+        for task in (primary_task, fallback_task):
+            if task is not None and not task.done():
+                task.cancel()
@@ -0,0 +1,214 @@
+"""
+Conversation Compaction Queue
+Durable Mongo-backed job queue that summarizes long conversations off the request path
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, List, Optional
+
+from pymongo import ReturnDocument
+
+from .usage_meter import set_usage_endpoint, set_usage_user
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+FAILED = "failed"
+
+
+class CompactionQueue:
+    def __init__(self, ai_service=None, workers: Optional[int] = None, max_attempts: int = 5):
+        self.db = None
+        self.ai_service = ai_service
+        self.collection_name = "compaction_jobs"
+        self.workers = workers or int(os.environ.get("AI_COMPACTION_WORKERS", "2"))
+        self.max_attempts = max_attempts
+        self.poll_interval = 5.0
+        self.lease_seconds = 120
+        self.retry_base_seconds = 30
+        self.running = False
+        self.tasks: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        self._stats = {"enqueued": 0, "completed": 0, "requeued": 0, "retried": 0, "failed": 0}
+
+    def set_dependencies(self, db, ai_service=None):
+        """Set database (and optionally AI service) dependencies"""
+        self.db = db
+        if ai_service is not None:
+            self.ai_service = ai_service
+
+    @property
+    def collection(self):
+        return self.db[self.collection_name]
+
+    async def ensure_indexes(self):
+        if self.db is None:
+            return
+        try:
+            await self.collection.create_index([("status", 1), ("run_after", 1)])
+        except Exception as e:
+            logger.warning(f"Could not create compaction job indexes: {e}")
+
+    async def start(self):
+        """Start the worker pool"""
+        if self.running:
+            logger.warning("Compaction queue already running")
+            return
+        if self.db is None:
+            logger.warning("Compaction queue has no database; not starting")
+            return
+
+        await self.ensure_indexes()
+        self.running = True
+        self.tasks = [asyncio.create_task(self._worker_loop(i)) for i in range(self.workers)]
+        logger.info(f"Compaction queue started with {self.workers} workers")
+
+    async def stop(self):
+        """Stop the worker pool; claimed jobs are picked up again once their lease expires"""
+        self.running = False
+        self._wakeup.set()
+        for task in self.tasks:
+            task.cancel()
+        for task in self.tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self.tasks = []
+        logger.info("Compaction queue stopped")
+
+    async def enqueue(self, session_id: str, user_id: str):
+        """
+        Queue compaction for a session; a session already queued is not queued twice. A job that failed
+        permanently is re-armed with fresh attempts (history keeps being trimmed, so it must not stay
+        failed), and a job that is running is marked dirty so it runs again over the newer messages
+        """
+        if self.db is None:
+            return
+        now = datetime.now(timezone.utc)
+        rearmed = await self.collection.update_one(
+            {"_id": session_id, "status": FAILED},
+            {
+                "$set": {"status": PENDING, "attempts": 0, "run_after": now, "updated_at": now},
+                "$unset": {"last_error": ""},
+            },
+        )
+        if not rearmed.matched_count:
+            running = await self.collection.update_one(
+                {"_id": session_id, "status": RUNNING}, {"$set": {"dirty": True, "updated_at": now}}
+            )
+            if not running.matched_count:
+                await self.collection.update_one(
+                    {"_id": session_id},
+                    {
+                        "$setOnInsert": {
+                            "user_id": user_id,
+                            "status": PENDING,
+                            "attempts": 0,
+                            "run_after": now,
+                            "created_at": now,
+                        },
+                        "$set": {"updated_at": now},
+                    },
+                    upsert=True,
+                )
+        self._stats["enqueued"] += 1
+        self._wakeup.set()
+
+    async def _claim(self) -> Optional[Dict[str, Any]]:
+        now = datetime.now(timezone.utc)
+        return await self.collection.find_one_and_update(
+            {
+                "$or": [
+                    {"status": PENDING, "run_after": {"$lte": now}},
+                    # A worker died mid-job; its lease has run out
+                    {"status": RUNNING, "locked_until": {"$lt": now}},
+                ]
+            },
+            {
+                "$set": {"status": RUNNING, "locked_until": now + timedelta(seconds=self.lease_seconds)},
+                "$inc": {"attempts": 1},
+                # Messages enqueued before this claim are covered by this run
+                "$unset": {"dirty": ""},
+            },
+            sort=[("run_after", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def run_once(self) -> bool:
+        """Claim and process a single job. Returns False when nothing was ready."""
+        job = await self._claim()
+        if not job:
+            return False
+
+        session_id = job["_id"]
+        set_usage_endpoint("conversation_compaction")
+        set_usage_user(job.get("user_id"))
+        try:
+            await self.ai_service.compact_conversation(session_id, job.get("user_id"))
+        except Exception as e:
+            await self._fail(job, e)
+        else:
+            await self._complete(session_id)
+        return True
+
+    async def _complete(self, session_id: str):
+        """Delete the finished job, unless it was enqueued again while running; then it runs once more"""
+        self._stats["completed"] += 1
+        deleted = await self.collection.delete_one({"_id": session_id, "status": RUNNING, "dirty": {"$ne": True}})
+        if deleted.deleted_count:
+            return
+        await self.collection.update_one(
+            {"_id": session_id, "status": RUNNING, "dirty": True},
+            {
+                "$set": {"status": PENDING, "attempts": 0, "run_after": datetime.now(timezone.utc)},
+                "$unset": {"dirty": "", "locked_until": ""},
+            },
+        )
+        self._stats["requeued"] += 1
+
+    async def _fail(self, job: Dict[str, Any], error: Exception):
+        attempts = job.get("attempts", 1)
+        if attempts >= self.max_attempts:
+            logger.error(f"Compaction of {job['_id']} failed permanently after {attempts} attempts: {error}")
+            update = {"status": FAILED, "last_error": str(error)}
+            self._stats["failed"] += 1
+        else:
+            delay = self.retry_base_seconds * (2 ** (attempts - 1))
+            logger.warning(f"Compaction of {job['_id']} failed (attempt {attempts}), retrying in {delay}s: {error}")
+            update = {
+                "status": PENDING,
+                "last_error": str(error),
+                "run_after": datetime.now(timezone.utc) + timedelta(seconds=delay),
+            }
+            self._stats["retried"] += 1
+        await self.collection.update_one(
+            {"_id": job["_id"]}, {"$set": update, "$unset": {"locked_until": "", "dirty": ""}}
+        )
+
+    async def _worker_loop(self, worker_id: int):
+        while self.running:
+            try:
+                if await self.run_once():
+                    continue
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in compaction worker {worker_id}: {e}")
+                await asyncio.sleep(self.poll_interval)
+
+    async def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {"running": self.running, "workers": len(self.tasks), **self._stats}
+        if self.db is not None:
+            for status in (PENDING, RUNNING, FAILED):
+                stats[status] = await self.collection.count_documents({"status": status})
+        return stats
@@ -0,0 +1,266 @@
+"""
+Retrieval Context Builder
+Packs the best-scoring, non-overlapping knowledge passages into a token budget and renders them
+into precompiled prompt templates, reporting the resulting prompt size
+"""
+
+import logging
+import os
+import re
+import string
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONTEXT_TOKENS = int(os.environ.get("BEANGENIE_CONTEXT_TOKENS", "1800"))
+
+# Passages are paragraphs merged up to about this many tokens
+PASSAGE_TOKENS = 160
+# A passage whose word shingles are mostly already in the context adds nothing
+DUPLICATE_CONTAINMENT = 0.6
+SHINGLE_SIZE = 5
+
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+_WORD = re.compile(r"\w+")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Fast local BPE-style estimate: one token per punctuation mark and per short word,
+    plus one for every further 6 characters of a long word
+    """
+    if not text:
+        return 0
+    return sum(1 + (len(piece) - 1) // 6 for piece in _TOKEN.findall(text))
+
+
+class PromptTemplate:
+    """
+    A str.format-style template parsed once; render() only joins strings and the
+    static part's token count is known up front
+    """
+
+    def __init__(self, template: str):
+        self.template = template
+        self._parts: List[Tuple[str, Optional[str]]] = [
+            (literal, name) for literal, name, _, _ in string.Formatter().parse(template)
+        ]
+        self.fields: Set[str] = {name for _, name in self._parts if name}
+        self.static_tokens = estimate_tokens("".join(literal for literal, _ in self._parts))
+
+    def render(self, **values: Any) -> str:
+        out = []
+        for literal, name in self._parts:
+            out.append(literal)
+            if name:
+                out.append(str(values[name]))
+        return "".join(out)
+
+
+@dataclass
+class Passage:
+    source_index: int
+    position: int
+    text: str
+    tokens: int
+    score: float
+    shingles: Set[Tuple[str, ...]] = field(default_factory=set)
+
+
+@dataclass
+class BuiltContext:
+    text: str
+    sources: List[Dict[str, Any]]
+    stats: Dict[str, Any]
+
+
+def _shingles(text: str) -> Set[Tuple[str, ...]]:
+    words = [w.lower() for w in _WORD.findall(text)]
+    if len(words) < SHINGLE_SIZE:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i : i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def split_passages(
+    content: str, max_tokens: int = PASSAGE_TOKENS, overlap_tokens: int = 0
+) -> List[Tuple[str, int]]:
+    """
+    Split into paragraph-aligned passages of at most max_tokens (long paragraphs split on sentences,
+    text without sentence breaks into word windows). With overlap_tokens, each passage starts with the closing sentences of the previous one so a
+    fact straddling a boundary is whole in at least one passage.
+    """
+    pieces: List[Tuple[str, int]] = []
+    for paragraph in _PARAGRAPH_BREAK.split(content.strip()):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        tokens = estimate_tokens(paragraph)
+        if tokens <= max_tokens:
+            pieces.append((paragraph, tokens))
+            continue
+        for sentence in _SENTENCE_END.split(paragraph):
+            if not sentence.strip():
+                continue
+            tokens = estimate_tokens(sentence)
+            # Lists, tables and space-joined pages have no sentence breaks to split on
+            pieces.extend([(sentence, tokens)] if tokens <= max_tokens else _word_windows(sentence, max_tokens))
+
+    passages: List[Tuple[str, int]] = []
+    current: List[str] = []
+    current_tokens = 0
+    for text, tokens in pieces:
+        if current and current_tokens + tokens > max_tokens:
+            passages.append(("\n".join(current), current_tokens))
+            current = _overlap_tail(current[-1], overlap_tokens)
+            current_tokens = sum(estimate_tokens(s) for s in current)
+            if current_tokens + tokens > max_tokens:
+                # max_tokens is a hard bound: a full-size piece starts its passage without overlap
+                current, current_tokens = [], 0
+        current.append(text)
+        current_tokens += tokens
+    if current:
+        passages.append(("\n".join(current), current_tokens))
+    return passages
+
+
+def _cut_word(word: str, max_tokens: int) -> List[str]:
+    """Cut a whitespace-free run (a URL, a table rule) into parts of at most max_tokens"""
+    parts: List[str] = []
+    current = ""
+    used = 0
+    step = max_tokens * 6
+    for piece in _TOKEN.findall(word):
+        for chunk in (piece[i : i + step] for i in range(0, len(piece), step)):
+            tokens = estimate_tokens(chunk)
+            if current and used + tokens > max_tokens:
+                parts.append(current)
+                current, used = "", 0
+            current += chunk
+            used += tokens
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _word_windows(text: str, max_tokens: int) -> List[Tuple[str, int]]:
+    """Consecutive runs of whole words of at most max_tokens each (a longer single word is cut)"""
+    max_tokens = max(max_tokens, 1)
+    windows: List[Tuple[str, int]] = []
+    current: List[str] = []
+    current_tokens = 0
+    for word in text.split():
+        parts = [word] if estimate_tokens(word) <= max_tokens else _cut_word(word, max_tokens)
+        for part in parts:
+            tokens = estimate_tokens(part)
+            if current and current_tokens + tokens > max_tokens:
+                windows.append((" ".join(current), current_tokens))
+                current, current_tokens = [], 0
+            current.append(part)
+            current_tokens += tokens
+    if current:
+        windows.append((" ".join(current), current_tokens))
+    return windows
+
+
+def _overlap_tail(text: str, overlap_tokens: int) -> List[str]:
+    """Closing sentences of text totalling at most overlap_tokens"""
+    tail: List[str] = []
+    used = 0
+    for sentence in reversed([s for s in _SENTENCE_END.split(text) if s.strip()]):
+        tokens = estimate_tokens(sentence)
+        if used + tokens > overlap_tokens:
+            break
+        tail.insert(0, sentence)
+        used += tokens
+    return [" ".join(tail)] if tail else []
+
+
+def build_context(
+    query: str,
+    results: List[Dict[str, Any]],
+    max_tokens: Optional[int] = None,
+    max_sources: int = 8,
+) -> BuiltContext:
+    """
+    Select passages from ranked retrieval results into at most max_tokens of context.
+    Passages are ranked by their source's retrieval score (results without one are scored
+    by rank), boosted by query-term overlap; near-duplicates of already selected text are
+    dropped. The returned sources are the ones actually cited, numbered [1]..[n] in text.
+    """
+    started = time.perf_counter()
+    budget = DEFAULT_CONTEXT_TOKENS if max_tokens is None else max_tokens
+    query_terms = {w.lower() for w in _WORD.findall(query) if len(w) > 2}
+
+    passages: List[Passage] = []
+    for index, result in enumerate(results):
+        source_score = result.get("score")
+        if source_score is None:
+            source_score = 1.0 / (index + 1)
+        # Results from the knowledge index carry their query-relevant passages already split
+        chunks = [(p["text"], estimate_tokens(p["text"])) for p in result.get("passages") or []]
+        for position, (text, tokens) in enumerate(chunks or split_passages(result.get("content") or "")):
+            words = {w.lower() for w in _WORD.findall(text)}
+            overlap = len(query_terms & words) / len(query_terms) if query_terms else 0.0
+            # Earlier passages of a source (intros, summaries) win ties
+            score = float(source_score) * (0.5 + 0.5 * overlap) / (1 + 0.05 * position)
+            passages.append(Passage(index, position, text, tokens, score))
+    passages.sort(key=lambda p: p.score, reverse=True)
+
+    selected: Dict[int, List[Passage]] = {}
+    seen_shingles: Set[Tuple[str, ...]] = set()
+    used_tokens = 0
+    duplicates = 0
+    for passage in passages:
+        header_tokens = 0
+        if passage.source_index not in selected:
+            if len(selected) >= max_sources:
+                continue
+            source = results[passage.source_index]
+            header_tokens = estimate_tokens(f"[00] {source.get('title', '')}\nURL: {source.get('url', '')}\n")
+        if used_tokens + header_tokens + passage.tokens > budget:
+            continue
+        passage.shingles = _shingles(passage.text)
+        if passage.shingles and len(passage.shingles & seen_shingles) / len(passage.shingles) >= DUPLICATE_CONTAINMENT:
+            duplicates += 1
+            continue
+        seen_shingles |= passage.shingles
+        selected.setdefault(passage.source_index, []).append(passage)
+        used_tokens += header_tokens + passage.tokens
+
+    if not selected and passages:
+        # Nothing fit whole (a budget smaller than one passage): cite the best passage cut to the budget
+        best = passages[0]
+        source = results[best.source_index]
+        header_tokens = estimate_tokens(f"[00] {source.get('title', '')}\nURL: {source.get('url', '')}\n")
+        windows = _word_windows(best.text, budget - header_tokens) if budget > header_tokens else []
+        if windows:
+            best.text, best.tokens = windows[0]
+            selected[best.source_index] = [best]
+            used_tokens = header_tokens + best.tokens
+
+    # Cite sources in order of their best passage, passages in document order
+    order = sorted(selected, key=lambda i: max(p.score for p in selected[i]), reverse=True)
+    blocks = []
+    sources = []
+    for number, source_index in enumerate(order, start=1):
+        source = results[source_index]
+        body = "\n".join(p.text for p in sorted(selected[source_index], key=lambda p: p.position))
+        blocks.append(f"[{number}] {source.get('title', '')}\nURL: {source.get('url', '')}\n{body}")
+        sources.append(source)
+    text = "\n\n".join(blocks)
+
+    stats = {
+        "budget_tokens": budget,
+        "context_tokens": estimate_tokens(text),
+        "sources_considered": len(results),
+        "sources_used": len(sources),
+        "passages_considered": len(passages),
+        "passages_used": sum(len(v) for v in selected.values()),
+        "duplicates_dropped": duplicates,
+        "build_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+    return BuiltContext(text=text, sources=sources, stats=stats)
@@ -0,0 +1,218 @@
+"""
+Shared Outbound HTTP Client
+Per-host aiohttp connection pools with keep-alive, DNS caching, warm-up and
+per-upstream connect / TTFB / total timings
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable
+from urllib.parse import urlsplit
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+def origin_of(url: str) -> str:
+    """scheme://host[:port] of a URL; each origin gets its own connection pool"""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+class _TimedRequest:
+    """Async context manager around a pooled request that records its timings on exit"""
+
+    def __init__(self, client: "HTTPClient", origin: str, session: aiohttp.ClientSession, method: str, url: str, kwargs):
+        self.client = client
+        self.origin = origin
+        self.session = session
+        self.method = method
+        self.url = url
+        self.kwargs = kwargs
+        self.ctx: Dict[str, Any] = {}
+        self._request = None
+
+    async def __aenter__(self) -> aiohttp.ClientResponse:
+        self.ctx["start"] = time.monotonic()
+        self._request = self.session.request(self.method, self.url, trace_request_ctx=self.ctx, **self.kwargs)
+        try:
+            return await self._request.__aenter__()
+        except BaseException:
+            self.client._record(self.origin, self.ctx, error=True)
+            raise
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            return await self._request.__aexit__(exc_type, exc, tb)
+        finally:
+            self.client._record(self.origin, self.ctx, error=exc_type is not None)
+
+
+class PooledSession:
+    """Drop-in for the get/post/request calls of aiohttp.ClientSession, bound to one upstream pool"""
+
+    def __init__(self, client: "HTTPClient", origin: str, session: aiohttp.ClientSession):
+        self.client = client
+        self.origin = origin
+        self.session = session
+
+    @property
+    def closed(self) -> bool:
+        return self.session.closed
+
+    def request(self, method: str, url: str, **kwargs) -> _TimedRequest:
+        return _TimedRequest(self.client, self.origin, self.session, method, url, kwargs)
+
+    def get(self, url: str, **kwargs) -> _TimedRequest:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> _TimedRequest:
+        return self.request("POST", url, **kwargs)
+
+
+class HTTPClient:
+    def __init__(self):
+        self.limit = int(os.environ.get("HTTP_POOL_LIMIT", "100"))
+        self.limit_per_host = int(os.environ.get("HTTP_POOL_LIMIT_PER_HOST", "20"))
+        self.keepalive_timeout = float(os.environ.get("HTTP_KEEPALIVE_SECONDS", "60"))
+        self.dns_cache_ttl = int(os.environ.get("HTTP_DNS_CACHE_SECONDS", "300"))
+        self.connect_timeout = float(os.environ.get("HTTP_CONNECT_TIMEOUT_SECONDS", "10"))
+        self._sessions: Dict[str, aiohttp.ClientSession] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._trace_config = self._build_trace_config()
+
+    def _build_trace_config(self) -> aiohttp.TraceConfig:
+        trace = aiohttp.TraceConfig()
+
+        async def on_connection_create_start(session, trace_ctx, params):
+            if trace_ctx.trace_request_ctx is not None:
+                trace_ctx.trace_request_ctx["connect_start"] = time.monotonic()
+
+        async def on_connection_create_end(session, trace_ctx, params):
+            ctx = trace_ctx.trace_request_ctx
+            if ctx is not None and "connect_start" in ctx:
+                ctx["connect"] = time.monotonic() - ctx["connect_start"]
+
+        async def on_connection_reuseconn(session, trace_ctx, params):
+            if trace_ctx.trace_request_ctx is not None:
+                trace_ctx.trace_request_ctx["reused"] = True
+
+        async def on_request_end(session, trace_ctx, params):
+            # Fired once the response headers have arrived
+            ctx = trace_ctx.trace_request_ctx
+            if ctx is not None and "start" in ctx:
+                ctx["ttfb"] = time.monotonic() - ctx["start"]
+
+        trace.on_connection_create_start.append(on_connection_create_start)
+        trace.on_connection_create_end.append(on_connection_create_end)
+        trace.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace.on_request_end.append(on_request_end)
+        return trace
+
+    def _new_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            use_dns_cache=True,
+            ttl_dns_cache=self.dns_cache_ttl,
+        )
+        # No total timeout here: callers pass per-request timeouts
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=self.connect_timeout)
+        return aiohttp.ClientSession(connector=connector, timeout=timeout, trace_configs=[self._trace_config])
+
+    def session_for(self, url: str) -> PooledSession:
+        """Pooled session for the URL's origin, created on first use"""
+        origin = origin_of(url)
+        session = self._sessions.get(origin)
+        if session is None or session.closed:
+            session = self._sessions[origin] = self._new_session()
+        return PooledSession(self, origin, session)
+
+    async def warm_up(self, urls: Iterable[str], timeout: float = 5.0):
+        """Open a keep-alive connection to each upstream so the first real request skips DNS + TLS"""
+
+        async def touch(url: str):
+            try:
+                async with self.session_for(url).request(
+                    "HEAD", origin_of(url), timeout=aiohttp.ClientTimeout(total=timeout)
+                ) as response:
+                    await response.read()
+            except Exception as e:
+                logger.warning(f"HTTP warm-up of {origin_of(url)} failed: {e}")
+
+        await asyncio.gather(*(touch(url) for url in {origin_of(u): u for u in urls}.values()))
+
+    async def close(self):
+        """Close every pool - call this on shutdown"""
+        sessions, self._sessions = list(self._sessions.values()), {}
+        for session in sessions:
+            if not session.closed:
+                await session.close()
+
+    def _record(self, origin: str, ctx: Dict[str, Any], error: bool = False):
+        stats = self._stats.setdefault(
+            origin,
+            {
+                "requests": 0,
+                "errors": 0,
+                "new_connections": 0,
+                "reused_connections": 0,
+                "connect_total": 0.0,
+                "connect_max": 0.0,
+                "ttfb_total": 0.0,
+                "ttfb_count": 0,
+                "total_total": 0.0,
+                "total_max": 0.0,
+            },
+        )
+        total = time.monotonic() - ctx.get("start", time.monotonic())
+        stats["requests"] += 1
+        if error:
+            stats["errors"] += 1
+        if "connect" in ctx:
+            stats["new_connections"] += 1
+            stats["connect_total"] += ctx["connect"]
+            stats["connect_max"] = max(stats["connect_max"], ctx["connect"])
+        elif ctx.get("reused"):
+            stats["reused_connections"] += 1
+        if "ttfb" in ctx:
+            stats["ttfb_total"] += ctx["ttfb"]
+            stats["ttfb_count"] += 1
+        stats["total_total"] += total
+        stats["total_max"] = max(stats["total_max"], total)
+
+    def stats(self) -> Dict[str, Any]:
+        upstreams = {}
+        for origin, s in self._stats.items():
+            requests = s["requests"]
+            upstreams[origin] = {
+                "requests": requests,
+                "errors": s["errors"],
+                "new_connections": s["new_connections"],
+                "reused_connections": s["reused_connections"],
+                "avg_connect_ms": round(s["connect_total"] / s["new_connections"] * 1000, 2)
+                if s["new_connections"]
+                else 0.0,
+                "max_connect_ms": round(s["connect_max"] * 1000, 2),
+                "avg_ttfb_ms": round(s["ttfb_total"] / s["ttfb_count"] * 1000, 2) if s["ttfb_count"] else 0.0,
+                "avg_total_ms": round(s["total_total"] / requests * 1000, 2) if requests else 0.0,
+                "max_total_ms": round(s["total_max"] * 1000, 2),
+            }
+        return {
+            "limits": {
+                "total": self.limit,
+                "per_host": self.limit_per_host,
+                "keepalive_seconds": self.keepalive_timeout,
+                "dns_cache_seconds": self.dns_cache_ttl,
+            },
+            "pools": sorted(origin for origin, session in self._sessions.items() if not session.closed),
+            "upstreams": upstreams,
+        }
+
+
+# Global HTTP client instance
+http_client = HTTPClient()
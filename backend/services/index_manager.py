@@ -0,0 +1,203 @@
+"""
+Index Manager
+Declarative index specification for the hot application collections, applied at startup. Drift
+against list_indexes() is reported, not repaired destructively: missing indexes are created, while
+indexes whose options differ from the spec and indexes the spec does not know about are only reported.
+Services that own their collections (AI cache, usage meter, tutorial library, knowledge passages)
+keep creating their own indexes
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+ASC = 1
+DESC = -1
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    collection: str
+    keys: Tuple[Tuple[str, int], ...]
+    unique: bool = False
+    expire_after_seconds: Optional[int] = None
+
+    @property
+    def name(self) -> str:
+        """MongoDB's default index name, so specs match indexes created before the manager existed"""
+        return "_".join(f"{field}_{direction}" for field, direction in self.keys)
+
+    @property
+    def options(self) -> Dict[str, Any]:
+        options: Dict[str, Any] = {"name": self.name}
+        if self.unique:
+            options["unique"] = True
+        if self.expire_after_seconds is not None:
+            options["expireAfterSeconds"] = self.expire_after_seconds
+        return options
+
+
+def index(collection: str, *keys: Any, unique: bool = False, expire_after_seconds: Optional[int] = None) -> IndexSpec:
+    """index("users", "id", unique=True) or index("messages", "channel_id", ("created_at", DESC))"""
+    normalized = tuple((key, ASC) if isinstance(key, str) else (key[0], key[1]) for key in keys)
+    return IndexSpec(collection, normalized, unique=unique, expire_after_seconds=expire_after_seconds)
+
+
+# Each entry serves a route-level query; comments name the query when the key choice is not obvious
+INDEX_SPECS: List[IndexSpec] = [
+    index("users", "id", unique=True),
+    index("users", "bigo_id", unique=True),
+    index("users", "email"),
+    index("users", "role"),
+    index("admins", "user_id", unique=True),
+    # GET /messages: $or on sender/recipient, newest first (one SORT_MERGE branch per index)
+    index("private_messages", "sender_id", ("sent_at", DESC)),
+    index("private_messages", "recipient_id", ("sent_at", DESC)),
+    index("private_messages", "id"),
+    index("messages", "channel_id", "created_at"),
+    index("messages", "created_at"),
+    index("channels", "id"),
+    index("channels", "name"),
+    index("events", "id"),
+    index("events", "creator_id", "start_time"),
+    index("events", "start_time"),
+    index("event_rsvps", "event_id", "user_id"),
+    index("audition_uploads", "id"),
+    index("audition_submissions", "id"),
+    # Single active audition check on register/upload
+    index("audition_submissions", "bigo_id", "status"),
+    index("audition_submissions", "status", ("submission_date", DESC)),
+    index("audition_submissions", ("submission_date", DESC)),
+    index("influencer_leads", "id"),
+    index("influencer_leads", "username", "platform"),
+    index("influencer_leads", "scan_id"),
+    index("influencer_leads", ("discovered_at", DESC)),
+    index("lead_scans", "id"),
+    index("lead_scans", ("started_at", DESC)),
+    index("conversations", "session_id", "user_id"),
+    index("memories", "user_id"),
+    index("ai_chats", "user_id", ("created_at", DESC)),
+    index("beangenie_panels", "user_id"),
+    index("beangenie_raffles", "user_id"),
+    index("beangenie_debts", "user_id"),
+    index("beangenie_notes", "user_id"),
+    index("bigo_wheels", "id"),
+    index("bigo_wheels", "user_id", "active"),
+    index("bigo_wheel_prizes", "wheel_id"),
+    index("bigo_wheel_spins", "wheel_id", ("spun_at", DESC)),
+    index("bigo_wheel_spins", "id"),
+    index("quizzes", "id"),
+    index("quiz_questions", "quiz_id"),
+    index("tasks", "id"),
+    index("task_submissions", "id"),
+    index("task_submissions", "user_id", "task_id"),
+    index("task_submissions", "status"),
+    index("task_submissions", ("submitted_at", DESC)),
+    index("quota_targets", "user_id", "active"),
+    index("rewards", "id"),
+    # Points issued/redeemed totals match on the sign of delta
+    index("point_ledger", "delta"),
+    index("point_ledger", "user_id"),
+    index("blogs", "slug", unique=True),
+    index("blogs", "id"),
+    index("blogs", "status"),
+    index("blogs", "category"),
+    index("blogs", ("published_at", DESC)),
+    index("settings", "key"),
+]
+
+
+def _key_tuple(key: Any) -> Tuple[Tuple[str, Any], ...]:
+    """list_indexes() key documents as comparable tuples (int() folds 1.0 into 1)"""
+    return tuple((field, int(d) if isinstance(d, (int, float)) else d) for field, d in key.items())
+
+
+def _differences(spec: IndexSpec, existing: Dict[str, Any]) -> List[str]:
+    differences = []
+    if bool(existing.get("unique")) != spec.unique:
+        differences.append(f"unique={bool(existing.get('unique'))}, spec unique={spec.unique}")
+    if existing.get("expireAfterSeconds") != spec.expire_after_seconds:
+        ttl = existing.get("expireAfterSeconds")
+        differences.append(f"expireAfterSeconds={ttl}, spec expireAfterSeconds={spec.expire_after_seconds}")
+    return differences
+
+
+def specs_by_collection(specs: Iterable[IndexSpec] = INDEX_SPECS) -> Dict[str, List[IndexSpec]]:
+    grouped: Dict[str, List[IndexSpec]] = {}
+    for spec in specs:
+        grouped.setdefault(spec.collection, []).append(spec)
+    return grouped
+
+
+async def index_drift(db, specs: Sequence[IndexSpec] = INDEX_SPECS) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Compare the spec with list_indexes(): missing specs, indexes on the same keys with different
+    options (conflicts) and indexes on managed collections that no spec describes (unmanaged)
+    """
+    drift: Dict[str, List[Dict[str, Any]]] = {"missing": [], "conflicts": [], "unmanaged": []}
+    for collection, collection_specs in specs_by_collection(specs).items():
+        existing = {_key_tuple(i["key"]): i for i in await db[collection].list_indexes().to_list(None)}
+        wanted = {spec.keys for spec in collection_specs}
+        for spec in collection_specs:
+            current = existing.get(spec.keys)
+            if current is None:
+                drift["missing"].append({"collection": collection, "index": spec.name, "keys": list(spec.keys)})
+            elif _differences(spec, current):
+                drift["conflicts"].append(
+                    {"collection": collection, "index": current["name"], "differences": _differences(spec, current)}
+                )
+        for keys, current in existing.items():
+            if keys != (("_id", 1),) and keys not in wanted:
+                drift["unmanaged"].append({"collection": collection, "index": current["name"]})
+    return drift
+
+
+async def ensure_indexes(db, specs: Sequence[IndexSpec] = INDEX_SPECS) -> Dict[str, Any]:
+    """
+    Create missing indexes. Conflicting and unmanaged indexes are logged and left alone: dropping or
+    rebuilding an index on a live collection is an operator decision. Returns the drift report with
+    what was created and what failed (e.g. duplicate keys blocking a unique index)
+    """
+    drift = await index_drift(db, specs)
+    by_name = {(spec.collection, spec.name): spec for spec in specs}
+    created, failed = [], []
+    for item in drift["missing"]:
+        spec = by_name[(item["collection"], item["index"])]
+        try:
+            await db[spec.collection].create_index(list(spec.keys), **spec.options)
+            created.append(f"{spec.collection}.{spec.name}")
+        except Exception as e:
+            failed.append({"collection": spec.collection, "index": spec.name, "error": str(e)})
+            logger.warning(f"Could not create index {spec.collection}.{spec.name}: {e}")
+    for item in drift["conflicts"]:
+        logger.warning(f"Index {item['collection']}.{item['index']} differs from its spec: {item['differences']}")
+    if created:
+        logger.info(f"Created {len(created)} indexes: {', '.join(created)}")
+    return {
+        "created": created,
+        "failed": failed,
+        "conflicts": drift["conflicts"],
+        "unmanaged": drift["unmanaged"],
+    }
+
+
+def serving_index(
+    collection: str, fields: Iterable[str], sort: Sequence[str] = (), specs: Sequence[IndexSpec] = INDEX_SPECS
+) -> Optional[IndexSpec]:
+    """
+    A spec that lets the planner avoid a collection scan for a query filtering on `fields` (equality)
+    and sorting on `sort`: its leading key is filtered on, or its keys start with the sort fields.
+    Used to check query shapes without a database; scripts/verify_indexes.py checks real plans
+    """
+    fields = set(fields)
+    for spec in specs:
+        if spec.collection != collection:
+            continue
+        names = [field for field, _ in spec.keys]
+        if names[0] in fields:
+            return spec
+        if sort and names[: len(sort)] == list(sort):
+            return spec
+    return None
@@ -0,0 +1,176 @@
+"""
+Intent Keyword Matcher
+Precompiled word-boundary matching of intent vocabularies in a single pass over the message
+"""
+
+import json
+import logging
+import os
+import re
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Words, plus each punctuation mark on its own so "?" can be a vocabulary term
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+# Distinct tokens remembered before the per-token cache is reset
+TOKEN_CACHE_SIZE = 50000
+
+# Vocabulary entry syntax:
+#   "pk"        whole word only ("pk" but not "speak"); "do i" matches the two words in order
+#   "stream*"   word prefix ("stream", "streams", "streaming", "streamer")
+#   "re:<pat>"  regular expression that must match a whole word
+DEFAULT_VOCABULARIES: Dict[str, List[str]] = {
+    "bigo": [
+        "bean*",
+        "bigo",
+        "pk",
+        "pks",
+        "tier*",
+        "stream*",
+        "diamond*",
+        "gift*",
+        "host*",
+        "broadcast*",
+        "viewer*",
+        "audience*",
+        "fan",
+        "fans",
+        "earn*",
+        "money",
+        "level*",
+        "rank*",
+        # Tier codes S1 - S25
+        "re:s(?:[1-9]|1[0-9]|2[0-5])",
+        "battle*",
+        "live",
+    ],
+    "question": [
+        "?",
+        "how",
+        "what",
+        "when",
+        "where",
+        "why",
+        "who",
+        "can",
+        "should",
+        "do i",
+        "help me",
+        "tell me",
+    ],
+    "greeting": ["hi", "hello", "hey", "yo", "sup", "what's up", "whats up", "hola", "greetings"],
+}
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN.findall(text)
+
+
+class IntentMatcher:
+    """
+    Splits the message into word tokens once and looks each token up in tables built
+    from the vocabularies, so matching is on whole words and the cost grows with the
+    message length rather than the number of configured terms.
+    The "greeting" vocabulary only matches at the start of the message.
+    """
+
+    def __init__(self, vocabularies: Optional[Dict[str, Iterable[str]]] = None):
+        vocabularies = {k: list(v) for k, v in (vocabularies or DEFAULT_VOCABULARIES).items() if v}
+        greetings = vocabularies.pop("greeting", [])
+        self.vocabularies = sorted(vocabularies)
+
+        self._words: Dict[str, Set[str]] = {}
+        # first word -> [(remaining words, vocabulary)] for multi-word phrases
+        self._phrases: Dict[str, List[Tuple[Tuple[str, ...], str]]] = {}
+        prefixes: Dict[str, List[str]] = {}
+        patterns: Dict[str, List[str]] = {}
+        for name in self.vocabularies:
+            for term in vocabularies[name]:
+                if term.startswith("re:"):
+                    patterns.setdefault(name, []).append(term[3:])
+                elif term.endswith("*"):
+                    prefixes.setdefault(name, []).append(term.rstrip("*"))
+                else:
+                    first, *rest = _tokens(term)
+                    if rest:
+                        self._phrases.setdefault(first, []).append((tuple(rest), name))
+                    else:
+                        self._words.setdefault(first, set()).add(name)
+        self._prefixes = [(name, tuple(terms)) for name, terms in prefixes.items()]
+        self._patterns = None
+        if patterns:
+            self._patterns = re.compile(
+                "|".join(f"(?P<{name}>{'|'.join(terms)})" for name, terms in patterns.items())
+            )
+        # token -> vocabularies it matches on its own; messages reuse a small set of words,
+        # so after warm-up each token costs one dict lookup
+        self._token_cache: Dict[str, FrozenSet[str]] = {}
+
+        self._greeting = None
+        if greetings:
+            options = "|".join(re.escape(g) for g in sorted(greetings, key=len, reverse=True))
+            self._greeting = re.compile(rf"^(?:{options})(?:$|[ ,])")
+
+    def _classify_token(self, token: str) -> FrozenSet[str]:
+        names = set(self._words.get(token, ()))
+        for name, prefixes in self._prefixes:
+            if token.startswith(prefixes):
+                names.add(name)
+        if self._patterns is not None:
+            match = self._patterns.fullmatch(token)
+            if match:
+                names.add(match.lastgroup)
+        names = frozenset(names)
+        if len(self._token_cache) >= TOKEN_CACHE_SIZE:
+            self._token_cache.clear()
+        self._token_cache[token] = names
+        return names
+
+    def categories(self, text: str) -> FrozenSet[str]:
+        """Names of the vocabularies with at least one term in the (lowercased) text"""
+        found: Set[str] = set()
+        wanted = len(self.vocabularies)
+        cache = self._token_cache
+        tokens = _tokens(text)
+        for i, token in enumerate(tokens):
+            names = cache.get(token)
+            if names is None:
+                names = self._classify_token(token)
+            found |= names
+            for rest, name in self._phrases.get(token, ()):
+                if tuple(tokens[i + 1 : i + 1 + len(rest)]) == rest:
+                    found.add(name)
+            if len(found) == wanted:
+                break
+        return frozenset(found)
+
+    def starts_with_greeting(self, text: str) -> bool:
+        """True if the text is a greeting or starts with one followed by a space or comma"""
+        return bool(self._greeting and self._greeting.match(text))
+
+
+def load_vocabularies(path: Optional[str] = None) -> Dict[str, List[str]]:
+    """Default vocabularies, with any lists from the JSON file at INTENT_VOCABULARY_PATH replacing them"""
+    vocabularies = {name: list(terms) for name, terms in DEFAULT_VOCABULARIES.items()}
+    path = path or os.environ.get("INTENT_VOCABULARY_PATH")
+    if path:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                overrides = json.load(f)
+            vocabularies.update({name: list(terms) for name, terms in overrides.items()})
+        except Exception as e:
+            logger.error(f"Failed to load intent vocabulary from {path}: {e}")
+    return vocabularies
+
+
+_matcher: Optional[IntentMatcher] = None
+
+
+def get_intent_matcher() -> IntentMatcher:
+    """Shared matcher, compiled once on first use"""
+    global _matcher
+    if _matcher is None:
+        _matcher = IntentMatcher(load_vocabularies())
+    return _matcher
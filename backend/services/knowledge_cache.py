@@ -0,0 +1,162 @@
+"""
+Knowledge Search Cache
+LRU of search_bigo_knowledge results keyed by normalized query. Entries are stamped with the
+knowledge base version (a Mongo counter bumped by every ingest, including seed scripts) and the
+in-process index version, so any write makes older entries unreachable
+"""
+
+import asyncio
+import logging
+import os
+import re
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+# knowledge_meta document holding the knowledge base version counter
+KNOWLEDGE_VERSION_ID = "bigo_knowledge"
+
+_QUERY_WORD = re.compile(r"[a-z0-9]+")
+
+
+async def bump_knowledge_version(db) -> int:
+    """Record a knowledge base write; returns the new version"""
+    doc = await db.knowledge_meta.find_one_and_update(
+        {"_id": KNOWLEDGE_VERSION_ID},
+        {"$inc": {"version": 1}, "$set": {"updated_at": datetime.now(timezone.utc)}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return doc["version"]
+
+
+class KnowledgeSearchCache:
+    def __init__(self, max_entries: Optional[int] = None, poll_interval: Optional[float] = None):
+        self.enabled = os.environ.get("KNOWLEDGE_CACHE_ENABLED", "true").lower() != "false"
+        self.max_entries = max_entries or int(os.environ.get("KNOWLEDGE_CACHE_MAX_ENTRIES", "500"))
+        self.poll_interval = poll_interval or float(os.environ.get("KNOWLEDGE_CACHE_VERSION_POLL_SECONDS", "5"))
+        self.db = None
+        self.index = None
+        # Knowledge base version last read from Mongo
+        self.version = 0
+        # key -> (version stamp, results)
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, int], List[Dict[str, Any]]]]" = OrderedDict()
+        self.task: Optional[asyncio.Task] = None
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "invalidations": 0}
+
+    def set_dependencies(self, db, index=None):
+        """Set database reference and the in-process index whose version also stamps entries"""
+        self.db = db
+        self.index = index
+
+    async def start(self):
+        """Read the current knowledge base version and watch it for writes made by other processes"""
+        if not self.enabled or self.db is None:
+            return
+        await self.sync_version()
+        if self.task is None:
+            self.task = asyncio.create_task(self._poll_loop())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    def stamp(self) -> Tuple[int, int]:
+        """Version stamp for entries computed now"""
+        return self.version, self.index.version if self.index is not None else 0
+
+    @staticmethod
+    def make_key(query: str, limit: int, snippets: bool = False) -> str:
+        """Case, spacing and punctuation do not change search results, so they do not change the key"""
+        return f"{' '.join(_QUERY_WORD.findall(query.lower()))}|{limit}|{int(snippets)}"
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        if not self.enabled:
+            return None
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == self.stamp():
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            # Callers may annotate results; the cached copies stay untouched
+            return [dict(result) for result in entry[1]]
+        if entry is not None:
+            del self._entries[key]
+        self._stats["misses"] += 1
+        return None
+
+    def put(self, key: str, results: List[Dict[str, Any]], stamp: Tuple[int, int]):
+        """Store results computed at `stamp`; dropped if the knowledge base changed meanwhile"""
+        if not self.enabled or stamp != self.stamp():
+            return
+        self._entries[key] = (stamp, [dict(result) for result in results])
+        self._entries.move_to_end(key)
+        self._stats["stores"] += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def invalidate(self):
+        self._entries.clear()
+        self._stats["invalidations"] += 1
+
+    async def observe_version(self, version: Optional[int]):
+        """
+        Note the version returned by this process's own ingest. Skipping versions means another
+        process wrote too, so the index catches up before older entries are dropped
+        """
+        if version is None or version <= self.version:
+            return
+        if version > self.version + 1:
+            await self._refresh_index()
+        self.version = version
+        self.invalidate()
+
+    async def sync_version(self) -> bool:
+        """Compare with the version in Mongo; returns True when the knowledge base changed"""
+        doc = await self.db.knowledge_meta.find_one({"_id": KNOWLEDGE_VERSION_ID}, {"version": 1})
+        version = doc["version"] if doc else 0
+        if version == self.version:
+            return False
+        await self._refresh_index()
+        self.version = version
+        self.invalidate()
+        return True
+
+    async def _refresh_index(self):
+        if self.index is not None and self.index.ready:
+            await self.index.refresh()
+
+    async def _poll_loop(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.sync_version()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Knowledge version check failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            **self._stats,
+            "enabled": self.enabled,
+            "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "version": self.version,
+            "index_version": self.index.version if self.index is not None else None,
+        }
+
+
+# Singleton instance
+knowledge_cache = KnowledgeSearchCache()
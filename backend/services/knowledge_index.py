@@ -0,0 +1,519 @@
+"""
+BIGO Knowledge Index
+In-process BM25 inverted index over db.bigo_knowledge with light stemming and BIGO-specific
+synonyms, plus a hashed-embedding vector index fused with it for paraphrased questions.
+Built at startup, updated incrementally on upserts, and kept in sync with writes made
+elsewhere (seed scripts, other workers) by polling updated_at
+"""
+
+import asyncio
+import logging
+import math
+import os
+import re
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .context_builder import split_passages
+from .vector_index import HashingEmbedder, VectorIndex
+
+logger = logging.getLogger(__name__)
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+# Title and tag terms count this many times towards a document's term frequencies
+TITLE_WEIGHT = 3
+TAG_WEIGHT = 2
+# Weight of a query term added by synonym expansion, relative to the typed term
+SYNONYM_WEIGHT = 0.4
+
+# Reciprocal rank fusion constant and the vector ranking's weight relative to BM25
+RRF_K = 60
+VECTOR_WEIGHT = float(os.environ.get("KNOWLEDGE_VECTOR_WEIGHT", "1.0"))
+# Vector hits below this cosine similarity are noise (off-topic questions should still find nothing)
+VECTOR_MIN_SIMILARITY = float(os.environ.get("KNOWLEDGE_VECTOR_MIN_SIMILARITY", "0.1"))
+VECTOR_DIR = Path(
+    os.environ.get("KNOWLEDGE_VECTOR_DIR", Path(__file__).parent.parent / "models" / "knowledge_vectors")
+)
+
+# Documents are indexed and returned as overlapping passages of about this many tokens
+PASSAGE_TOKENS = int(os.environ.get("KNOWLEDGE_PASSAGE_TOKENS", "160"))
+PASSAGE_OVERLAP_TOKENS = int(os.environ.get("KNOWLEDGE_PASSAGE_OVERLAP_TOKENS", "30"))
+# Passages of each result handed to callers, and the length of its display snippet
+PASSAGES_PER_RESULT = int(os.environ.get("KNOWLEDGE_PASSAGES_PER_RESULT", "3"))
+SNIPPET_CHARS = 200
+
+_WORD = re.compile(r"[a-z0-9]+")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+# "S10", "s-10", "s 10" and "tier 10" all mean the S10 tier
+_TIER = re.compile(r"\b(?:s\s?-?\s?|tier\s+)(\d{1,2})\b")
+
+STOPWORDS = frozenset(
+    "a about all also an and any are as at be but by can could do does for from get has have how i if in "
+    "into is it its just me more much my of on or our should so some than that the their them then there "
+    "these they this to up was we what when where which who why will with would you your".split()
+)
+
+# Canonical (stemmed) term -> related terms searched alongside it at reduced weight
+SYNONYMS: Dict[str, Tuple[str, ...]] = {
+    "bean": ("diamond", "earn"),
+    "diamond": ("bean",),
+    "pk": ("battl",),
+    "battl": ("pk",),
+    "earn": ("bean", "incom", "pay"),
+    "incom": ("earn",),
+    "pay": ("earn", "salari"),
+    "paid": ("earn", "pay"),
+    "salari": ("pay", "earn"),
+    "monei": ("earn", "bean", "incom"),
+    "cash": ("bean", "earn"),
+    "gift": ("bean", "diamond"),
+    "tier": ("rank", "level"),
+    "rank": ("tier", "level"),
+    "level": ("tier", "rank"),
+    "viewer": ("audienc", "fan"),
+    "audienc": ("viewer", "fan"),
+    "fan": ("viewer", "follower"),
+    "follower": ("fan",),
+    "stream": ("broadcast", "live"),
+    "broadcast": ("stream",),
+    "live": ("stream",),
+    "host": ("streamer", "broadcast"),
+    "streamer": ("host",),
+}
+
+# (suffix, replacement), first match wins; applied only when the stem keeps 3+ characters
+_SUFFIXES = (
+    ("ational", "ate"),
+    ("ization", "ize"),
+    ("fulness", "ful"),
+    ("iveness", "ive"),
+    ("ments", ""),
+    ("ment", ""),
+    ("ness", ""),
+    ("ings", ""),
+    ("ing", ""),
+    ("edly", ""),
+    ("ed", ""),
+    ("ies", "y"),
+    ("sses", "ss"),
+    ("ly", ""),
+    ("s", ""),
+)
+
+
+@lru_cache(maxsize=50000)
+def stem(word: str) -> str:
+    """Small suffix-stripping stemmer: streams/streaming/streamed -> stream, battles/battling -> battl"""
+    if len(word) <= 3 or word.isdigit():
+        return word
+    for suffix, replacement in _SUFFIXES:
+        if word.endswith(suffix):
+            candidate = word[: -len(suffix)] + replacement
+            if suffix == "s" and word.endswith(("ss", "us", "is")):
+                continue
+            if len(candidate) >= 3:
+                word = candidate
+                break
+    # running -> runn -> run; keep ll/ss/zz
+    if len(word) > 3 and word[-1] == word[-2] and word[-1] not in "lsz" and word[-1] not in "aeiou":
+        word = word[:-1]
+    # Trailing e and y are dropped/normalized so battle/battling and money/monies meet
+    if len(word) > 3 and word.endswith("e"):
+        word = word[:-1]
+    if len(word) > 3 and word.endswith("y"):
+        word = word[:-1] + "i"
+    return word
+
+
+def analyze(text: str) -> List[str]:
+    """Lowercase, fold tier mentions to sN, drop stopwords, stem"""
+    lowered = _TIER.sub(lambda m: f" s{int(m.group(1))} " if 1 <= int(m.group(1)) <= 25 else m.group(0), text.lower())
+    return [stem(w) for w in _WORD.findall(lowered) if w not in STOPWORDS]
+
+
+def query_terms(query: str) -> Dict[str, float]:
+    """Analyzed query terms with weights, including synonym expansions"""
+    weights: Dict[str, float] = {}
+    for term in analyze(query):
+        weights[term] = 1.0
+    for term in list(weights):
+        for synonym in SYNONYMS.get(term, ()):
+            weights.setdefault(synonym, SYNONYM_WEIGHT)
+    return weights
+
+
+def document_terms(doc: Dict[str, Any]) -> Counter:
+    terms = Counter(analyze(doc.get("content") or ""))
+    for term in analyze(doc.get("title") or ""):
+        terms[term] += TITLE_WEIGHT
+    for term in analyze(" ".join(doc.get("tags") or [])):
+        terms[term] += TAG_WEIGHT
+    return terms
+
+
+def embedding_text(doc: Dict[str, Any]) -> str:
+    return "\n".join([doc.get("title") or "", " ".join(doc.get("tags") or []), doc.get("content") or ""])
+
+
+def document_passages(content: str) -> List[str]:
+    """Overlapping passages a document is indexed, stored and returned as"""
+    return [text for text, _ in split_passages(content, PASSAGE_TOKENS, PASSAGE_OVERLAP_TOKENS)]
+
+
+def snippet(text: str, query: str, max_chars: int = SNIPPET_CHARS) -> str:
+    """The sentence of text that best matches the query plus what follows it, trimmed to about max_chars"""
+    sentences = [s for s in _SENTENCE_END.split(text.strip()) if s.strip()]
+    if not sentences:
+        return ""
+    weights = query_terms(query)
+    scored = [sum(weights.get(term, 0.0) for term in set(analyze(s))) for s in sentences]
+    best = max(range(len(sentences)), key=lambda i: (scored[i], -i))
+    out = " ".join(sentences[best:])
+    if len(out) > max_chars:
+        cut = out.rfind(" ", 0, max_chars)
+        out = out[: cut if cut > 0 else max_chars].rstrip(",;: ") + "..."
+    return ("..." if best > 0 else "") + out
+
+
+class KnowledgeIndex:
+    def __init__(self, refresh_interval: Optional[float] = None, vector_dir: Optional[Path] = None):
+        self.db = None
+        self.enabled = os.environ.get("KNOWLEDGE_INDEX_ENABLED", "true").lower() != "false"
+        # Vectors are persisted under vector_dir (None = in memory only) and reused while content is unchanged
+        self.vectors: Optional[VectorIndex] = None
+        if os.environ.get("KNOWLEDGE_VECTORS_ENABLED", "true").lower() != "false":
+            self.vectors = VectorIndex(HashingEmbedder(analyze, SYNONYMS), vector_dir)
+        self.refresh_interval = refresh_interval or float(os.environ.get("KNOWLEDGE_INDEX_REFRESH_SECONDS", "60"))
+        self.ready = False
+        # Bumped on every change so cached search results can tell they are stale
+        self.version = 0
+        # doc id -> stored fields (id, url, title, tags) and the document's passages
+        self.docs: Dict[str, Dict[str, Any]] = {}
+        self.passages: Dict[str, List[str]] = {}
+        # BM25 runs over passages keyed "<doc id>#<position>"; term -> {passage key: term frequency}
+        self.postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        # passage key -> term frequencies, kept to remove a document's postings on update
+        self.doc_terms: Dict[str, Counter] = {}
+        self.doc_lengths: Dict[str, int] = {}
+        self.total_length = 0
+        # Passages live in numbered slots so per-term BM25 impacts can be cached as arrays
+        self._slots: Dict[str, int] = {}
+        self._free_slots: List[int] = []
+        self._slot_ids: List[Optional[str]] = []
+        # slot -> (doc id, passage position); doc ids are numbered so passage scores group with NumPy
+        self._slot_passages: List[Optional[Tuple[str, int]]] = []
+        self._doc_numbers: Dict[str, int] = {}
+        self._numbered_docs: Dict[int, str] = {}
+        self._next_doc_number = 0
+        self._slot_doc_array: Optional[np.ndarray] = None
+        # term -> (slot indices, tf-and-length-normalized impact); cleared on every index change
+        self._impacts: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.watermark: Optional[datetime] = None
+        self.task: Optional[asyncio.Task] = None
+        self._stats = {"searches": 0, "hybrid_searches": 0, "fallbacks": 0, "upserts": 0, "refreshes": 0, "build_ms": 0.0}
+
+    def set_db(self, db):
+        """Set database reference for building and refreshing the index"""
+        self.db = db
+
+    async def start(self):
+        """Build the index from Mongo and keep polling for writes made outside this process"""
+        if not self.enabled or self.db is None:
+            return
+        await self.rebuild()
+        if self.task is None:
+            self.task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        if self.vectors is not None:
+            self.vectors.save()
+
+    async def rebuild(self):
+        started = time.perf_counter()
+        docs = await self.db.bigo_knowledge.find(
+            {}, {"_id": 0, "id": 1, "url": 1, "title": 1, "content": 1, "tags": 1, "updated_at": 1}
+        ).to_list(None)
+        if self.vectors is not None and not len(self.vectors):
+            # Rows of a previous run are reused for every document whose content hash still matches
+            self.vectors.load()
+        self.load(docs)
+        if self.vectors is not None:
+            self.vectors.save()
+        self._stats["build_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        logger.info(f"Knowledge index built: {len(self.docs)} documents, {len(self.postings)} terms")
+
+    def load(self, docs: Iterable[Dict[str, Any]]):
+        """Replace the index contents with the given documents"""
+        self.docs.clear()
+        self.passages.clear()
+        self.postings.clear()
+        self.doc_terms.clear()
+        self.doc_lengths.clear()
+        self.total_length = 0
+        self._slots.clear()
+        self._free_slots.clear()
+        self._slot_ids.clear()
+        self._slot_passages.clear()
+        self._doc_numbers.clear()
+        self._numbered_docs.clear()
+        self._changed()
+        self.watermark = None
+        for doc in docs:
+            self._add(doc)
+        if self.vectors is not None:
+            self.vectors.retain(self.docs)
+            self.vectors.maybe_retrain()
+        self.ready = True
+
+    def upsert(self, doc: Dict[str, Any]):
+        """Index a new or changed document (keyed by its id)"""
+        self._add(doc)
+        self._stats["upserts"] += 1
+
+    def remove(self, doc_id: str):
+        self._remove_postings(doc_id)
+        if self.vectors is not None:
+            self.vectors.remove(doc_id)
+
+    def _changed(self):
+        self.version += 1
+        self._impacts.clear()
+        self._slot_doc_array = None
+
+    def _remove_postings(self, doc_id: str):
+        passages = self.passages.pop(doc_id, None)
+        if passages is None:
+            return
+        for position in range(len(passages)):
+            key = f"{doc_id}#{position}"
+            for term in self.doc_terms.pop(key):
+                postings = self.postings.get(term)
+                if postings is not None:
+                    postings.pop(key, None)
+                    if not postings:
+                        del self.postings[term]
+            self.total_length -= self.doc_lengths.pop(key, 0)
+            slot = self._slots.pop(key)
+            self._slot_ids[slot] = None
+            self._slot_passages[slot] = None
+            self._free_slots.append(slot)
+        self.docs.pop(doc_id, None)
+        self._numbered_docs.pop(self._doc_numbers.pop(doc_id), None)
+        self._changed()
+
+    def _add(self, doc: Dict[str, Any]):
+        doc_id = doc.get("id")
+        if not doc_id:
+            return
+        self._remove_postings(doc_id)
+        passages = document_passages(doc.get("content") or "") or [""]
+        for position, text in enumerate(passages):
+            # Every passage carries its document's title and tags
+            key = f"{doc_id}#{position}"
+            terms = document_terms({"title": doc.get("title"), "tags": doc.get("tags"), "content": text})
+            for term, tf in terms.items():
+                self.postings[term][key] = tf
+            length = sum(terms.values())
+            self.doc_terms[key] = terms
+            self.doc_lengths[key] = length
+            self.total_length += length
+            if self._free_slots:
+                slot = self._free_slots.pop()
+                self._slot_ids[slot] = key
+                self._slot_passages[slot] = (doc_id, position)
+            else:
+                slot = len(self._slot_ids)
+                self._slot_ids.append(key)
+                self._slot_passages.append((doc_id, position))
+            self._slots[key] = slot
+        self._next_doc_number += 1
+        self._doc_numbers[doc_id] = self._next_doc_number
+        self._numbered_docs[self._next_doc_number] = doc_id
+        self._changed()
+        self.passages[doc_id] = passages
+        self.docs[doc_id] = {k: doc.get(k) for k in ("id", "url", "title", "tags")}
+        if self.vectors is not None:
+            # Unchanged content keeps its stored vector, so re-upserts and rebuilds skip embedding
+            self.vectors.upsert(doc_id, embedding_text(doc))
+        updated_at = doc.get("updated_at")
+        if isinstance(updated_at, datetime):
+            if updated_at.tzinfo is None:
+                updated_at = updated_at.replace(tzinfo=timezone.utc)
+            if self.watermark is None or updated_at > self.watermark:
+                self.watermark = updated_at
+
+    async def refresh(self) -> int:
+        """Pull documents written since the newest one indexed; returns how many changed"""
+        if self.db is None:
+            return 0
+        query = {"updated_at": {"$gt": self.watermark}} if self.watermark else {}
+        docs = await self.db.bigo_knowledge.find(
+            query, {"_id": 0, "id": 1, "url": 1, "title": 1, "content": 1, "tags": 1, "updated_at": 1}
+        ).to_list(None)
+        for doc in docs:
+            self._add(doc)
+        if docs:
+            if self.vectors is not None:
+                self.vectors.maybe_retrain()
+                self.vectors.save()
+            self._stats["refreshes"] += 1
+            logger.info(f"Knowledge index refreshed {len(docs)} documents")
+        return len(docs)
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Knowledge index refresh failed: {e}")
+
+    def _term_impacts(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Slots containing the term and their BM25 tf component, computed once per index version"""
+        cached = self._impacts.get(term)
+        if cached is not None:
+            return cached
+        postings = self.postings.get(term)
+        if not postings:
+            return None
+        avg_length = self.total_length / len(self.doc_lengths)
+        slots = np.fromiter((self._slots[key] for key in postings), dtype=np.int64, count=len(postings))
+        tf = np.fromiter(postings.values(), dtype=np.float64, count=len(postings))
+        lengths = np.fromiter((self.doc_lengths[key] for key in postings), dtype=np.float64, count=len(postings))
+        impact = tf * (K1 + 1) / (tf + K1 * (1 - B + B * lengths / avg_length))
+        self._impacts[term] = (slots, impact)
+        return slots, impact
+
+    def _slot_scores(self, query: str) -> Optional[np.ndarray]:
+        n_passages = len(self.doc_lengths)
+        if not n_passages:
+            return None
+        scores = np.zeros(len(self._slot_ids))
+        matched = False
+        for term, weight in query_terms(query).items():
+            impacts = self._term_impacts(term)
+            if impacts is None:
+                continue
+            slots, impact = impacts
+            idf = math.log(1 + (n_passages - len(slots) + 0.5) / (len(slots) + 0.5))
+            scores[slots] += weight * idf * impact
+            matched = True
+        return scores if matched else None
+
+    def _slot_docs(self) -> np.ndarray:
+        """Document number of every slot (0 for free slots), rebuilt after index changes"""
+        if self._slot_doc_array is None:
+            self._slot_doc_array = np.array(
+                [self._doc_numbers[p[0]] if p else 0 for p in self._slot_passages], dtype=np.int64
+            )
+        return self._slot_doc_array
+
+    def _ranked_docs(self, query: str, limit: Optional[int]) -> List[Tuple[str, float, List[int]]]:
+        """
+        (doc id, score, matching passage positions best first) for the top documents.
+        A document scores as its best passage, so one relevant section of a long page is enough.
+        """
+        scores = self._slot_scores(query)
+        if scores is None:
+            return []
+        matched = np.flatnonzero(scores)
+        docs = self._slot_docs()[matched]
+        best = np.zeros(self._next_doc_number + 1)
+        np.maximum.at(best, docs, scores[matched])
+        top = np.flatnonzero(best)
+        if limit is not None and len(top) > limit:
+            top = top[np.argpartition(best[top], -limit)[-limit:]]
+        top = top[np.argsort(-best[top], kind="stable")]
+        # Matching passages of the top documents, best first
+        passages = matched[np.isin(docs, top)]
+        positions: Dict[int, List[int]] = {int(number): [] for number in top}
+        for slot in passages[np.argsort(-scores[passages], kind="stable")]:
+            doc_id, position = self._slot_passages[slot]
+            positions[self._doc_numbers[doc_id]].append(position)
+        return [(self._numbered_docs[int(number)], float(best[number]), positions[int(number)]) for number in top]
+
+    def _result(
+        self, doc_id: str, score: float, positions: List[int], query: str, snippets: bool
+    ) -> Dict[str, Any]:
+        """Document fields with only its most relevant passages (in document order) and optionally a snippet"""
+        passages = self.passages[doc_id]
+        chosen = sorted(positions[:PASSAGES_PER_RESULT]) or [0]
+        result = {
+            **self.docs[doc_id],
+            "content": "\n\n".join(passages[p] for p in chosen),
+            "passages": [{"position": p, "text": passages[p]} for p in chosen],
+            "score": score,
+        }
+        if snippets:
+            result["snippet"] = snippet(passages[positions[0] if positions else 0], query)
+        return result
+
+    def scores(self, query: str) -> Dict[str, float]:
+        """BM25 score (best passage) of every document matching at least one (expanded) query term"""
+        return {doc_id: score for doc_id, score, _ in self._ranked_docs(query, None)}
+
+    def search(self, query: str, limit: int = 5, snippets: bool = False) -> List[Dict[str, Any]]:
+        """Top BM25 documents in the shape search_bigo_knowledge returns, with a "score" field"""
+        self._stats["searches"] += 1
+        return [
+            self._result(doc_id, round(score, 4), positions, query, snippets)
+            for doc_id, score, positions in self._ranked_docs(query, limit)
+        ]
+
+    def hybrid_search(self, query: str, limit: int = 5, snippets: bool = False) -> List[Dict[str, Any]]:
+        """
+        BM25 and vector rankings fused with reciprocal rank fusion; "score" is the fused score.
+        Falls back to plain BM25 when vectors are disabled.
+        """
+        if self.vectors is None:
+            return self.search(query, limit, snippets)
+        self._stats["hybrid_searches"] += 1
+        depth = max(limit * 4, 20)
+        fused: Dict[str, float] = defaultdict(float)
+        positions: Dict[str, List[int]] = {}
+        for rank, (doc_id, _, matched) in enumerate(self._ranked_docs(query, depth)):
+            fused[doc_id] += 1.0 / (RRF_K + rank + 1)
+            positions[doc_id] = matched
+        for rank, (doc_id, _) in enumerate(self.vectors.search(query, depth, VECTOR_MIN_SIMILARITY)):
+            if doc_id in self.docs:
+                fused[doc_id] += VECTOR_WEIGHT / (RRF_K + rank + 1)
+        ranked = sorted(fused.items(), key=lambda item: -item[1])[:limit]
+        return [
+            self._result(doc_id, round(score, 6), positions.get(doc_id, []), query, snippets) for doc_id, score in ranked
+        ]
+
+    def note_fallback(self):
+        self._stats["fallbacks"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "ready": self.ready,
+            "version": self.version,
+            "documents": len(self.docs),
+            "passages": len(self.doc_lengths),
+            "terms": len(self.postings),
+            "watermark": self.watermark.isoformat() if self.watermark else None,
+            "vectors": self.vectors.stats() if self.vectors is not None else None,
+        }
+
+
+# Singleton instance
+knowledge_index = KnowledgeIndex(vector_dir=VECTOR_DIR)
@@ -0,0 +1,151 @@
+"""
+Knowledge Ingestion
+Validates knowledge entries and writes them in bulk: one lookup per batch, bulk_write upserts,
+content-hash dedup so unchanged pages cost no writes, and passage/index updates for changed
+documents only
+"""
+
+import hashlib
+import json
+import logging
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from pymongo import UpdateOne
+
+from .knowledge_cache import bump_knowledge_version
+from .knowledge_passages import store_passages_many
+
+logger = logging.getLogger(__name__)
+
+MAX_CONTENT_CHARS = 20000
+INGEST_BATCH_SIZE = int(os.environ.get("KNOWLEDGE_INGEST_BATCH_SIZE", "500"))
+KNOWLEDGE_BULK_MAX_BYTES = int(os.environ.get("KNOWLEDGE_BULK_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+async def ensure_ingest_indexes(db):
+    """Entries are matched by url and documents by id once per batch"""
+    await db.bigo_knowledge.create_index("url")
+    await db.bigo_knowledge.create_index("id")
+
+
+def document_hash(doc: Dict[str, Any]) -> str:
+    """Hash of the fields that matter for search; equal hashes mean the stored document is current"""
+    canonical = json.dumps([doc["title"], doc["content"], sorted(doc.get("tags") or [])], ensure_ascii=False)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+def normalize_entry(raw: Any) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """(entry, None) for a valid knowledge entry, (None, error) otherwise"""
+    if not isinstance(raw, dict):
+        return None, "Entry must be a JSON object"
+    url = str(raw.get("url") or "").strip()
+    title = str(raw.get("title") or "").strip()
+    content = str(raw.get("content") or "").strip()
+    tags = raw.get("tags") or []
+    if not url or not title or not content:
+        return None, "URL, title, and content are required"
+    if not urlparse(url).netloc.endswith("bigo.tv"):
+        return None, "Only bigo.tv domains are allowed"
+    if not isinstance(tags, list):
+        return None, "Tags must be a list"
+    # Cap content at 20k chars
+    return {"url": url, "title": title, "content": content[:MAX_CONTENT_CHARS], "tags": [str(t) for t in tags]}, None
+
+
+def parse_ndjson(data: bytes) -> Tuple[List[Tuple[int, Any]], List[Dict[str, Any]]]:
+    """(line number, parsed object) for every non-blank line, plus parse errors"""
+    entries, errors = [], []
+    for number, line in enumerate(data.decode("utf-8-sig", errors="replace").splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            entries.append((number, json.loads(line)))
+        except json.JSONDecodeError as e:
+            errors.append({"line": number, "status": "error", "error": f"Invalid JSON: {e.msg}"})
+    return entries, errors
+
+
+async def ingest(db, entries: Iterable[Tuple[int, Any]], index=None) -> Dict[str, Any]:
+    """
+    Upsert knowledge entries keyed by URL. Each entry is (line number, raw object); a later
+    entry for the same URL replaces an earlier one. Returns counts and a per-entry result list.
+    """
+    results: List[Dict[str, Any]] = []
+    latest: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+    for line, raw in entries:
+        entry, error = normalize_entry(raw)
+        if error:
+            results.append({"line": line, "status": "error", "error": error})
+            continue
+        if entry["url"] in latest:
+            results.append({"line": latest[entry["url"]][0], "url": entry["url"], "status": "superseded"})
+        latest[entry["url"]] = (line, entry)
+
+    pending = list(latest.values())
+    for start in range(0, len(pending), INGEST_BATCH_SIZE):
+        results.extend(await _write_batch(db, pending[start : start + INGEST_BATCH_SIZE], index))
+
+    counts = {status: 0 for status in ("inserted", "updated", "unchanged", "superseded", "error")}
+    for result in results:
+        counts[result["status"]] += 1
+    # Cached searches in every process are invalidated through the knowledge base version
+    version = await bump_knowledge_version(db) if counts["inserted"] or counts["updated"] else None
+    return {
+        **counts,
+        "received": len(results),
+        "version": version,
+        "results": sorted(results, key=lambda r: r["line"]),
+    }
+
+
+async def _write_batch(db, batch: List[Tuple[int, Dict[str, Any]]], index) -> List[Dict[str, Any]]:
+    urls = [entry["url"] for _, entry in batch]
+    existing = {
+        doc["url"]: doc
+        for doc in await db.bigo_knowledge.find(
+            {"url": {"$in": urls}}, {"_id": 0, "id": 1, "url": 1, "content_hash": 1}
+        ).to_list(None)
+    }
+    now = datetime.now(timezone.utc)
+    operations, changed, results = [], [], []
+    for line, entry in batch:
+        digest = document_hash(entry)
+        stored = existing.get(entry["url"])
+        if stored and stored.get("content_hash") == digest:
+            results.append({"line": line, "url": entry["url"], "id": stored["id"], "status": "unchanged"})
+            continue
+        doc = {**entry, "content_hash": digest, "updated_at": now}
+        operations.append(
+            UpdateOne(
+                {"url": entry["url"]},
+                {"$set": doc, "$setOnInsert": {"id": str(uuid.uuid4()), "created_at": now}},
+                upsert=True,
+            )
+        )
+        changed.append((line, doc, "updated" if stored else "inserted"))
+    if not operations:
+        return results
+
+    await db.bigo_knowledge.bulk_write(operations, ordered=False)
+    # Ids of inserted documents come from the stored rows, so a concurrent insert of the same URL agrees
+    ids = {
+        doc["url"]: doc["id"]
+        for doc in await db.bigo_knowledge.find(
+            {"url": {"$in": [doc["url"] for _, doc, _ in changed]}}, {"_id": 0, "id": 1, "url": 1}
+        ).to_list(None)
+    }
+    docs = []
+    for line, doc, status in changed:
+        doc["id"] = ids[doc["url"]]
+        docs.append(doc)
+        results.append({"line": line, "url": doc["url"], "id": doc["id"], "status": status})
+    await store_passages_many(db, docs)
+    if index is not None:
+        for doc in docs:
+            index.upsert(doc)
+    logger.info(f"Knowledge ingest wrote {len(docs)} documents, skipped {len(batch) - len(docs)} unchanged")
+    return results
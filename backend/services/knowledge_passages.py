@@ -0,0 +1,129 @@
+"""
+Knowledge Passages
+Stores each knowledge document's overlapping passages in db.bigo_knowledge_passages at write
+time, so the Mongo search path fetches only matching passages instead of 20k-character pages
+"""
+
+import hashlib
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from pymongo import UpdateOne
+
+from .knowledge_index import PASSAGES_PER_RESULT, document_passages, snippet
+
+logger = logging.getLogger(__name__)
+
+PASSAGE_WRITE_BATCH = 1000
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+def passage_documents(doc: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """The passage rows stored for a knowledge document"""
+    now = datetime.now(timezone.utc)
+    return [
+        {"id": f"{doc['id']}#{position}", "doc_id": doc["id"], "position": position, "text": text, "updated_at": now}
+        for position, text in enumerate(document_passages(doc.get("content") or ""))
+    ]
+
+
+async def ensure_passage_indexes(db):
+    await db.bigo_knowledge_passages.create_index([("doc_id", 1), ("position", 1)], unique=True)
+    await db.bigo_knowledge_passages.create_index([("text", "text")])
+
+
+async def store_passages(db, doc: Dict[str, Any]) -> int:
+    """Replace a document's stored passages and mark which content they were split from"""
+    return await store_passages_many(db, [doc])
+
+
+async def store_passages_many(db, docs: List[Dict[str, Any]]) -> int:
+    """
+    store_passages for many documents: batched upserts keyed by (doc_id, position), one delete for
+    positions past each document's new end, and one bulk update. Two workers storing the same
+    document both upsert the same keys, where delete-then-insert would hit the unique index
+    """
+    if not docs:
+        return 0
+    passages = {doc["id"]: passage_documents(doc) for doc in docs}
+    operations = [
+        UpdateOne(
+            {"doc_id": row["doc_id"], "position": row["position"]},
+            {"$set": {"id": row["id"], "text": row["text"], "updated_at": row["updated_at"]}},
+            upsert=True,
+        )
+        for rows in passages.values()
+        for row in rows
+    ]
+    for start in range(0, len(operations), PASSAGE_WRITE_BATCH):
+        await db.bigo_knowledge_passages.bulk_write(operations[start : start + PASSAGE_WRITE_BATCH], ordered=False)
+    await db.bigo_knowledge_passages.delete_many(
+        {"$or": [{"doc_id": doc_id, "position": {"$gte": len(rows)}} for doc_id, rows in passages.items()]}
+    )
+    await db.bigo_knowledge.bulk_write(
+        [
+            UpdateOne({"id": doc["id"]}, {"$set": {"passages_hash": content_hash(doc.get("content") or "")}})
+            for doc in docs
+        ],
+        ordered=False,
+    )
+    return len(operations)
+
+
+async def backfill_passages(db) -> int:
+    """Split documents written before passages existed (or by tools that skip them); returns how many"""
+    docs = await db.bigo_knowledge.find(
+        {"passages_hash": {"$exists": False}}, {"_id": 0, "id": 1, "content": 1}
+    ).to_list(None)
+    for start in range(0, len(docs), PASSAGE_WRITE_BATCH):
+        await store_passages_many(db, docs[start : start + PASSAGE_WRITE_BATCH])
+    if docs:
+        logger.info(f"Split {len(docs)} knowledge documents into passages")
+    return len(docs)
+
+
+async def search_passages(db, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+    """
+    Mongo text search over passages, grouped into documents in the knowledge index's result shape.
+    Only the matching passages and the documents' url/title/tags are read from the database.
+    """
+    hits = (
+        await db.bigo_knowledge_passages.find(
+            {"$text": {"$search": query}},
+            {"score": {"$meta": "textScore"}, "doc_id": 1, "position": 1, "text": 1, "_id": 0},
+        )
+        .sort([("score", {"$meta": "textScore"})])
+        .limit(limit * PASSAGES_PER_RESULT * 2)
+        .to_list(None)
+    )
+    grouped: Dict[str, List[Dict[str, Any]]] = {}
+    for hit in hits:
+        passages = grouped.setdefault(hit["doc_id"], [])
+        if len(passages) < PASSAGES_PER_RESULT:
+            passages.append(hit)
+    doc_ids = list(grouped)[:limit]
+    docs = await db.bigo_knowledge.find(
+        {"id": {"$in": doc_ids}}, {"_id": 0, "id": 1, "url": 1, "title": 1, "tags": 1}
+    ).to_list(None)
+    by_id = {doc["id"]: doc for doc in docs}
+
+    results = []
+    for doc_id in doc_ids:
+        if doc_id not in by_id:
+            continue
+        passages = grouped[doc_id]
+        chosen = sorted(passages, key=lambda p: p["position"])
+        results.append(
+            {
+                **by_id[doc_id],
+                "content": "\n\n".join(p["text"] for p in chosen),
+                "passages": [{"position": p["position"], "text": p["text"]} for p in chosen],
+                "snippet": snippet(passages[0]["text"], query),
+                "score": passages[0]["score"],
+            }
+        )
+    return results
@@ -0,0 +1,155 @@
+"""
+Model Router
+Maps chat completion call sites to latency tiers, falls back to another tier on timeout
+and keeps per-route latency and token usage
+"""
+
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+FAST = "fast"
+STANDARD = "standard"
+
+DEFAULT_TIERS = {
+    FAST: os.environ.get("AI_MODEL_FAST", "llama-3.1-8b-instant"),
+    STANDARD: os.environ.get("AI_MODEL_STANDARD", "llama-3.3-70b-versatile"),
+}
+
+# Error string AIService returns when the upstream request times out
+TIMEOUT_ERROR = "Request timeout"
+
+DEFAULT_TIMEOUT = 60
+
+
+@dataclass(frozen=True)
+class ModelRoute:
+    tier: str
+    timeout: int = DEFAULT_TIMEOUT
+    fallback_tier: Optional[str] = None
+
+
+# Short classification and summarization jobs do not need the 70B model
+DEFAULT_ROUTES: Dict[str, ModelRoute] = {
+    "conversation_summary": ModelRoute(FAST, timeout=15, fallback_tier=STANDARD),
+    "beangenie_categorize": ModelRoute(FAST, timeout=20, fallback_tier=STANDARD),
+    "ai_assist": ModelRoute(FAST, timeout=20, fallback_tier=STANDARD),
+    "academy_research": ModelRoute(FAST, timeout=30, fallback_tier=STANDARD),
+}
+
+
+class ModelRouter:
+    def __init__(self, tiers: Optional[Dict[str, str]] = None, routes: Optional[Dict[str, ModelRoute]] = None):
+        self.tiers = dict(DEFAULT_TIERS if tiers is None else tiers)
+        self.routes = dict(DEFAULT_ROUTES if routes is None else routes)
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def set_route(self, call_site: str, route: Optional[ModelRoute]):
+        """Register, replace or (with None) remove the route for a call site"""
+        if route is None:
+            self.routes.pop(call_site, None)
+        else:
+            self.routes[call_site] = route
+
+    def route_for(self, call_site: Optional[str]) -> Optional[ModelRoute]:
+        return self.routes.get(call_site) if call_site else None
+
+    def model_for(self, route: Optional[ModelRoute], default_model: str) -> str:
+        if route is None:
+            return default_model
+        return self.tiers.get(route.tier, default_model)
+
+    def timeout_for(self, route: Optional[ModelRoute], timeout: Optional[int]) -> int:
+        if timeout is not None:
+            return timeout
+        return route.timeout if route else DEFAULT_TIMEOUT
+
+    async def run(
+        self,
+        call_site: Optional[str],
+        route: Optional[ModelRoute],
+        model: str,
+        timeout: int,
+        request_fn: Callable[[str, int], Awaitable[Dict[str, Any]]],
+    ) -> Dict[str, Any]:
+        """
+        Call request_fn(model, timeout), retrying once on the route's fallback tier
+        if the first attempt timed out. Every attempt is recorded under the call site.
+        """
+        result = await self._timed(call_site, model, timeout, request_fn)
+        if route is None or not route.fallback_tier or result.get("error") != TIMEOUT_ERROR:
+            return result
+
+        fallback_model = self.tiers.get(route.fallback_tier)
+        if not fallback_model or fallback_model == model:
+            return result
+        logger.warning(f"{call_site} timed out on {model} after {timeout}s; falling back to {fallback_model}")
+        self._route_stats(call_site)["fallbacks"] += 1
+        return await self._timed(call_site, fallback_model, DEFAULT_TIMEOUT, request_fn)
+
+    async def _timed(
+        self,
+        call_site: Optional[str],
+        model: str,
+        timeout: int,
+        request_fn: Callable[[str, int], Awaitable[Dict[str, Any]]],
+    ) -> Dict[str, Any]:
+        started = time.monotonic()
+        result = await request_fn(model, timeout)
+        self._record(call_site, model, time.monotonic() - started, result)
+        return result
+
+    def _route_stats(self, call_site: Optional[str]) -> Dict[str, Any]:
+        return self._stats.setdefault(call_site or "default", {"fallbacks": 0, "models": {}})
+
+    def _record(self, call_site: Optional[str], model: str, latency: float, result: Dict[str, Any]):
+        stats = self._route_stats(call_site)["models"].setdefault(
+            model,
+            {
+                "calls": 0,
+                "errors": 0,
+                "timeouts": 0,
+                "latency_total": 0.0,
+                "latency_max": 0.0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+            },
+        )
+        stats["calls"] += 1
+        stats["latency_total"] += latency
+        stats["latency_max"] = max(stats["latency_max"], latency)
+        if not result.get("success"):
+            stats["errors"] += 1
+            if result.get("error") == TIMEOUT_ERROR:
+                stats["timeouts"] += 1
+        usage = result.get("usage") or {}
+        stats["prompt_tokens"] += usage.get("prompt_tokens", 0) or 0
+        stats["completion_tokens"] += usage.get("completion_tokens", 0) or 0
+
+    def stats(self) -> Dict[str, Any]:
+        routes = {}
+        for call_site, route_stats in self._stats.items():
+            route = self.routes.get(call_site)
+            models = {}
+            for model, s in route_stats["models"].items():
+                calls = s["calls"]
+                models[model] = {
+                    "calls": calls,
+                    "errors": s["errors"],
+                    "timeouts": s["timeouts"],
+                    "avg_latency_ms": round(s["latency_total"] / calls * 1000, 2) if calls else 0.0,
+                    "max_latency_ms": round(s["latency_max"] * 1000, 2),
+                    "prompt_tokens": s["prompt_tokens"],
+                    "completion_tokens": s["completion_tokens"],
+                    "avg_completion_tokens": round(s["completion_tokens"] / calls, 1) if calls else 0.0,
+                }
+            routes[call_site] = {
+                "tier": route.tier if route else None,
+                "fallbacks": route_stats["fallbacks"],
+                "models": models,
+            }
+        return {"tiers": dict(self.tiers), "routes": routes}
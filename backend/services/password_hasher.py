@@ -0,0 +1,83 @@
+"""
+Password Hasher
+bcrypt hashing and verification on a bounded thread pool so logins never block the event loop.
+bcrypt releases the GIL while it works, so worker threads hash in parallel with request handling.
+Hashes made with fewer rounds than PASSWORD_BCRYPT_ROUNDS are upgraded on the next successful login
+"""
+
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from passlib.context import CryptContext
+
+logger = logging.getLogger(__name__)
+
+# passlib's default bcrypt work factor
+DEFAULT_ROUNDS = 12
+
+
+class PasswordHasher:
+    def __init__(self, rounds: Optional[int] = None, workers: Optional[int] = None):
+        self.rounds = rounds or int(os.environ.get("PASSWORD_BCRYPT_ROUNDS", str(DEFAULT_ROUNDS)))
+        self.workers = workers or int(os.environ.get("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+        # min_rounds makes verify_and_update flag hashes weaker than the configured work factor
+        self.context = CryptContext(
+            schemes=["bcrypt"], deprecated="auto", bcrypt__default_rounds=self.rounds, bcrypt__min_rounds=self.rounds
+        )
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.in_flight = 0
+        self._stats = {"hashes": 0, "verifications": 0, "failed_verifications": 0, "rehashes": 0, "total_ms": 0.0}
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    async def _run(self, fn, *args):
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self.in_flight -= 1
+            # Includes time queued for a worker, which is what a login waits for
+            self._stats["total_ms"] += (time.perf_counter() - started) * 1000
+
+    async def hash(self, password: str) -> str:
+        self._stats["hashes"] += 1
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """(valid, replacement hash or None); a replacement means the stored hash should be upgraded"""
+        self._stats["verifications"] += 1
+        valid, new_hash = await self._run(self.context.verify_and_update, password, hashed)
+        if not valid:
+            self._stats["failed_verifications"] += 1
+        elif new_hash:
+            self._stats["rehashes"] += 1
+        return valid, new_hash
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        calls = self._stats["hashes"] + self._stats["verifications"]
+        return {
+            **self._stats,
+            "total_ms": round(self._stats["total_ms"], 1),
+            "avg_ms": round(self._stats["total_ms"] / calls, 1) if calls else 0.0,
+            "rounds": self.rounds,
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+        }
+
+
+# Singleton instance
+password_hasher = PasswordHasher()
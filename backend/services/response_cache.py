@@ -0,0 +1,171 @@
+"""
+Response Cache for AI chat completions
+Content-addressed two-tier cache: in-process LRU front with a MongoDB TTL backing store
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """Caching rules for a single call site"""
+
+    ttl_seconds: int = 3600
+    use_db: bool = True  # also persist to the Mongo second level
+
+
+# Call sites opt in by name; anything not listed here is never cached
+DEFAULT_CACHE_POLICIES: Dict[str, CachePolicy] = {
+    "recruiter_chat": CachePolicy(ttl_seconds=6 * 3600),
+    "public_onboarding_chat": CachePolicy(ttl_seconds=6 * 3600),
+    "bigo_strategy": CachePolicy(ttl_seconds=3600),
+}
+
+
+def _normalize_text(text: Any) -> str:
+    """Collapse whitespace so trivially different prompts share a key"""
+    return " ".join(str(text or "").split())
+
+
+class ResponseCache:
+    def __init__(self, max_entries: Optional[int] = None, policies: Optional[Dict[str, CachePolicy]] = None):
+        self.enabled = os.environ.get("AI_CACHE_ENABLED", "true").lower() != "false"
+        self.max_entries = max_entries or int(os.environ.get("AI_CACHE_MAX_ENTRIES", "1000"))
+        self.policies: Dict[str, CachePolicy] = dict(DEFAULT_CACHE_POLICIES if policies is None else policies)
+        self.collection_name = "ai_response_cache"
+        self.db = None
+        # key -> (expires_at_epoch, response)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"l1_hits": 0, "l2_hits": 0, "misses": 0, "stores": 0})
+
+    def set_db(self, db):
+        """Set database reference for the second-level cache"""
+        self.db = db
+
+    async def ensure_indexes(self):
+        """Create the unique key index and the TTL index used for expiry"""
+        if self.db is None:
+            return
+        try:
+            collection = self.db[self.collection_name]
+            await collection.create_index([("key", 1)], unique=True)
+            await collection.create_index([("expires_at", 1)], expireAfterSeconds=0)
+        except Exception as e:
+            logger.warning(f"Could not create {self.collection_name} indexes: {e}")
+
+    def set_policy(self, call_site: str, policy: Optional[CachePolicy]):
+        """Register, replace or (with None) remove the policy for a call site"""
+        if policy is None:
+            self.policies.pop(call_site, None)
+        else:
+            self.policies[call_site] = policy
+
+    def policy_for(self, call_site: Optional[str]) -> Optional[CachePolicy]:
+        if not self.enabled or not call_site:
+            return None
+        return self.policies.get(call_site)
+
+    @staticmethod
+    def make_key(
+        model: str, messages: List[Dict[str, str]], temperature: float, max_completion_tokens: Optional[int]
+    ) -> str:
+        """Hash the normalized (model, messages, temperature, max tokens) tuple"""
+        normalized = {
+            "model": model,
+            "messages": [[m.get("role", ""), _normalize_text(m.get("content"))] for m in messages],
+            "temperature": round(float(temperature), 2),
+            "max_completion_tokens": max_completion_tokens,
+        }
+        raw = json.dumps(normalized, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str, call_site: str, policy: CachePolicy) -> Optional[Dict[str, Any]]:
+        """Look up a cached response, promoting second-level hits into the LRU"""
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry:
+            expires_at, response = entry
+            if expires_at > now:
+                self._entries.move_to_end(key)
+                self._stats[call_site]["l1_hits"] += 1
+                return dict(response)
+            del self._entries[key]
+
+        if policy.use_db and self.db is not None:
+            try:
+                doc = await self.db[self.collection_name].find_one(
+                    {"key": key}, {"_id": 0, "response": 1, "expires_at": 1}
+                )
+                if doc and doc.get("expires_at"):
+                    expires_at = doc["expires_at"]
+                    if expires_at.tzinfo is None:
+                        expires_at = expires_at.replace(tzinfo=timezone.utc)
+                    if expires_at.timestamp() > now:
+                        self._remember(key, expires_at.timestamp(), doc["response"])
+                        self._stats[call_site]["l2_hits"] += 1
+                        return dict(doc["response"])
+            except Exception as e:
+                logger.warning(f"Response cache lookup failed: {e}")
+
+        self._stats[call_site]["misses"] += 1
+        return None
+
+    async def set(self, key: str, call_site: str, policy: CachePolicy, response: Dict[str, Any]):
+        """Store a successful response in both tiers"""
+        stored = {k: response[k] for k in ("content", "model", "usage") if k in response}
+        expires_at = time.time() + policy.ttl_seconds
+        self._remember(key, expires_at, stored)
+        self._stats[call_site]["stores"] += 1
+
+        if policy.use_db and self.db is not None:
+            try:
+                now = datetime.now(timezone.utc)
+                await self.db[self.collection_name].update_one(
+                    {"key": key},
+                    {
+                        "$set": {
+                            "key": key,
+                            "call_site": call_site,
+                            "response": stored,
+                            "created_at": now,
+                            "expires_at": now + timedelta(seconds=policy.ttl_seconds),
+                        }
+                    },
+                    upsert=True,
+                )
+            except Exception as e:
+                logger.warning(f"Response cache write failed: {e}")
+
+    def _remember(self, key: str, expires_at: float, response: Dict[str, Any]):
+        self._entries[key] = (expires_at, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop the in-process tier (Mongo entries expire on their own)"""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters per call site plus current LRU size"""
+        call_sites = {}
+        for call_site, counters in self._stats.items():
+            hits = counters["l1_hits"] + counters["l2_hits"]
+            lookups = hits + counters["misses"]
+            call_sites[call_site] = {**counters, "hit_rate": round(hits / lookups, 4) if lookups else 0.0}
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "call_sites": call_sites,
+        }
@@ -0,0 +1,145 @@
+"""
+Settings Store
+In-memory snapshot of db.settings, kept current across worker processes by a
+Mongo change stream, or by a short polling loop where change streams are unavailable
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+CHANGE_STREAM = "change_stream"
+POLLING = "polling"
+
+
+class SettingsStore:
+    def __init__(self, poll_interval: Optional[float] = None):
+        self.db = None
+        self.poll_interval = poll_interval or float(os.environ.get("SETTINGS_POLL_SECONDS", "1"))
+        self.running = False
+        self.task: Optional[asyncio.Task] = None
+        self.mode: Optional[str] = None
+        self._values: Dict[str, Any] = {}
+        self._keys_by_id: Dict[Any, str] = {}
+        self._refreshed_at: Optional[float] = None
+        self._stats = {"snapshots": 0, "changes": 0, "errors": 0}
+
+    def set_db(self, db):
+        """Set database reference"""
+        self.db = db
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Current value of a setting; a plain dict lookup, safe on the request path"""
+        return self._values.get(key, default)
+
+    def apply(self, key: str, value: Any):
+        """Update the local snapshot right after this process wrote the setting"""
+        self._values[key] = value
+
+    async def load(self):
+        """Replace the snapshot with the current contents of db.settings"""
+        if self.db is None:
+            return
+        docs = await self.db.settings.find({}, {"key": 1, "value": 1}).to_list(None)
+        self._values = {doc["key"]: doc.get("value") for doc in docs if "key" in doc}
+        self._keys_by_id = {doc["_id"]: doc["key"] for doc in docs if "key" in doc}
+        self._refreshed_at = time.monotonic()
+        self._stats["snapshots"] += 1
+
+    async def start(self):
+        """Load the snapshot and start watching for changes"""
+        if self.running:
+            logger.warning("Settings store already running")
+            return
+        if self.db is None:
+            logger.warning("Settings store has no database; not starting")
+            return
+
+        try:
+            await self.load()
+        except Exception as e:
+            logger.error(f"Failed to load settings snapshot: {e}")
+        self.running = True
+        self.task = asyncio.create_task(self._watch_loop())
+        logger.info("Settings store started")
+
+    async def stop(self):
+        """Stop watching for changes"""
+        self.running = False
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        logger.info("Settings store stopped")
+
+    def _apply_change(self, change: Dict[str, Any]):
+        operation = change.get("operationType")
+        doc_id = (change.get("documentKey") or {}).get("_id")
+        if operation in ("insert", "update", "replace"):
+            doc = change.get("fullDocument")
+            if doc and "key" in doc:
+                self._values[doc["key"]] = doc.get("value")
+                self._keys_by_id[doc_id] = doc["key"]
+        elif operation == "delete":
+            key = self._keys_by_id.pop(doc_id, None)
+            if key is not None:
+                self._values.pop(key, None)
+        self._refreshed_at = time.monotonic()
+        self._stats["changes"] += 1
+
+    async def _watch_changes(self):
+        async with self.db.settings.watch(full_document="updateLookup") as stream:
+            self.mode = CHANGE_STREAM
+            # Catch anything written between the snapshot and the stream opening
+            await self.load()
+            async for change in stream:
+                if change.get("operationType") in ("drop", "rename", "invalidate"):
+                    await self.load()
+                    return
+                self._apply_change(change)
+
+    async def _watch_loop(self):
+        use_change_stream = True
+        while self.running:
+            try:
+                if use_change_stream:
+                    await self._watch_changes()
+                else:
+                    self.mode = POLLING
+                    await asyncio.sleep(self.poll_interval)
+                    await self.load()
+            except asyncio.CancelledError:
+                break
+            except OperationFailure as e:
+                # Standalone servers have no change streams; poll instead
+                if use_change_stream:
+                    logger.info(f"Settings change stream unavailable ({e}); polling every {self.poll_interval}s")
+                    use_change_stream = False
+                else:
+                    self._stats["errors"] += 1
+                    await asyncio.sleep(self.poll_interval)
+            except Exception as e:
+                self._stats["errors"] += 1
+                logger.warning(f"Settings watcher error: {e}")
+                await asyncio.sleep(self.poll_interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "mode": self.mode,
+            "keys": sorted(self._values),
+            "seconds_since_refresh": round(time.monotonic() - self._refreshed_at, 2) if self._refreshed_at else None,
+            **self._stats,
+        }
+
+
+# Global settings store instance
+settings_store = SettingsStore()
@@ -0,0 +1,93 @@
+"""
+Single-flight request coalescing
+Concurrent callers asking for the same key share one upstream call instead of each making their own
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Every SingleFlight registers itself here so metrics can be reported in one place
+_flights: List["SingleFlight"] = []
+
+
+def default_key(*args, **kwargs) -> str:
+    """Hash the call arguments; suitable for JSON-friendly arguments"""
+    raw = json.dumps([args, kwargs], sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    def __init__(self, name: str, key_fn: Optional[Callable[..., str]] = None):
+        self.name = name
+        self.key_fn = key_fn or default_key
+        self.enabled = os.environ.get("AI_COALESCE_ENABLED", "true").lower() != "false"
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.calls = 0
+        self.executions = 0
+        self.collapsed = 0
+        _flights.append(self)
+
+    def key_for(self, *args, **kwargs) -> str:
+        return self.key_fn(*args, **kwargs)
+
+    async def do(self, key: str, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        Run fn(*args, **kwargs) unless a call with the same key is already in flight,
+        in which case wait for and return that call's result. Results are shared
+        between callers, so treat them as read-only.
+        """
+        self.calls += 1
+        if not self.enabled:
+            self.executions += 1
+            return await fn(*args, **kwargs)
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.collapsed += 1
+        else:
+            self.executions += 1
+            # Run as a task so a cancelled caller (e.g. a client disconnect)
+            # does not cancel the upstream call for everyone else waiting on it
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._finish(k, t))
+        return await asyncio.shield(task)
+
+    def wrap(self, fn: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        """Decorator form: coalesce calls whose key_fn(*args, **kwargs) match"""
+
+        async def wrapper(*args, **kwargs):
+            return await self.do(self.key_for(*args, **kwargs), fn, *args, **kwargs)
+
+        wrapper.__name__ = fn.__name__
+        wrapper.__doc__ = fn.__doc__
+        wrapper.__wrapped__ = fn
+        return wrapper
+
+    def _finish(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved; callers that are still waiting re-raise it themselves
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"{self.name} flight for {key[:12]} failed: {task.exception()}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "calls": self.calls,
+            "executions": self.executions,
+            "collapsed": self.collapsed,
+            "collapse_rate": round(self.collapsed / self.calls, 4) if self.calls else 0.0,
+            "in_flight": len(self._inflight),
+        }
+
+
+def singleflight_stats() -> Dict[str, Dict[str, Any]]:
+    """Metrics for every coalescing layer in the process"""
+    return {flight.name: flight.stats() for flight in _flights}
@@ -0,0 +1,138 @@
+"""
+Local Text Classifier
+Hashed word and character n-gram features with a NumPy nearest-centroid model, trained
+offline and loaded once so confident routing decisions need no LLM round trip
+"""
+
+import logging
+import os
+import re
+import zlib
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Hashed feature space size; collisions are rare for short chat messages
+DEFAULT_DIM = 2**16
+
+# Softmax sharpness over cosine similarities, so confidence reads like a probability
+DEFAULT_SCALE = 20.0
+
+DEFAULT_THRESHOLD = float(os.environ.get("CLASSIFIER_MIN_CONFIDENCE", "0.75"))
+
+MODEL_DIR = Path(os.environ.get("CLASSIFIER_MODEL_DIR", Path(__file__).parent.parent / "models"))
+
+# Models trained by scripts/train_text_classifiers.py
+BEANGENIE_INTENT = "beangenie_intent"
+BOCADEMA = "bocadema"
+ADMIN_ACTION = "admin_action"
+
+# Label the admin action model uses for messages that ask for no action
+NO_ACTION = "none"
+
+_WORD = re.compile(r"\w+")
+
+
+def _hash(feature: str, dim: int) -> int:
+    # crc32 rather than hash(): str hashes are salted per process
+    return zlib.crc32(feature.encode("utf-8")) % dim
+
+
+def featurize(text: str, dim: int = DEFAULT_DIM) -> Tuple[np.ndarray, np.ndarray]:
+    """Sparse L2-normalised feature vector as (indices, values)"""
+    words = _WORD.findall(text.lower())
+    counts: Dict[int, float] = defaultdict(float)
+    for i, word in enumerate(words):
+        counts[_hash("w:" + word, dim)] += 1.0
+        if i:
+            counts[_hash(f"b:{words[i - 1]} {word}", dim)] += 1.0
+        # Character trigrams make misspellings ("beens", "streemer") land near the right word
+        padded = f"<{word}>"
+        for j in range(len(padded) - 2):
+            counts[_hash("c:" + padded[j : j + 3], dim)] += 0.5
+    if not counts:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+    values = np.sqrt(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+    return indices, values / np.linalg.norm(values)
+
+
+class TextClassifier:
+    """Nearest-centroid classifier over hashed n-gram features"""
+
+    def __init__(self, labels: List[str], centroids: np.ndarray, scale: float = DEFAULT_SCALE):
+        self.labels = list(labels)
+        self.centroids = centroids.astype(np.float32)
+        self.dim = centroids.shape[1]
+        self.scale = scale
+
+    @classmethod
+    def train(cls, examples: Iterable[Tuple[str, str]], dim: int = DEFAULT_DIM, scale: float = DEFAULT_SCALE):
+        """Fit one centroid per label from (text, label) pairs"""
+        sums: Dict[str, np.ndarray] = {}
+        for text, label in examples:
+            indices, values = featurize(text, dim)
+            if not len(indices):
+                continue
+            if label not in sums:
+                sums[label] = np.zeros(dim, dtype=np.float32)
+            np.add.at(sums[label], indices, values)
+        if len(sums) < 2:
+            raise ValueError("Need examples for at least two labels")
+        labels = sorted(sums)
+        centroids = np.stack([sums[label] for label in labels])
+        centroids /= np.linalg.norm(centroids, axis=1, keepdims=True)
+        return cls(labels, centroids, scale)
+
+    def predict(self, text: str) -> Tuple[Optional[str], float]:
+        """Most likely label and its confidence (0-1); (None, 0.0) for text with no features"""
+        indices, values = featurize(text, self.dim)
+        if not len(indices):
+            return None, 0.0
+        scores = self.centroids[:, indices] @ values
+        exp = np.exp((scores - scores.max()) * self.scale)
+        probabilities = exp / exp.sum()
+        best = int(probabilities.argmax())
+        return self.labels[best], float(probabilities[best])
+
+    def classify(self, text: str, threshold: float = DEFAULT_THRESHOLD) -> Optional[str]:
+        """Label if the prediction is at least `threshold` confident, else None"""
+        label, confidence = self.predict(text)
+        return label if confidence >= threshold else None
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(path, labels=np.array(self.labels), centroids=self.centroids, scale=self.scale)
+
+    @classmethod
+    def load(cls, path) -> "TextClassifier":
+        with np.load(path) as data:
+            return cls([str(label) for label in data["labels"]], data["centroids"], float(data["scale"]))
+
+
+_classifiers: Dict[str, Optional[TextClassifier]] = {}
+
+
+def get_classifier(name: str) -> Optional[TextClassifier]:
+    """Trained model `name` from MODEL_DIR, loaded once; None until one has been trained"""
+    if name not in _classifiers:
+        path = MODEL_DIR / f"{name}.npz"
+        classifier = None
+        if path.exists():
+            try:
+                classifier = TextClassifier.load(path)
+                logger.info(f"Loaded text classifier {name} ({len(classifier.labels)} labels)")
+            except Exception as e:
+                logger.error(f"Failed to load text classifier {path}: {e}")
+        _classifiers[name] = classifier
+    return _classifiers[name]
+
+
+def reload_classifiers():
+    """Forget loaded models so the next lookup reads freshly trained files"""
+    _classifiers.clear()
@@ -0,0 +1,402 @@
+"""
+Academy Tutorial Library
+Generates BIGO Academy tutorials with a research -> synthesis pipeline (research split into
+concurrent calls, synthesis streamable), persists them keyed by normalized (topic, category)
+and pre-generates the curated topic list in the background
+"""
+
+import asyncio
+import logging
+import os
+import re
+from datetime import datetime, timezone, timedelta
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+from .ai_scheduler import BACKGROUND, INTERACTIVE
+from .singleflight import SingleFlight
+from .usage_meter import set_usage_endpoint
+
+logger = logging.getLogger(__name__)
+
+# Quick topics shown per category on the Academy page; pre-generated so clicks are served from the library
+CURATED_TOPICS: Dict[str, List[str]] = {
+    "basics": ["Getting started on BIGO Live", "Creating an attractive profile", "Understanding BIGO interface"],
+    "streaming": ["Best camera angles", "Lighting setup guide", "Audio quality tips"],
+    "monetization": ["Understanding gifts and beans", "Building paid subscriptions", "Maximizing earnings"],
+    "engagement": ["Interacting with viewers", "Building loyal fanbase", "Handling trolls professionally"],
+    "technical": ["OBS setup for BIGO", "Internet speed requirements", "Troubleshooting common issues"],
+    "growth": ["Growing followers fast", "Cross-platform promotion", "Collaboration strategies"],
+}
+
+# The research stage runs as independent calls in parallel; each covers part of the outline
+RESEARCH_ASPECTS = {
+    "strategy": "1. Key facts and strategies\n2. Step-by-step guidance\n3. Best practices from successful streamers",
+    "pitfalls": "1. Common mistakes to avoid\n2. Pro tips and advanced techniques",
+}
+RESEARCH_MAX_TOKENS = 450
+SYNTHESIS_MAX_TOKENS = 1000
+
+SYNTHESIS_TEMPLATE = """You are a professional tutorial writer. Create a well-structured, engaging tutorial from this research:
+
+{research}
+
+Format as:
+📚 **{topic}**
+
+**Overview:**
+[Brief introduction]
+
+**Step-by-Step Guide:**
+1. [First step with details]
+2. [Second step with details]
+3. [Continue...]
+
+**Pro Tips:**
+💡 [Tip 1]
+💡 [Tip 2]
+
+**Common Mistakes:**
+❌ [Mistake 1]
+✅ [Correct approach]
+
+**Key Takeaways:**
+• [Point 1]
+• [Point 2]
+
+Make it actionable, engaging, and easy to follow!"""
+
+_NON_WORD = re.compile(r"[^\w\s]")
+
+
+def normalize_topic(topic: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace so rephrasings share an entry"""
+    return " ".join(_NON_WORD.sub(" ", topic.lower()).split())
+
+
+def tutorial_key(topic: str, category: str) -> str:
+    return f"{normalize_topic(category or 'basics')}:{normalize_topic(topic)}"
+
+
+def difficulty_for(topic: str) -> str:
+    lowered = topic.lower()
+    if "beginner" in lowered or "start" in lowered:
+        return "Beginner"
+    if "advanced" in lowered or "pro" in lowered:
+        return "Advanced"
+    return "Intermediate"
+
+
+def research_prompt(topic: str, category: str, aspect: str) -> str:
+    return f"""You are a BIGO Live expert researcher. Research the following topic and provide comprehensive information:
+
+Topic: {topic}
+Category: {category}
+
+Provide:
+{RESEARCH_ASPECTS[aspect]}
+
+Be detailed and practical. Include real examples."""
+
+
+class TutorialLibrary:
+    def __init__(self):
+        self.ai_service = None
+        self.db = None
+        self.collection_name = "academy_tutorials"
+        self.max_age = timedelta(days=float(os.environ.get("ACADEMY_TUTORIAL_MAX_AGE_DAYS", "30")))
+        self.pregenerate_enabled = os.environ.get("ACADEMY_PREGENERATE", "true").lower() != "false"
+        self.pregenerate_concurrency = int(os.environ.get("ACADEMY_PREGENERATE_CONCURRENCY", "2"))
+        self.pregenerate_interval = float(os.environ.get("ACADEMY_PREGENERATE_INTERVAL_HOURS", "24")) * 3600
+        self.lease_seconds = 300
+        # Concurrent requests for the same tutorial share one pipeline run
+        self.flight = SingleFlight("academy_tutorial")
+        self.task: Optional[asyncio.Task] = None
+        self._stats = {"library_hits": 0, "generated": 0, "pregenerated": 0, "failed": 0, "degraded": 0}
+
+    def set_dependencies(self, db, ai_service):
+        """Set database and AI service dependencies"""
+        self.db = db
+        self.ai_service = ai_service
+
+    @property
+    def collection(self):
+        return self.db[self.collection_name]
+
+    async def ensure_indexes(self):
+        if self.db is None:
+            return
+        try:
+            await self.collection.create_index([("key", 1)], unique=True)
+            await self.collection.create_index([("category", 1), ("hits", -1)])
+        except Exception as e:
+            logger.warning(f"Could not create {self.collection_name} indexes: {e}")
+
+    async def start(self):
+        """Pre-generate curated topics now and then every pregenerate_interval"""
+        if not self.pregenerate_enabled or self.db is None or self.task is not None:
+            return
+        self.task = asyncio.create_task(self._pregenerate_loop())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def lookup(self, topic: str, category: str) -> Optional[Dict[str, Any]]:
+        """Fresh library entry for (topic, category), counting the hit"""
+        if self.db is None:
+            return None
+        try:
+            doc = await self.collection.find_one_and_update(
+                {"key": tutorial_key(topic, category), "tutorial": {"$exists": True}},
+                {"$inc": {"hits": 1}},
+                projection={"_id": 0, "tutorial": 1, "metadata": 1, "updated_at": 1},
+            )
+        except Exception as e:
+            logger.warning(f"Tutorial library lookup failed: {e}")
+            return None
+        if not doc or self._is_stale(doc):
+            return None
+        self._stats["library_hits"] += 1
+        return {"tutorial": doc["tutorial"], "metadata": doc["metadata"], "cached": True}
+
+    def _is_stale(self, doc: Dict[str, Any]) -> bool:
+        updated_at = doc.get("updated_at")
+        if not updated_at:
+            return True
+        if updated_at.tzinfo is None:
+            updated_at = updated_at.replace(tzinfo=timezone.utc)
+        return datetime.now(timezone.utc) - updated_at > self.max_age
+
+    async def get_or_generate(self, topic: str, category: str, refresh: bool = False) -> Dict[str, Any]:
+        """
+        Serve (topic, category) from the library, generating and storing it on a miss.
+        Returns {"success": True, "tutorial", "metadata", "cached"} or {"success": False, "error"}
+        """
+        if not refresh:
+            found = await self.lookup(topic, category)
+            if found:
+                return {"success": True, **found}
+        key = tutorial_key(topic, category)
+        return await self.flight.do(key, self._generate, topic, category, INTERACTIVE)
+
+    async def _research(self, topic: str, category: str, lane: str) -> Tuple[Optional[str], Optional[str]]:
+        """Run the research aspects concurrently; returns (combined notes, error)"""
+        results = await asyncio.gather(
+            *(
+                self.ai_service.chat_completion(
+                    messages=[{"role": "user", "content": research_prompt(topic, category, aspect)}],
+                    temperature=0.7,
+                    max_completion_tokens=RESEARCH_MAX_TOKENS,
+                    call_site="academy_research",
+                    lane=lane,
+                )
+                for aspect in RESEARCH_ASPECTS
+            )
+        )
+        notes = [r.get("content", "") for r in results if r.get("success") and r.get("content")]
+        if not notes:
+            return None, results[0].get("error") or "Research phase failed"
+        return "\n\n".join(notes), None
+
+    def _synthesis_messages(self, topic: str, research: str) -> List[Dict[str, str]]:
+        return [{"role": "user", "content": SYNTHESIS_TEMPLATE.format(research=research, topic=topic)}]
+
+    async def _generate(self, topic: str, category: str, lane: str) -> Dict[str, Any]:
+        research, error = await self._research(topic, category, lane)
+        if research is None:
+            self._stats["failed"] += 1
+            return {"success": False, "error": error}
+
+        synthesis = await self.ai_service.chat_completion(
+            messages=self._synthesis_messages(topic, research),
+            temperature=0.6,
+            max_completion_tokens=SYNTHESIS_MAX_TOKENS,
+            call_site="academy_synthesis",
+            lane=lane,
+        )
+        tutorial = synthesis.get("content") if synthesis.get("success") else None
+        if not tutorial:
+            logger.warning(f"Academy synthesis failed, serving research notes: {synthesis.get('error')}")
+            return self._degraded(topic, category, research)
+        return await self._store(topic, category, tutorial)
+
+    async def generate_stream(
+        self, topic: str, category: str, refresh: bool = False
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Streaming variant: a library hit is a single "done" event; otherwise a "stage" event while
+        research runs, synthesis token deltas, then {"type": "done", "tutorial", "metadata", "cached"}.
+        If synthesis fails part way, a {"type": "reset"} event tells the client to discard the deltas
+        it has shown, and "done" carries the research notes (not stored, metadata "degraded": True)
+        """
+        if not refresh:
+            found = await self.lookup(topic, category)
+            if found:
+                yield {"type": "done", **found}
+                return
+
+        yield {"type": "stage", "stage": "research"}
+        research, error = await self._research(topic, category, INTERACTIVE)
+        if research is None:
+            self._stats["failed"] += 1
+            yield {"type": "error", "error": error}
+            return
+
+        yield {"type": "stage", "stage": "synthesis"}
+        tutorial = None
+        error = None
+        async for event in self.ai_service.chat_completion_stream(
+            self._synthesis_messages(topic, research),
+            temperature=0.6,
+            max_completion_tokens=SYNTHESIS_MAX_TOKENS,
+            call_site="academy_synthesis",
+        ):
+            if event["type"] == "delta":
+                yield event
+            elif event["type"] == "done":
+                tutorial = event["content"]
+            else:
+                error = event.get("error")
+        if tutorial:
+            result = await self._store(topic, category, tutorial)
+        else:
+            logger.warning(f"Academy synthesis stream failed, serving research notes: {error}")
+            yield {"type": "reset", "error": error or "Synthesis failed"}
+            result = self._degraded(topic, category, research)
+        yield {"type": "done", **{k: v for k, v in result.items() if k != "success"}}
+
+    def _degraded(self, topic: str, category: str, research: str) -> Dict[str, Any]:
+        """
+        Research notes served when synthesis fails. They are not stored: a transient LLM error must not
+        be cached for max_age, and the next request retries the pipeline
+        """
+        self._stats["degraded"] += 1
+        metadata = {**self._metadata(topic, category, datetime.now(timezone.utc)), "degraded": True}
+        return {"success": True, "tutorial": research, "metadata": metadata, "cached": False}
+
+    def _metadata(self, topic: str, category: str, now: datetime) -> Dict[str, Any]:
+        return {
+            "title": topic,
+            "category": category,
+            "difficulty": difficulty_for(topic),
+            "sources": "Compound AI Research",
+            "generated_at": now.isoformat(),
+        }
+
+    async def _store(self, topic: str, category: str, tutorial: str) -> Dict[str, Any]:
+        now = datetime.now(timezone.utc)
+        metadata = self._metadata(topic, category, now)
+        self._stats["generated"] += 1
+        if self.db is not None:
+            try:
+                await self.collection.update_one(
+                    {"key": tutorial_key(topic, category)},
+                    {
+                        "$set": {
+                            "topic": topic,
+                            "category": category,
+                            "tutorial": tutorial,
+                            "metadata": metadata,
+                            "updated_at": now,
+                        },
+                        "$unset": {"lease_until": ""},
+                        "$setOnInsert": {"hits": 0, "created_at": now},
+                    },
+                    upsert=True,
+                )
+            except Exception as e:
+                logger.warning(f"Could not store academy tutorial '{topic}': {e}")
+        return {"success": True, "tutorial": tutorial, "metadata": metadata, "cached": False}
+
+    async def list_tutorials(self, category: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Library entries, most requested first"""
+        if self.db is None:
+            return []
+        query: Dict[str, Any] = {"tutorial": {"$exists": True}}
+        if category:
+            query["category"] = category
+        cursor = (
+            self.collection.find(query, {"_id": 0, "key": 1, "topic": 1, "category": 1, "metadata": 1, "hits": 1})
+            .sort("hits", -1)
+            .limit(limit)
+        )
+        return await cursor.to_list(limit)
+
+    async def _claim(self, topic: str, category: str) -> bool:
+        """Lease a missing or stale entry for pre-generation so only one worker process builds it"""
+        now = datetime.now(timezone.utc)
+        try:
+            await self.collection.update_one(
+                {
+                    "key": tutorial_key(topic, category),
+                    "$and": [
+                        {"$or": [{"tutorial": {"$exists": False}}, {"updated_at": {"$lt": now - self.max_age}}]},
+                        {"$or": [{"lease_until": {"$exists": False}}, {"lease_until": {"$lt": now}}]},
+                    ],
+                },
+                {
+                    "$set": {
+                        "topic": topic,
+                        "category": category,
+                        "lease_until": now + timedelta(seconds=self.lease_seconds),
+                    },
+                    "$setOnInsert": {"hits": 0, "created_at": now},
+                },
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # The entry exists and is either fresh or leased by another worker
+            return False
+        return True
+
+    async def pregenerate(self, topics: Optional[Dict[str, List[str]]] = None) -> Dict[str, int]:
+        """Generate every missing or stale (topic, category) on the background lane, a few at a time"""
+        if self.db is None:
+            return {"generated": 0, "skipped": 0, "failed": 0}
+        topics = topics or CURATED_TOPICS
+        semaphore = asyncio.Semaphore(max(1, self.pregenerate_concurrency))
+        counts = {"generated": 0, "skipped": 0, "failed": 0}
+
+        async def build(topic: str, category: str):
+            async with semaphore:
+                if not await self._claim(topic, category):
+                    counts["skipped"] += 1
+                    return
+                key = tutorial_key(topic, category)
+                result = await self.flight.do(key, self._generate, topic, category, BACKGROUND)
+                if result.get("success") and not result["metadata"].get("degraded"):
+                    counts["generated"] += 1
+                    self._stats["pregenerated"] += 1
+                else:
+                    counts["failed"] += 1
+
+        await asyncio.gather(
+            *(build(topic, category) for category, names in topics.items() for topic in names)
+        )
+        logger.info(f"Academy pre-generation: {counts}")
+        return counts
+
+    async def _pregenerate_loop(self):
+        set_usage_endpoint("academy_pregenerate")
+        while True:
+            try:
+                await self.pregenerate()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Academy pre-generation failed: {e}")
+            await asyncio.sleep(self.pregenerate_interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "pregenerate_enabled": self.pregenerate_enabled}
+
+
+# Singleton instance
+tutorial_library = TutorialLibrary()
@@ -0,0 +1,349 @@
+"""
+LLM Usage Meter
+Buffers per-call token, latency and model records, flushes them in batches into daily
+Mongo rollups keyed by endpoint, call site, user and model, and enforces daily token budgets
+"""
+
+import asyncio
+import json
+import logging
+import os
+from collections import defaultdict
+from contextvars import ContextVar
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+UNATTRIBUTED = "unattributed"
+
+# Request-scoped attribution: the endpoint is set by middleware, the user by authentication
+_endpoint: ContextVar[Optional[str]] = ContextVar("usage_endpoint", default=None)
+_user_id: ContextVar[Optional[str]] = ContextVar("usage_user_id", default=None)
+# ASGI scope of the request being served; the router adds the matched route to it
+_scope: ContextVar[Optional[Dict[str, Any]]] = ContextVar("usage_scope", default=None)
+
+# Fields a rollup can be grouped by in the admin query
+ROLLUP_DIMENSIONS = ("endpoint", "call_site", "user_id", "model", "day")
+
+
+def set_usage_endpoint(endpoint: Optional[str]):
+    """Attribute LLM calls made from here on (in this task and its children) to an endpoint"""
+    _endpoint.set(endpoint)
+
+
+def set_usage_user(user_id: Optional[str]):
+    """Attribute LLM calls made from here on (in this task and its children) to a user"""
+    _user_id.set(user_id)
+
+
+def _route_template(scope: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Path template of the route that matched the request (e.g. /api/conversations/{conversation_id})"""
+    route = scope.get("route") if scope else None
+    return getattr(route, "path", None)
+
+
+def current_attribution() -> Tuple[str, Optional[str]]:
+    return _endpoint.get() or _route_template(_scope.get()) or UNATTRIBUTED, _user_id.get()
+
+
+class UsageAttributionMiddleware:
+    """
+    ASGI middleware that attributes LLM calls made while serving a request to its route template.
+    Routing happens after the middleware runs, so the scope is kept and the template is read from it
+    when a call is recorded; raw paths would give every conversation or item id its own rollup row
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket"):
+            _scope.set(scope)
+            set_usage_endpoint(None)
+            set_usage_user(None)
+        await self.app(scope, receive, send)
+
+
+def _today() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+def _endpoint_budgets() -> Dict[str, int]:
+    raw = os.environ.get("AI_ENDPOINT_DAILY_TOKENS", "")
+    if not raw:
+        return {}
+    try:
+        return {endpoint: int(tokens) for endpoint, tokens in json.loads(raw).items()}
+    except Exception as e:
+        logger.error(f"Invalid AI_ENDPOINT_DAILY_TOKENS: {e}")
+        return {}
+
+
+class UsageMeter:
+    def __init__(
+        self,
+        user_daily_tokens: Optional[int] = None,
+        endpoint_daily_tokens: Optional[Dict[str, int]] = None,
+        flush_interval: Optional[float] = None,
+        batch_size: int = 500,
+    ):
+        self.db = None
+        self.collection_name = "llm_usage_daily"
+        # 0 disables the per-user budget
+        self.user_daily_tokens = (
+            user_daily_tokens
+            if user_daily_tokens is not None
+            else int(os.environ.get("AI_USER_DAILY_TOKENS", "0"))
+        )
+        self.endpoint_daily_tokens = dict(
+            _endpoint_budgets() if endpoint_daily_tokens is None else endpoint_daily_tokens
+        )
+        self.flush_interval = flush_interval or float(os.environ.get("AI_USAGE_FLUSH_SECONDS", "10"))
+        self.batch_size = batch_size
+        self.running = False
+        self.task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        # (day, endpoint, call_site, user_id, model) -> counters awaiting flush
+        self._buffer: Dict[Tuple[str, str, str, str, str], Dict[str, float]] = {}
+        # Today's token totals for budget checks: flushed totals from Mongo plus local records since
+        self._day = _today()
+        self._user_tokens: Dict[str, int] = defaultdict(int)
+        self._endpoint_tokens: Dict[str, int] = defaultdict(int)
+        self._stats = {"records": 0, "flushes": 0, "flushed_rows": 0, "flush_errors": 0, "degraded": 0}
+
+    def set_db(self, db):
+        """Set database reference for the rollup collection"""
+        self.db = db
+
+    @property
+    def collection(self):
+        return self.db[self.collection_name]
+
+    async def ensure_indexes(self):
+        if self.db is None:
+            return
+        try:
+            await self.collection.create_index(
+                [("day", 1), ("endpoint", 1), ("call_site", 1), ("user_id", 1), ("model", 1)], unique=True
+            )
+            await self.collection.create_index([("day", 1), ("user_id", 1)])
+        except Exception as e:
+            logger.warning(f"Could not create {self.collection_name} indexes: {e}")
+
+    async def start(self):
+        """Load today's totals and start the periodic flusher"""
+        if self.running:
+            return
+        if self.db is None:
+            logger.warning("Usage meter has no database; records stay in memory")
+            return
+        await self.ensure_indexes()
+        await self._refresh_totals()
+        self.running = True
+        self.task = asyncio.create_task(self._flush_loop())
+        logger.info(f"Usage meter started (flush every {self.flush_interval:.0f}s)")
+
+    async def stop(self):
+        """Stop the flusher and write out whatever is buffered"""
+        self.running = False
+        self._wakeup.set()
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        await self.flush()
+
+    def record(
+        self,
+        call_site: Optional[str],
+        model: Optional[str],
+        usage: Optional[Dict[str, Any]],
+        latency: float,
+        success: bool,
+        cached: bool = False,
+        degraded: bool = False,
+    ):
+        """Buffer one LLM call; attribution comes from the current request context"""
+        endpoint, user_id = current_attribution()
+        self._roll_day()
+        usage = usage or {}
+        prompt_tokens = int(usage.get("prompt_tokens") or 0)
+        completion_tokens = int(usage.get("completion_tokens") or 0)
+        key = (self._day, endpoint, call_site or UNATTRIBUTED, user_id or "", model or "")
+        row = self._buffer.get(key)
+        if row is None:
+            row = self._buffer[key] = defaultdict(float)
+        row["calls"] += 1
+        row["errors"] += 0 if success else 1
+        row["cached"] += 1 if cached else 0
+        row["degraded"] += 1 if degraded else 0
+        row["prompt_tokens"] += prompt_tokens
+        row["completion_tokens"] += completion_tokens
+        row["latency_ms_total"] += latency * 1000
+        row["latency_ms_max"] = max(row["latency_ms_max"], latency * 1000)
+
+        tokens = prompt_tokens + completion_tokens
+        if user_id:
+            self._user_tokens[user_id] += tokens
+        self._endpoint_tokens[endpoint] += tokens
+        self._stats["records"] += 1
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    def over_budget(self) -> bool:
+        """Whether the current user or endpoint has used up today's token budget"""
+        endpoint, user_id = current_attribution()
+        self._roll_day()
+        if user_id and self.user_daily_tokens and self._user_tokens[user_id] >= self.user_daily_tokens:
+            return True
+        limit = self.endpoint_daily_tokens.get(endpoint)
+        return bool(limit and self._endpoint_tokens[endpoint] >= limit)
+
+    def note_degraded(self):
+        self._stats["degraded"] += 1
+
+    def _roll_day(self):
+        today = _today()
+        if today != self._day:
+            self._day = today
+            self._user_tokens.clear()
+            self._endpoint_tokens.clear()
+
+    async def _flush_loop(self):
+        while self.running:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+            await self._refresh_totals()
+
+    async def flush(self):
+        """Write buffered records as $inc upserts, one bulk write per batch"""
+        if self.db is None or not self._buffer:
+            return
+        buffer, self._buffer = self._buffer, {}
+        operations = []
+        for (day, endpoint, call_site, user_id, model), row in buffer.items():
+            inc = {field: value for field, value in row.items() if field != "latency_ms_max"}
+            operations.append(
+                UpdateOne(
+                    {"day": day, "endpoint": endpoint, "call_site": call_site, "user_id": user_id, "model": model},
+                    {
+                        "$inc": inc,
+                        "$max": {"latency_ms_max": row["latency_ms_max"]},
+                        "$set": {"updated_at": datetime.now(timezone.utc)},
+                    },
+                    upsert=True,
+                )
+            )
+        try:
+            for i in range(0, len(operations), self.batch_size):
+                await self.collection.bulk_write(operations[i : i + self.batch_size], ordered=False)
+            self._stats["flushes"] += 1
+            self._stats["flushed_rows"] += len(operations)
+        except Exception as e:
+            # Put the rows back so the next flush retries them
+            self._stats["flush_errors"] += 1
+            logger.error(f"Usage meter flush failed ({len(operations)} rows): {e}")
+            for key, row in buffer.items():
+                pending = self._buffer.setdefault(key, defaultdict(float))
+                for field, value in row.items():
+                    if field == "latency_ms_max":
+                        pending[field] = max(pending[field], value)
+                    else:
+                        pending[field] += value
+
+    async def _refresh_totals(self):
+        """Reload today's totals from Mongo so budgets count every worker's usage"""
+        if self.db is None:
+            return
+        self._roll_day()
+        try:
+            user_tokens: Dict[str, int] = defaultdict(int)
+            endpoint_tokens: Dict[str, int] = defaultdict(int)
+            for user_id, tokens in await self._token_totals("user_id", {"user_id": {"$ne": ""}}):
+                user_tokens[user_id] += tokens
+            for endpoint, tokens in await self._token_totals("endpoint"):
+                endpoint_tokens[endpoint or UNATTRIBUTED] += tokens
+            # Records still waiting in the buffer are not in Mongo yet
+            for (day, endpoint, _, user_id, _), row in self._buffer.items():
+                if day != self._day:
+                    continue
+                tokens = int(row["prompt_tokens"] + row["completion_tokens"])
+                if user_id:
+                    user_tokens[user_id] += tokens
+                endpoint_tokens[endpoint] += tokens
+            self._user_tokens, self._endpoint_tokens = user_tokens, endpoint_tokens
+        except Exception as e:
+            logger.warning(f"Could not refresh usage totals: {e}")
+
+    async def _token_totals(self, field: str, match: Optional[Dict[str, Any]] = None) -> List[Tuple[str, int]]:
+        """Today's tokens summed per value of `field`, grouped in Mongo rather than streamed row by row"""
+        pipeline = [
+            {"$match": {"day": self._day, **(match or {})}},
+            {
+                "$group": {
+                    "_id": f"${field}",
+                    "tokens": {"$sum": {"$add": ["$prompt_tokens", "$completion_tokens"]}},
+                }
+            },
+        ]
+        return [(doc["_id"], int(doc["tokens"] or 0)) async for doc in self.collection.aggregate(pipeline)]
+
+    async def rollup(
+        self, group_by: List[str], days: int = 1, filters: Optional[Dict[str, str]] = None, limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """Aggregate the last `days` daily rollups by the given dimensions, biggest token users first"""
+        if self.db is None:
+            return []
+        since = (datetime.now(timezone.utc) - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+        match: Dict[str, Any] = {"day": {"$gte": since}}
+        match.update({k: v for k, v in (filters or {}).items() if k in ROLLUP_DIMENSIONS and v})
+        pipeline = [
+            {"$match": match},
+            {
+                "$group": {
+                    "_id": {dimension: f"${dimension}" for dimension in group_by},
+                    "calls": {"$sum": "$calls"},
+                    "errors": {"$sum": "$errors"},
+                    "cached": {"$sum": "$cached"},
+                    "degraded": {"$sum": "$degraded"},
+                    "prompt_tokens": {"$sum": "$prompt_tokens"},
+                    "completion_tokens": {"$sum": "$completion_tokens"},
+                    "latency_ms_total": {"$sum": "$latency_ms_total"},
+                    "latency_ms_max": {"$max": "$latency_ms_max"},
+                }
+            },
+            {"$addFields": {"total_tokens": {"$add": ["$prompt_tokens", "$completion_tokens"]}}},
+            {"$sort": {"total_tokens": -1}},
+            {"$limit": limit},
+        ]
+        rows = []
+        async for doc in self.collection.aggregate(pipeline):
+            calls = doc["calls"] or 0
+            rows.append(
+                {
+                    **doc.pop("_id"),
+                    **{k: int(v) for k, v in doc.items() if k not in ("latency_ms_total", "latency_ms_max")},
+                    "avg_latency_ms": round(doc["latency_ms_total"] / calls, 1) if calls else 0.0,
+                    "max_latency_ms": round(doc["latency_ms_max"], 1),
+                }
+            )
+        return rows
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "buffered_rows": len(self._buffer),
+            "user_daily_tokens": self.user_daily_tokens,
+            "endpoint_daily_tokens": dict(self.endpoint_daily_tokens),
+            "today_endpoint_tokens": dict(self._endpoint_tokens),
+        }
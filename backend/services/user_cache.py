@@ -0,0 +1,154 @@
+"""
+User Principal Cache
+Per-process cache of authenticated users so repeat callers cost a JWT decode and a dict lookup instead
+of a users read and model validation. Entries expire after a short TTL and are stamped with a users
+version (a Mongo counter bumped by role, status and profile writes), so admin changes apply everywhere
+within one poll interval
+"""
+
+import asyncio
+import copy
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+# users_meta document holding the users version counter
+USERS_VERSION_ID = "users"
+
+
+async def bump_users_version(db) -> int:
+    """Record a write that changes cached users; returns the new version"""
+    doc = await db.users_meta.find_one_and_update(
+        {"_id": USERS_VERSION_ID},
+        {"$inc": {"version": 1}, "$set": {"updated_at": datetime.now(timezone.utc)}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return doc["version"]
+
+
+class UserPrincipalCache:
+    def __init__(
+        self, max_entries: Optional[int] = None, ttl: Optional[float] = None, poll_interval: Optional[float] = None
+    ):
+        self.enabled = os.environ.get("USER_CACHE_ENABLED", "true").lower() != "false"
+        self.max_entries = max_entries or int(os.environ.get("USER_CACHE_MAX_ENTRIES", "5000"))
+        self.ttl = ttl or float(os.environ.get("USER_CACHE_TTL_SECONDS", "30"))
+        self.poll_interval = poll_interval or float(os.environ.get("USER_CACHE_VERSION_POLL_SECONDS", "5"))
+        self.db = None
+        # Users version last read from Mongo or written by this process
+        self.version = 0
+        # user id -> (version, expires at, user)
+        self._entries: "OrderedDict[str, Tuple[int, float, Any]]" = OrderedDict()
+        self.task: Optional[asyncio.Task] = None
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "invalidations": 0}
+
+    def set_db(self, db):
+        """Set database reference"""
+        self.db = db
+
+    async def start(self):
+        """Read the current users version and watch it for writes made by other processes"""
+        if not self.enabled or self.db is None:
+            return
+        await self.sync_version()
+        if self.task is None:
+            self.task = asyncio.create_task(self._poll_loop())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    def get(self, user_id: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        entry = self._entries.get(user_id)
+        if entry is None:
+            self._stats["misses"] += 1
+            return None
+        version, expires_at, user = entry
+        if version != self.version or expires_at <= time.monotonic():
+            del self._entries[user_id]
+            self._stats["expired"] += 1
+            self._stats["misses"] += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self._stats["hits"] += 1
+        # Handlers get their own copy; the cached principal stays untouched
+        return copy.copy(user)
+
+    def put(self, user_id: str, user: Any, version: Optional[int] = None):
+        """Store a validated user read at `version`; dropped if the users version moved on meanwhile"""
+        if not self.enabled:
+            return
+        version = self.version if version is None else version
+        if version != self.version:
+            return
+        self._entries[user_id] = (version, time.monotonic() + self.ttl, user)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def invalidate(self, user_id: Optional[str] = None):
+        """Drop one user (e.g. after a points change) or everyone"""
+        if user_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(user_id, None)
+        self._stats["invalidations"] += 1
+
+    async def users_changed(self):
+        """Call after role, status or profile writes; every process drops its cached users"""
+        if self.db is not None:
+            # Reads that started before the write carry the old version, so put() drops them
+            self.version = max(self.version, await bump_users_version(self.db))
+        self.invalidate()
+
+    async def sync_version(self) -> bool:
+        """Compare with the version in Mongo; returns True when users changed elsewhere"""
+        doc = await self.db.users_meta.find_one({"_id": USERS_VERSION_ID}, {"version": 1})
+        version = doc["version"] if doc else 0
+        if version == self.version:
+            return False
+        self.version = version
+        self.invalidate()
+        return True
+
+    async def _poll_loop(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.sync_version()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Users version check failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            **self._stats,
+            "enabled": self.enabled,
+            "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "version": self.version,
+        }
+
+
+# Singleton instance
+user_cache = UserPrincipalCache()
@@ -0,0 +1,307 @@
+"""
+Knowledge Vector Index
+CPU-only hashed embeddings in a NumPy matrix that is persisted as a memory-mappable .npy file,
+with brute-force top-k search (IVF cluster probing once the corpus is large)
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import tempfile
+import zlib
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIM = int(os.environ.get("KNOWLEDGE_VECTOR_DIM", "1024"))
+# Bump when the embedding features change so persisted matrices are rebuilt
+EMBEDDER_VERSION = 1
+
+# Switch from brute force to IVF probing at this many documents
+IVF_MIN_DOCS = int(os.environ.get("KNOWLEDGE_VECTOR_IVF_MIN_DOCS", "20000"))
+IVF_PROBES = int(os.environ.get("KNOWLEDGE_VECTOR_IVF_PROBES", "8"))
+
+_RAW_WORD = re.compile(r"[a-z0-9]+")
+
+
+class HashingEmbedder:
+    """
+    Signed feature hashing of analyzed terms, term bigrams, synonym concepts and character
+    4-grams into a dense L2-normalized vector. Synonym concepts let paraphrases that share
+    no surface words ("get paid more" / "bean earnings") land close together.
+    """
+
+    def __init__(
+        self,
+        analyzer: Callable[[str], List[str]],
+        synonyms: Optional[Dict[str, Iterable[str]]] = None,
+        dim: int = EMBEDDING_DIM,
+    ):
+        self.analyzer = analyzer
+        self.synonyms = synonyms or {}
+        self.dim = dim
+
+    def embed(self, text: str) -> np.ndarray:
+        terms = self.analyzer(text)
+        hashes: List[int] = []
+        weights: List[float] = []
+        counts: Dict[str, int] = {}
+        for term in terms:
+            counts[term] = counts.get(term, 0) + 1
+        for term, count in counts.items():
+            # Sublinear tf so one repeated word does not dominate a long document
+            weight = 1.0 + math.log(count)
+            hashes.append(_hash("t:" + term))
+            weights.append(weight)
+            for concept in self.synonyms.get(term, ()):
+                hashes.append(_hash("t:" + concept))
+                weights.append(0.5 * weight)
+        for word in set(_RAW_WORD.findall(text.lower())):
+            grams = _char_hashes(word)
+            hashes.extend(grams)
+            weights.extend([0.25] * len(grams))
+        features = np.array(hashes, dtype=np.uint64)
+        values = np.array(weights)
+        if len(terms) > 1:
+            # Adjacent-term bigrams, hashed by mixing the two term hashes
+            sequence = np.array([_hash("t:" + term) for term in terms], dtype=np.uint64)
+            bigrams = (sequence[:-1] * np.uint64(1000003) ^ sequence[1:]) & np.uint64(0xFFFFFFFF)
+            features = np.concatenate([features, bigrams])
+            values = np.concatenate([values, np.full(len(bigrams), 0.5)])
+        if not len(features):
+            return np.zeros(self.dim, dtype=np.float32)
+        signs = np.where(features >> np.uint64(31) & np.uint64(1), 1.0, -1.0)
+        vector = np.bincount(
+            (features % np.uint64(self.dim)).astype(np.int64), weights=signs * values, minlength=self.dim
+        ).astype(np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+@lru_cache(maxsize=200000)
+def _hash(feature: str) -> int:
+    return zlib.crc32(feature.encode("utf-8"))
+
+
+@lru_cache(maxsize=100000)
+def _char_hashes(word: str) -> Tuple[int, ...]:
+    """Hashed character 4-grams of a word, so spelling variants share features"""
+    padded = f"<{word}>"
+    return tuple(_hash("c:" + padded[i : i + 4]) for i in range(len(padded) - 3))
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class VectorIndex:
+    def __init__(self, embedder: HashingEmbedder, path: Optional[Path] = None):
+        self.embedder = embedder
+        self.dim = embedder.dim
+        self.path = path
+        self.matrix = np.zeros((0, self.dim), dtype=np.float32)
+        self.count = 0  # rows in use (including freed ones)
+        self.ids: List[Optional[str]] = []
+        self.slots: Dict[str, int] = {}
+        self.hashes: Dict[str, str] = {}
+        self._free: List[int] = []
+        self._writable = True
+        # True when rows or ids changed since the last load/save, so unchanged rebuilds skip the write
+        self._dirty = False
+        # IVF state: centroids and each row's cluster (-1 for free rows)
+        self.centroids: Optional[np.ndarray] = None
+        self.assignments = np.zeros(0, dtype=np.int32)
+        self._changes_since_train = 0
+        self._stats = {"embedded": 0, "reused": 0, "searches": 0}
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def _ensure_writable(self, rows: int):
+        """Copy a memory-mapped matrix into RAM on first write and grow capacity geometrically"""
+        if not self._writable or rows > self.matrix.shape[0]:
+            capacity = max(rows, 2 * self.matrix.shape[0], 64)
+            grown = np.zeros((capacity, self.dim), dtype=np.float32)
+            grown[: self.count] = self.matrix[: self.count]
+            self.matrix = grown
+            assignments = np.full(capacity, -1, dtype=np.int32)
+            assignments[: self.count] = self.assignments[: self.count]
+            self.assignments = assignments
+            self._writable = True
+
+    def upsert(self, doc_id: str, text: str) -> bool:
+        """Embed and store text for doc_id; returns False when the stored vector is already current"""
+        digest = content_hash(text)
+        if self.hashes.get(doc_id) == digest:
+            self._stats["reused"] += 1
+            return False
+        vector = self.embedder.embed(text)
+        slot = self.slots.get(doc_id)
+        if slot is None:
+            slot = self._free.pop() if self._free else self.count
+            self._ensure_writable(max(self.count, slot + 1))
+            if slot == self.count:
+                self.count += 1
+                self.ids.append(doc_id)
+            else:
+                self.ids[slot] = doc_id
+            self.slots[doc_id] = slot
+        else:
+            self._ensure_writable(self.count)
+        self.matrix[slot] = vector
+        self.hashes[doc_id] = digest
+        self._dirty = True
+        if self.centroids is not None:
+            self.assignments[slot] = int(np.argmax(self.centroids @ vector))
+        self._changes_since_train += 1
+        self._stats["embedded"] += 1
+        return True
+
+    def remove(self, doc_id: str):
+        slot = self.slots.pop(doc_id, None)
+        if slot is None:
+            return
+        self._ensure_writable(self.count)
+        self.matrix[slot] = 0.0
+        self.assignments[slot] = -1
+        self.ids[slot] = None
+        self.hashes.pop(doc_id, None)
+        self._free.append(slot)
+        self._dirty = True
+        self._changes_since_train += 1
+
+    def retain(self, doc_ids: Iterable[str]):
+        """Drop every stored vector whose id is not in doc_ids"""
+        keep = set(doc_ids)
+        for doc_id in [d for d in self.slots if d not in keep]:
+            self.remove(doc_id)
+
+    def train_ivf(self, iterations: int = 8, seed: int = 0):
+        """k-means over the stored rows (sqrt(n) clusters) so searches probe only nearby clusters"""
+        live = np.array(sorted(self.slots.values()), dtype=np.int64)
+        if not len(live):
+            self.centroids = None
+            return
+        self._ensure_writable(self.count)
+        n_lists = max(1, int(np.sqrt(len(live))))
+        rng = np.random.default_rng(seed)
+        vectors = self.matrix[live]
+        centroids = vectors[rng.choice(len(live), n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            labels = np.argmax(vectors @ centroids.T, axis=1)
+            for k in range(n_lists):
+                members = vectors[labels == k]
+                if len(members):
+                    mean = members.mean(axis=0)
+                    norm = np.linalg.norm(mean)
+                    centroids[k] = mean / norm if norm else mean
+        self.centroids = centroids
+        self.assignments[live] = np.argmax(vectors @ centroids.T, axis=1)
+        self._changes_since_train = 0
+        logger.info(f"Knowledge vector IVF trained: {n_lists} clusters over {len(live)} documents")
+
+    def search(self, query: str, limit: int = 10, min_similarity: float = 0.0) -> List[Tuple[str, float]]:
+        """(doc id, cosine similarity) of the closest stored vectors, best first"""
+        self._stats["searches"] += 1
+        if not self.slots:
+            return []
+        vector = self.embedder.embed(query)
+        if not vector.any():
+            return []
+        if self.centroids is not None:
+            probes = np.argsort(-(self.centroids @ vector))[:IVF_PROBES]
+            candidates = np.flatnonzero(np.isin(self.assignments[: self.count], probes))
+            similarities = self.matrix[candidates] @ vector
+        else:
+            candidates = np.arange(self.count)
+            similarities = self.matrix[: self.count] @ vector
+        keep = similarities > min_similarity
+        candidates, similarities = candidates[keep], similarities[keep]
+        if len(candidates) > limit:
+            top = np.argpartition(-similarities, limit)[:limit]
+            candidates, similarities = candidates[top], similarities[top]
+        order = np.argsort(-similarities, kind="stable")
+        return [
+            (self.ids[candidates[i]], float(similarities[i]))
+            for i in order
+            if self.ids[candidates[i]] is not None
+        ]
+
+    def _replace(self, name: str, write: Callable):
+        """
+        Write through a temp file in the same directory and rename it over `name`. The matrix may still be
+        memory-mapped from the current file (truncating it in place raises SIGBUS on the next read), and
+        several workers may save at once; a rename leaves readers on the old inode and never half a file
+        """
+        fd, tmp = tempfile.mkstemp(dir=self.path, prefix=f".{name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp, self.path / name)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    def save(self):
+        """Persist the matrix (.npy, memory-mappable) and id/hash metadata when they changed"""
+        if self.path is None or not self._dirty:
+            return
+        try:
+            self.path.mkdir(parents=True, exist_ok=True)
+            matrix = np.ascontiguousarray(self.matrix[: self.count])
+            meta = {"version": EMBEDDER_VERSION, "dim": self.dim, "ids": self.ids, "hashes": self.hashes}
+            # Matrix first: metadata naming rows the matrix lacks would be worse than the reverse
+            self._replace("vectors.npy", lambda f: np.save(f, matrix))
+            self._replace("vectors.json", lambda f: f.write(json.dumps(meta).encode("utf-8")))
+            self._dirty = False
+        except Exception as e:
+            logger.warning(f"Could not persist knowledge vectors to {self.path}: {e}")
+
+    def load(self) -> bool:
+        """Memory-map a previously saved matrix; returns False when missing or built differently"""
+        if self.path is None or not (self.path / "vectors.npy").exists():
+            return False
+        try:
+            with open(self.path / "vectors.json", "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("version") != EMBEDDER_VERSION or meta.get("dim") != self.dim:
+                return False
+            matrix = np.load(self.path / "vectors.npy", mmap_mode="r")
+        except Exception as e:
+            logger.warning(f"Could not load knowledge vectors from {self.path}: {e}")
+            return False
+        self.matrix = matrix
+        self._writable = False
+        self.count = matrix.shape[0]
+        self.ids = list(meta["ids"])
+        self.slots = {doc_id: slot for slot, doc_id in enumerate(self.ids) if doc_id is not None}
+        self._free = [slot for slot, doc_id in enumerate(self.ids) if doc_id is None]
+        self.hashes = dict(meta["hashes"])
+        self.assignments = np.full(self.count, -1, dtype=np.int32)
+        self.centroids = None
+        self._dirty = False
+        return True
+
+    def maybe_retrain(self):
+        """Retrain IVF when the corpus crossed the threshold or drifted by a fifth since training"""
+        trained = self.centroids is not None
+        if (not trained and len(self) >= IVF_MIN_DOCS) or (trained and self._changes_since_train > len(self) / 5):
+            self.train_ivf()
+
+    def stats(self):
+        return {
+            **self._stats,
+            "documents": len(self),
+            "dim": self.dim,
+            "ivf_clusters": 0 if self.centroids is None else len(self.centroids),
+        }
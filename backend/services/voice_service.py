@@ -12,6 +12,10 @@ import tempfile
 from typing import Dict, Optional, Any, AsyncGenerator
 from datetime import datetime
 
+from .circuit_breaker import CIRCUIT_OPEN_ERROR, get_breaker, hedge_delay, hedged
+from .http_client import http_client
+from .text_classifier import BOCADEMA, get_classifier
+
 logger = logging.getLogger(__name__)
 
 
@@ -26,17 +30,25 @@ class VoiceService:
         self.default_voice_id = "JBFqnCBsd6RMkjVDRZzb"
         self.tts_model = "eleven_multilingual_v2"
         self.stt_model = "scribe_v1"
+        # Short control-plane calls (voices, signed URLs, agents)
+        self.request_timeout = aiohttp.ClientTimeout(total=30)
+        self.breaker = get_breaker("elevenlabs")
+        # Seconds to wait on the primary provider before racing the fallback; None waits for a failure
+        self.tts_hedge_seconds = hedge_delay("TTS_HEDGE_SECONDS")
+        self.stt_hedge_seconds = hedge_delay("STT_HEDGE_SECONDS")
 
     async def list_voices(self) -> Dict[str, Any]:
         """Get available voices from ElevenLabs"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"{self.base_url}/voices", headers=self.headers) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return {"success": True, "voices": data.get("voices", [])}
-                    else:
-                        return {"success": False, "error": f"HTTP {response.status}"}
+            session = http_client.session_for(self.base_url)
+            async with session.get(
+                f"{self.base_url}/voices", headers=self.headers, timeout=self.request_timeout
+            ) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    return {"success": True, "voices": data.get("voices", [])}
+                else:
+                    return {"success": False, "error": f"HTTP {response.status}"}
         except Exception as e:
             logger.error(f"Voice list error: {str(e)}")
             return {"success": False, "error": str(e)}
@@ -50,8 +62,24 @@ class VoiceService:
         similarity_boost: float = 0.8,
     ) -> Dict[str, Any]:
         """
-        Convert text to speech using ElevenLabs TTS
+        Convert text to speech using ElevenLabs TTS, falling back to (or racing) Groq TTS
         """
+        return await hedged(
+            lambda: self._elevenlabs_tts(text, voice_id, model_id, stability, similarity_boost),
+            lambda: self._groq_tts_fallback(text, voice_id or self.default_voice_id),
+            self.tts_hedge_seconds,
+        )
+
+    async def _elevenlabs_tts(
+        self,
+        text: str,
+        voice_id: Optional[str],
+        model_id: Optional[str],
+        stability: float,
+        similarity_boost: float,
+    ) -> Dict[str, Any]:
+        if not self.breaker.allow():
+            return {"success": False, "error": CIRCUIT_OPEN_ERROR}
         try:
             voice_id = voice_id or self.default_voice_id
             model_id = model_id or self.tts_model
@@ -67,34 +95,54 @@ class VoiceService:
 
             timeout = aiohttp.ClientTimeout(total=120)  # 2 minutes for TTS
 
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.post(
-                    f"{self.base_url}/text-to-speech/{voice_id}", json=payload, headers=headers
-                ) as response:
-                    if response.status == 200:
-                        audio_data = await response.read()
-                        audio_base64 = base64.b64encode(audio_data).decode("utf-8")
-
-                        return {
-                            "success": True,
-                            "audio_base64": audio_base64,
-                            "mime_type": "audio/mpeg",
-                            "text": text,
-                            "voice_id": voice_id,
-                            "duration_estimate": len(text) * 0.08,  # ~80ms per character
-                        }
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"TTS error {response.status}: {error_text}")
-                        return {"success": False, "error": f"TTS failed: {response.status}"}
+            session = http_client.session_for(self.base_url)
+            async with session.post(
+                f"{self.base_url}/text-to-speech/{voice_id}", json=payload, headers=headers, timeout=timeout
+            ) as response:
+                self.breaker.record_status(response.status)
+                if response.status == 200:
+                    audio_data = await response.read()
+                    audio_base64 = base64.b64encode(audio_data).decode("utf-8")
+
+                    return {
+                        "success": True,
+                        "audio_base64": audio_base64,
+                        "mime_type": "audio/mpeg",
+                        "text": text,
+                        "voice_id": voice_id,
+                        "duration_estimate": len(text) * 0.08,  # ~80ms per character
+                    }
+                else:
+                    error_text = await response.text()
+                    logger.error(f"TTS error {response.status}: {error_text}")
+                    return {"success": False, "error": f"TTS failed: {response.status}"}
 
         except asyncio.TimeoutError:
             logger.error("TTS request timeout")
+            self.breaker.record_failure()
             return {"success": False, "error": "TTS timeout"}
         except Exception as e:
             logger.error(f"TTS error: {str(e)}")
+            if isinstance(e, aiohttp.ClientError):
+                self.breaker.record_failure()
             return {"success": False, "error": str(e)}
 
+    async def _groq_tts_fallback(self, text: str, voice_id: str) -> Dict[str, Any]:
+        """Groq TTS in the same result shape as the ElevenLabs call"""
+        from services.ai_service import ai_service
+
+        result = await ai_service.tts_generate(text)
+        if not result.get("success"):
+            return result
+        return {
+            "success": True,
+            "audio_base64": result["audio_base64"],
+            "mime_type": result["mime"],
+            "text": text,
+            "voice_id": voice_id,
+            "duration_estimate": len(text) * 0.08,
+        }
+
     async def text_to_speech_stream(self, text: str, voice_id: Optional[str] = None) -> AsyncGenerator[bytes, None]:
         """
         Streaming TTS for real-time audio generation
@@ -111,16 +159,19 @@ class VoiceService:
             headers = self.headers.copy()
             headers["Accept"] = "audio/mpeg"
 
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.base_url}/text-to-speech/{voice_id}/stream", json=payload, headers=headers
-                ) as response:
-                    if response.status == 200:
-                        async for chunk in response.content.iter_chunked(8192):
-                            yield chunk
-                    else:
-                        logger.error(f"Streaming TTS error: {response.status}")
-                        yield b""  # Empty chunk to signal error
+            session = http_client.session_for(self.base_url)
+            async with session.post(
+                f"{self.base_url}/text-to-speech/{voice_id}/stream",
+                json=payload,
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=300),
+            ) as response:
+                if response.status == 200:
+                    async for chunk in response.content.iter_chunked(8192):
+                        yield chunk
+                else:
+                    logger.error(f"Streaming TTS error: {response.status}")
+                    yield b""  # Empty chunk to signal error
 
         except Exception as e:
             logger.error(f"Streaming TTS error: {str(e)}")
@@ -131,44 +182,54 @@ class VoiceService:
         Convert speech to text using Groq Whisper API
         """
         try:
-            # Use Groq Whisper for STT
-            from services.ai_service import ai_service
-
-            result = await ai_service.stt_transcribe_file(audio_file_path)
-
-            if result.get("success"):
-                return {
-                    "success": True,
-                    "transcription": result.get("text", ""),
-                    "confidence": 0.95,  # Groq Whisper has high confidence
-                    "language": "en",
-                }
-            else:
-                # Fallback to ElevenLabs if Groq fails
-                logger.warning(f"Groq STT failed, trying ElevenLabs: {result.get('error')}")
-                return await self._elevenlabs_stt_fallback(audio_file_path)
-
+            # Groq Whisper first; ElevenLabs if it fails, or races it once Groq is slower than the hedge delay
+            return await hedged(
+                lambda: self._groq_stt(audio_file_path),
+                lambda: self._elevenlabs_stt_fallback(audio_file_path),
+                self.stt_hedge_seconds,
+            )
         except Exception as e:
             logger.error(f"STT error: {str(e)}")
             return {"success": False, "error": str(e)}
 
+    async def _groq_stt(self, audio_file_path: str) -> Dict[str, Any]:
+        """Groq Whisper STT"""
+        from services.ai_service import ai_service
+
+        result = await ai_service.stt_transcribe_file(audio_file_path)
+        if not result.get("success"):
+            logger.warning(f"Groq STT failed: {result.get('error')}")
+            return result
+        return {
+            "success": True,
+            "transcription": result.get("text", ""),
+            "confidence": 0.95,  # Groq Whisper has high confidence
+            "language": "en",
+        }
+
     async def _elevenlabs_stt_fallback(self, audio_file_path: str) -> Dict[str, Any]:
         """
         Fallback to ElevenLabs STT if Groq fails
         """
+        if not self.breaker.allow():
+            return {"success": False, "error": CIRCUIT_OPEN_ERROR}
         try:
-            data = aiohttp.FormData()
-            data.add_field("file", open(audio_file_path, "rb"), filename="audio.wav")
-            data.add_field("model_id", self.stt_model)
-
             headers = {
                 k: v for k, v in self.headers.items() if k != "Content-Type"
             }  # Remove Content-Type for multipart
 
             timeout = aiohttp.ClientTimeout(total=120)  # 2 minutes for STT
 
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.post(f"{self.base_url}/speech-to-text", data=data, headers=headers) as response:
+            with open(audio_file_path, "rb") as audio_file:
+                data = aiohttp.FormData()
+                data.add_field("file", audio_file, filename="audio.wav")
+                data.add_field("model_id", self.stt_model)
+
+                session = http_client.session_for(self.base_url)
+                async with session.post(
+                    f"{self.base_url}/speech-to-text", data=data, headers=headers, timeout=timeout
+                ) as response:
+                    self.breaker.record_status(response.status)
                     if response.status == 200:
                         result = await response.json()
                         return {
@@ -184,6 +245,8 @@ class VoiceService:
 
         except Exception as e:
             logger.error(f"ElevenLabs STT error: {str(e)}")
+            if isinstance(e, (asyncio.TimeoutError, aiohttp.ClientError)):
+                self.breaker.record_failure()
             return {"success": False, "error": str(e)}
 
     async def get_conversation_signed_url(self, agent_id: Optional[str] = None) -> Dict[str, Any]:
@@ -196,22 +259,25 @@ class VoiceService:
 
             params = {"agent_id": agent_id}
 
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    f"{self.base_url}/convai/conversation/get-signed-url", params=params, headers=self.headers
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return {
-                            "success": True,
-                            "signed_url": data.get("signed_url"),
-                            "agent_id": agent_id,
-                            "expires_in": 300,  # Usually expires in 5 minutes
-                        }
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"Signed URL error {response.status}: {error_text}")
-                        return {"success": False, "error": f"Failed to get signed URL: {response.status}"}
+            session = http_client.session_for(self.base_url)
+            async with session.get(
+                f"{self.base_url}/convai/conversation/get-signed-url",
+                params=params,
+                headers=self.headers,
+                timeout=self.request_timeout,
+            ) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    return {
+                        "success": True,
+                        "signed_url": data.get("signed_url"),
+                        "agent_id": agent_id,
+                        "expires_in": 300,  # Usually expires in 5 minutes
+                    }
+                else:
+                    error_text = await response.text()
+                    logger.error(f"Signed URL error {response.status}: {error_text}")
+                    return {"success": False, "error": f"Failed to get signed URL: {response.status}"}
 
         except Exception as e:
             logger.error(f"Signed URL error: {str(e)}")
@@ -262,17 +328,17 @@ Remember: You're helping hosts build successful BIGO Live careers!""",
         }
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.base_url}/convai/agents", json=agent_config, headers=self.headers
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return {"success": True, "agent_id": data.get("agent_id"), "agent_config": agent_config}
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"Agent creation error {response.status}: {error_text}")
-                        return {"success": False, "error": f"Failed to create agent: {response.status}"}
+            session = http_client.session_for(self.base_url)
+            async with session.post(
+                f"{self.base_url}/convai/agents", json=agent_config, headers=self.headers, timeout=self.request_timeout
+            ) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    return {"success": True, "agent_id": data.get("agent_id"), "agent_config": agent_config}
+                else:
+                    error_text = await response.text()
+                    logger.error(f"Agent creation error {response.status}: {error_text}")
+                    return {"success": False, "error": f"Failed to create agent: {response.status}"}
 
         except Exception as e:
             logger.error(f"Agent creation error: {str(e)}")
@@ -333,10 +399,13 @@ Remember: You're helping hosts build successful BIGO Live careers!""",
                 "PK strategy, schedule help, or tier advice!"
             )
 
-            for command, response in bocademas.items():
-                if command in transcription:
-                    response_text = response
-                    break
+            command = next((c for c in bocademas if c in transcription), None)
+            if command is None:
+                # Loosely worded commands ("how do I win a pk") go to the locally trained model
+                classifier = get_classifier(BOCADEMA)
+                command = classifier.classify(transcription) if classifier is not None else None
+            if command in bocademas:
+                response_text = bocademas[command]
 
             # Generate TTS response
             tts_result = await self.text_to_speech(response_text)
@@ -344,7 +413,7 @@ Remember: You're helping hosts build successful BIGO Live careers!""",
             return {
                 "success": True,
                 "transcription": stt_result["transcription"],
-                "bocadema_detected": command if command in transcription else None,
+                "bocadema_detected": command if command in bocademas else None,
                 "response_text": response_text,
                 "response_audio": tts_result.get("audio_base64") if tts_result.get("success") else None,
                 "processing_time": datetime.utcnow().isoformat(),
@@ -0,0 +1,180 @@
+"""
+AI endpoint load test
+Drives /beangenie/chat, /ai/chat/with-memory and /recruiter/chat at a fixed arrival rate and
+reports latency percentiles, throughput and, when the backend talks to tests/fake_groq_server.py,
+how many upstream Groq calls the run cost.
+
+Usage:
+  python tests/fake_groq_server.py --latency uniform:0.2,0.8 &
+  GROQ_BASE_URL=http://localhost:8787 uvicorn server:app --app-dir backend --port 8000 &
+  python scripts/ai_load_test.py --rps 20 --duration 30 --bigo-id demo --password demo123 \\
+      --fake-groq http://localhost:8787
+"""
+import argparse
+import asyncio
+import itertools
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+ENDPOINTS = {
+    "beangenie": "/beangenie/chat",
+    "memory": "/ai/chat/with-memory",
+    "recruiter": "/recruiter/chat",
+}
+
+# Endpoints that need a bearer token
+AUTHENTICATED = {"beangenie", "memory"}
+
+MESSAGES = [
+    "How do I earn more beans?",
+    "What's the best PK battle strategy?",
+    "When should I stream to get more viewers?",
+    "How do I rank up to S10?",
+    "How do gifts work on BIGO Live?",
+    "I'm a new host, how do I get started?",
+]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[rank]
+
+
+async def login(session: aiohttp.ClientSession, base_url: str, bigo_id: str, password: str) -> str:
+    async with session.post(f"{base_url}/auth/login", json={"bigo_id": bigo_id, "password": password}) as r:
+        if r.status != 200:
+            raise SystemExit(f"Login failed ({r.status}): {await r.text()}")
+        return (await r.json())["access_token"]
+
+
+async def fake_groq_stats(session: aiohttp.ClientSession, fake_url: Optional[str]) -> Dict[str, Any]:
+    if not fake_url:
+        return {}
+    try:
+        async with session.get(f"{fake_url}/_fake/stats") as r:
+            return await r.json()
+    except Exception as e:
+        print(f"Could not read fake Groq stats from {fake_url}: {e}")
+        return {}
+
+
+async def run(args) -> Dict[str, Dict[str, Any]]:
+    connector = aiohttp.TCPConnector(limit=0)
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        headers = {}
+        if AUTHENTICATED & set(args.endpoints):
+            token = args.token or await login(session, args.base_url, args.bigo_id, args.password)
+            headers["Authorization"] = f"Bearer {token}"
+
+        before = await fake_groq_stats(session, args.fake_groq)
+        latencies: Dict[str, List[float]] = defaultdict(list)
+        statuses: Dict[str, Counter] = defaultdict(Counter)
+
+        async def send(i: int, name: str):
+            message = MESSAGES[i % len(MESSAGES)]
+            if args.unique:
+                # Distinct prompts so caching and request coalescing do not hide upstream cost
+                message = f"{message} (#{i})"
+            payload = {"message": message}
+            if name == "memory":
+                # A handful of long-lived sessions so memory compaction kicks in
+                payload["session_id"] = f"load-test-{i % args.sessions}"
+            started = time.perf_counter()
+            try:
+                async with session.post(
+                    f"{args.base_url}{ENDPOINTS[name]}", json=payload, headers=headers
+                ) as r:
+                    await r.read()
+                    status = r.status
+            except asyncio.TimeoutError:
+                status = "timeout"
+            except aiohttp.ClientError as e:
+                status = type(e).__name__
+            statuses[name][status] += 1
+            if status == 200:
+                latencies[name].append(time.perf_counter() - started)
+
+        total = int(args.rps * args.duration)
+        endpoint_cycle = itertools.cycle(args.endpoints)
+        tasks = []
+        start = time.perf_counter()
+        # Open loop: requests go out on schedule whether or not earlier ones have finished
+        for i in range(total):
+            delay = start + i / args.rps - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(send(i, next(endpoint_cycle))))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+        after = await fake_groq_stats(session, args.fake_groq)
+
+    report = {}
+    for name in args.endpoints:
+        values = sorted(latencies[name])
+        report[name] = {
+            "sent": sum(statuses[name].values()),
+            "ok": len(values),
+            "statuses": dict(statuses[name]),
+            "throughput_rps": len(values) / elapsed,
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+        }
+    if after:
+        calls = Counter(after.get("calls", {}))
+        calls.subtract(before.get("calls", {}))
+        limited = Counter(after.get("rate_limited", {}))
+        limited.subtract(before.get("rate_limited", {}))
+        report["upstream"] = {
+            "calls": {k: v for k, v in calls.items() if v},
+            "rate_limited": {k: v for k, v in limited.items() if v},
+            "max_in_flight": after.get("max_in_flight"),
+        }
+    report["run"] = {"elapsed_s": elapsed, "target_rps": args.rps, "requests": total}
+    return report
+
+
+def print_report(report: Dict[str, Dict[str, Any]]):
+    run_info = report["run"]
+    print(f"\n{run_info['requests']} requests at {run_info['target_rps']} rps in {run_info['elapsed_s']:.1f}s")
+    print(f"{'endpoint':<12}{'sent':>7}{'ok':>7}{'rps':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  statuses")
+    for name, row in report.items():
+        if name in ("run", "upstream"):
+            continue
+        print(
+            f"{name:<12}{row['sent']:>7}{row['ok']:>7}{row['throughput_rps']:>8.1f}"
+            f"{row['p50_ms']:>10.0f}{row['p95_ms']:>10.0f}{row['p99_ms']:>10.0f}  {row['statuses']}"
+        )
+    if "upstream" in report:
+        upstream = report["upstream"]
+        print(f"Upstream Groq calls: {upstream['calls']}")
+        print(f"Upstream 429s: {upstream['rate_limited']}  max in flight: {upstream['max_in_flight']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--base-url", default="http://localhost:8000/api")
+    parser.add_argument("--rps", type=float, default=10, help="target arrival rate across all endpoints")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to keep sending")
+    parser.add_argument("--endpoints", nargs="+", choices=sorted(ENDPOINTS), default=sorted(ENDPOINTS))
+    parser.add_argument("--token", help="bearer token; otherwise log in with --bigo-id/--password")
+    parser.add_argument("--bigo-id", default="demo")
+    parser.add_argument("--password", default="demo123")
+    parser.add_argument("--sessions", type=int, default=10, help="distinct memory-chat sessions")
+    parser.add_argument("--unique", action="store_true", help="make every prompt distinct")
+    parser.add_argument("--timeout", type=float, default=120, help="per-request timeout in seconds")
+    parser.add_argument("--fake-groq", help="fake Groq server URL, to report upstream call counts")
+    args = parser.parse_args()
+
+    print_report(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Login burst load test
+Fires a burst of concurrent /auth/login requests while probing GET /health every few milliseconds.
+The probe costs one Mongo ping, so any growth in its latency during the burst is event loop latency:
+with bcrypt on the password hasher pool it stays flat, with inline bcrypt it grows with every queued login.
+
+Usage:
+  uvicorn server:app --app-dir backend --port 8000 &
+  python scripts/auth_load_test.py --logins 50 --bigo-id demo --password demo123
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+from typing import List
+
+import aiohttp
+
+from ai_load_test import percentile
+
+
+async def probe(session: aiohttp.ClientSession, url: str, interval: float, stop: asyncio.Event) -> List[float]:
+    latencies = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        async with session.get(url) as r:
+            await r.read()
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def measure_probe(session, args, seconds: float) -> List[float]:
+    """Probe latency with no other load"""
+    stop = asyncio.Event()
+    task = asyncio.create_task(probe(session, args.health_url, args.probe_interval, stop))
+    await asyncio.sleep(seconds)
+    stop.set()
+    return await task
+
+
+async def run(args):
+    session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0))
+    # Probes get their own connection so they never queue behind logins client-side
+    probe_session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=1))
+    async with session, probe_session:
+        baseline = await measure_probe(probe_session, args, args.baseline_seconds)
+
+        statuses, login_latencies = Counter(), []
+
+        async def login():
+            started = time.perf_counter()
+            async with session.post(
+                f"{args.base_url}/auth/login", json={"bigo_id": args.bigo_id, "password": args.password}
+            ) as r:
+                await r.read()
+                statuses[r.status] += 1
+            login_latencies.append(time.perf_counter() - started)
+
+        stop = asyncio.Event()
+        probe_task = asyncio.create_task(probe(probe_session, args.health_url, args.probe_interval, stop))
+        started = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(args.logins)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        during = await probe_task
+
+    print(f"\n{args.logins} concurrent logins in {elapsed:.2f}s, statuses {dict(statuses)}")
+    print(f"{'':<18}{'samples':>8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for label, values in (
+        ("probe, idle", baseline),
+        ("probe, burst", during),
+        ("login", login_latencies),
+    ):
+        values = sorted(values)
+        print(
+            f"{label:<18}{len(values):>8}{percentile(values, 50) * 1000:>10.1f}"
+            f"{percentile(values, 99) * 1000:>10.1f}{(values[-1] if values else 0) * 1000:>10.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--base-url", default="http://localhost:8000/api")
+    parser.add_argument("--health-url", default="http://localhost:8000/health")
+    parser.add_argument("--logins", type=int, default=50, help="concurrent login requests")
+    parser.add_argument("--bigo-id", default="demo")
+    parser.add_argument("--password", default="demo123")
+    parser.add_argument("--probe-interval", type=float, default=0.01, help="seconds between health probes")
+    parser.add_argument("--baseline-seconds", type=float, default=2, help="idle probing before the burst")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
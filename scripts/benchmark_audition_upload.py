@@ -0,0 +1,290 @@
+"""
+Audition upload benchmark
+Pushes a full-size audition through the chunk and complete steps twice: the previous path (Starlette
+form parsing into an UploadFile, aiofiles copy to a .part file, blocking reopen, upload_from_stream, and
+a .final temp file on complete) and the streaming path (services/audition_storage.py). Reports MB/s,
+bytes written to local files (/proc/self/io wchar), the worst event-loop stall and peak Python memory
+per upload. Runs against an in-memory GridFS stand-in that does its I/O on worker threads like Motor,
+unless --mongo-url points at a real server.
+
+Usage:
+  python scripts/benchmark_audition_upload.py [--size-mb 500] [--chunk-mb 10] [--message-kb 64]
+  python scripts/benchmark_audition_upload.py --mongo-url mongodb://localhost:27017
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import aiofiles
+from starlette.datastructures import Headers
+from starlette.formparsers import MultiPartParser
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, "backend"))
+
+from services.audition_storage import AuditionStorage, multipart_field  # noqa: E402
+
+BOUNDARY = "benchboundary"
+HEADERS = {"content-type": f"multipart/form-data; boundary={BOUNDARY}"}
+GRID_CHUNK = 255 * 1024
+PATTERN = bytes(range(256)) * 4096  # 1 MB
+
+
+def pattern_bytes(size: int) -> bytes:
+    return PATTERN[:size] if size <= len(PATTERN) else (PATTERN * (size // len(PATTERN) + 1))[:size]
+
+
+class InMemoryGridIn:
+    """Upload stream that counts what it is sent; writes hop to a worker thread as Motor's do"""
+
+    chunk_size = GRID_CHUNK
+
+    def __init__(self, bucket, file_id):
+        self.bucket = bucket
+        self._id = file_id
+        self.length = 0
+
+    def _write(self, data):
+        self.length += len(data)
+
+    async def write(self, data):
+        await asyncio.get_running_loop().run_in_executor(None, self._write, data)
+
+    async def set(self, name, value):
+        pass
+
+    async def close(self):
+        self.bucket.lengths[self._id] = self.length
+
+    async def abort(self):
+        pass
+
+
+class InMemoryGridOut:
+    """Download stream producing `length` bytes of the benchmark pattern"""
+
+    def __init__(self, length: int):
+        self.remaining = length
+
+    def _read(self, size):
+        size = min(size, self.remaining)
+        self.remaining -= size
+        return pattern_bytes(size)
+
+    async def read(self, size):
+        return await asyncio.get_running_loop().run_in_executor(None, self._read, size)
+
+    def close(self):
+        pass
+
+
+class InMemoryBucket:
+    def __init__(self):
+        self.lengths = {}
+        self.ids = itertools.count(1)
+
+    def open_upload_stream(self, filename, metadata=None):
+        return InMemoryGridIn(self, next(self.ids))
+
+    def _drain(self, source):
+        length = 0
+        while True:
+            data = source.read(GRID_CHUNK)
+            if not data:
+                return length
+            length += len(data)
+
+    async def upload_from_stream(self, filename, source, metadata=None):
+        file_id = next(self.ids)
+        self.lengths[file_id] = await asyncio.get_running_loop().run_in_executor(None, self._drain, source)
+        return file_id
+
+    async def open_download_stream(self, file_id):
+        return InMemoryGridOut(self.lengths[file_id])
+
+
+async def request_body(chunk_bytes: int, message_bytes: int):
+    """A multipart chunk upload arriving as ASGI body messages of message_bytes"""
+    head = (
+        f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"chunk\"; filename=\"blob\"\r\n"
+        "Content-Type: application/octet-stream\r\n\r\n"
+    ).encode()
+    yield head
+    sent = 0
+    while sent < chunk_bytes:
+        size = min(message_bytes, chunk_bytes - sent)
+        yield pattern_bytes(size)
+        sent += size
+    yield f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+class LoopLag:
+    """Worst delay of a 5 ms timer while the block runs"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.worst = 0.0
+
+    async def _watch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.worst = max(self.worst, loop.time() - started - self.interval)
+
+    async def __aenter__(self):
+        self.task = asyncio.create_task(self._watch())
+        await asyncio.sleep(0)
+        return self
+
+    async def __aexit__(self, *exc):
+        await asyncio.sleep(self.interval * 2)
+        self.task.cancel()
+
+
+def local_write_bytes() -> int:
+    """Bytes this process has passed to write() (files, not sockets, in this benchmark)"""
+    try:
+        with open("/proc/self/io") as f:
+            return int(next(line for line in f if line.startswith("wchar")).split()[1])
+    except (OSError, StopIteration):
+        return 0
+
+
+async def legacy_chunk(bucket, chunk_bytes, message_bytes, index):
+    form = await MultiPartParser(Headers(HEADERS), request_body(chunk_bytes, message_bytes)).parse()
+    chunk = form["chunk"]
+    tmp_path = os.path.join(tempfile.gettempdir(), f"bench_audition_{index}.part")
+    try:
+        async with aiofiles.open(tmp_path, "wb") as f:
+            while True:
+                data = await chunk.read(1024 * 1024)
+                if not data:
+                    break
+                await f.write(data)
+        with open(tmp_path, "rb") as fsrc:
+            file_id = await bucket.upload_from_stream(filename=f"bench:{index}", source=fsrc)
+    finally:
+        await chunk.close()
+        os.remove(tmp_path)
+    return file_id
+
+
+async def legacy_complete(bucket, file_ids):
+    final_tmp = os.path.join(tempfile.gettempdir(), "bench_audition.final")
+    try:
+        with open(final_tmp, "wb") as fout:
+            for file_id in file_ids:
+                stream = await bucket.open_download_stream(file_id)
+                while True:
+                    b = await stream.read(1024 * 1024)
+                    if not b:
+                        break
+                    fout.write(b)
+        with open(final_tmp, "rb") as fin:
+            await bucket.upload_from_stream(filename="bench", source=fin)
+    finally:
+        os.remove(final_tmp)
+
+
+async def streaming_chunk(storage, chunk_bytes, message_bytes, index):
+    stored = await storage.store(
+        f"bench:{index}", multipart_field(HEADERS, request_body(chunk_bytes, message_bytes), "chunk")
+    )
+    return stored.file_id
+
+
+async def streaming_complete(storage, file_ids):
+    return await storage.store("bench", storage.read_files(file_ids))
+
+
+async def timed(label, coro_factory):
+    writes = local_write_bytes()
+    async with LoopLag() as lag:
+        started = time.perf_counter()
+        result = await coro_factory()
+        seconds = time.perf_counter() - started
+    return {"label": label, "seconds": seconds, "disk": local_write_bytes() - writes, "lag": lag.worst}, result
+
+
+async def peak_memory(coro_factory) -> int:
+    tracemalloc.start()
+    try:
+        await coro_factory()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+async def main_async(args):
+    total = args.size_mb * 1024 * 1024
+    chunk_bytes = args.chunk_mb * 1024 * 1024
+    sizes = [min(chunk_bytes, total - start) for start in range(0, total, chunk_bytes)]
+    message_bytes = args.message_kb * 1024
+
+    client = None
+    if args.mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
+
+        client = AsyncIOMotorClient(args.mongo_url)
+        bucket = AsyncIOMotorGridFSBucket(client[os.environ.get("BENCH_DB_NAME", "audition_bench")], "bench")
+    else:
+        bucket = InMemoryBucket()
+    storage = AuditionStorage(read_bytes=1024 * 1024)
+    storage.set_bucket(bucket)
+
+    paths = {
+        "temp files": (
+            lambda size, n: legacy_chunk(bucket, size, message_bytes, n),
+            lambda ids: legacy_complete(bucket, ids),
+        ),
+        "streaming": (
+            lambda size, n: streaming_chunk(storage, size, message_bytes, n),
+            lambda ids: streaming_complete(storage, ids),
+        ),
+    }
+
+    backend = args.mongo_url or "in-memory GridFS stand-in"
+    print(f"{args.size_mb} MB audition as {len(sizes)} x {args.chunk_mb} MB chunks, {args.message_kb} KB body messages")
+    print(f"({backend})\n")
+    print(f"{'path':<28}{'MB/s':>10}{'seconds':>10}{'local writes':>15}{'worst stall':>14}{'peak mem':>12}")
+    try:
+        for name, (store_chunk, complete) in paths.items():
+
+            async def all_chunks():
+                return [await store_chunk(size, n) for n, size in enumerate(sizes)]
+
+            chunk_row, file_ids = await timed(f"{name}: chunks", all_chunks)
+            chunk_row["peak"] = await peak_memory(lambda: store_chunk(sizes[0], 0))
+            complete_row, _ = await timed(f"{name}: complete", lambda: complete(file_ids))
+            complete_row["peak"] = None
+            for row in (chunk_row, complete_row):
+                peak = f"{row['peak'] / 1024 / 1024:.1f} MB" if row["peak"] is not None else "-"
+                print(
+                    f"{row['label']:<28}{args.size_mb / row['seconds']:>10.0f}{row['seconds']:>10.2f}"
+                    f"{row['disk'] / 1024 / 1024:>12.0f} MB{row['lag'] * 1000:>11.1f} ms{peak:>12}"
+                )
+        print(f"\n{storage.stats()}")
+    finally:
+        if client is not None:
+            await client[os.environ.get("BENCH_DB_NAME", "audition_bench")].drop_collection("bench.files")
+            await client[os.environ.get("BENCH_DB_NAME", "audition_bench")].drop_collection("bench.chunks")
+            client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mb", type=int, default=500, help="audition size (the upload limit is 500 MB)")
+    parser.add_argument("--chunk-mb", type=int, default=10, help="client chunk size")
+    parser.add_argument("--message-kb", type=int, default=64, help="ASGI body message size (uvicorn reads 64 KB)")
+    parser.add_argument("--mongo-url", help="write to this Mongo server instead of the in-memory stand-in")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
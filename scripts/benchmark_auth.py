@@ -0,0 +1,126 @@
+"""
+Authenticated request benchmark
+Times get_current_user (JWT decode, users lookup, User validation) with the user cache disabled and enabled
+and counts the database round trips each costs. Uses an in-memory users collection with a simulated
+round-trip time unless --mongo-url points at a real server.
+
+Usage:
+  python scripts/benchmark_auth.py [--users 50] [--requests 5000] [--rtt-ms 0.5]
+  python scripts/benchmark_auth.py --mongo-url mongodb://localhost:27017
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, "backend"))
+
+from fastapi.security import HTTPAuthorizationCredentials  # noqa: E402
+
+import server  # noqa: E402
+from services.user_cache import user_cache  # noqa: E402
+
+
+class InMemoryUsers:
+    """users collection stand-in that waits one round trip per read"""
+
+    def __init__(self, docs, rtt_ms: float):
+        self.docs = {d["id"]: d for d in docs}
+        self.rtt = rtt_ms / 1000
+        self.reads = 0
+
+    async def find_one(self, query, projection=None):
+        self.reads += 1
+        await asyncio.sleep(self.rtt)
+        doc = self.docs.get(query["id"])
+        return dict(doc) if doc else None
+
+
+class InMemoryDB:
+    def __init__(self, users):
+        self.users = users
+
+
+def user_docs(count: int):
+    users = [
+        server.User(bigo_id=f"bench{n}", name=f"Bench Host {n}", email=f"bench{n}@example.com") for n in range(count)
+    ]
+    return [{**user.dict(), "password": "x"} for user in users]
+
+
+async def run(db, reads, tokens, requests: int, cached: bool):
+    user_cache.enabled = cached
+    user_cache.invalidate()
+    server.db = db
+    reads_before = await reads.count_reads()
+    samples = []
+    for n in range(requests):
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=tokens[n % len(tokens)])
+        started = time.perf_counter()
+        await server.get_current_user(credentials)
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    count = await reads.count_reads() - reads_before
+    return statistics.mean(samples), statistics.median(samples), samples[int(len(samples) * 0.99) - 1], count
+
+
+class Reads:
+    """Read counter for either backend"""
+
+    def __init__(self, collection=None, memory=None):
+        self.collection = collection
+        self.memory = memory
+
+    async def count_reads(self):
+        if self.memory is not None:
+            return self.memory.reads
+        status = await self.collection.database.command("serverStatus")
+        return status["opcounters"]["query"]
+
+
+async def main_async(args):
+    docs = user_docs(args.users)
+    if args.mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        client = AsyncIOMotorClient(args.mongo_url)
+        db = client[os.environ.get("BENCH_DB_NAME", "auth_bench")]
+        await db.users.drop()
+        await db.users.insert_many([dict(d) for d in docs])
+        await db.users.create_index("id")
+        reads = Reads(collection=db.users)
+    else:
+        client = None
+        memory = InMemoryUsers(docs, args.rtt_ms)
+        db = InMemoryDB(memory)
+        reads = Reads(memory=memory)
+    tokens = [server.create_access_token({"sub": d["id"]}) for d in docs]
+    try:
+        backend = args.mongo_url or f"in-memory users, {args.rtt_ms} ms simulated RTT"
+        print(f"{args.users} users, {args.requests} authenticated requests ({backend})\n")
+        print(f"{'user cache':<12}{'mean':>10}{'p50':>10}{'p99':>10}{'db reads':>10}{'req/s':>10}")
+        for cached in (False, True):
+            mean, p50, p99, count = await run(db, reads, tokens, args.requests, cached)
+            label = "on" if cached else "off"
+            print(f"{label:<12}{mean:>8.3f}ms{p50:>8.3f}ms{p99:>8.3f}ms{count:>10}{1000 / mean:>10.0f}")
+        print(f"\n{user_cache.stats()}")
+    finally:
+        if client is not None:
+            await db.users.drop()
+            client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=50, help="distinct callers")
+    parser.add_argument("--requests", type=int, default=5000, help="timed get_current_user calls")
+    parser.add_argument("--rtt-ms", type=float, default=0.5, help="simulated Mongo round trip (in-memory mode)")
+    parser.add_argument("--mongo-url", help="benchmark against this Mongo server instead")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Micro-benchmark for the classify_intent keyword matcher
+Compares the precompiled word-boundary matcher with the old substring scan on the
+labelled regression corpus, for both speed and accuracy.
+
+Usage: python scripts/benchmark_intent_matcher.py [--repeat 2000] [--vocabulary path.json]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from pathlib import Path
+
+# Add backend directory to path
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+from services.intent_matcher import IntentMatcher, load_vocabularies  # noqa: E402
+
+CORPUS_PATH = Path(__file__).parent.parent / "tests" / "data" / "intent_corpus.jsonl"
+
+# The substring lists classify_intent scanned before the compiled matcher
+LEGACY_BIGO = [
+    "bean", "bigo", "pk", "tier", "stream", "streaming", "diamond", "gift", "host", "broadcast",
+    "viewer", "audience", "fan", "earn", "money", "level", "rank", "s1", "s25", "battle", "live",
+]  # fmt: skip
+LEGACY_QUESTION = ["?", "how", "what", "when", "where", "why", "who", "can", "should", "do i", "help me", "tell me"]
+LEGACY_GREETINGS = ["hi", "hello", "hey", "yo", "sup", "what's up", "whats up", "hola", "greetings"]
+
+
+def legacy_is_bigo(text: str, bigo=LEGACY_BIGO) -> bool:
+    return any(keyword in text for keyword in bigo)
+
+
+def legacy_keywords(text: str, bigo=LEGACY_BIGO, question=LEGACY_QUESTION):
+    """The keyword step of the old classify_intent: three substring scans"""
+    is_bigo = legacy_is_bigo(text, bigo)
+    is_question = any(indicator in text for indicator in question)
+    is_greeting = text in LEGACY_GREETINGS or any(
+        text.startswith(g + " ") or text.startswith(g + ",") for g in LEGACY_GREETINGS
+    )
+    return is_bigo, is_question, is_greeting
+
+
+def compiled_keywords(matcher: IntentMatcher, text: str):
+    return matcher.categories(text), matcher.starts_with_greeting(text)
+
+
+def grown(vocabularies, extra: int):
+    """Vocabularies padded with synthetic terms, to see how cost scales as they grow"""
+    vocabularies = {name: list(terms) for name, terms in vocabularies.items()}
+    vocabularies["bigo"] += [f"term{i}x" for i in range(extra)]
+    return vocabularies
+
+
+def load_corpus():
+    with open(CORPUS_PATH, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=2000, help="passes over the corpus per timing run")
+    parser.add_argument("--vocabulary", help="JSON vocabulary override file")
+    parser.add_argument("--grow", type=int, default=500, help="synthetic terms added for the scaling run")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    texts = [row["text"].lower().strip() for row in corpus]
+    matcher = IntentMatcher(load_vocabularies(args.vocabulary))
+
+    def time_per_message(fn):
+        best = min(timeit.repeat(lambda: [fn(text) for text in texts], number=args.repeat, repeat=5))
+        return best / (args.repeat * len(texts)) * 1e6
+
+    print(f"Corpus: {len(texts)} messages, {args.repeat} passes")
+    for extra in (0, args.grow):
+        vocabularies = grown(load_vocabularies(args.vocabulary), extra)
+        grown_matcher = IntentMatcher(vocabularies)
+        legacy_bigo = LEGACY_BIGO + vocabularies["bigo"][-extra:] if extra else LEGACY_BIGO
+        print(f"Vocabulary +{extra} terms:")
+        compiled = time_per_message(lambda text: compiled_keywords(grown_matcher, text))
+        legacy = time_per_message(lambda text: legacy_keywords(text, legacy_bigo))
+        print(f"  compiled matcher   {compiled:8.2f} µs/message")
+        print(f"  legacy substring   {legacy:8.2f} µs/message")
+
+    compiled_correct = sum(("bigo" in matcher.categories(t)) == row["is_bigo_related"] for t, row in zip(texts, corpus))
+    legacy_correct = sum(legacy_is_bigo(t) == row["is_bigo_related"] for t, row in zip(texts, corpus))
+    print("BIGO-related accuracy:")
+    print(f"  compiled matcher   {compiled_correct}/{len(corpus)}")
+    print(f"  legacy substring   {legacy_correct}/{len(corpus)}")
+
+
+if __name__ == "__main__":
+    main()
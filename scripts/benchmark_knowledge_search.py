@@ -0,0 +1,143 @@
+"""
+Knowledge search benchmark
+Times the in-process BM25 and hybrid (BM25 + vector) knowledge search against MongoDB $text search on the seed corpus
+(optionally padded with synthetic documents) and reports how much the two rankings agree.
+
+Usage:
+  python scripts/benchmark_knowledge_search.py [--docs 2000] [--repeat 200]
+  python scripts/benchmark_knowledge_search.py --mongo-url mongodb://localhost:27017  # also time $text
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, "backend"))
+sys.path.append(os.path.join(ROOT, "scripts"))
+
+from seed_bigo_knowledge import BIGO_KNOWLEDGE_DATA  # noqa: E402
+from services.knowledge_index import KnowledgeIndex  # noqa: E402
+
+QUERIES = [
+    "How do I earn more beans?",
+    "What's the best PK battle strategy?",
+    "When should I stream to get more viewers?",
+    "How do I rank up to S10?",
+    "How do gifts work on BIGO Live?",
+    "how do I get paid more",
+    "tier 5 requirements",
+    "building a loyal fan base",
+    "diamonds to cash",
+    "streaming schedule for new hosts",
+]
+
+
+def corpus(size: int):
+    """Seed documents plus synthetic ones recombined from their paragraphs"""
+    docs = [{**d, "id": str(uuid.uuid4())} for d in BIGO_KNOWLEDGE_DATA]
+    paragraphs = [p for d in BIGO_KNOWLEDGE_DATA for p in d["content"].split("\n\n") if p.strip()]
+    tags = sorted({t for d in BIGO_KNOWLEDGE_DATA for t in d["tags"]})
+    rng = random.Random(7)
+    while len(docs) < size:
+        n = len(docs)
+        docs.append(
+            {
+                "id": str(uuid.uuid4()),
+                "url": f"https://www.bigo.tv/synthetic/{n}",
+                "title": f"{rng.choice(BIGO_KNOWLEDGE_DATA)['title']} (part {n})",
+                "content": "\n\n".join(rng.sample(paragraphs, min(6, len(paragraphs)))),
+                "tags": rng.sample(tags, min(3, len(tags))),
+            }
+        )
+    return docs
+
+
+def time_calls(fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+async def time_mongo(mongo_url: str, docs, repeat: int, limit: int):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(mongo_url)
+    collection = client[os.environ.get("BENCH_DB_NAME", "knowledge_search_bench")].bigo_knowledge
+    try:
+        await collection.drop()
+        await collection.insert_many([dict(d) for d in docs])
+        await collection.create_index([("content", "text"), ("title", "text")])
+        results, timings = {}, {}
+        for query in QUERIES:
+            samples = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                found = (
+                    await collection.find(
+                        {"$text": {"$search": query}}, {"score": {"$meta": "textScore"}, "id": 1, "_id": 0}
+                    )
+                    .sort([("score", {"$meta": "textScore"})])
+                    .limit(limit)
+                    .to_list(limit)
+                )
+                samples.append((time.perf_counter() - started) * 1000)
+            samples.sort()
+            results[query] = [r["id"] for r in found]
+            timings[query] = (statistics.median(samples), samples[int(len(samples) * 0.99) - 1])
+        return results, timings
+    finally:
+        await collection.drop()
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--docs", type=int, default=len(BIGO_KNOWLEDGE_DATA), help="corpus size")
+    parser.add_argument("--repeat", type=int, default=200, help="timed runs per query")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--ivf", action="store_true", help="probe IVF clusters instead of brute-force vectors")
+    parser.add_argument("--mongo-url", help="also benchmark Mongo $text search against this server")
+    args = parser.parse_args()
+
+    docs = corpus(args.docs)
+    index = KnowledgeIndex()
+    started = time.perf_counter()
+    index.load(docs)
+    build_ms = (time.perf_counter() - started) * 1000
+    print(f"{len(docs)} documents, {len(index.postings)} terms, index built in {build_ms:.1f} ms\n")
+    if index.vectors is not None and args.ivf:
+        index.vectors.train_ivf()
+
+    mongo_results, mongo_timings = {}, {}
+    if args.mongo_url:
+        mongo_results, mongo_timings = asyncio.run(time_mongo(args.mongo_url, docs, args.repeat, args.limit))
+
+    header = f"{'query':<45}{'bm25 p50':>10}{'bm25 p99':>10}{'hits':>6}{'hybrid p50':>12}{'hybrid p99':>12}{'hits':>6}"
+    if mongo_timings:
+        header += f"{'$text p50':>11}{'$text p99':>11}{'hits':>6}{'overlap':>9}"
+    print(header)
+    for query in QUERIES:
+        p50, p99 = time_calls(lambda: index.search(query, args.limit), args.repeat)
+        hits = [r["id"] for r in index.search(query, args.limit)]
+        h50, h99 = time_calls(lambda: index.hybrid_search(query, args.limit), args.repeat)
+        hybrid = index.hybrid_search(query, args.limit)
+        row = f"{query[:44]:<45}{p50:>9.3f}ms{p99:>8.3f}ms{len(hits):>6}{h50:>10.3f}ms{h99:>10.3f}ms{len(hybrid):>6}"
+        if mongo_timings:
+            m50, m99 = mongo_timings[query]
+            theirs = mongo_results[query]
+            overlap = len(set(hits[:5]) & set(theirs[:5])) / max(1, min(5, len(theirs)))
+            row += f"{m50:>9.3f}ms{m99:>9.3f}ms{len(theirs):>6}{overlap:>9.0%}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,16 +7,20 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from bs4 import BeautifulSoup
 import os
 import sys
-from datetime import datetime, timezone
 from urllib.parse import urlparse
 import re
+import time
 
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from backend.services.knowledge_ingest import ensure_ingest_indexes, ingest  # noqa: E402
+
 # MongoDB connection
 MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
 DB_NAME = os.environ.get('DB_NAME', 'bigo_agency')
+# Concurrent page fetches while seeding
+FETCH_CONCURRENCY = int(os.environ.get('SEED_FETCH_CONCURRENCY', '8'))
 
 # Comprehensive BIGO Live knowledge base
 # Mix of official URLs and structured training data
@@ -860,7 +864,8 @@ async def fetch_url_content(session: aiohttp.ClientSession, url: str) -> str:
         async with session.get(url, timeout=aiohttp.ClientTimeout(total=30)) as response:
             if response.status == 200:
                 html = await response.text()
-                return extract_text_from_html(html)
+                # Parsing is CPU-bound; keep it off the event loop so other fetches keep flowing
+                return await asyncio.to_thread(extract_text_from_html, html)
             else:
                 print(f"Failed to fetch {url}: HTTP {response.status}")
                 return ""
@@ -869,106 +874,57 @@ async def fetch_url_content(session: aiohttp.ClientSession, url: str) -> str:
         return ""
 
 
-async def seed_knowledge_base():
+async def fetch_url_entries(urls, concurrency: int = FETCH_CONCURRENCY):
+    """Fetch every bigo.tv URL entry with at most `concurrency` requests in flight"""
+    semaphore = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency, ttl_dns_cache=300)
+
+    async def fetch(session, entry):
+        url = entry["url"]
+        if not urlparse(url).netloc.endswith("bigo.tv"):
+            print(f"Skipping non-bigo.tv URL: {url}")
+            return None
+        async with semaphore:
+            content = await fetch_url_content(session, url)
+        if not content:
+            # Use placeholder content for demo
+            content = f"Official information about {entry['title']} from BIGO Live platform. Visit {url} for more details."
+            print(f"  Using placeholder content for {url}")
+        return {**entry, "content": content}
+
+    async with aiohttp.ClientSession(connector=connector) as session:
+        fetched = await asyncio.gather(*(fetch(session, entry) for entry in urls))
+    return [entry for entry in fetched if entry]
+
+
+async def seed_knowledge_base(concurrency: int = FETCH_CONCURRENCY):
     """Seed the BIGO knowledge base"""
     print("Starting BIGO knowledge base seeding...")
-    
+    started = time.perf_counter()
+
     # Connect to MongoDB
     client = AsyncIOMotorClient(MONGO_URL)
     db = client[DB_NAME]
-    
-    total_seeded = 0
-    
+
     try:
-        # First, seed URL-based entries
-        async with aiohttp.ClientSession() as session:
-            for entry in BIGO_URLS:
-                url = entry["url"]
-                title = entry["title"]
-                tags = entry["tags"]
-                
-                # Validate bigo.tv domain
-                parsed = urlparse(url)
-                if not parsed.netloc.endswith("bigo.tv"):
-                    print(f"Skipping non-bigo.tv URL: {url}")
-                    continue
-                
-                print(f"Processing URL: {title} ({url})")
-                
-                # Fetch content
-                content = await fetch_url_content(session, url)
-                
-                if not content:
-                    # Use placeholder content for demo
-                    content = f"Official information about {title} from BIGO Live platform. Visit {url} for more details."
-                    print(f"  Using placeholder content for {url}")
-                
-                # Cap at 20k characters
-                if len(content) > 20000:
-                    content = content[:20000]
-                    print(f"  Content truncated to 20k chars")
-                
-                # Upsert into database
-                doc = {
-                    "url": url,
-                    "title": title,
-                    "content": content,
-                    "tags": tags,
-                    "updated_at": datetime.now(timezone.utc)
-                }
-                
-                existing = await db.bigo_knowledge.find_one({"url": url})
-                if existing:
-                    await db.bigo_knowledge.update_one({"url": url}, {"$set": doc})
-                    print(f"  ✓ Updated: {title}")
-                else:
-                    doc["id"] = str(os.urandom(16).hex())
-                    doc["created_at"] = datetime.now(timezone.utc)
-                    await db.bigo_knowledge.insert_one(doc)
-                    print(f"  ✓ Inserted: {title}")
-                
-                total_seeded += 1
-        
-        # Second, seed structured knowledge data (no web scraping needed)
-        print("\nProcessing structured BIGO knowledge data...")
-        for entry in BIGO_KNOWLEDGE_DATA:
-            url = entry["url"]
-            title = entry["title"]
-            content = entry["content"]
-            tags = entry["tags"]
-            
-            print(f"Processing: {title}")
-            
-            # Cap at 20k characters
-            if len(content) > 20000:
-                content = content[:20000]
-                print(f"  Content truncated to 20k chars")
-            
-            # Upsert into database
-            doc = {
-                "url": url,
-                "title": title,
-                "content": content,
-                "tags": tags,
-                "updated_at": datetime.now(timezone.utc)
-            }
-            
-            existing = await db.bigo_knowledge.find_one({"url": url})
-            if existing:
-                await db.bigo_knowledge.update_one({"url": url}, {"$set": doc})
-                print(f"  ✓ Updated: {title}")
-            else:
-                doc["id"] = str(os.urandom(16).hex())
-                doc["created_at"] = datetime.now(timezone.utc)
-                await db.bigo_knowledge.insert_one(doc)
-                print(f"  ✓ Inserted: {title}")
-            
-            total_seeded += 1
-        
-        print(f"\n✅ Successfully seeded {total_seeded} entries into BIGO knowledge base")
-        print(f"   - URL-based entries: {len(BIGO_URLS)}")
-        print(f"   - Structured data entries: {len(BIGO_KNOWLEDGE_DATA)}")
-        
+        # URL-based entries are fetched concurrently, structured entries need no scraping
+        url_entries = await fetch_url_entries(BIGO_URLS, concurrency)
+        print(f"Fetched {len(url_entries)} URLs in {time.perf_counter() - started:.1f}s")
+        entries = list(enumerate(url_entries + BIGO_KNOWLEDGE_DATA, start=1))
+
+        # One bulk upsert; documents whose content hash is unchanged are not rewritten
+        await ensure_ingest_indexes(db)
+        outcome = await ingest(db, entries)
+        for result in outcome["results"]:
+            if result["status"] == "error":
+                print(f"  ✗ Entry {result['line']}: {result['error']}")
+
+        print(f"\n✅ Seeded BIGO knowledge base in {time.perf_counter() - started:.1f}s")
+        print(f"   - Inserted: {outcome['inserted']}")
+        print(f"   - Updated: {outcome['updated']}")
+        print(f"   - Unchanged: {outcome['unchanged']}")
+        print(f"   - Errors: {outcome['error']}")
+
     except Exception as e:
         print(f"❌ Error seeding knowledge base: {e}")
         raise
@@ -986,4 +942,10 @@ if __name__ == "__main__":
     if env_path.exists():
         load_dotenv(env_path)
     
-    asyncio.run(seed_knowledge_base())
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Seed the BIGO knowledge base")
+    parser.add_argument("--concurrency", type=int, default=FETCH_CONCURRENCY, help="parallel page fetches")
+    args = parser.parse_args()
+
+    asyncio.run(seed_knowledge_base(args.concurrency))
@@ -0,0 +1,175 @@
+"""
+Train the local text classifiers used for BeanGenie intent, bocadema and admin action routing
+Messages stored in ai_chats are labelled with the existing keyword rules, hand-labelled
+examples are added on top, and the nearest-centroid models are written to CLASSIFIER_MODEL_DIR.
+tests/data/intent_corpus.jsonl is the held-out regression corpus and is never trained on.
+
+Usage: python scripts/train_text_classifiers.py [--limit 20000] [--labels extra.jsonl ...]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+# Add backend directory to path, and load backend/.env before the services read their settings
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+load_dotenv(Path(__file__).parent.parent / "backend" / ".env")
+
+from services.ai_service import ai_service  # noqa: E402
+from services.text_classifier import (  # noqa: E402
+    ADMIN_ACTION,
+    BEANGENIE_INTENT,
+    BOCADEMA,
+    MODEL_DIR,
+    NO_ACTION,
+    TextClassifier,
+)
+
+# MongoDB connection
+MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+DB_NAME = os.environ.get("DB_NAME", "bigo_agency")
+
+# Regression corpus for tests/test_intent_matcher.py; training on it would make that test grade the model
+# against its own training data
+HELD_OUT_CORPUS = (Path(__file__).parent.parent / "tests" / "data" / "intent_corpus.jsonl").resolve()
+
+# Hand-labelled examples count this many times against one weakly labelled chat
+SEED_WEIGHT = 3
+
+BEANGENIE_INTENT_EXAMPLES = {
+    "greeting": [
+        "hey genie", "good evening", "hello there bean genie", "hi again", "sup", "morning everyone",
+    ],
+    "casual": [
+        "thank you so much", "got it", "haha", "okay", "cool thanks", "sounds good",
+    ],
+    "question": [
+        "how can i get more gifts from viewers", "what does the s5 tier unlock", "tips to win my next pk",
+        "how many hours should i stream a week", "how do bean payouts work", "ways to grow my fan club",
+    ],
+    "off_topic": [
+        "recommend a good movie", "how do i fix my car", "what's the capital of france",
+        "write me a song", "how tall is mount everest", "what should i eat for dinner",
+    ],
+}  # fmt: skip
+
+# Voice transcripts are not stored, so the bocadema model learns from these phrasings
+BOCADEMA_EXAMPLES = {
+    "hey coach": ["hey coach", "hi coach", "hello coach", "coach are you there", "okay coach"],
+    "check my beans": [
+        "check my beans", "how many beans do i have", "what are my bean earnings",
+        "show my beans", "bean balance", "how am i doing on beans",
+    ],
+    "pk strategy": [
+        "pk strategy", "how do i win a pk", "tips for pk battles", "help me win battles",
+        "pk battle advice", "how to beat my opponent in pk",
+    ],
+    "schedule help": [
+        "schedule help", "when should i stream", "best time to go live", "help with my streaming schedule",
+        "what hours should i broadcast", "how often should i stream",
+    ],
+    "tier advice": [
+        "tier advice", "how do i rank up", "what tier am i", "how to reach the next tier",
+        "help me level up my tier", "tier progression tips",
+    ],
+    "event planning": [
+        "event planning", "help me plan an event", "ideas for an event", "how do i run a tournament",
+        "plan a contest for my fans", "event ideas",
+    ],
+    "motivation boost": [
+        "motivation boost", "i need motivation", "i feel like giving up", "cheer me up",
+        "i'm feeling down about streaming", "motivate me",
+    ],
+    NO_ACTION: [
+        "what's the weather", "play some music", "stop", "never mind", "call my mom", "turn up the volume",
+    ],
+}  # fmt: skip
+
+ADMIN_ACTION_EXAMPLES = {
+    "system_announcement": [
+        "tell everyone the agency meeting moved to friday", "broadcast a message to all hosts",
+        "post a notice about the new bonus", "let all users know about maintenance tonight",
+    ],
+    "create_event": [
+        "set up a pk tournament for next weekend", "schedule a community meetup on saturday",
+        "add a new bean contest to the calendar", "organize a host training session",
+    ],
+    "user_analytics": [
+        "how are our hosts performing this month", "show me host performance stats",
+        "which hosts earned the most beans", "give me a breakdown of new signups",
+    ],
+    NO_ACTION: [
+        "what can you do", "thanks", "how does this dashboard work", "hello",
+        "explain the tier system", "what is a pk battle",
+    ],
+}  # fmt: skip
+
+
+def read_jsonl(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def expand(examples):
+    return [(text, label) for label, texts in examples.items() for text in texts]
+
+
+async def load_chats(limit: int):
+    client = AsyncIOMotorClient(MONGO_URL)
+    try:
+        cursor = client[DB_NAME].ai_chats.find({}, {"message": 1, "chat_type": 1, "_id": 0}).sort("created_at", -1)
+        return await cursor.to_list(limit)
+    finally:
+        client.close()
+
+
+def train(name, examples):
+    model = TextClassifier.train(examples)
+    path = MODEL_DIR / f"{name}.npz"
+    model.save(path)
+    counts = {label: sum(1 for _, lbl in examples if lbl == label) for label in model.labels}
+    print(f"{name}: {len(examples)} examples {counts} -> {path}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--limit", type=int, default=20000, help="most recent ai_chats to train on")
+    parser.add_argument(
+        "--labels", nargs="*", default=[], help='extra JSONL files of {"text", "intent"} BeanGenie examples'
+    )
+    args = parser.parse_args()
+
+    chats = [c for c in await load_chats(args.limit) if c.get("message")]
+    print(f"Loaded {len(chats)} chats from {DB_NAME}.ai_chats")
+
+    seeds = expand(BEANGENIE_INTENT_EXAMPLES)
+    for path in args.labels:
+        if Path(path).resolve() == HELD_OUT_CORPUS:
+            parser.error(f"{path} is the held-out regression corpus; pass a separate training file")
+        seeds += [(row["text"], row["intent"]) for row in read_jsonl(path)]
+    intent_examples = seeds * SEED_WEIGHT
+    intent_examples += [
+        (c["message"], ai_service.classify_intent_by_keywords(c["message"])["intent"])
+        for c in chats
+        if c.get("chat_type") != "admin_assistant"
+    ]
+    train(BEANGENIE_INTENT, intent_examples)
+
+    admin_examples = expand(ADMIN_ACTION_EXAMPLES) * SEED_WEIGHT
+    admin_examples += [
+        (c["message"], ai_service.detect_admin_action_by_keywords(c["message"]) or NO_ACTION)
+        for c in chats
+        if c.get("chat_type") == "admin_assistant"
+    ]
+    train(ADMIN_ACTION, admin_examples)
+
+    train(BOCADEMA, expand(BOCADEMA_EXAMPLES))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
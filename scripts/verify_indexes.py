@@ -0,0 +1,183 @@
+"""
+Index verification
+Applies the declarative index spec (backend/services/index_manager.py) and flags route-level queries that
+scan a whole collection. Queries are captured with the MongoDB profiler while the backend test suite
+runs against a live server; every distinct query shape is then re-planned with explain() against the
+current indexes, and shapes whose winning plan still contains a COLLSCAN fail the check.
+
+Unfiltered, unsorted reads (admin listings, count_documents({})) read every document by design and are
+listed separately instead of failing the check.
+
+Usage:
+  python scripts/verify_indexes.py apply --mongo-url mongodb://localhost:27017   # create indexes, show drift
+  python scripts/verify_indexes.py profile --mongo-url mongodb://localhost:27017 # reset + enable profiler
+  uvicorn server:app --app-dir backend --port 8000 &
+  python tests/backend_test.py                                                  # or any route-level suite
+  python scripts/verify_indexes.py check --mongo-url mongodb://localhost:27017   # exit 1 on COLLSCAN
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, "backend"))
+
+from services.index_manager import ensure_indexes, index_drift  # noqa: E402
+
+# Profiler ops that carry a query
+QUERY_OPS = {"query", "update", "remove", "command", "getmore"}
+# Bookkeeping collections that are not read by routes
+IGNORED_COLLECTIONS = {"system.profile", "system.indexes", "system.js", "system.views"}
+
+
+def query_shape(entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """(collection, kind, filter, sort, pipeline) of a profiler entry, or None when it is not a query"""
+    if entry.get("op") not in QUERY_OPS:
+        return None
+    collection = entry.get("ns", "").split(".", 1)[-1]
+    if not collection or collection in IGNORED_COLLECTIONS or collection.startswith("system."):
+        return None
+    command = entry.get("command") or {}
+    if "aggregate" in command:
+        return {"collection": collection, "kind": "aggregate", "pipeline": command.get("pipeline", [])}
+    if "find" in command:
+        kind, filter, sort = "find", command.get("filter", {}), command.get("sort")
+    elif "count" in command:
+        kind, filter, sort = "count", command.get("query", {}), None
+    elif "findAndModify" in command or "findandmodify" in command:
+        kind, filter, sort = "findAndModify", command.get("query", {}), command.get("sort")
+    elif "q" in command:
+        kind, filter, sort = entry["op"], command["q"], None
+    else:
+        return None
+    return {"collection": collection, "kind": kind, "filter": filter, "sort": sort}
+
+
+def _skeleton(value: Any) -> Any:
+    """Replace literal values with their type so queries differing only in ids share a shape"""
+    if isinstance(value, dict):
+        return {k: _skeleton(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_skeleton(v) for v in value]
+    return type(value).__name__
+
+
+def shape_key(shape: Dict[str, Any]) -> str:
+    body = shape.get("pipeline") if shape["kind"] == "aggregate" else [shape.get("filter"), shape.get("sort")]
+    return f"{shape['collection']} {shape['kind']} {json.dumps(_skeleton(body), sort_keys=True, default=str)}"
+
+
+def is_full_read(shape: Dict[str, Any]) -> bool:
+    """Unfiltered, unsorted reads scan the collection by design"""
+    if shape["kind"] == "aggregate":
+        first = shape["pipeline"][0] if shape["pipeline"] else {}
+        return "$match" not in first and "$sort" not in first
+    return not shape.get("filter") and not shape.get("sort")
+
+
+def has_collscan(plan: Any) -> bool:
+    """True when any stage of an explain() document is a collection scan"""
+    if isinstance(plan, dict):
+        if plan.get("stage") == "COLLSCAN":
+            return True
+        return any(has_collscan(v) for v in plan.values())
+    if isinstance(plan, list):
+        return any(has_collscan(v) for v in plan)
+    return False
+
+
+async def explain(db, shape: Dict[str, Any]) -> Dict[str, Any]:
+    """Plan the shape against the current indexes (writes are planned as the equivalent find)"""
+    if shape["kind"] == "aggregate":
+        command = {"aggregate": shape["collection"], "pipeline": shape["pipeline"], "cursor": {}}
+    else:
+        command = {"find": shape["collection"], "filter": shape["filter"]}
+        if shape.get("sort"):
+            command["sort"] = shape["sort"]
+    return await db.command({"explain": command, "verbosity": "queryPlanner"})
+
+
+def collect_shapes(entries: Iterable[Dict[str, Any]]) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, int]]:
+    """One sample per distinct shape, with how often each shape ran"""
+    samples: Dict[str, Dict[str, Any]] = {}
+    counts: Dict[str, int] = {}
+    for entry in entries:
+        shape = query_shape(entry)
+        if shape is None:
+            continue
+        key = shape_key(shape)
+        samples.setdefault(key, shape)
+        counts[key] = counts.get(key, 0) + 1
+    return samples, counts
+
+
+async def check(db) -> int:
+    entries = await db.system.profile.find({}, {"op": 1, "ns": 1, "command": 1}).to_list(None)
+    samples, counts = collect_shapes(entries)
+    if not samples:
+        print("No profiled queries; run `profile` before the test suite")
+        return 1
+    collscans: List[str] = []
+    full_reads: List[str] = []
+    for key, shape in sorted(samples.items()):
+        if is_full_read(shape):
+            full_reads.append(key)
+            continue
+        if has_collscan(await explain(db, shape)):
+            collscans.append(key)
+    print(f"{len(samples)} query shapes from {sum(counts.values())} profiled operations")
+    if full_reads:
+        print(f"\nUnfiltered reads (full scans by design): {len(full_reads)}")
+        for key in full_reads:
+            print(f"  {counts[key]:>5}x  {key}")
+    if collscans:
+        print(f"\nCOLLSCAN with the current indexes: {len(collscans)}")
+        for key in collscans:
+            print(f"  {counts[key]:>5}x  {key}")
+        return 1
+    print("\nNo filtered or sorted query needs a collection scan")
+    return 0
+
+
+async def main_async(args) -> int:
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(args.mongo_url)
+    db = client[args.db_name]
+    try:
+        if args.command == "apply":
+            report = await ensure_indexes(db)
+            print(json.dumps(report, indent=2, default=str))
+            return 1 if report["failed"] or report["conflicts"] else 0
+        if args.command == "drift":
+            drift = await index_drift(db)
+            print(json.dumps(drift, indent=2, default=str))
+            return 1 if drift["missing"] or drift["conflicts"] else 0
+        if args.command == "profile":
+            await db.command({"profile": 0})
+            await db.system.profile.drop()
+            await db.command({"profile": 2})
+            print(f"Profiling every operation on {args.db_name}; run the test suite, then `check`")
+            return 0
+        code = await check(db)
+        if not args.keep_profiling:
+            await db.command({"profile": 0})
+        return code
+    finally:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("command", choices=["apply", "drift", "profile", "check"])
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db-name", default=os.environ.get("DB_NAME", "lvl_up_agency"))
+    parser.add_argument("--keep-profiling", action="store_true", help="leave the profiler on after `check`")
+    sys.exit(asyncio.run(main_async(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
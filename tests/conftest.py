@@ -0,0 +1,613 @@
+"""
+Shared test configuration: the anyio backend and an in-memory stand-in for Motor collections
+"""
+import asyncio
+import copy
+import re
+from collections import Counter, defaultdict
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Optional
+
+import pytest
+from bson import ObjectId
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+_MISSING = object()
+_WORD = re.compile(r"\w+")
+
+
+@pytest.fixture
+def anyio_backend():
+    # The services run under uvicorn's asyncio loop
+    return "asyncio"
+
+
+def _get(doc: Dict[str, Any], path: str) -> Any:
+    if "." not in path:
+        return doc.get(path, _MISSING)
+    value: Any = doc
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _set(doc: Dict[str, Any], path: str, value: Any):
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.setdefault(part, {})
+    doc[last] = value
+
+
+def _unset(doc: Dict[str, Any], path: str):
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(last, None)
+
+
+def _compare(value: Any, bound: Any, test) -> bool:
+    if value is _MISSING or value is None:
+        return False
+    try:
+        return test(value, bound)
+    except TypeError:
+        return False
+
+
+def _equals(value: Any, expected: Any) -> bool:
+    if expected is None:
+        return value is _MISSING or value is None
+    if isinstance(value, list) and not isinstance(expected, list):
+        return expected in value
+    return value is not _MISSING and value == expected
+
+
+def _regex(condition: Dict[str, Any]):
+    pattern = condition["$regex"]
+    flags = re.IGNORECASE if "i" in condition.get("$options", "") else 0
+    return pattern if isinstance(pattern, re.Pattern) else re.compile(pattern, flags)
+
+
+def _in(value: Any, operand: List[Any]) -> bool:
+    if isinstance(value, str):
+        return value in operand
+    return any(_equals(value, item) for item in operand)
+
+
+def _operator_matches(value: Any, condition: Dict[str, Any]) -> bool:
+    for op, operand in condition.items():
+        if op == "$eq" and not _equals(value, operand):
+            return False
+        if op == "$ne" and _equals(value, operand):
+            return False
+        if op == "$in" and not _in(value, operand):
+            return False
+        if op == "$nin" and _in(value, operand):
+            return False
+        if op == "$exists" and (value is not _MISSING) != bool(operand):
+            return False
+        if op == "$gt" and not _compare(value, operand, lambda a, b: a > b):
+            return False
+        if op == "$gte" and not _compare(value, operand, lambda a, b: a >= b):
+            return False
+        if op == "$lt" and not _compare(value, operand, lambda a, b: a < b):
+            return False
+        if op == "$lte" and not _compare(value, operand, lambda a, b: a <= b):
+            return False
+        if op == "$regex" and not (isinstance(value, str) and _regex(condition).search(value)):
+            return False
+    return True
+
+
+def matches(doc: Dict[str, Any], query: Optional[Dict[str, Any]]) -> bool:
+    """Whether a stored document satisfies a Mongo query filter"""
+    for field, condition in (query or {}).items():
+        if isinstance(condition, str):
+            value = _get(doc, field)
+            if not (value == condition or isinstance(value, list) and condition in value):
+                return False
+        elif field == "$and":
+            if not all(matches(doc, sub) for sub in condition):
+                return False
+        elif field == "$or":
+            if not any(matches(doc, sub) for sub in condition):
+                return False
+        elif field == "$nor":
+            if any(matches(doc, sub) for sub in condition):
+                return False
+        elif field == "$text":
+            continue  # scored by FakeCollection.find
+        elif isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition):
+            if not _operator_matches(_get(doc, field), condition):
+                return False
+        elif isinstance(condition, re.Pattern):
+            value = _get(doc, field)
+            if not (isinstance(value, str) and condition.search(value)):
+                return False
+        elif not _equals(_get(doc, field), condition):
+            return False
+    return True
+
+
+def _project(doc: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if not projection:
+        return copy.deepcopy(doc)
+    fields = {k: v for k, v in projection.items() if not isinstance(v, dict)}
+    included = [k for k, v in fields.items() if v and k != "_id"]
+    if included:
+        out: Dict[str, Any] = {}
+        if fields.get("_id", 1) and "_id" in doc:
+            out["_id"] = doc["_id"]
+        for path in included:
+            value = _get(doc, path)
+            if value is not _MISSING:
+                _set(out, path, copy.deepcopy(value))
+    else:
+        out = copy.deepcopy(doc)
+        for path, keep in fields.items():
+            if not keep:
+                _unset(out, path)
+    for name, meta in projection.items():
+        if isinstance(meta, dict) and meta.get("$meta") == "textScore":
+            out[name] = doc.get("__text_score", 0.0)
+    out.pop("__text_score", None)
+    return out
+
+
+def _sort_key(value: Any):
+    # Missing and null sort first, as in Mongo
+    return (0, 0) if value is _MISSING or value is None else (1, value)
+
+
+def _sort(docs: List[Dict[str, Any]], spec) -> List[Dict[str, Any]]:
+    for field, direction in reversed(spec):
+        if isinstance(direction, dict):  # {"$meta": "textScore"}
+            docs = sorted(docs, key=lambda d: d.get("__text_score", 0.0), reverse=True)
+        else:
+            docs = sorted(docs, key=lambda d: _sort_key(_get(d, field)), reverse=direction < 0)
+    return docs
+
+
+def _sort_spec(key_or_list, direction=None):
+    if isinstance(key_or_list, str):
+        return [(key_or_list, 1 if direction is None else direction)]
+    if isinstance(key_or_list, dict):
+        return list(key_or_list.items())
+    return list(key_or_list)
+
+
+class FakeCursor:
+    """Motor cursor over a snapshot of documents: sort/skip/limit, to_list and async iteration"""
+
+    def __init__(self, docs: Iterable[Dict[str, Any]], projection: Optional[Dict[str, Any]] = None):
+        self._docs = list(docs)
+        self._projection = projection
+        self._skip = 0
+        self._limit = 0
+        self._iter = None
+
+    def sort(self, key_or_list, direction=None):
+        self._docs = _sort(self._docs, _sort_spec(key_or_list, direction))
+        return self
+
+    def skip(self, n: int):
+        self._skip = n
+        return self
+
+    def limit(self, n: int):
+        self._limit = n
+        return self
+
+    def _results(self) -> List[Dict[str, Any]]:
+        docs = self._docs[self._skip :]
+        if self._limit:
+            docs = docs[: self._limit]
+        return [_project(d, self._projection) for d in docs]
+
+    async def to_list(self, length: Optional[int] = None):
+        await asyncio.sleep(0)
+        results = self._results()
+        return results[:length] if length else results
+
+    def __aiter__(self):
+        self._iter = iter(self._results())
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+def _evaluate(expression: Any, doc: Dict[str, Any]) -> Any:
+    if isinstance(expression, str) and expression.startswith("$"):
+        value = _get(doc, expression[1:])
+        return None if value is _MISSING else value
+    if isinstance(expression, dict) and len(expression) == 1:
+        op, args = next(iter(expression.items()))
+        if op == "$add":
+            values = [_evaluate(arg, doc) for arg in args]
+            return None if any(v is None for v in values) else sum(values)
+        if op == "$ifNull":
+            value = _evaluate(args[0], doc)
+            return _evaluate(args[1], doc) if value is None else value
+    if isinstance(expression, dict):
+        return {key: _evaluate(value, doc) for key, value in expression.items()}
+    return expression
+
+
+def _accumulate(op: str, values: List[Any]) -> Any:
+    present = [v for v in values if v is not None]
+    if op == "$sum":
+        return sum(v for v in present if isinstance(v, (int, float)))
+    if op == "$max":
+        return max(present) if present else None
+    if op == "$min":
+        return min(present) if present else None
+    if op == "$avg":
+        numbers = [v for v in present if isinstance(v, (int, float))]
+        return sum(numbers) / len(numbers) if numbers else None
+    if op == "$first":
+        return values[0] if values else None
+    if op == "$push":
+        return values
+    raise NotImplementedError(f"FakeCollection.aggregate does not support {op}")
+
+
+def _group(docs: List[Dict[str, Any]], spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    groups: Dict[Any, List[Dict[str, Any]]] = defaultdict(list)
+    keys: Dict[Any, Any] = {}
+    for doc in docs:
+        key = _evaluate(spec["_id"], doc)
+        hashable = repr(key)
+        keys[hashable] = key
+        groups[hashable].append(doc)
+    out = []
+    for hashable, members in groups.items():
+        row = {"_id": keys[hashable]}
+        for field, accumulator in spec.items():
+            if field != "_id":
+                op, expression = next(iter(accumulator.items()))
+                row[field] = _accumulate(op, [_evaluate(expression, d) for d in members])
+        out.append(row)
+    return out
+
+
+class FakeCollection:
+    """
+    In-memory stand-in for a Motor collection: Mongo query, projection and update semantics for the
+    operators the services use, unique indexes, call counters (`calls["find"]`, ...) and the projections
+    reads asked for. Every
+    operation yields to the event loop once, as a round trip to the server would
+    """
+
+    def __init__(self, name: str = "collection", docs: Optional[List[Dict[str, Any]]] = None):
+        self.name = name
+        # Seeded documents are kept by reference so a test can change them "outside the process"
+        self.docs: List[Dict[str, Any]] = docs if docs is not None else []
+        self.indexes: List[Dict[str, Any]] = [{"name": "_id_", "key": {"_id": 1}}]
+        self.calls: Counter = Counter()
+        self.projections: List[Optional[Dict[str, Any]]] = []
+        self._failures: Dict[str, List[BaseException]] = defaultdict(list)
+
+    # Test helpers
+
+    def fail_next(self, method: str, error: BaseException):
+        """Make the next call of `method` raise `error`"""
+        self._failures[method].append(error)
+
+    def peek(self, query: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """The stored document (not a copy) matching `query`, without counting a call"""
+        return next((d for d in self.docs if matches(d, query)), None)
+
+    async def _call(self, method: str):
+        self.calls[method] += 1
+        await asyncio.sleep(0)
+        if self._failures[method]:
+            raise self._failures[method].pop(0)
+
+    # Indexes
+
+    async def create_index(self, keys, **options) -> str:
+        await self._call("create_index")
+        keys = [(keys, 1)] if isinstance(keys, str) else list(keys)
+        name = options.get("name") or "_".join(f"{field}_{direction}" for field, direction in keys)
+        if options.get("unique"):
+            fields = [field for field, _ in keys]
+            seen = set()
+            for doc in self.docs:
+                value = repr(self._key(doc, fields))
+                if value in seen:
+                    raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: {name}")
+                seen.add(value)
+        if not any(index["name"] == name for index in self.indexes):
+            self.indexes.append({**options, "name": name, "key": dict(keys)})
+        return name
+
+    def list_indexes(self) -> FakeCursor:
+        return FakeCursor(self.indexes)
+
+    def _unique_fields(self, with_id: bool = True) -> List[List[str]]:
+        unique = [list(index["key"]) for index in self.indexes if index.get("unique")]
+        return [["_id"]] + unique if with_id else unique
+
+    @staticmethod
+    def _key(doc: Dict[str, Any], fields: List[str]) -> List[Any]:
+        # A missing field is indexed as null
+        return [None if value is _MISSING else value for value in (_get(doc, field) for field in fields)]
+
+    def _check_unique(self, candidate: Dict[str, Any], with_id: bool = True):
+        for fields in self._unique_fields(with_id):
+            value = self._key(candidate, fields)
+            for doc in self.docs:
+                if doc is not candidate and self._key(doc, fields) == value:
+                    raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} dup key: {value}")
+
+    def _text_fields(self) -> List[str]:
+        return [field for index in self.indexes for field, kind in index["key"].items() if kind == "text"]
+
+    # Reads
+
+    def _select(self, query: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        hits = [d for d in self.docs if matches(d, query)]
+        if query and "$text" in query:
+            fields = self._text_fields()
+            if not fields:
+                raise OperationFailure("text index required for $text query", code=27)
+            words = {w.lower() for w in _WORD.findall(query["$text"]["$search"])}
+            scored = []
+            for doc in hits:
+                text = " ".join(str(_get(doc, f)) for f in fields if _get(doc, f) is not _MISSING)
+                score = len(words & {w.lower() for w in _WORD.findall(text)})
+                if score:
+                    scored.append({**doc, "__text_score": float(score)})
+            hits = scored
+        return hits
+
+    def find(self, query: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None, **kwargs):
+        self.calls["find"] += 1
+        self.projections.append(projection)
+        cursor = FakeCursor(self._select(query), projection)
+        if kwargs.get("sort"):
+            cursor.sort(kwargs["sort"])
+        if kwargs.get("limit"):
+            cursor.limit(kwargs["limit"])
+        return cursor
+
+    async def find_one(self, query: Optional[Dict[str, Any]] = None, projection=None, sort=None, **kwargs):
+        await self._call("find_one")
+        self.projections.append(projection)
+        hits = self._select(query)
+        if sort:
+            hits = _sort(hits, _sort_spec(sort))
+        return _project(hits[0], projection) if hits else None
+
+    async def count_documents(self, query: Dict[str, Any], **kwargs) -> int:
+        await self._call("count_documents")
+        return len(self._select(query))
+
+    def aggregate(self, pipeline: List[Dict[str, Any]], **kwargs) -> FakeCursor:
+        self.calls["aggregate"] += 1
+        docs = [copy.deepcopy(d) for d in self.docs]
+        for stage in pipeline:
+            (op, spec), = stage.items()
+            if op == "$match":
+                docs = [d for d in docs if matches(d, spec)]
+            elif op == "$group":
+                docs = _group(docs, spec)
+            elif op in ("$addFields", "$set"):
+                for d in docs:
+                    for field, expression in spec.items():
+                        _set(d, field, _evaluate(expression, d))
+            elif op == "$sort":
+                docs = _sort(docs, list(spec.items()))
+            elif op == "$skip":
+                docs = docs[spec:]
+            elif op == "$limit":
+                docs = docs[:spec]
+            elif op == "$project":
+                docs = [_project(d, spec) for d in docs]
+            else:
+                raise NotImplementedError(f"FakeCollection.aggregate does not support {op}")
+        return FakeCursor(docs)
+
+    # Writes
+
+    def _apply(self, doc: Dict[str, Any], update: Dict[str, Any], inserted: bool):
+        if isinstance(update, list):
+            raise NotImplementedError("FakeCollection does not run update pipelines")
+        for op, fields in update.items():
+            if op == "$setOnInsert" and not inserted:
+                continue
+            for path, value in fields.items():
+                current = _get(doc, path)
+                if op in ("$set", "$setOnInsert"):
+                    _set(doc, path, copy.deepcopy(value))
+                elif op == "$unset":
+                    _unset(doc, path)
+                elif op == "$inc":
+                    _set(doc, path, (0 if current is _MISSING else current) + value)
+                elif op == "$max":
+                    _set(doc, path, value if current is _MISSING or value > current else current)
+                elif op == "$min":
+                    _set(doc, path, value if current is _MISSING or value < current else current)
+                elif op == "$push":
+                    _set(doc, path, (current if current is not _MISSING else []) + [copy.deepcopy(value)])
+                elif op == "$addToSet":
+                    values = current if current is not _MISSING else []
+                    _set(doc, path, values if value in values else values + [copy.deepcopy(value)])
+                else:
+                    raise NotImplementedError(f"FakeCollection does not support {op}")
+
+    def _upsert_document(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        doc: Dict[str, Any] = {}
+        for field, condition in query.items():
+            if field.startswith("$"):
+                continue
+            if isinstance(condition, dict) and any(k.startswith("$") for k in condition):
+                if "$eq" in condition:
+                    _set(doc, field, copy.deepcopy(condition["$eq"]))
+                continue
+            _set(doc, field, copy.deepcopy(condition))
+        return doc
+
+    def _insert(self, doc: Dict[str, Any]) -> Any:
+        # A freshly generated ObjectId cannot collide, so only a caller-chosen _id is checked
+        generated = "_id" not in doc
+        doc.setdefault("_id", ObjectId())
+        self._check_unique(doc, with_id=not generated)
+        self.docs.append(doc)
+        return doc["_id"]
+
+    def _update(self, query, update, upsert: bool, many: bool, replace: bool = False) -> SimpleNamespace:
+        if many:
+            hits = [d for d in self.docs if matches(d, query)]
+        else:
+            first = self.peek(query)
+            hits = [first] if first is not None else []
+        for doc in hits:
+            before = copy.deepcopy(doc)
+            if replace:
+                doc.clear()
+                doc.update(copy.deepcopy(update))
+                if "_id" in before:
+                    doc["_id"] = before["_id"]
+            else:
+                self._apply(doc, update, inserted=False)
+            try:
+                self._check_unique(doc, with_id=False)  # _id is immutable
+            except DuplicateKeyError:
+                doc.clear()
+                doc.update(before)
+                raise
+        upserted_id = None
+        if not hits and upsert:
+            doc = self._upsert_document(query)
+            if replace:
+                doc = {**({"_id": doc["_id"]} if "_id" in doc else {}), **copy.deepcopy(update)}
+            else:
+                self._apply(doc, update, inserted=True)
+            upserted_id = self._insert(doc)
+        return SimpleNamespace(
+            matched_count=len(hits), modified_count=len(hits), upserted_id=upserted_id, acknowledged=True
+        )
+
+    async def insert_one(self, document: Dict[str, Any], **kwargs):
+        await self._call("insert_one")
+        inserted_id = self._insert(copy.deepcopy(document))
+        document.setdefault("_id", inserted_id)
+        return SimpleNamespace(inserted_id=inserted_id, acknowledged=True)
+
+    async def insert_many(self, documents: List[Dict[str, Any]], ordered: bool = True, **kwargs):
+        await self._call("insert_many")
+        inserted_ids = []
+        for document in documents:
+            inserted_ids.append(self._insert(copy.deepcopy(document)))
+            document.setdefault("_id", inserted_ids[-1])
+        return SimpleNamespace(inserted_ids=inserted_ids, acknowledged=True)
+
+    async def update_one(self, query, update, upsert: bool = False, **kwargs):
+        await self._call("update_one")
+        return self._update(query, update, upsert, many=False)
+
+    async def update_many(self, query, update, upsert: bool = False, **kwargs):
+        await self._call("update_many")
+        return self._update(query, update, upsert, many=True)
+
+    async def replace_one(self, query, replacement, upsert: bool = False, **kwargs):
+        await self._call("replace_one")
+        return self._update(query, replacement, upsert, many=False, replace=True)
+
+    async def find_one_and_update(
+        self, query, update, projection=None, sort=None, upsert: bool = False, return_document=False, **kwargs
+    ):
+        await self._call("find_one_and_update")
+        hits = [d for d in self.docs if matches(d, query)]
+        if sort:
+            hits = _sort(hits, _sort_spec(sort))
+        if not hits:
+            if not upsert:
+                return None
+            doc = self._upsert_document(query)
+            self._apply(doc, update, inserted=True)
+            self._insert(doc)
+            return _project(doc, projection) if return_document else None
+        doc = hits[0]
+        before = _project(doc, projection)
+        self._apply(doc, update, inserted=False)
+        return _project(doc, projection) if return_document else before
+
+    async def delete_one(self, query, **kwargs):
+        await self._call("delete_one")
+        doc = self.peek(query)
+        if doc is not None:
+            self.docs.remove(doc)
+        return SimpleNamespace(deleted_count=0 if doc is None else 1, acknowledged=True)
+
+    async def delete_many(self, query, **kwargs):
+        await self._call("delete_many")
+        kept = [d for d in self.docs if not matches(d, query)]
+        deleted = len(self.docs) - len(kept)
+        self.docs[:] = kept
+        return SimpleNamespace(deleted_count=deleted, acknowledged=True)
+
+    async def bulk_write(self, operations, ordered: bool = True, **kwargs):
+        await self._call("bulk_write")
+        counts = Counter()
+        for op in operations:
+            if isinstance(op, InsertOne):
+                self._insert(copy.deepcopy(op._doc))
+                counts["inserted"] += 1
+            elif isinstance(op, (DeleteOne, DeleteMany)):
+                hits = [d for d in self.docs if matches(d, op._filter)]
+                for doc in hits if isinstance(op, DeleteMany) else hits[:1]:
+                    self.docs.remove(doc)
+                    counts["deleted"] += 1
+            elif isinstance(op, (UpdateOne, UpdateMany, ReplaceOne)):
+                result = self._update(
+                    op._filter,
+                    op._doc,
+                    bool(op._upsert),
+                    many=isinstance(op, UpdateMany),
+                    replace=isinstance(op, ReplaceOne),
+                )
+                counts["matched"] += result.matched_count
+                counts["upserted"] += result.upserted_id is not None
+            else:
+                raise NotImplementedError(f"FakeCollection.bulk_write does not support {type(op).__name__}")
+        return SimpleNamespace(
+            inserted_count=counts["inserted"],
+            matched_count=counts["matched"],
+            modified_count=counts["matched"],
+            upserted_count=counts["upserted"],
+            deleted_count=counts["deleted"],
+            acknowledged=True,
+        )
+
+    def watch(self, *args, **kwargs):
+        raise OperationFailure("The $changeStream stage is only supported on replica sets", code=40573)
+
+
+class FakeDB:
+    """In-memory stand-in for a Motor database; collections are created on first access"""
+
+    def __init__(self, **collections: List[Dict[str, Any]]):
+        self._collections: Dict[str, FakeCollection] = {}
+        for name, docs in collections.items():
+            self._collections[name] = FakeCollection(name, docs)
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        if name not in self._collections:
+            self._collections[name] = FakeCollection(name)
+        return self._collections[name]
+
+    def __getattr__(self, name: str) -> FakeCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
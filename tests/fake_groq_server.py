@@ -0,0 +1,261 @@
+"""
+Offline Groq stand-in server
+Speaks the /chat/completions (plain and streamed), /audio/speech, /audio/transcriptions and
+/models shapes AIService uses, with configurable latency, 429 injection and payload recording,
+so AIService can be load tested without spending Groq quota.
+
+Usage: python tests/fake_groq_server.py [--port 8787] [--latency uniform:0.2,0.8] [--rate-limit 0.05]
+Then start the backend with GROQ_BASE_URL=http://localhost:8787
+Inspect with GET /_fake/stats and /_fake/requests, clear with POST /_fake/reset
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Optional
+
+from aiohttp import web
+
+DEFAULT_REPLY = (
+    "Great question, Boss! Focus on consistent streaming hours, engage your audience early, "
+    "and plan PK battles for peak times to grow your beans [1].\n\nSources:\n[1] BIGO Live Guide"
+)
+
+# A tiny valid WAV header followed by silence
+SILENT_WAV = (
+    b"RIFF$\x00\x00\x00WAVEfmt \x10\x00\x00\x00\x01\x00\x01\x00\x80>\x00\x00\x00}\x00\x00\x02\x00\x10\x00"
+    b"data\x00\x00\x00\x00"
+)
+
+MODELS = ["llama-3.3-70b-versatile", "llama-3.1-8b-instant", "playai-tts", "whisper-large-v3"]
+
+
+def parse_latency(spec: str):
+    """
+    Latency distribution in seconds from a spec string:
+    "fixed:0.2", "uniform:0.1,0.5", "normal:0.3,0.1" or "lognormal:mu,sigma" (of ln seconds)
+    """
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v]
+    samplers = {
+        "fixed": lambda: values[0],
+        "uniform": lambda: random.uniform(values[0], values[1]),
+        "normal": lambda: random.gauss(values[0], values[1]),
+        "lognormal": lambda: random.lognormvariate(values[0], values[1]),
+    }
+    if kind not in samplers:
+        raise ValueError(f"Unknown latency distribution: {spec}")
+    sampler = samplers[kind]
+    return lambda: max(0.0, sampler())
+
+
+@dataclass
+class FakeGroqConfig:
+    latency: str = "fixed:0"
+    # Delay between streamed chunks
+    token_delay: float = 0.0
+    # Probability of answering 429 instead of serving the request
+    rate_limit: float = 0.0
+    # Answer 429 to this many requests before serving any (deterministic injection)
+    rate_limit_first: int = 0
+    retry_after: float = 0.1
+    reply: str = DEFAULT_REPLY
+    transcription: str = "how do I win more pk battles"
+    # Request payloads kept for /_fake/requests
+    record_limit: int = 1000
+
+
+@dataclass
+class FakeGroq:
+    config: FakeGroqConfig = field(default_factory=FakeGroqConfig)
+    calls: Counter = field(default_factory=Counter)
+    rate_limited: Counter = field(default_factory=Counter)
+    in_flight: int = 0
+    max_in_flight: int = 0
+    requests: Deque[Dict[str, Any]] = field(default_factory=deque)
+    url: Optional[str] = None
+
+    def __post_init__(self):
+        self._latency = parse_latency(self.config.latency)
+        self.requests = deque(maxlen=self.config.record_limit)
+
+    def reset(self):
+        self.calls.clear()
+        self.rate_limited.clear()
+        self.requests.clear()
+        self.max_in_flight = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": dict(self.calls),
+            "rate_limited": dict(self.rate_limited),
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+        }
+
+    def _rate_limit_headers(self) -> Dict[str, str]:
+        return {
+            "x-ratelimit-limit-requests": "1000",
+            "x-ratelimit-remaining-requests": "999",
+            "x-ratelimit-reset-requests": "60ms",
+            "x-ratelimit-limit-tokens": "1000000",
+            "x-ratelimit-remaining-tokens": "999000",
+            "x-ratelimit-reset-tokens": "60ms",
+        }
+
+    async def _begin(self, endpoint: str, payload: Any) -> Optional[web.Response]:
+        """Count and record a call, wait out the sampled latency, maybe answer 429"""
+        self.calls[endpoint] += 1
+        self.requests.append({"endpoint": endpoint, "at": time.time(), "payload": payload})
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self._latency())
+        finally:
+            self.in_flight -= 1
+        injected = sum(self.rate_limited.values()) < self.config.rate_limit_first
+        if injected or random.random() < self.config.rate_limit:
+            self.rate_limited[endpoint] += 1
+            headers = {**self._rate_limit_headers(), "x-ratelimit-remaining-requests": "0"}
+            headers["retry-after"] = str(self.config.retry_after)
+            return web.json_response(
+                {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                status=429,
+                headers=headers,
+            )
+        return None
+
+    @staticmethod
+    def _usage(payload: Dict[str, Any], content: str) -> Dict[str, int]:
+        prompt_tokens = sum(len(m.get("content") or "") for m in payload.get("messages", [])) // 4
+        completion_tokens = len(content) // 4
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+    async def chat_completions(self, request: web.Request) -> web.StreamResponse:
+        payload = await request.json()
+        limited = await self._begin("chat_completions", payload)
+        if limited is not None:
+            return limited
+        model = payload.get("model", MODELS[0])
+        content = self.config.reply
+        usage = self._usage(payload, content)
+        created = int(time.time())
+
+        if not payload.get("stream"):
+            return web.json_response(
+                {
+                    "id": f"chatcmpl-fake-{created}",
+                    "object": "chat.completion",
+                    "created": created,
+                    "model": model,
+                    "choices": [
+                        {"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}
+                    ],
+                    "usage": usage,
+                },
+                headers=self._rate_limit_headers(),
+            )
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", **self._rate_limit_headers()})
+        await response.prepare(request)
+        words = content.split(" ")
+        for i, word in enumerate(words):
+            chunk = {
+                "object": "chat.completion.chunk",
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}}],
+            }
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            if self.config.token_delay:
+                await asyncio.sleep(self.config.token_delay)
+        final = {
+            "object": "chat.completion.chunk",
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            "x_groq": {"usage": usage},
+        }
+        await response.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+        await response.write_eof()
+        return response
+
+    async def audio_speech(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        limited = await self._begin("audio_speech", payload)
+        if limited is not None:
+            return limited
+        return web.Response(body=SILENT_WAV, content_type="audio/wav", headers=self._rate_limit_headers())
+
+    async def audio_transcriptions(self, request: web.Request) -> web.Response:
+        form = await request.post()
+        upload = form.get("file")
+        payload = {"model": form.get("model"), "filename": getattr(upload, "filename", None)}
+        limited = await self._begin("audio_transcriptions", payload)
+        if limited is not None:
+            return limited
+        return web.json_response({"text": self.config.transcription}, headers=self._rate_limit_headers())
+
+    async def models(self, request: web.Request) -> web.Response:
+        limited = await self._begin("models", None)
+        if limited is not None:
+            return limited
+        data = [{"id": name, "object": "model", "owned_by": "fake-groq"} for name in MODELS]
+        return web.json_response({"object": "list", "data": data})
+
+    async def get_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats())
+
+    async def get_requests(self, request: web.Request) -> web.Response:
+        return web.json_response(list(self.requests))
+
+    async def post_reset(self, request: web.Request) -> web.Response:
+        self.reset()
+        return web.json_response({"success": True})
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/chat/completions", self.chat_completions)
+        app.router.add_post("/audio/speech", self.audio_speech)
+        app.router.add_post("/audio/transcriptions", self.audio_transcriptions)
+        app.router.add_get("/models", self.models)
+        app.router.add_get("/_fake/stats", self.get_stats)
+        app.router.add_get("/_fake/requests", self.get_requests)
+        app.router.add_post("/_fake/reset", self.post_reset)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> web.AppRunner:
+        """Serve in the running event loop; the bound URL is in self.url"""
+        runner = web.AppRunner(self.make_app())
+        await runner.setup()
+        site = web.TCPSite(runner, host, port)
+        await site.start()
+        bound_port = runner.addresses[0][1]
+        self.url = f"http://{host}:{bound_port}"
+        return runner
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--latency", default="lognormal:-1.0,0.5", help="response latency distribution (seconds)")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="seconds between streamed chunks")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="probability of answering 429")
+    parser.add_argument("--retry-after", type=float, default=0.1, help="retry-after seconds sent with 429s")
+    args = parser.parse_args()
+
+    config = FakeGroqConfig(
+        latency=args.latency, token_delay=args.token_delay, rate_limit=args.rate_limit, retry_after=args.retry_after
+    )
+    print(f"Fake Groq on http://{args.host}:{args.port} (latency {args.latency}, 429 rate {args.rate_limit})")
+    web.run_app(FakeGroq(config).make_app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
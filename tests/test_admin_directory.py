@@ -0,0 +1,87 @@
+"""
+Tests for the event-driven admin directory and its reconciliation
+"""
+import pytest
+
+from backend.services.admin_directory import DEFAULT_PERMISSIONS, AdminDirectory
+from tests.conftest import FakeDB
+
+pytestmark = pytest.mark.anyio
+
+
+def _writes(collection):
+    return sum(collection.calls[m] for m in ("update_one", "delete_one", "delete_many", "bulk_write"))
+
+
+def _user(n, role="host", **extra):
+    return {"id": f"u{n}", "bigo_id": f"b{n}", "email": f"u{n}@example.com", "name": f"User {n}", "role": role, **extra}
+
+
+async def _directory(users):
+    directory = AdminDirectory(reconcile_interval=3600)
+    directory.set_db(FakeDB(users=users))
+    await directory.reconcile()
+    return directory
+
+
+async def test_reconcile_builds_rows_and_roster_and_is_idempotent():
+    directory = await _directory(
+        [_user(1, "admin"), _user(2, "owner", permissions=["manage_users"]), _user(3), _user(4, "coach")]
+    )
+    admins = directory.db.admins
+    assert sorted(d["user_id"] for d in admins.docs) == ["u1", "u2"]
+    assert directory.has_permission("u2", "manage_users")
+    assert not directory.has_permission("u2", "view_analytics")
+    ids = {d["user_id"]: d["id"] for d in admins.docs}
+
+    writes = _writes(admins)
+    assert await directory.reconcile() == {"admins": 2, "written": 0}
+    assert _writes(admins) == writes
+    # Row ids are stable across reconciles
+    assert {d["user_id"]: d["id"] for d in admins.docs} == ids
+
+
+async def test_registering_a_host_costs_no_database_work_regardless_of_admin_count():
+    directory = await _directory([_user(n, "admin") for n in range(300)])
+    db = directory.db
+    reads, writes = db.users.calls["find"] + db.admins.calls["find"], _writes(db.admins)
+    await directory.role_changed(_user(1000), new_user=True)
+    assert db.users.calls["find"] + db.admins.calls["find"] == reads
+    assert _writes(db.admins) == writes
+    assert not directory.is_admin("u1000")
+
+
+async def test_role_change_events_touch_only_the_affected_row():
+    directory = await _directory([_user(1, "admin"), _user(2, "admin")])
+    admins = directory.db.admins
+    writes = _writes(admins)
+
+    await directory.role_changed(_user(3, "owner"), new_user=True)
+    assert directory.is_admin("u3")
+    assert directory.has_permission("u3", "view_analytics")
+    await directory.role_changed({"id": "u1", "role": "coach"})
+    assert not directory.is_admin("u1")
+    assert sorted(d["user_id"] for d in admins.docs) == ["u2", "u3"]
+    assert _writes(admins) == writes + 2
+    assert directory.stats()["events"] == 2
+
+
+async def test_reconcile_repairs_drift_from_writes_made_elsewhere():
+    directory = await _directory([_user(1, "admin"), _user(2, "admin")])
+    users = directory.db.users.docs
+    users[0]["role"] = "host"  # demoted by a script
+    users[1]["name"] = "Renamed"
+    users.append(_user(5, "owner"))
+
+    assert await directory.reconcile() == {"admins": 2, "written": 3}
+    assert sorted(directory.roster) == ["u2", "u5"]
+    assert directory.roster["u2"]["name"] == "Renamed"
+
+    await directory.reconcile(rebuild=True)
+    assert sorted(d["user_id"] for d in directory.db.admins.docs) == ["u2", "u5"]
+
+
+def test_admins_promoted_elsewhere_get_default_permissions_until_reconciled():
+    directory = AdminDirectory(reconcile_interval=3600)
+    assert all(directory.has_permission("unknown", p) for p in DEFAULT_PERMISSIONS)
+    assert not directory.has_permission("unknown", "billing")
@@ -0,0 +1,119 @@
+"""
+Concurrency tests for AIService against the offline Groq stand-in server
+"""
+import asyncio
+import time
+
+import pytest
+
+from backend.services.ai_scheduler import AIScheduler
+from backend.services.ai_service import AIService
+from backend.services.http_client import http_client
+from tests.fake_groq_server import DEFAULT_REPLY, FakeGroq, FakeGroqConfig, parse_latency
+
+# Use anyio for async support (already installed)
+pytestmark = pytest.mark.anyio
+
+
+async def _start(**config):
+    fake = FakeGroq(FakeGroqConfig(**config))
+    runner = await fake.start()
+    service = AIService()
+    service.chat_url = f"{fake.url}/chat/completions"
+    service.tts_url = f"{fake.url}/audio/speech"
+    service.stt_url = f"{fake.url}/audio/transcriptions"
+    service.models_url = f"{fake.url}/models"
+    service.scheduler = AIScheduler(max_concurrency=16)
+    service.scheduler.base_backoff = 0.01
+    return fake, service, runner
+
+
+async def _stop(runner):
+    # The pooled sessions belong to this test's event loop
+    await http_client.close()
+    await runner.cleanup()
+
+
+@pytest.fixture
+async def fake_groq():
+    fake, service, runner = await _start(latency="uniform:0.02,0.05")
+    yield fake, service
+    await _stop(runner)
+
+
+def _messages(i):
+    return [{"role": "user", "content": f"How do I earn more beans? #{i}"}]
+
+
+async def test_concurrent_requests_are_served_in_parallel(fake_groq):
+    fake, service = fake_groq
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*[service.chat_completion(_messages(i)) for i in range(40)])
+    elapsed = time.perf_counter() - start
+
+    assert all(r["success"] and r["content"] == DEFAULT_REPLY for r in results)
+    assert fake.calls["chat_completions"] == 40
+    assert fake.max_in_flight > 1
+    # 40 calls of at least 20 ms each, serially, would take 0.8 s
+    assert elapsed < 0.8
+
+
+async def test_identical_concurrent_requests_reach_upstream_once(fake_groq):
+    fake, service = fake_groq
+
+    results = await asyncio.gather(*[service.chat_completion(_messages(0)) for _ in range(20)])
+
+    assert all(r["success"] for r in results)
+    assert fake.calls["chat_completions"] == 1
+
+
+async def test_injected_rate_limits_are_retried():
+    fake, service, runner = await _start(rate_limit_first=2, retry_after=0.01)
+    try:
+        result = await service.chat_completion(_messages(1))
+    finally:
+        await _stop(runner)
+
+    assert result["success"] is True
+    assert fake.rate_limited["chat_completions"] == 2
+    assert fake.calls["chat_completions"] == 3
+    assert service.scheduler.stats()["lanes"]["interactive"]["rate_limited"] == 2
+
+
+async def test_streaming_and_payload_recording(fake_groq):
+    fake, service = fake_groq
+
+    events = [e async for e in service.chat_completion_stream(_messages(2), temperature=0.3)]
+
+    deltas = [e["content"] for e in events if e["type"] == "delta"]
+    assert len(deltas) > 1
+    assert events[-1]["type"] == "done"
+    assert events[-1]["content"] == DEFAULT_REPLY
+    assert events[-1]["usage"]["completion_tokens"] > 0
+    recorded = fake.requests[-1]["payload"]
+    assert recorded["stream"] is True
+    assert recorded["temperature"] == 0.3
+
+
+async def test_audio_and_model_endpoints(fake_groq, tmp_path):
+    fake, service = fake_groq
+    audio = tmp_path / "clip.wav"
+    audio.write_bytes(b"RIFF0000WAVE")
+
+    tts = await service.tts_generate("hello")
+    stt = await service.stt_transcribe_file(str(audio))
+    models = await service.list_models()
+
+    assert tts["success"] and tts["audio_base64"]
+    assert stt == {"success": True, "text": fake.config.transcription}
+    assert models["success"] and any(m["id"] == service.default_chat_model for m in models["data"])
+    assert fake.requests[-2]["payload"]["filename"] == "clip.wav"
+
+
+def test_parse_latency():
+    assert parse_latency("fixed:0.2")() == 0.2
+    assert 0.1 <= parse_latency("uniform:0.1,0.3")() <= 0.3
+    assert parse_latency("normal:-5,0.1")() == 0.0
+    with pytest.raises(ValueError):
+        parse_latency("gamma:1,2")
@@ -0,0 +1,185 @@
+"""
+Tests for the AI request scheduler: lane priority, rate-limit headers and retries
+"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from backend.services.ai_scheduler import AIScheduler, parse_reset_duration, BACKGROUND, BATCH, INTERACTIVE
+from backend.services.ai_service import AIService
+
+# Use anyio for async support (already installed)
+pytestmark = pytest.mark.anyio
+
+
+def test_parse_reset_duration():
+    assert parse_reset_duration("7.66s") == pytest.approx(7.66)
+    assert parse_reset_duration("2m59.56s") == pytest.approx(179.56)
+    assert parse_reset_duration("120ms") == pytest.approx(0.12)
+    assert parse_reset_duration("3") == 3.0
+    assert parse_reset_duration("") is None
+    assert parse_reset_duration("soon") is None
+
+
+async def test_interactive_waiters_are_served_before_background():
+    scheduler = AIScheduler(max_concurrency=1)
+    order = []
+    release = asyncio.Event()
+
+    async def holder():
+        async with scheduler.slot(INTERACTIVE):
+            await release.wait()
+
+    async def job(lane, name):
+        async with scheduler.slot(lane):
+            order.append(name)
+
+    first = asyncio.ensure_future(holder())
+    await asyncio.sleep(0)
+    queued = [
+        asyncio.ensure_future(job(BACKGROUND, "background")),
+        asyncio.ensure_future(job(BATCH, "batch")),
+        asyncio.ensure_future(job(INTERACTIVE, "interactive")),
+    ]
+    await asyncio.sleep(0)
+    assert scheduler.stats()["lanes"][BACKGROUND]["queue_depth"] == 1
+
+    release.set()
+    await asyncio.gather(first, *queued)
+    assert order == ["interactive", "batch", "background"]
+
+
+async def test_background_lane_leaves_slots_for_interactive():
+    scheduler = AIScheduler(max_concurrency=4)
+    release = asyncio.Event()
+
+    async def job(lane):
+        async with scheduler.slot(lane):
+            await release.wait()
+
+    jobs = [asyncio.ensure_future(job(BACKGROUND)) for _ in range(4)]
+    await asyncio.sleep(0)
+    lanes = scheduler.stats()["lanes"]
+    assert lanes[BACKGROUND]["active"] == 2
+    assert lanes[BACKGROUND]["queue_depth"] == 2
+
+    interactive = asyncio.ensure_future(job(INTERACTIVE))
+    await asyncio.sleep(0)
+    assert scheduler.stats()["lanes"][INTERACTIVE]["active"] == 1
+
+    release.set()
+    await asyncio.gather(interactive, *jobs)
+
+
+async def test_execute_retries_rate_limited_attempts():
+    scheduler = AIScheduler(max_concurrency=2, max_attempts=3)
+    scheduler.base_backoff = 0.001
+    responses = [
+        (429, {"retry-after": "0.01"}, "limited"),
+        (
+            200,
+            {
+                "x-ratelimit-limit-requests": "14400",
+                "x-ratelimit-remaining-requests": "14399",
+                "x-ratelimit-reset-requests": "6s",
+            },
+            "ok",
+        ),
+    ]
+    attempt = AsyncMock(side_effect=responses)
+
+    assert await scheduler.execute(BATCH, attempt) == "ok"
+    assert attempt.await_count == 2
+
+    stats = scheduler.stats()
+    assert stats["lanes"][BATCH]["retries"] == 1
+    assert stats["lanes"][BATCH]["rate_limited"] == 1
+    assert stats["rate_limits"]["requests"]["capacity"] == 14400
+
+
+async def test_execute_gives_up_after_max_attempts():
+    scheduler = AIScheduler(max_attempts=2)
+    scheduler.base_backoff = 0.001
+    attempt = AsyncMock(return_value=(503, {}, {"success": False, "error": "API error: 503"}))
+
+    result = await scheduler.execute(INTERACTIVE, attempt)
+
+    assert result["error"] == "API error: 503"
+    assert attempt.await_count == 2
+
+
+async def test_exhausted_token_budget_delays_background_work():
+    scheduler = AIScheduler()
+    scheduler.observe_headers(
+        {
+            "x-ratelimit-limit-tokens": "1000",
+            "x-ratelimit-remaining-tokens": "300",
+            "x-ratelimit-reset-tokens": "7s",
+        }
+    )
+    # Interactive may spend down to zero; background must leave a quarter of the budget
+    assert scheduler.tokens_bucket.wait_time(200, 0.0) == 0.0
+    assert scheduler.tokens_bucket.wait_time(200, 0.25) > 0.0
+
+
+async def test_estimate_above_the_lane_reserve_waits_only_for_a_full_bucket():
+    scheduler = AIScheduler()
+    scheduler.observe_headers(
+        {
+            "x-ratelimit-limit-tokens": "1000",
+            "x-ratelimit-remaining-tokens": "1000",
+            "x-ratelimit-reset-tokens": "60s",
+        }
+    )
+    # 900 + a quarter reserve is more than the bucket holds; a full bucket must still be enough
+    assert scheduler.tokens_bucket.wait_time(900, 0.25) == 0.0
+    scheduler.tokens_bucket.tokens = 500
+    assert scheduler.tokens_bucket.wait_time(900, 0.25) < 60
+
+
+async def test_waiting_for_budget_does_not_hold_a_lane_slot():
+    scheduler = AIScheduler(max_concurrency=2)
+    scheduler.observe_headers(
+        {
+            "x-ratelimit-limit-tokens": "1000",
+            "x-ratelimit-remaining-tokens": "0",
+            "x-ratelimit-reset-tokens": "60s",
+        }
+    )
+
+    async def starved():
+        async with scheduler.slot(BACKGROUND, estimated_tokens=500):
+            pass
+
+    task = asyncio.create_task(starved())
+    await asyncio.sleep(0.01)
+    assert scheduler._active[BACKGROUND] == 0
+    # The only background slot (max_concurrency // 2) is free for work that needs no token budget
+    await asyncio.wait_for(_enter(scheduler.slot(BACKGROUND)), timeout=1)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert scheduler._active[BACKGROUND] == 0
+
+
+async def _enter(slot):
+    async with slot:
+        pass
+
+
+async def test_compression_runs_on_background_lane():
+    service = AIService()
+    db = MagicMock()
+    db.conversations.find_one = AsyncMock(return_value={"messages": [{"role": "user", "content": "hi"}] * 12})
+    db.conversations.update_one = AsyncMock()
+    service.set_db(db)
+    service.chat_completion = AsyncMock(return_value={"success": True, "content": "summary"})
+
+    await service.compact_conversation("session-1", "user-1")
+
+    assert service.chat_completion.await_args.kwargs["lane"] == BACKGROUND
+
+
+if __name__ == "__main__":
+    # Run tests
+    pytest.main([__file__, "-v"])
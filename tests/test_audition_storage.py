@@ -0,0 +1,193 @@
+"""
+Tests for streaming audition chunks into GridFS without local temp files
+"""
+import hashlib
+import re
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+
+from backend.services.audition_storage import (
+    AuditionStorage,
+    UploadFormatError,
+    UploadTooLarge,
+    multipart_field,
+    ordered_chunks,
+    request_chunks,
+)
+from tests.conftest import FakeCursor
+
+pytestmark = pytest.mark.anyio
+
+GRID_CHUNK = 255 * 1024
+
+
+class FakeGridIn:
+    def __init__(self, bucket, file_id, filename, metadata):
+        self.bucket = bucket
+        self._id = file_id
+        self.chunk_size = GRID_CHUNK
+        self.doc = {"_id": file_id, "filename": filename, "metadata": metadata, "data": bytearray()}
+        self.write_sizes = []
+        self.aborted = False
+
+    async def write(self, data):
+        self.write_sizes.append(len(data))
+        self.doc["data"] += data
+
+    async def set(self, name, value):
+        self.doc[name] = value
+
+    async def close(self):
+        self.doc["uploadDate"] = datetime.now(timezone.utc)
+        self.bucket.files[self._id] = self.doc
+
+    async def abort(self):
+        self.aborted = True
+
+
+class FakeGridOut:
+    def __init__(self, doc):
+        self.data = bytes(doc["data"])
+        self.offset = 0
+        self._id = doc["_id"]
+        self.filename = doc["filename"]
+        self.upload_date = doc.get("uploadDate")
+
+    async def read(self, size):
+        data = self.data[self.offset : self.offset + size]
+        self.offset += len(data)
+        return data
+
+    def close(self):
+        pass
+
+
+class FakeBucket:
+    def __init__(self):
+        self.files = {}
+        self.streams = []
+
+    def open_upload_stream(self, filename, metadata=None):
+        grid_in = FakeGridIn(self, len(self.streams) + 1, filename, metadata)
+        self.streams.append(grid_in)
+        return grid_in
+
+    async def open_download_stream(self, file_id):
+        return FakeGridOut(self.files[file_id])
+
+    def find(self, query):
+        pattern = re.compile(query["filename"]["$regex"])
+        return FakeCursor([FakeGridOut(d) for d in self.files.values() if pattern.search(d["filename"])])
+
+    async def delete(self, file_id):
+        del self.files[file_id]
+
+
+async def _pieces(data, size):
+    for start in range(0, len(data), size):
+        yield data[start : start + size]
+
+
+def _storage():
+    storage = AuditionStorage(read_bytes=1024 * 1024)
+    storage.set_bucket(FakeBucket())
+    return storage
+
+
+async def test_store_hashes_and_counts_on_the_fly_with_bounded_writes():
+    storage = _storage()
+    payload = bytes(range(256)) * (12 * 1024)  # 3 MB
+    stored = await storage.store("u_a.mp4:0", _pieces(payload, 64 * 1024), metadata={"upload_id": "u"})
+
+    assert stored.length == len(payload)
+    assert stored.sha256 == hashlib.sha256(payload).hexdigest()
+    doc = storage.bucket.files[stored.file_id]
+    assert bytes(doc["data"]) == payload
+    assert doc["metadata"] == {"upload_id": "u", "size": len(payload), "sha256": stored.sha256}
+    # Never more than one GridFS chunk plus one body message held before a write
+    assert max(storage.bucket.streams[0].write_sizes) < GRID_CHUNK + 64 * 1024
+    assert storage.stats()["bytes"] == len(payload)
+
+
+async def test_stream_over_the_limit_is_aborted_and_nothing_is_kept():
+    storage = _storage()
+    with pytest.raises(UploadTooLarge):
+        await storage.store("u_a.mp4:0", _pieces(b"x" * 10_000, 1000), max_bytes=5000)
+    assert storage.bucket.streams[0].aborted
+    assert storage.bucket.files == {}
+    assert storage.stats()["rejected_too_large"] == 1
+
+
+def _multipart(payload, boundary="XyZ"):
+    return (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"note\"\r\n\r\nhello\r\n"
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"chunk\"; filename=\"blob\"\r\n"
+        "Content-Type: application/octet-stream\r\n\r\n"
+    ).encode() + payload + f"\r\n--{boundary}--\r\n".encode()
+
+
+async def test_multipart_field_yields_only_the_named_field_across_message_boundaries():
+    payload = bytes(range(256)) * 400 + b"\r\n--XyZ-not-a-boundary"
+    headers = {"content-type": "multipart/form-data; boundary=XyZ"}
+    received = b"".join([piece async for piece in multipart_field(headers, _pieces(_multipart(payload), 777), "chunk")])
+    assert received == payload
+
+    with pytest.raises(UploadFormatError):
+        async for _ in multipart_field(headers, _pieces(_multipart(payload), 777), "video"):
+            pass
+
+
+def test_retried_chunks_collapse_to_the_newest_revision_in_index_order():
+    now = datetime.now(timezone.utc)
+    files = [
+        {"_id": 1, "filename": "u_a.mp4:10", "uploadDate": now},
+        {"_id": 2, "filename": "u_a.mp4:2", "uploadDate": now},
+        {"_id": 3, "filename": "u_a.mp4:2", "uploadDate": now + timedelta(seconds=1)},
+    ]
+    assert [f["_id"] for f in ordered_chunks(files)] == [3, 1]
+
+
+async def test_compose_pipes_stored_chunks_into_one_hashed_file():
+    storage = _storage()
+    parts = [bytes([n]) * (300 * 1024 + n) for n in range(4)]
+    for index in (2, 0, 3, 1):
+        await storage.store(f"u_a.mp4:{index}", _pieces(parts[index], 64 * 1024), metadata={"upload_id": "u"})
+
+    chunks = await storage.chunk_files("u_a.mp4", "u")
+    final = await storage.store("u_a.mp4", storage.read_files(c["_id"] for c in chunks))
+    assert final.sha256 == hashlib.sha256(b"".join(parts)).hexdigest()
+
+    await storage.delete_chunks("u_a.mp4", "u")
+    assert [d["filename"] for d in storage.bucket.files.values()] == ["u_a.mp4"]
+
+
+async def test_chunk_lookups_treat_the_file_name_literally():
+    storage = _storage()
+    await storage.store("u_take 1.mp4:0", _pieces(b"other", 5), metadata={"upload_id": "u"})
+    await storage.store("u_take (1.mp4:0", _pieces(b"mine", 4), metadata={"upload_id": "u"})
+
+    chunks = await storage.chunk_files("u_take (1.mp4", "u")
+    assert [c["filename"] for c in chunks] == ["u_take (1.mp4:0"]
+    await storage.delete_chunks("u_take (1).mp4", "u")
+    assert len(storage.bucket.files) == 2
+
+
+async def test_request_bodies_stream_into_storage_for_raw_and_multipart_uploads():
+    storage = _storage()
+    app = FastAPI()
+
+    @app.post("/chunk")
+    async def chunk(request: Request):
+        stored = await storage.store("u_a.mp4:0", request_chunks(request))
+        return {"bytes": stored.length, "sha256": stored.sha256}
+
+    payload = b"\x00\x01video" * 100_000
+    expected = {"bytes": len(payload), "sha256": hashlib.sha256(payload).hexdigest()}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        raw = await client.post("/chunk", content=payload, headers={"content-type": "application/octet-stream"})
+        form = await client.post("/chunk", files={"chunk": ("blob", payload, "application/octet-stream")})
+    assert raw.json() == expected
+    assert form.json() == expected
@@ -0,0 +1,101 @@
+"""
+Tests for server-sent event parsing in AIService.chat_completion_stream
+"""
+import json
+import pytest
+from unittest.mock import AsyncMock
+
+from backend.services.ai_service import AIService
+
+# Use anyio for async support (already installed)
+pytestmark = pytest.mark.anyio
+
+
+class FakeStreamResponse:
+    def __init__(self, status, lines):
+        self.status = status
+        self.headers = {}
+        self._lines = lines
+        self.content = self._iter_lines()
+
+    async def _iter_lines(self):
+        for line in self._lines:
+            yield line
+
+    async def text(self):
+        return "upstream failure"
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    def __init__(self, response):
+        self.response = response
+        self.payloads = []
+
+    def post(self, url, json=None, headers=None, **kwargs):
+        self.payloads.append(json)
+        return self.response
+
+
+def _sse(chunk):
+    return f"data: {json.dumps(chunk)}\n".encode("utf-8")
+
+
+def _service(response):
+    service = AIService()
+    service.get_api_key = AsyncMock(return_value="test-key")
+    session = FakeSession(response)
+    service._get_session = AsyncMock(return_value=session)
+    return service, session
+
+
+async def test_stream_yields_deltas_then_done():
+    lines = [
+        _sse({"choices": [{"delta": {"role": "assistant"}}]}),
+        b"\n",
+        _sse({"choices": [{"delta": {"content": "Stream "}}]}),
+        b": keep-alive comment\n",
+        _sse({"choices": [{"delta": {"content": "at 7pm"}}]}),
+        _sse({"choices": [{"delta": {}}], "x_groq": {"usage": {"completion_tokens": 3}}}),
+        b"data: [DONE]\n",
+    ]
+    service, session = _service(FakeStreamResponse(200, lines))
+
+    events = [e async for e in service.chat_completion_stream([{"role": "user", "content": "when?"}])]
+
+    assert [e["content"] for e in events if e["type"] == "delta"] == ["Stream ", "at 7pm"]
+    assert events[-1] == {
+        "type": "done",
+        "content": "Stream at 7pm",
+        "model": service.default_chat_model,
+        "usage": {"completion_tokens": 3},
+    }
+    assert session.payloads[0]["stream"] is True
+
+
+async def test_stream_reports_upstream_error():
+    service, _ = _service(FakeStreamResponse(401, []))
+    events = [e async for e in service.chat_completion_stream([{"role": "user", "content": "hi"}])]
+    assert len(events) == 1
+    assert events[0]["type"] == "error"
+    assert "401" in events[0]["error"]
+
+
+async def test_chat_completion_stream_flag_returns_full_result():
+    lines = [_sse({"choices": [{"delta": {"content": "PK "}}]}), _sse({"choices": [{"delta": {"content": "tips"}}]})]
+    service, _ = _service(FakeStreamResponse(200, lines + [b"data: [DONE]\n"]))
+
+    result = await service.chat_completion([{"role": "user", "content": "pk?"}], stream=True)
+
+    assert result["success"] is True
+    assert result["content"] == "PK tips"
+
+
+if __name__ == "__main__":
+    # Run tests
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,166 @@
+"""
+Tests for upstream circuit breakers and hedged requests
+"""
+import asyncio
+import time
+
+import pytest
+
+from backend.services import circuit_breaker
+from backend.services.ai_scheduler import AIScheduler
+from backend.services.ai_service import AIService
+from backend.services.circuit_breaker import (
+    CIRCUIT_OPEN_ERROR,
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    breaker_stats,
+    get_breaker,
+    hedged,
+)
+from backend.services.http_client import http_client
+
+# Use anyio for async support (already installed)
+pytestmark = pytest.mark.anyio
+
+
+def test_opens_after_consecutive_failures_and_fails_fast():
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=60)
+
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.allow() is False
+    assert breaker.stats()["rejected"] == 1
+    assert breaker.stats()["opens"] == 1
+
+
+def test_half_open_allows_one_probe():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.allow() is False
+
+    time.sleep(0.06)
+    assert breaker.allow() is True
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() is False
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow() is True
+
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker("test", failure_threshold=5, reset_timeout=0.05)
+    for _ in range(5):
+        breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow() is True
+
+    breaker.record_failure()
+
+    assert breaker.state == OPEN
+    assert breaker.allow() is False
+
+
+def test_status_codes():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+    breaker.record_status(503)
+    breaker.record_status(429)
+    breaker.record_status(500)
+    assert breaker.state == CLOSED
+    breaker.record_status(502)
+    assert breaker.state == OPEN
+
+
+def test_registry_reports_every_breaker():
+    breaker = get_breaker("registry-test")
+    assert get_breaker("registry-test") is breaker
+    assert breaker_stats()["registry-test"]["state"] == CLOSED
+    circuit_breaker._breakers.pop("registry-test")
+
+
+def _provider(result, delay=0.0, calls=None):
+    async def call(*args):
+        if calls is not None:
+            calls.append(result.get("name"))
+        await asyncio.sleep(delay)
+        return result
+
+    return call
+
+
+async def test_hedge_returns_fast_primary_without_fallback():
+    calls = []
+    result = await hedged(
+        _provider({"success": True, "name": "primary"}, calls=calls),
+        _provider({"success": True, "name": "fallback"}, calls=calls),
+        delay=0.5,
+    )
+    assert result["name"] == "primary"
+    assert calls == ["primary"]
+
+
+async def test_hedge_races_fallback_when_primary_is_slow():
+    start = time.perf_counter()
+    result = await hedged(
+        _provider({"success": True, "name": "primary"}, delay=1.0),
+        _provider({"success": True, "name": "fallback"}, delay=0.01),
+        delay=0.05,
+    )
+    assert result["name"] == "fallback"
+    assert time.perf_counter() - start < 0.5
+
+
+async def test_hedge_falls_back_on_failure_and_keeps_primary_error_when_both_fail():
+    result = await hedged(
+        _provider({"success": False, "error": "down"}),
+        _provider({"success": True, "name": "fallback"}),
+        delay=None,
+    )
+    assert result["name"] == "fallback"
+
+    result = await hedged(_provider({"success": False, "error": "down"}), _provider({"success": False}), delay=None)
+    assert result["error"] == "down"
+
+
+async def test_chat_completion_fails_fast_once_circuit_opens():
+    service = AIService()
+    # Nothing listens on port 9: every attempt is a connection error
+    service.chat_url = "http://127.0.0.1:9/chat/completions"
+    service.scheduler = AIScheduler(max_attempts=1)
+    service.breaker = CircuitBreaker("groq-test", failure_threshold=2, reset_timeout=60)
+    messages = [{"role": "user", "content": "How do I earn beans?"}]
+
+    try:
+        first = await service.chat_completion(messages)
+        second = await service.chat_completion(messages + [{"role": "user", "content": "again"}])
+        third = await service.chat_completion(messages + [{"role": "user", "content": "third"}])
+        streamed = [e async for e in service.chat_completion_stream(messages)]
+    finally:
+        await http_client.close()
+
+    assert first["success"] is False and first["error"] != CIRCUIT_OPEN_ERROR
+    assert second["success"] is False
+    assert service.breaker.state == OPEN
+    assert third == {"success": False, "error": CIRCUIT_OPEN_ERROR}
+    assert streamed == [{"type": "error", "error": CIRCUIT_OPEN_ERROR}]
+
+
+async def test_speech_to_text_hedges_with_elevenlabs_when_groq_is_slow():
+    from backend.services.voice_service import VoiceService
+
+    voice = VoiceService()
+    voice.stt_hedge_seconds = 0.05
+    voice._groq_stt = _provider({"success": True, "transcription": "groq"}, delay=1.0)
+    voice._elevenlabs_stt_fallback = _provider({"success": True, "transcription": "elevenlabs"}, delay=0.01)
+
+    result = await voice.speech_to_text("clip.wav")
+
+    assert result["transcription"] == "elevenlabs"
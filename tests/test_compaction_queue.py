@@ -0,0 +1,128 @@
+"""
+Tests for the background conversation compaction queue
+"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from backend.services.ai_service import AIService, COMPACT_EVERY_TURNS, KEEP_RECENT_MESSAGES
+from backend.services.compaction_queue import CompactionQueue, PENDING, FAILED, RUNNING
+from tests.conftest import FakeDB
+
+# Use anyio for async support (already installed)
+pytestmark = pytest.mark.anyio
+
+
+def _queue(compact):
+    ai_service = MagicMock()
+    ai_service.compact_conversation = compact
+    queue = CompactionQueue(ai_service, max_attempts=2)
+    queue.set_dependencies(FakeDB())
+    return queue
+
+
+def _job(queue, session_id="session-1"):
+    return queue.collection.peek({"_id": session_id})
+
+
+async def test_enqueue_deduplicates_by_session():
+    queue = _queue(AsyncMock(return_value=True))
+    await queue.enqueue("session-1", "user-1")
+    await queue.enqueue("session-1", "user-1")
+
+    assert [job["_id"] for job in queue.collection.docs] == ["session-1"]
+    assert await queue.run_once() is True
+    assert await queue.run_once() is False
+    queue.ai_service.compact_conversation.assert_awaited_once_with("session-1", "user-1")
+    assert queue.collection.docs == []
+
+
+async def test_failed_job_is_retried_then_marked_failed():
+    queue = _queue(AsyncMock(side_effect=RuntimeError("API error: 503")))
+    await queue.enqueue("session-1", "user-1")
+
+    await queue.run_once()
+    job = _job(queue)
+    assert job["status"] == PENDING
+    assert job["attempts"] == 1
+    assert job["last_error"] == "API error: 503"
+
+    # Make the backoff elapse
+    job["run_after"] = job["created_at"]
+    await queue.run_once()
+    assert _job(queue)["status"] == FAILED
+
+    # New messages re-arm a permanently failed session instead of leaving it stuck
+    queue.ai_service.compact_conversation.side_effect = None
+    await queue.enqueue("session-1", "user-1")
+    job = _job(queue)
+    assert (job["status"], job["attempts"]) == (PENDING, 0)
+    assert "last_error" not in job
+    assert await queue.run_once() is True
+    assert queue.collection.docs == []
+
+
+async def test_enqueue_while_running_runs_the_job_again():
+    queue = _queue(AsyncMock(return_value=True))
+
+    async def compact(session_id, user_id):
+        assert _job(queue, session_id)["status"] == RUNNING
+        await queue.enqueue(session_id, user_id)
+
+    queue.ai_service.compact_conversation.side_effect = compact
+    await queue.enqueue("session-1", "user-1")
+    await queue.run_once()
+    job = _job(queue)
+    assert (job["status"], job["attempts"]) == (PENDING, 0)
+    assert "dirty" not in job
+
+    queue.ai_service.compact_conversation.side_effect = None
+    assert await queue.run_once() is True
+    assert queue.collection.docs == []
+    assert queue.ai_service.compact_conversation.await_count == 2
+
+
+async def test_save_turn_is_one_write_and_enqueues_every_few_turns():
+    service = AIService()
+    db = MagicMock()
+    db.conversations.find_one_and_update = AsyncMock(side_effect=[{"turns": t} for t in range(1, 7)])
+    service.set_db(db)
+    service.compaction_queue.enqueue = AsyncMock()
+
+    for _ in range(6):
+        await service.save_conversation_turn("user-1", "session-1", "hi", "hello")
+
+    assert db.conversations.find_one_and_update.await_count == 6
+    assert service.compaction_queue.enqueue.await_count == 6 // COMPACT_EVERY_TURNS
+    update = db.conversations.find_one_and_update.await_args.args[1]
+    assert update["$push"]["messages"]["$slice"] < 0
+
+
+async def test_compaction_removes_only_the_summarized_prefix():
+    service = AIService()
+    db = MagicMock()
+    messages = [{"role": "user", "content": f"m{i}"} for i in range(12)]
+    db.conversations.find_one = AsyncMock(return_value={"messages": messages})
+    db.conversations.update_one = AsyncMock()
+    service.set_db(db)
+    service.chat_completion = AsyncMock(return_value={"success": True, "content": "Host asked about PK."})
+
+    assert await service.compact_conversation("session-1") is True
+
+    pipeline = db.conversations.update_one.await_args.args[1]
+    assert pipeline[0]["$set"]["messages"]["$slice"][1] == len(messages) - KEEP_RECENT_MESSAGES
+
+
+async def test_compaction_failure_raises_for_retry():
+    service = AIService()
+    db = MagicMock()
+    db.conversations.find_one = AsyncMock(return_value={"messages": [{"role": "user", "content": "x"}] * 12})
+    service.set_db(db)
+    service.chat_completion = AsyncMock(return_value={"success": False, "error": "Request timeout"})
+
+    with pytest.raises(RuntimeError):
+        await service.compact_conversation("session-1")
+
+
+if __name__ == "__main__":
+    # Run tests
+    pytest.main([__file__, "-v"])
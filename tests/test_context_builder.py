@@ -0,0 +1,121 @@
+"""
+Tests for token-budgeted retrieval context assembly
+"""
+from backend.services.context_builder import PromptTemplate, build_context, estimate_tokens, split_passages
+
+PK_GUIDE = (
+    "PK battles are head-to-head matches where viewers send gifts to decide the winner.\n\n"
+    "Schedule PK battles at peak hours and warm up your audience beforehand so gifts arrive early.\n\n"
+    "After the battle, thank every gifter by name to build loyalty."
+)
+BEANS_GUIDE = (
+    "Beans are earned from gifts and convert to cash at the agency rate.\n\n"
+    "Consistent streaming hours raise your tier, and higher tiers unlock bigger bean bonuses."
+)
+
+
+def _result(title, content, score=None):
+    result = {"title": title, "url": f"https://example.com/{title.replace(' ', '-')}", "content": content}
+    if score is not None:
+        result["score"] = score
+    return result
+
+
+def test_estimate_is_close_to_a_bpe_count_for_prose():
+    text = "Schedule PK battles at peak hours and warm up your audience beforehand."
+    # 12 words and a period; long words cost an extra token
+    assert 13 <= estimate_tokens(text) <= 17
+    assert estimate_tokens("") == 0
+
+
+def test_template_renders_like_str_format():
+    template = PromptTemplate("Sources:\n{sources}\nRole: {role}{extra}")
+    values = {"sources": "[1] PK", "role": "Host", "extra": ""}
+    assert template.render(**values) == "Sources:\n{sources}\nRole: {role}{extra}".format(**values)
+    assert template.fields == {"sources", "role", "extra"}
+    assert template.static_tokens == estimate_tokens("Sources:\n\nRole: ")
+
+
+def test_context_fits_budget_and_prefers_higher_scores():
+    results = [_result("Beans", BEANS_GUIDE, score=0.5), _result("PK Guide", PK_GUIDE, score=3.0)]
+    built = build_context("How do I win PK battles?", results, max_tokens=80)
+
+    assert built.stats["context_tokens"] <= 80
+    # Both sources do not fit; the better-scored one is kept
+    assert [s["title"] for s in built.sources] == ["PK Guide"]
+    assert built.text.startswith("[1] PK Guide\nURL: https://example.com/PK-Guide\n")
+    assert "peak hours" in built.text
+
+
+def test_citation_numbers_follow_the_returned_sources():
+    results = [_result(f"Source {i}", f"Unique advice number {i} about streaming tier {i}.") for i in range(5)]
+    built = build_context("streaming tier", results, max_tokens=1000, max_sources=3)
+    assert len(built.sources) == 3
+    for number, source in enumerate(built.sources, start=1):
+        assert f"[{number}] {source['title']}" in built.text
+
+
+def test_overlapping_passages_are_deduplicated():
+    copy = _result("PK Guide (mirror)", PK_GUIDE, score=2.9)
+    built = build_context("PK battles", [_result("PK Guide", PK_GUIDE, score=3.0), copy], max_tokens=2000)
+    assert [s["title"] for s in built.sources] == ["PK Guide"]
+    assert built.stats["duplicates_dropped"] == 1
+
+
+def test_budget_shrinks_the_prompt_compared_to_fixed_truncation():
+    long_content = "\n\n".join(f"Paragraph {i}: " + "stream consistently and engage viewers. " * 12 for i in range(20))
+    results = [_result(f"Guide {i}", long_content.replace("Paragraph", f"G{i} paragraph"), score=8 - i) for i in range(8)]
+    legacy = "\n\n".join(f"[{i+1}] {r['title']}\nURL: {r['url']}\n{r['content'][:1500]}" for i, r in enumerate(results))
+
+    built = build_context("engage viewers", results, max_tokens=800)
+    assert built.stats["context_tokens"] < estimate_tokens(legacy) / 2
+    assert built.stats["sources_considered"] == 8
+
+
+def test_no_results_gives_empty_context():
+    built = build_context("anything", [])
+    assert built.text == ""
+    assert built.sources == []
+
+
+def test_split_passages_can_overlap_sentences():
+    content = " ".join(f"Sentence number {i} explains one more streaming tip." for i in range(40))
+    plain = split_passages(content, max_tokens=60)
+    overlapping = split_passages(content, max_tokens=60, overlap_tokens=15)
+    assert len(plain) > 2
+    for previous, current in zip(overlapping, overlapping[1:]):
+        assert current[0].startswith(previous[0].splitlines()[-1])
+
+
+def test_results_with_passages_are_used_without_resplitting():
+    results = [
+        {
+            "title": "Doc",
+            "url": "u",
+            "content": "ignored whole document",
+            "passages": [{"position": 4, "text": "Relevant section about beans."}],
+        }
+    ]
+    built = build_context("beans", results)
+    assert "Relevant section about beans." in built.text
+    assert "ignored" not in built.text
+
+
+def test_text_without_sentence_breaks_is_split_into_bounded_passages():
+    # Space-joined scraped pages and uploaded tables have no blank lines or sentence ends
+    content = "\n".join(f"Tier S{i} needs {i * 10} hours and {i * 1000} beans" for i in range(500))
+    passages = split_passages(content)
+    assert len(passages) > 1
+    assert all(tokens <= 160 for _, tokens in passages)
+    assert all(estimate_tokens(text) == tokens for text, tokens in passages)
+    assert all(tokens <= 160 for _, tokens in split_passages("https://example.com/" + "a-b" * 2000))
+
+    context = build_context("S10 beans", [_result("Tier table", content)])
+    assert context.stats["sources_used"] == 1
+    assert context.stats["context_tokens"] <= context.stats["budget_tokens"]
+
+
+def test_a_passage_larger_than_the_budget_is_cut_to_fit():
+    context = build_context("beans", [{"title": "Guide", "url": "u", "passages": [{"text": "beans " * 400}]}], 50)
+    assert [s["title"] for s in context.sources] == ["Guide"]
+    assert 0 < context.stats["context_tokens"] <= 50
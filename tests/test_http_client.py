@@ -0,0 +1,95 @@
+"""
+Tests for the shared pooled outbound HTTP client
+"""
+import pytest
+from aiohttp import web
+
+from backend.services import ai_service as ai_service_module
+from backend.services.http_client import HTTPClient, origin_of
+
+# Use anyio for async support (already installed)
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def upstream():
+    async def ok(request):
+        return web.json_response({"ok": True})
+
+    async def fail(request):
+        return web.Response(status=503, text="busy")
+
+    app = web.Application()
+    app.router.add_get("/v1/ok", ok)
+    app.router.add_post("/v1/fail", fail)
+    app.router.add_route("HEAD", "/", ok)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    yield f"http://127.0.0.1:{port}"
+    await runner.cleanup()
+
+
+def test_origin_of():
+    assert origin_of("https://api.groq.com/openai/v1/chat/completions") == "https://api.groq.com"
+    assert origin_of("http://127.0.0.1:8080/v1") == "http://127.0.0.1:8080"
+
+
+async def test_requests_reuse_pooled_connection(upstream):
+    client = HTTPClient()
+    try:
+        for _ in range(3):
+            async with client.session_for(upstream).get(f"{upstream}/v1/ok") as response:
+                assert (await response.json()) == {"ok": True}
+
+        stats = client.stats()["upstreams"][upstream]
+        assert stats["requests"] == 3
+        assert stats["new_connections"] == 1
+        assert stats["reused_connections"] == 2
+        assert stats["avg_ttfb_ms"] > 0
+        assert stats["avg_total_ms"] >= stats["avg_ttfb_ms"]
+    finally:
+        await client.close()
+
+
+async def test_one_pool_per_origin(upstream):
+    client = HTTPClient()
+    try:
+        first = client.session_for(f"{upstream}/v1/ok")
+        second = client.session_for(f"{upstream}/v1/fail")
+        assert first.session is second.session
+        assert client.stats()["pools"] == [upstream]
+    finally:
+        await client.close()
+    assert client.stats()["pools"] == []
+
+
+async def test_warm_up_opens_connection_and_tolerates_failures(upstream):
+    client = HTTPClient()
+    try:
+        await client.warm_up([f"{upstream}/v1/ok", "http://127.0.0.1:1/unreachable"], timeout=1)
+        assert client.stats()["upstreams"][upstream]["new_connections"] == 1
+
+        async with client.session_for(upstream).post(f"{upstream}/v1/fail") as response:
+            assert response.status == 503
+        assert client.stats()["upstreams"][upstream]["reused_connections"] == 1
+    finally:
+        await client.close()
+
+
+async def test_ai_service_pools_by_the_origin_it_actually_calls(upstream, monkeypatch):
+    client = HTTPClient()
+    monkeypatch.setattr(ai_service_module, "http_client", client)
+    service = ai_service_module.AIService()
+    service.chat_url = f"{upstream}/v1/ok"
+    try:
+        assert (await service._get_session(service.chat_url)).origin == upstream
+        assert client.stats()["pools"] == [upstream]
+    finally:
+        await client.close()
+
+if __name__ == "__main__":
+    # Run tests
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,104 @@
+"""
+Tests for the declarative index spec, drift detection and the COLLSCAN verification helpers
+"""
+import pytest
+
+from backend.services.index_manager import INDEX_SPECS, ensure_indexes, index, index_drift, serving_index
+from scripts.verify_indexes import collect_shapes, has_collscan, is_full_read, query_shape
+from tests.conftest import FakeDB
+
+pytestmark = pytest.mark.anyio
+
+
+SPECS = [
+    index("users", "id", unique=True),
+    index("users", "bigo_id", unique=True),
+    index("private_messages", "sender_id", ("sent_at", -1)),
+]
+
+
+async def test_missing_indexes_are_created_once_and_failures_reported():
+    # Two accounts share a bigo_id, so the unique index cannot be built
+    db = FakeDB(users=[{"id": "a", "bigo_id": "b1"}, {"id": "b", "bigo_id": "b1"}])
+    report = await ensure_indexes(db, SPECS)
+    assert report["created"] == ["users.id_1", "private_messages.sender_id_1_sent_at_-1"]
+    assert [f["index"] for f in report["failed"]] == ["bigo_id_1"]
+
+    attempts = {name: db[name].calls["create_index"] for name in ("users", "private_messages")}
+    await ensure_indexes(db, SPECS)
+    # Only the index that failed is retried
+    assert db["users"].calls["create_index"] == attempts["users"] + 1
+    assert db["private_messages"].calls["create_index"] == attempts["private_messages"]
+    assert [m["index"] for m in (await index_drift(db, SPECS))["missing"]] == ["bigo_id_1"]
+
+
+async def test_conflicting_and_unmanaged_indexes_are_reported_not_dropped():
+    db = FakeDB()
+    db["users"].indexes += [
+        {"name": "id_1", "key": {"id": 1.0}},  # same keys, not unique
+        {"name": "legacy_email", "key": {"email": 1}},
+    ]
+    report = await ensure_indexes(db, SPECS[:1])
+    assert report["created"] == []
+    assert report["conflicts"] == [
+        {"collection": "users", "index": "id_1", "differences": ["unique=False, spec unique=True"]}
+    ]
+    assert report["unmanaged"] == [{"collection": "users", "index": "legacy_email"}]
+    assert len(db["users"].indexes) == 3
+
+
+@pytest.mark.parametrize(
+    "collection, fields, sort",
+    [
+        ("users", ["id"], ()),
+        ("users", ["bigo_id"], ()),
+        ("users", ["email"], ()),
+        ("private_messages", ["sender_id"], ("sent_at",)),
+        ("private_messages", ["recipient_id"], ("sent_at",)),
+        ("messages", ["channel_id"], ("created_at",)),
+        ("event_rsvps", ["event_id", "status"], ()),
+        ("audition_uploads", ["id", "user_id"], ()),
+        ("influencer_leads", ["username", "platform"], ()),
+        ("conversations", ["session_id"], ()),
+        ("beangenie_panels", ["user_id"], ()),
+        ("ai_chats", ["user_id"], ("created_at",)),
+        ("bigo_wheel_spins", ["wheel_id"], ("spun_at",)),
+        ("audition_submissions", ["bigo_id", "status"], ()),
+        ("lead_scans", [], ("started_at",)),
+    ],
+)
+def test_hot_route_queries_have_a_serving_index(collection, fields, sort):
+    assert serving_index(collection, fields, sort) is not None
+
+
+def test_spec_names_are_unique_per_collection():
+    names = [(spec.collection, spec.name) for spec in INDEX_SPECS]
+    assert len(names) == len(set(names))
+
+
+def test_profiled_queries_are_grouped_by_shape():
+    entries = [
+        {"op": "query", "ns": "app.users", "command": {"find": "users", "filter": {"id": "a"}}},
+        {"op": "query", "ns": "app.users", "command": {"find": "users", "filter": {"id": "b"}}},
+        {"op": "command", "ns": "app.users", "command": {"count": "users", "query": {}}},
+        {"op": "update", "ns": "app.users", "command": {"q": {"id": "a"}, "u": {"$set": {"x": 1}}}},
+        {"op": "insert", "ns": "app.users", "command": {"insert": "users"}},
+        {"op": "query", "ns": "app.system.profile", "command": {"find": "system.profile", "filter": {}}},
+    ]
+    samples, counts = collect_shapes(entries)
+    assert sorted(counts.values()) == [1, 1, 2]
+    assert [is_full_read(shape) for shape in samples.values()].count(True) == 1
+    aggregate = {"op": "command", "ns": "app.blogs", "command": {"aggregate": "blogs", "pipeline": []}}
+    assert query_shape(aggregate)["kind"] == "aggregate"
+
+
+def test_collscan_is_found_anywhere_in_an_explain_plan():
+    ixscan = {"queryPlanner": {"winningPlan": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}}}}
+    merged = {
+        "queryPlanner": {
+            "winningPlan": {"stage": "SORT_MERGE", "inputStages": [{"stage": "IXSCAN"}, {"stage": "COLLSCAN"}]}
+        }
+    }
+    assert not has_collscan(ixscan)
+    assert has_collscan(merged)
+    assert has_collscan({"stages": [{"$cursor": {"queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}}}}]})
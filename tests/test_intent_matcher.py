@@ -0,0 +1,78 @@
+"""
+Tests for the compiled intent keyword matcher and its labelled regression corpus
+"""
+import json
+from pathlib import Path
+
+import pytest
+
+from backend.services.ai_service import AIService
+from backend.services.intent_matcher import DEFAULT_VOCABULARIES, IntentMatcher, load_vocabularies
+
+# Use anyio for async support (already installed)
+pytestmark = pytest.mark.anyio
+
+CORPUS_PATH = Path(__file__).parent / "data" / "intent_corpus.jsonl"
+
+
+def load_corpus():
+    with open(CORPUS_PATH, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+@pytest.fixture
+def matcher():
+    return IntentMatcher(DEFAULT_VOCABULARIES)
+
+
+@pytest.mark.parametrize("row", load_corpus(), ids=lambda row: row["text"])
+async def test_corpus_is_classified_as_labelled(row):
+    result = await AIService().classify_intent(row["text"])
+
+    assert result["is_bigo_related"] == row["is_bigo_related"]
+    assert result["intent"] == row["intent"]
+
+
+@pytest.mark.parametrize("text", ["can you speak spanish", "they deliver pizza", "the fantastic four", "my ghost story"])
+def test_keywords_do_not_match_inside_other_words(matcher, text):
+    assert "bigo" not in matcher.categories(text)
+
+
+@pytest.mark.parametrize("text", ["streamers unite", "my earnings", "pk", "going live now", "i hit s25", "s1 host"])
+def test_whole_words_and_prefixes_match(matcher, text):
+    assert "bigo" in matcher.categories(text)
+
+
+def test_tier_pattern_matches_whole_word_only(matcher):
+    assert "bigo" in matcher.categories("how to reach s10")
+    assert "bigo" not in matcher.categories("my s26 phone")
+    assert "bigo" not in matcher.categories("s1x")
+
+
+def test_phrases_match_words_in_order(matcher):
+    assert "question" in matcher.categories("help me out")
+    assert "question" not in matcher.categories("me help")
+    assert "question" in matcher.categories("beans?")
+
+
+def test_greeting_only_at_start(matcher):
+    assert matcher.starts_with_greeting("hey, anyone here")
+    assert matcher.starts_with_greeting("what's up")
+    assert not matcher.starts_with_greeting("they said hi")
+    assert not matcher.starts_with_greeting("hiring hosts")
+
+
+def test_vocabulary_file_replaces_lists(tmp_path, monkeypatch):
+    path = tmp_path / "vocabulary.json"
+    path.write_text(json.dumps({"bigo": ["agency*"]}))
+    monkeypatch.setenv("INTENT_VOCABULARY_PATH", str(path))
+
+    matcher = IntentMatcher(load_vocabularies())
+
+    assert "bigo" in matcher.categories("which agency is best")
+    assert "bigo" not in matcher.categories("earn beans")
+    assert "question" in matcher.categories("which agency is best?")
+
+
+def test_bad_vocabulary_file_falls_back_to_defaults(tmp_path):
+    assert load_vocabularies(str(tmp_path / "missing.json")) == DEFAULT_VOCABULARIES
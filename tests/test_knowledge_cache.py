@@ -0,0 +1,105 @@
+"""
+Tests for the knowledge search result cache and its version-based invalidation
+"""
+import pytest
+
+from backend.services.knowledge_cache import KNOWLEDGE_VERSION_ID, KnowledgeSearchCache
+from backend.services.knowledge_index import KnowledgeIndex
+from tests.conftest import FakeDB
+
+pytestmark = pytest.mark.anyio
+
+
+DOC = {"id": "beans", "url": "u", "title": "Bean Earnings", "content": "Earn beans from gifts.", "tags": []}
+
+
+class RecordingIndex(KnowledgeIndex):
+    def __init__(self):
+        super().__init__()
+        self.refreshes = 0
+
+    async def refresh(self):
+        self.refreshes += 1
+        return 0
+
+
+def _cache(max_entries=10):
+    index = RecordingIndex()
+    index.load([DOC])
+    cache = KnowledgeSearchCache(max_entries=max_entries)
+    cache.set_dependencies(FakeDB(), index)
+    return cache, index
+
+
+def test_queries_differing_only_in_case_spacing_and_punctuation_share_a_key():
+    make_key = KnowledgeSearchCache.make_key
+    assert make_key("How do I earn more beans?", 10) == make_key("  how do i EARN more beans ", 10)
+    assert make_key("PK strategy", 10) != make_key("PK strategy", 5)
+    assert make_key("PK strategy", 10) != make_key("PK strategy", 10, snippets=True)
+
+
+def test_hits_return_copies_and_count_towards_the_hit_rate():
+    cache, _ = _cache()
+    key = cache.make_key("beans", 5)
+    assert cache.get(key) is None
+    cache.put(key, [{"id": "beans"}], cache.stamp())
+    hit = cache.get(key)
+    hit[0]["id"] = "mutated"
+    assert cache.get(key) == [{"id": "beans"}]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (2, 1, 0.6667)
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache, _ = _cache(max_entries=2)
+    for query in ("a", "b"):
+        cache.put(cache.make_key(query, 5), [], cache.stamp())
+    cache.get(cache.make_key("a", 5))
+    cache.put(cache.make_key("c", 5), [], cache.stamp())
+    assert cache.get(cache.make_key("b", 5)) is None
+    assert cache.get(cache.make_key("a", 5)) == []
+    assert cache.stats()["evictions"] == 1
+
+
+def test_index_changes_make_entries_stale():
+    cache, index = _cache()
+    key = cache.make_key("beans", 5)
+    cache.put(key, [{"id": "beans"}], cache.stamp())
+    index.upsert({**DOC, "content": "Beans convert to cash."})
+    assert cache.get(key) is None
+
+
+def test_results_computed_before_a_write_are_not_stored():
+    cache, index = _cache()
+    stamp = cache.stamp()
+    index.remove("beans")
+    cache.put(cache.make_key("beans", 5), [{"id": "beans"}], stamp)
+    assert cache.stats()["entries"] == 0
+
+
+async def test_version_bumps_from_other_processes_refresh_the_index_and_invalidate():
+    cache, index = _cache()
+    await cache.start()
+    await cache.stop()
+    key = cache.make_key("beans", 5)
+    cache.put(key, [{"id": "beans"}], cache.stamp())
+
+    assert await cache.sync_version() is False
+    cache.db.knowledge_meta.docs.append({"_id": KNOWLEDGE_VERSION_ID, "version": 3})  # e.g. the seed script ran
+    assert await cache.sync_version() is True
+    assert index.refreshes == 1
+    assert cache.get(key) is None
+    assert cache.stats()["version"] == 3
+
+
+async def test_own_writes_skip_the_index_refresh():
+    cache, index = _cache()
+    cache.put(cache.make_key("beans", 5), [], cache.stamp())
+    await cache.observe_version(1)
+    assert index.refreshes == 0
+    assert cache.stats()["entries"] == 0
+    # Someone else wrote version 2 before our version 3
+    await cache.observe_version(3)
+    assert index.refreshes == 1
+    await cache.observe_version(None)
+    assert cache.stats()["version"] == 3
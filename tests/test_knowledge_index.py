@@ -0,0 +1,209 @@
+"""
+Tests for the in-process BM25 knowledge index behind search_bigo_knowledge
+"""
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+from backend.services.context_builder import estimate_tokens
+from backend.services.knowledge_index import (
+    PASSAGE_TOKENS,
+    KnowledgeIndex,
+    analyze,
+    query_terms,
+    snippet,
+    stem,
+)
+from tests.conftest import FakeDB
+
+pytestmark = pytest.mark.anyio
+
+
+DOCS = [
+    {
+        "id": "beans",
+        "url": "https://www.bigo.tv/beans",
+        "title": "Bean Earnings Guide",
+        "content": "Beans convert to cash. Hosts earn beans from viewer gifts during live streams.",
+        "tags": ["beans", "monetization"],
+    },
+    {
+        "id": "pk",
+        "url": "https://www.bigo.tv/pk",
+        "title": "PK Battle Strategy",
+        "content": "Win PK battles by scheduling them at peak hours and rallying your fans before the match.",
+        "tags": ["pk"],
+    },
+    {
+        "id": "tiers",
+        "url": "https://www.bigo.tv/tiers",
+        "title": "Tier System",
+        "content": "Reaching S10 requires consistent streaming hours. Tier 5 hosts unlock weekly bonuses.",
+        "tags": ["tier"],
+    },
+]
+
+
+def _index(docs=DOCS):
+    index = KnowledgeIndex()
+    index.load(docs)
+    return index
+
+
+def test_stemming_folds_inflections():
+    assert stem("streaming") == stem("streams") == stem("streamed") == "stream"
+    assert stem("battles") == stem("battling") == stem("battle")
+    assert stem("running") == "run"
+
+
+def test_tier_mentions_fold_to_canonical_terms():
+    assert analyze("Tier 10") == analyze("S10") == analyze("s-10") == ["s10"]
+    # Not a tier
+    assert "s99" not in analyze("s 99")
+
+
+def test_synonyms_expand_at_reduced_weight():
+    weights = query_terms("how do I get paid")
+    assert weights["paid"] == 1.0
+    assert 0 < weights["earn"] < 1.0
+    assert "how" not in weights
+
+
+def test_ranking_prefers_title_and_exact_matches():
+    index = _index()
+    assert index.search("PK battle tips")[0]["id"] == "pk"
+    assert index.search("how do I earn beans")[0]["id"] == "beans"
+    assert index.search("how to reach tier 10")[0]["id"] == "tiers"
+
+
+def test_paraphrases_reach_the_right_document_through_synonyms():
+    index = _index()
+    assert index.search("diamonds")[0]["id"] == "beans"
+    assert index.search("getting paid more money")[0]["id"] == "beans"
+
+
+def test_results_have_the_mongo_search_shape():
+    result = _index().search("PK battles", limit=1)[0]
+    assert set(result) == {"id", "url", "title", "content", "tags", "score", "passages"}
+    assert result["score"] > 0
+
+
+def test_unmatched_query_returns_nothing():
+    assert _index().search("zzz qqq") == []
+    assert KnowledgeIndex().search("beans") == []
+
+
+def test_upsert_replaces_postings_and_remove_forgets_document():
+    index = _index()
+    index.upsert(
+        {**DOCS[1], "title": "Collabs", "content": "Collaborate with other hosts on joint streams.", "tags": []}
+    )
+    assert all(r["id"] != "pk" for r in index.search("PK battles"))
+    assert index.search("collaborate")[0]["id"] == "pk"
+
+    index.remove("pk")
+    assert index.search("collaborate") == []
+    assert index.stats()["documents"] == 2
+
+    # Freed slots are reused without disturbing other documents
+    index.upsert({"id": "new", "url": "u", "title": "Gift Guide", "content": "Gifts and beans", "tags": []})
+    assert {r["id"] for r in index.search("gifts")} >= {"new", "beans"}
+
+
+def test_limit_keeps_the_best_scores_in_order():
+    docs = [
+        {"id": str(i), "url": "u", "title": "Beans " * (i % 3 + 1), "content": "beans " * i, "tags": []}
+        for i in range(1, 30)
+    ]
+    index = _index(docs)
+    limited = index.search("beans", limit=5)
+    full = sorted(index.scores("beans").values(), reverse=True)[:5]
+    assert [r["score"] for r in limited] == [round(s, 4) for s in full]
+
+
+async def test_refresh_picks_up_writes_made_outside_the_process():
+    now = datetime.now(timezone.utc)
+    stored = [{**doc, "updated_at": now - timedelta(hours=1)} for doc in DOCS]
+    index = KnowledgeIndex()
+    index.set_db(FakeDB(bigo_knowledge=stored))
+    await index.rebuild()
+    assert await index.refresh() == 0
+
+    seeded = {"id": "seeded", "url": "u", "title": "Audio Setup", "content": "Microphone tips", "tags": []}
+    stored.append({**seeded, "updated_at": now})
+    assert await index.refresh() == 1
+    assert index.search("microphone")[0]["id"] == "seeded"
+
+
+async def test_rebuilding_over_a_memory_mapped_vector_file_keeps_it_intact(tmp_path):
+    now = datetime.now(timezone.utc)
+    stored = [
+        {"id": f"d{i}", "url": "u", "title": f"Guide {i}", "content": f"beans tier {i} " * 20, "tags": [],
+         "updated_at": now}
+        for i in range(300)
+    ]
+    first = KnowledgeIndex(vector_dir=tmp_path)
+    first.set_db(FakeDB(bigo_knowledge=stored))
+    await first.rebuild()
+
+    # A restart maps the saved matrix; rebuilding unchanged docs must not rewrite the mapped file
+    second = KnowledgeIndex(vector_dir=tmp_path)
+    second.set_db(FakeDB(bigo_knowledge=stored))
+    await second.rebuild()
+    mtime = (tmp_path / "vectors.npy").stat().st_mtime_ns
+    await second.rebuild()
+    assert (tmp_path / "vectors.npy").stat().st_mtime_ns == mtime
+    assert second.vectors.stats()["embedded"] == 0
+
+    # A changed doc is written through a temp file renamed over the one still mapped
+    stored[0] = {**stored[0], "content": "microphone setup"}
+    await second.rebuild()
+    await second.stop()
+    assert float(second.vectors.matrix[: second.vectors.count].sum()) != 0.0
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["vectors.json", "vectors.npy"]
+    third = KnowledgeIndex(vector_dir=tmp_path)
+    third.set_db(FakeDB(bigo_knowledge=stored))
+    await third.rebuild()
+    assert third.vectors.stats()["embedded"] == 0
+
+
+LONG_DOC = {
+    "id": "handbook",
+    "url": "https://www.bigo.tv/handbook",
+    "title": "Host Handbook",
+    "content": "\n\n".join(
+        [f"Section {i}. Hosts should keep a consistent schedule and greet every viewer by name." for i in range(30)]
+        + ["Microphone setup: use a cardioid microphone and keep it a hand's width from your mouth."]
+        + [f"Appendix {i}. Review the community guidelines before every stream." for i in range(30)]
+    ),
+    "tags": [],
+}
+
+
+def test_long_documents_return_only_their_matching_passages():
+    index = _index(DOCS + [LONG_DOC])
+    assert index.stats()["passages"] > len(DOCS) + 1
+    result = index.search("microphone setup", limit=1, snippets=True)[0]
+    assert result["id"] == "handbook"
+    assert "cardioid microphone" in result["content"]
+    assert len(result["content"]) < len(LONG_DOC["content"]) / 4
+    assert result["snippet"].startswith("...Microphone setup")
+    assert len(result["snippet"]) <= 210
+
+
+def test_documents_without_sentence_breaks_are_indexed_as_bounded_passages():
+    words = [f"stream{n} schedule viewers" for n in range(1500)]
+    words[900] = "cardioid microphone"
+    page = {"id": "flat", "url": "https://www.bigo.tv/flat", "title": "Flat page", "content": " ".join(words)}
+    index = _index(DOCS + [page])
+    result = index.search("cardioid microphone", limit=1)[0]
+    assert result["id"] == "flat"
+    assert "cardioid microphone" in result["content"]
+    assert all(estimate_tokens(p["text"]) <= PASSAGE_TOKENS for p in result["passages"])
+    assert len(result["content"]) < len(page["content"]) / 4
+
+
+def test_snippet_picks_the_best_sentence():
+    text = "Beans are the platform currency. PK battles happen at peak hours. Fans send gifts during battles."
+    assert snippet(text, "pk battle").startswith("...PK battles happen")
+    assert snippet(text, "unrelated") == text
@@ -0,0 +1,99 @@
+"""
+Tests for bulk knowledge ingestion and the concurrent seeding pipeline
+"""
+import asyncio
+import json
+
+import pytest
+
+from backend.services.knowledge_index import KnowledgeIndex
+from backend.services.knowledge_ingest import ingest, parse_ndjson
+from tests.conftest import FakeDB
+
+pytestmark = pytest.mark.anyio
+
+
+def _entry(n, content=None):
+    return {
+        "url": f"https://www.bigo.tv/page/{n}",
+        "title": f"Page {n}",
+        "content": content or f"Guide number {n} about beans and PK battles.",
+        "tags": ["guide"],
+    }
+
+
+def _ndjson(entries):
+    return "\n".join(json.dumps(e) for e in entries).encode()
+
+
+async def test_bulk_ingest_upserts_and_skips_unchanged_documents():
+    db, index = FakeDB(), KnowledgeIndex()
+    index.load([])
+    entries, errors = parse_ndjson(_ndjson([_entry(n) for n in range(1200)]))
+    assert errors == []
+
+    first = await ingest(db, entries, index)
+    assert first["inserted"] == 1200
+    # Batches of 500: one bulk write each, not one round trip per document
+    assert db.bigo_knowledge.calls["bulk_write"] == 3 + 3  # upserts + passages_hash marks
+    assert index.stats()["documents"] == 1200
+    assert len({d["id"] for d in db.bigo_knowledge.docs}) == 1200
+
+    changed = [_entry(n) for n in range(1200)]
+    changed[7] = _entry(7, "Rewritten guide about tier requirements.")
+    index_upserts = index.stats()["upserts"]
+    second = await ingest(db, list(enumerate(changed, start=1)), index)
+    assert (second["updated"], second["unchanged"]) == (1, 1199)
+    assert (first["version"], second["version"]) == (1, 2)
+    assert (await ingest(db, list(enumerate(changed, start=1)), index))["version"] is None
+    assert index.stats()["upserts"] == index_upserts + 1
+    assert index.search("tier requirements")[0]["url"] == "https://www.bigo.tv/page/7"
+    # The updated document keeps its id and its passages were replaced
+    doc = next(d for d in db.bigo_knowledge.docs if d["url"].endswith("/7"))
+    assert doc["id"] == first["results"][7]["id"]
+    assert [p["text"] for p in db.bigo_knowledge_passages.docs if p["doc_id"] == doc["id"]] == [
+        "Rewritten guide about tier requirements."
+    ]
+
+
+async def test_invalid_lines_are_reported_without_failing_the_batch():
+    data = b'{"url": "https://www.bigo.tv/a", "title": "A", "content": "Alpha"}\nnot json\n\n' + _ndjson(
+        [{"url": "https://example.com/x", "title": "X", "content": "x"}, {"url": "https://www.bigo.tv/b"}]
+    )
+    entries, errors = parse_ndjson(data)
+    assert errors == [{"line": 2, "status": "error", "error": "Invalid JSON: Expecting value"}]
+    outcome = await ingest(FakeDB(), entries)
+    assert outcome["inserted"] == 1
+    assert [r["error"] for r in outcome["results"] if r["status"] == "error"] == [
+        "Only bigo.tv domains are allowed",
+        "URL, title, and content are required",
+    ]
+
+
+async def test_later_duplicate_url_in_one_upload_wins():
+    db = FakeDB()
+    outcome = await ingest(db, [(1, _entry(1)), (2, _entry(1, "Newer content."))])
+    assert (outcome["inserted"], outcome["superseded"]) == (1, 1)
+    assert db.bigo_knowledge.docs[0]["content"] == "Newer content."
+
+
+async def test_seed_fetches_run_concurrently_within_the_limit(monkeypatch):
+    from scripts import seed_bigo_knowledge as seed
+
+    active = peak = 0
+
+    async def fake_fetch(session, url):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return "" if url.endswith("/1") else f"Content of {url}"
+
+    monkeypatch.setattr(seed, "fetch_url_content", fake_fetch)
+    urls = [{"url": f"https://www.bigo.tv/{n}", "title": f"T{n}", "tags": []} for n in range(20)]
+    urls.append({"url": "https://example.com/x", "title": "X", "tags": []})
+    entries = await seed.fetch_url_entries(urls, concurrency=4)
+    assert peak == 4
+    assert len(entries) == 20
+    assert entries[1]["content"].startswith("Official information about T1")
@@ -0,0 +1,85 @@
+"""
+Tests for stored knowledge passages and the passage-level Mongo search fallback
+"""
+import asyncio
+
+import pytest
+
+from backend.services.context_builder import estimate_tokens
+from backend.services.knowledge_index import PASSAGE_TOKENS
+from backend.services.knowledge_passages import (
+    backfill_passages,
+    ensure_passage_indexes,
+    search_passages,
+    store_passages,
+)
+from tests.conftest import FakeDB
+
+pytestmark = pytest.mark.anyio
+
+
+async def _db(*docs):
+    db = FakeDB(bigo_knowledge=list(docs))
+    await ensure_passage_indexes(db)
+    return db
+
+
+def _doc():
+    sections = [f"Section {i}. Keep a consistent schedule and thank your viewers." for i in range(40)]
+    sections.insert(20, "Microphone setup. Use a cardioid microphone close to your mouth.")
+    return {
+        "id": "handbook",
+        "url": "https://www.bigo.tv/handbook",
+        "title": "Host Handbook",
+        "tags": ["setup"],
+        "content": "\n\n".join(sections),
+    }
+
+
+async def test_backfill_splits_documents_once_and_marks_them():
+    db = await _db(_doc())
+    assert await backfill_passages(db) == 1
+    passages = db.bigo_knowledge_passages.docs
+    assert len(passages) > 3
+    assert [p["position"] for p in passages] == list(range(len(passages)))
+    assert "passages_hash" in db.bigo_knowledge.docs[0]
+    assert await backfill_passages(db) == 0
+
+
+async def test_store_replaces_previous_passages():
+    db = await _db(_doc())
+    await store_passages(db, _doc())
+    await store_passages(db, {**_doc(), "content": "Short replacement."})
+    assert [p["text"] for p in db.bigo_knowledge_passages.docs] == ["Short replacement."]
+
+
+async def test_stored_passages_never_exceed_the_passage_size():
+    # A scraped page joined with spaces: 20k characters and no sentence or paragraph breaks
+    words = [f"tier{n % 25} beans hours viewers gifts" for n in range(700)]
+    page = {**_doc(), "content": " ".join(words)[:20000]}
+    db = await _db(page)
+    await store_passages(db, page)
+    passages = db.bigo_knowledge_passages.docs
+    assert len(passages) > 10
+    assert max(estimate_tokens(p["text"]) for p in passages) <= PASSAGE_TOKENS
+
+
+async def test_concurrent_stores_of_one_document_upsert_the_same_rows():
+    db = await _db(_doc())
+    await asyncio.gather(store_passages(db, _doc()), store_passages(db, _doc()))
+    positions = [p["position"] for p in db.bigo_knowledge_passages.docs]
+    assert sorted(positions) == list(range(len(positions)))
+
+
+async def test_search_reads_only_matching_passages_and_metadata():
+    db = await _db(_doc())
+    await store_passages(db, _doc())
+    results = await search_passages(db, "cardioid microphone", limit=3)
+    assert len(results) == 1
+    result = results[0]
+    assert result["url"] == "https://www.bigo.tv/handbook"
+    assert "cardioid" in result["passages"][0]["text"]
+    assert len(result["content"]) < len(_doc()["content"]) / 4
+    assert "cardioid" in result["snippet"]
+    # Neither query pulls the full document content out of the database
+    assert all("content" not in projection for projection in db.bigo_knowledge.projections)
@@ -0,0 +1,71 @@
+"""
+Tests for call-site model routing and timeout fallback in AIService
+"""
+import pytest
+from unittest.mock import AsyncMock
+
+from backend.services.ai_service import AIService
+from backend.services.model_router import ModelRouter, ModelRoute, FAST, STANDARD, TIMEOUT_ERROR
+
+# Use anyio for async support (already installed)
+pytestmark = pytest.mark.anyio
+
+
+MESSAGES = [{"role": "user", "content": "Summarize: host asked about PK battles"}]
+
+OK = {"success": True, "content": "ok", "model": "m", "usage": {"prompt_tokens": 12, "completion_tokens": 4}}
+
+
+def _service(side_effect):
+    service = AIService()
+    service.model_router = ModelRouter(
+        tiers={FAST: "small-model", STANDARD: "large-model"},
+        routes={"summary": ModelRoute(FAST, timeout=5, fallback_tier=STANDARD)},
+    )
+    service._request_chat_completion = AsyncMock(side_effect=side_effect)
+    return service
+
+
+async def test_routed_call_site_uses_fast_tier_and_route_timeout():
+    service = _service([OK])
+    await service.chat_completion(MESSAGES, call_site="summary")
+
+    args = service._request_chat_completion.await_args.args
+    assert args[1] == "small-model"
+    assert args[4] == 5
+
+
+async def test_unrouted_and_explicit_model_calls_keep_their_model():
+    service = _service([OK, OK])
+    await service.chat_completion(MESSAGES)
+    await service.chat_completion(MESSAGES, model="pinned-model", call_site="summary")
+
+    models = [c.args[1] for c in service._request_chat_completion.await_args_list]
+    assert models == [service.default_chat_model, "pinned-model"]
+
+
+async def test_timeout_falls_back_to_other_tier():
+    service = _service([{"success": False, "error": TIMEOUT_ERROR}, OK])
+
+    result = await service.chat_completion(MESSAGES, call_site="summary")
+
+    assert result["success"] is True
+    models = [c.args[1] for c in service._request_chat_completion.await_args_list]
+    assert models == ["small-model", "large-model"]
+
+    stats = service.model_router.stats()["routes"]["summary"]
+    assert stats["fallbacks"] == 1
+    assert stats["models"]["small-model"]["timeouts"] == 1
+    assert stats["models"]["large-model"]["completion_tokens"] == 4
+
+
+async def test_other_errors_do_not_fall_back():
+    service = _service([{"success": False, "error": "API error: 400"}])
+    result = await service.chat_completion(MESSAGES, call_site="summary")
+    assert result["success"] is False
+    assert service._request_chat_completion.await_count == 1
+
+
+if __name__ == "__main__":
+    # Run tests
+    pytest.main([__file__, "-v"])
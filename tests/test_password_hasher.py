@@ -0,0 +1,99 @@
+"""
+Tests for the pooled bcrypt password hasher: rehash on login and event loop latency under a login burst
+"""
+import asyncio
+import time
+
+import pytest
+from passlib.context import CryptContext
+
+from backend.services.password_hasher import PasswordHasher
+
+pytestmark = pytest.mark.anyio
+
+
+# Low work factors keep the suite fast; the latency comparison only needs each call to take a few ms
+ROUNDS = 6
+
+
+class LagMonitor:
+    """Ticks every `interval` seconds and records how late each tick fires"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.lags = []
+        self.task = None
+
+    async def _tick(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            self.lags.append(time.perf_counter() - expected)
+
+    async def __aenter__(self):
+        self.task = asyncio.create_task(self._tick())
+        await asyncio.sleep(0)
+        return self
+
+    async def __aexit__(self, *exc):
+        # Let a tick that was held up by the burst fire and record its lag
+        await asyncio.sleep(self.interval * 2)
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+
+    @property
+    def worst_ms(self) -> float:
+        return max(self.lags, default=0.0) * 1000
+
+
+async def test_hash_and_verify_round_trip():
+    hasher = PasswordHasher(rounds=ROUNDS, workers=2)
+    try:
+        hashed = await hasher.hash("s3cret")
+        assert hashed.startswith(f"$2b${ROUNDS:02d}$")
+        assert await hasher.verify("s3cret", hashed) == (True, None)
+        assert await hasher.verify("wrong", hashed) == (False, None)
+        stats = hasher.stats()
+        assert (stats["hashes"], stats["verifications"], stats["failed_verifications"]) == (1, 2, 1)
+        assert stats["in_flight"] == 0
+    finally:
+        hasher.close()
+
+
+async def test_weaker_hashes_are_upgraded_on_successful_verification():
+    old = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("s3cret")
+    hasher = PasswordHasher(rounds=ROUNDS, workers=1)
+    try:
+        assert await hasher.verify("wrong", old) == (False, None)
+        valid, new_hash = await hasher.verify("s3cret", old)
+        assert valid and new_hash.startswith(f"$2b${ROUNDS:02d}$")
+        assert await hasher.verify("s3cret", new_hash) == (True, None)
+        assert hasher.stats()["rehashes"] == 1
+    finally:
+        hasher.close()
+
+
+async def test_event_loop_stays_responsive_during_50_concurrent_logins():
+    hasher = PasswordHasher(rounds=ROUNDS + 2, workers=4)
+    try:
+        hashed = await hasher.hash("s3cret")
+
+        # Baseline: verifying inline, as the login handler used to, blocks the loop for the whole burst
+        async def inline_login():
+            return hasher.context.verify("s3cret", hashed)
+
+        async with LagMonitor() as inline:
+            assert all(await asyncio.gather(*(inline_login() for _ in range(50))))
+
+        async with LagMonitor() as pooled:
+            results = await asyncio.gather(*(hasher.verify("s3cret", hashed) for _ in range(50)))
+        assert all(valid for valid, _ in results)
+
+        assert inline.worst_ms > 100
+        assert pooled.worst_ms < inline.worst_ms / 4
+        assert pooled.worst_ms < 50
+    finally:
+        hasher.close()
@@ -0,0 +1,91 @@
+"""
+Tests for the AI response cache used by AIService.chat_completion
+"""
+import pytest
+from unittest.mock import AsyncMock
+from datetime import datetime, timezone, timedelta
+
+from backend.services.ai_service import AIService
+from backend.services.response_cache import ResponseCache, CachePolicy
+from tests.conftest import FakeDB
+
+# Use anyio for async support (already installed)
+pytestmark = pytest.mark.anyio
+
+
+MESSAGES = [{"role": "system", "content": "You are a recruiter."}, {"role": "user", "content": "How much can I earn?"}]
+
+
+def _service_with_upstream():
+    service = AIService()
+    service._request_chat_completion = AsyncMock(
+        return_value={"success": True, "content": "Up to $5000/month", "model": "m", "usage": {"total_tokens": 10}}
+    )
+    return service
+
+
+async def test_uncached_call_site_always_hits_upstream():
+    service = _service_with_upstream()
+    await service.chat_completion(MESSAGES)
+    await service.chat_completion(MESSAGES, call_site="not_registered")
+    assert service._request_chat_completion.await_count == 2
+
+
+async def test_repeated_prompt_served_from_lru():
+    service = _service_with_upstream()
+    first = await service.chat_completion(MESSAGES, call_site="recruiter_chat")
+    second = await service.chat_completion(MESSAGES, call_site="recruiter_chat")
+
+    assert service._request_chat_completion.await_count == 1
+    assert "cached" not in first
+    assert second["cached"] is True
+    assert second["content"] == first["content"]
+
+    stats = service.response_cache.stats()["call_sites"]["recruiter_chat"]
+    assert stats["l1_hits"] == 1
+    assert stats["misses"] == 1
+
+
+async def test_key_normalizes_whitespace_but_not_parameters():
+    key = ResponseCache.make_key("m", MESSAGES, 0.7, 200)
+    spaced = [{"role": m["role"], "content": "  " + m["content"].replace(" ", "   ") + "\n"} for m in MESSAGES]
+    assert ResponseCache.make_key("m", spaced, 0.7, 200) == key
+    assert ResponseCache.make_key("m", MESSAGES, 0.8, 200) != key
+    assert ResponseCache.make_key("m", MESSAGES, 0.7, 300) != key
+    assert ResponseCache.make_key("other", MESSAGES, 0.7, 200) != key
+
+
+async def test_failures_are_not_cached():
+    service = AIService()
+    service._request_chat_completion = AsyncMock(return_value={"success": False, "error": "API error: 500"})
+    await service.chat_completion(MESSAGES, call_site="recruiter_chat")
+    await service.chat_completion(MESSAGES, call_site="recruiter_chat")
+    assert service._request_chat_completion.await_count == 2
+
+
+async def test_second_level_survives_lru_eviction():
+    cache = ResponseCache(max_entries=1, policies={"site": CachePolicy(ttl_seconds=60)})
+    cache.set_db(FakeDB())
+    policy = cache.policy_for("site")
+
+    await cache.set("a", "site", policy, {"content": "A", "model": "m", "usage": {}})
+    await cache.set("b", "site", policy, {"content": "B", "model": "m", "usage": {}})  # evicts "a" from LRU
+
+    hit = await cache.get("a", "site", policy)
+    assert hit["content"] == "A"
+    assert cache.stats()["call_sites"]["site"]["l2_hits"] == 1
+
+
+async def test_expired_second_level_entry_is_a_miss():
+    cache = ResponseCache(policies={"site": CachePolicy(ttl_seconds=60)})
+    db = FakeDB()
+    db[cache.collection_name].docs.append(
+        {"key": "k", "response": {"content": "stale"}, "expires_at": datetime.now(timezone.utc) - timedelta(seconds=1)}
+    )
+    cache.set_db(db)
+    assert await cache.get("k", "site", cache.policy_for("site")) is None
+
+
+if __name__ == "__main__":
+    # Run tests
+    pytest.main([__file__, "-v"])
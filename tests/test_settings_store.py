@@ -0,0 +1,71 @@
+"""
+Tests for the in-memory settings snapshot behind AIService.get_api_key
+"""
+import asyncio
+import pytest
+
+from backend.services.ai_service import AIService
+from backend.services import settings_store as settings_module
+from backend.services.settings_store import SettingsStore, POLLING
+from tests.conftest import FakeDB
+
+# Use anyio for async support (already installed)
+pytestmark = pytest.mark.anyio
+
+
+async def test_get_is_served_from_snapshot():
+    db = FakeDB(settings=[{"_id": 1, "key": "groq_api_key", "value": "gsk_first"}])
+    store = SettingsStore()
+    store.set_db(db)
+    await store.load()
+
+    for _ in range(100):
+        assert store.get("groq_api_key") == "gsk_first"
+    assert db.settings.calls["find"] == 1
+    assert store.get("missing", "default") == "default"
+
+
+async def test_change_events_update_and_delete_keys():
+    store = SettingsStore()
+    store._apply_change(
+        {"operationType": "insert", "documentKey": {"_id": 7}, "fullDocument": {"_id": 7, "key": "k", "value": "v1"}}
+    )
+    assert store.get("k") == "v1"
+    store._apply_change(
+        {"operationType": "update", "documentKey": {"_id": 7}, "fullDocument": {"_id": 7, "key": "k", "value": "v2"}}
+    )
+    assert store.get("k") == "v2"
+    store._apply_change({"operationType": "delete", "documentKey": {"_id": 7}})
+    assert store.get("k") is None
+
+
+async def test_falls_back_to_polling_and_picks_up_rotation():
+    docs = [{"_id": 1, "key": "groq_api_key", "value": "gsk_old"}]
+    store = SettingsStore(poll_interval=0.01)
+    store.set_db(FakeDB(settings=docs))
+    await store.start()
+    try:
+        assert store.get("groq_api_key") == "gsk_old"
+        # Another worker rotates the key
+        docs[0]["value"] = "gsk_new"
+        await asyncio.sleep(0.1)
+        assert store.mode == POLLING
+        assert store.get("groq_api_key") == "gsk_new"
+    finally:
+        await store.stop()
+
+
+async def test_api_key_reads_snapshot_then_env(monkeypatch):
+    store = SettingsStore()
+    monkeypatch.setattr(settings_module.settings_store, "_values", store._values)
+    monkeypatch.setenv("GROQ_API_KEY", "gsk_env")
+    service = AIService()
+
+    assert await service.get_api_key() == "gsk_env"
+    store.apply("groq_api_key", "gsk_db")
+    assert await service.get_api_key() == "gsk_db"
+
+
+if __name__ == "__main__":
+    # Run tests
+    pytest.main([__file__, "-v"])
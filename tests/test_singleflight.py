@@ -0,0 +1,97 @@
+"""
+Tests for single-flight coalescing of identical in-flight requests
+"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+
+from backend.services.singleflight import SingleFlight
+from backend.services.ai_service import AIService
+
+# Use anyio for async support (already installed)
+pytestmark = pytest.mark.anyio
+
+
+async def test_concurrent_identical_calls_share_one_execution():
+    flight = SingleFlight("test_identical")
+    calls = 0
+
+    async def upstream(question):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return f"answer to {question}"
+
+    search = flight.wrap(upstream)
+    results = await asyncio.gather(*[search("how do I earn beans") for _ in range(20)])
+
+    assert calls == 1
+    assert set(results) == {"answer to how do I earn beans"}
+    assert flight.stats()["collapsed"] == 19
+    assert flight.stats()["in_flight"] == 0
+
+
+async def test_different_keys_are_not_coalesced():
+    flight = SingleFlight("test_distinct", key_fn=lambda q: q.lower())
+
+    async def upstream(q):
+        await asyncio.sleep(0.01)
+        return q
+
+    calls = []
+    search = flight.wrap(lambda q: calls.append(q) or upstream(q))
+    await asyncio.gather(search("PK"), search("pk"), search("beans"))
+
+    assert calls == ["PK", "beans"]
+
+
+async def test_errors_propagate_to_every_waiter():
+    flight = SingleFlight("test_errors")
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    results = await asyncio.gather(*[flight.do("k", failing) for _ in range(3)], return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+    # A later call starts a fresh execution instead of reusing the failure
+    ok = AsyncMock(return_value="recovered")
+    assert await flight.do("k", ok) == "recovered"
+
+
+async def test_cancelled_leader_does_not_cancel_followers():
+    flight = SingleFlight("test_cancel")
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    leader = asyncio.ensure_future(flight.do("k", slow))
+    await asyncio.sleep(0)
+    follower = asyncio.ensure_future(flight.do("k", slow))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await follower == "done"
+
+
+async def test_ai_service_coalesces_identical_chat_requests():
+    service = AIService()
+
+    async def upstream(*args):
+        await asyncio.sleep(0.01)
+        return {"success": True, "content": "Stream at 7pm", "model": "m", "usage": {}}
+
+    service._request_chat_completion = AsyncMock(side_effect=upstream)
+    messages = [{"role": "user", "content": "When should I stream?"}]
+
+    results = await asyncio.gather(*[service.chat_completion(messages) for _ in range(10)])
+
+    assert service._request_chat_completion.await_count == 1
+    assert all(r["content"] == "Stream at 7pm" for r in results)
+
+
+if __name__ == "__main__":
+    # Run tests
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,127 @@
+"""
+Tests for the local hashed n-gram text classifier and its use in intent and admin action routing
+"""
+import pytest
+
+from backend.services import text_classifier
+from backend.services.ai_service import AIService, GREETING_RESPONSE
+from backend.services.text_classifier import ADMIN_ACTION, BEANGENIE_INTENT, TextClassifier, get_classifier
+
+# Use anyio for async support (already installed)
+pytestmark = pytest.mark.anyio
+
+
+EXAMPLES = [
+    ("how do I earn more beans", "question"),
+    ("tips for winning pk battles", "question"),
+    ("when should I stream to get viewers", "question"),
+    ("hello", "greeting"),
+    ("hey there", "greeting"),
+    ("hi friend", "greeting"),
+    ("good morning", "greeting"),
+    ("how do I cook pasta", "off_topic"),
+    ("what's the weather like", "off_topic"),
+    ("tell me a joke", "off_topic"),
+]
+
+
+@pytest.fixture
+def model():
+    return TextClassifier.train(EXAMPLES)
+
+
+def test_predicts_nearest_label(model):
+    assert model.predict("how can I earn beans faster")[0] == "question"
+    assert model.predict("hello there")[0] == "greeting"
+    assert model.predict("a joke about pasta")[0] == "off_topic"
+
+
+def test_misspellings_land_near_the_right_label(model):
+    label, confidence = model.predict("earnin beens")
+    assert label == "question"
+    assert confidence > 0.5
+
+
+def test_classify_respects_threshold(model):
+    assert model.classify("hello", threshold=0.5) == "greeting"
+    assert model.classify("hello", threshold=1.01) is None
+
+
+def test_empty_text_has_no_prediction(model):
+    assert model.predict("   ") == (None, 0.0)
+
+
+def test_needs_two_labels():
+    with pytest.raises(ValueError):
+        TextClassifier.train([("hello", "greeting"), ("hi", "greeting")])
+
+
+def test_save_and_load_round_trip(model, tmp_path):
+    path = tmp_path / "intent.npz"
+    model.save(path)
+
+    loaded = TextClassifier.load(path)
+
+    assert loaded.labels == model.labels
+    assert loaded.predict("how do I earn more beans") == model.predict("how do I earn more beans")
+
+
+def test_get_classifier_loads_once_and_misses_without_model(model, tmp_path, monkeypatch):
+    monkeypatch.setattr(text_classifier, "MODEL_DIR", tmp_path)
+    text_classifier.reload_classifiers()
+    assert get_classifier(BEANGENIE_INTENT) is None
+
+    model.save(tmp_path / f"{BEANGENIE_INTENT}.npz")
+    assert get_classifier(BEANGENIE_INTENT) is None
+    text_classifier.reload_classifiers()
+    assert get_classifier(BEANGENIE_INTENT).labels == model.labels
+    text_classifier.reload_classifiers()
+
+
+async def test_classify_intent_asks_the_model_when_no_keyword_rule_fires(model, monkeypatch):
+    monkeypatch.setattr("backend.services.ai_service.get_classifier", lambda name: model)
+
+    # No keyword rule fires for this; the model knows it is a greeting
+    result = await AIService().classify_intent("good morning everyone")
+
+    assert result["intent"] == "greeting"
+    assert result["is_bigo_related"] is False
+    assert result["suggested_response"] == GREETING_RESPONSE
+
+
+async def test_keyword_rules_win_over_a_confident_model(monkeypatch):
+    greeter = TextClassifier.train([("how do I earn more beans", "greeting"), ("tell me a joke", "off_topic")])
+    monkeypatch.setattr("backend.services.ai_service.get_classifier", lambda name: greeter)
+
+    result = await AIService().classify_intent("How do I earn more beans?")
+
+    assert result["intent"] == "question"
+    assert result["is_bigo_related"] is True
+
+
+async def test_classify_intent_falls_back_to_keywords_without_model(monkeypatch):
+    monkeypatch.setattr("backend.services.ai_service.get_classifier", lambda name: None)
+
+    result = await AIService().classify_intent("How do I earn more beans?")
+
+    assert result["intent"] == "question"
+    assert result["is_bigo_related"] is True
+
+
+def test_admin_action_model_covers_keyword_misses(monkeypatch):
+    admin = TextClassifier.train(
+        [
+            ("tell everyone the meeting moved", "system_announcement"),
+            ("let all hosts know about the bonus", "system_announcement"),
+            ("what can you do", "none"),
+            ("explain the tier system", "none"),
+        ]
+    )
+    monkeypatch.setattr(
+        "backend.services.ai_service.get_classifier", lambda name: admin if name == ADMIN_ACTION else None
+    )
+    service = AIService()
+
+    assert service.detect_admin_action("create an event for friday") == "create_event"
+    assert service.detect_admin_action("tell everyone about the bonus") == "system_announcement"
+    assert service.detect_admin_action("explain the tier system please") is None
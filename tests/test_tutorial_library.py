@@ -0,0 +1,172 @@
+"""
+Tests for the academy tutorial library and its research -> synthesis pipeline
+"""
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+from backend.services.ai_scheduler import BACKGROUND
+from backend.services.tutorial_library import TutorialLibrary, normalize_topic, tutorial_key
+from tests.conftest import FakeDB
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeAIService:
+    def __init__(self, research_delay=0.05, fail_synthesis=False):
+        self.research_delay = research_delay
+        self.fail_synthesis = fail_synthesis
+        self.fail_synthesis_stream = False
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def chat_completion(self, messages, call_site=None, lane=None, **kwargs):
+        self.calls.append((call_site, lane))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.research_delay)
+        finally:
+            self.in_flight -= 1
+        if call_site == "academy_synthesis":
+            if self.fail_synthesis:
+                return {"success": False, "error": "API error: 500"}
+            return {"success": True, "content": "📚 **Tutorial**"}
+        return {"success": True, "content": f"notes for {messages[0]['content'][-40:]}"}
+
+    async def chat_completion_stream(self, messages, call_site=None, **kwargs):
+        self.calls.append((call_site, None))
+        for word in ["📚 ", "**Tutorial**"]:
+            yield {"type": "delta", "content": word}
+        if self.fail_synthesis_stream:
+            yield {"type": "error", "error": "stream interrupted"}
+            return
+        yield {"type": "done", "content": "📚 **Tutorial**", "model": "m", "usage": {}}
+
+
+async def _library(ai=None, db=None):
+    library = TutorialLibrary()
+    library.set_dependencies(db if db is not None else FakeDB(), ai or FakeAIService())
+    # The unique key index is what lets only one worker claim an entry
+    await library.ensure_indexes()
+    return library
+
+
+def test_rephrasings_share_a_library_key():
+    assert normalize_topic("  Best  Camera angles?! ") == "best camera angles"
+    assert tutorial_key("Best camera angles", "Streaming") == tutorial_key("best camera-angles", "streaming")
+
+
+async def test_repeat_requests_are_served_from_the_library():
+    ai = FakeAIService()
+    library = await _library(ai)
+
+    first = await library.get_or_generate("Best camera angles", "streaming")
+    second = await library.get_or_generate("best camera angles!", "streaming")
+
+    assert first["success"] and first["cached"] is False
+    assert second["cached"] is True
+    assert second["tutorial"] == first["tutorial"] == "📚 **Tutorial**"
+    # Two research calls and one synthesis, all for the first request
+    assert [site for site, _ in ai.calls] == ["academy_research", "academy_research", "academy_synthesis"]
+    assert library.stats()["library_hits"] == 1
+
+
+async def test_research_calls_run_concurrently():
+    ai = FakeAIService(research_delay=0.1)
+    library = await _library(ai)
+    await library.get_or_generate("Lighting setup guide", "streaming")
+    assert ai.max_in_flight == 2
+
+
+async def test_concurrent_misses_share_one_pipeline_run():
+    ai = FakeAIService()
+    library = await _library(ai)
+    results = await asyncio.gather(*(library.get_or_generate("Audio quality tips", "streaming") for _ in range(5)))
+    assert all(r["success"] for r in results)
+    assert len(ai.calls) == 3
+
+
+async def test_failed_synthesis_serves_research_notes_without_storing_them():
+    db = FakeDB()
+    library = await _library(FakeAIService(fail_synthesis=True), db)
+    result = await library.get_or_generate("Maximizing earnings", "monetization")
+    assert result["success"]
+    assert "notes for" in result["tutorial"]
+    assert result["metadata"]["degraded"] is True
+    # A transient synthesis error is not cached; the next request runs the pipeline again
+    assert db.academy_tutorials.docs == []
+    assert library.stats()["degraded"] == 1
+
+
+async def test_stream_resets_partial_synthesis_before_serving_research_notes():
+    ai = FakeAIService()
+    ai.fail_synthesis_stream = True
+    db = FakeDB()
+    library = await _library(ai, db)
+    events = [e async for e in library.generate_stream("Audio quality tips", "streaming")]
+
+    assert [e["type"] for e in events] == ["stage", "stage", "delta", "delta", "reset", "done"]
+    assert events[-1]["tutorial"].startswith("notes for")
+    assert events[-1]["metadata"]["degraded"] is True
+    assert db.academy_tutorials.docs == []
+
+
+async def test_stale_entries_are_regenerated():
+    ai = FakeAIService()
+    db = FakeDB()
+    library = await _library(ai, db)
+    await library.get_or_generate("Growing followers fast", "growth")
+    doc = db.academy_tutorials.peek({"key": tutorial_key("Growing followers fast", "growth")})
+    doc["updated_at"] = datetime.now(timezone.utc) - library.max_age - timedelta(days=1)
+
+    result = await library.get_or_generate("Growing followers fast", "growth")
+    assert result["cached"] is False
+    assert len(ai.calls) == 6
+
+
+async def test_stream_emits_stages_deltas_and_stores_the_tutorial():
+    library = await _library()
+    events = [e async for e in library.generate_stream("OBS setup for BIGO", "technical")]
+
+    types = [e["type"] for e in events]
+    assert types == ["stage", "stage", "delta", "delta", "done"]
+    assert events[-1]["tutorial"] == "📚 **Tutorial**"
+    assert events[-1]["metadata"]["category"] == "technical"
+
+    replay = [e async for e in library.generate_stream("OBS setup for BIGO", "technical")]
+    assert [e["type"] for e in replay] == ["done"]
+    assert replay[0]["cached"] is True
+
+
+async def test_pregeneration_fills_the_library_on_the_background_lane():
+    ai = FakeAIService(research_delay=0)
+    db = FakeDB()
+    library = await _library(ai, db)
+    topics = {"basics": ["Getting started on BIGO Live", "Creating an attractive profile"]}
+
+    counts = await library.pregenerate(topics)
+    assert counts == {"generated": 2, "skipped": 0, "failed": 0}
+    assert {lane for _, lane in ai.calls} == {BACKGROUND}
+
+    # A second pass (or another worker) finds fresh entries and skips them
+    again = await library.pregenerate(topics)
+    assert again == {"generated": 0, "skipped": 2, "failed": 0}
+    assert len(ai.calls) == 6
+
+    served = await library.get_or_generate("getting started on BIGO live", "basics")
+    assert served["cached"] is True
+
+
+async def test_pregeneration_skips_entries_leased_by_another_worker():
+    db = FakeDB()
+    key = tutorial_key("Best camera angles", "streaming")
+    db.academy_tutorials.docs.append({"key": key, "lease_until": datetime.now(timezone.utc) + timedelta(minutes=5)})
+    ai = FakeAIService(research_delay=0)
+    library = await _library(ai, db)
+
+    counts = await library.pregenerate({"streaming": ["Best camera angles"]})
+    assert counts["skipped"] == 1
+    assert ai.calls == []
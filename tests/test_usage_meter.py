@@ -0,0 +1,190 @@
+"""
+Tests for LLM usage metering and daily token budgets
+"""
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from unittest.mock import AsyncMock
+
+from backend.services.ai_service import AIService
+from backend.services.model_router import DEFAULT_TIERS, FAST
+from backend.services.usage_meter import (
+    UsageAttributionMiddleware,
+    UsageMeter,
+    set_usage_endpoint,
+    set_usage_user,
+)
+from tests.conftest import FakeDB
+
+pytestmark = pytest.mark.anyio
+
+
+def _attribute(endpoint, user_id=None):
+    set_usage_endpoint(endpoint)
+    set_usage_user(user_id)
+
+
+def _service(usage=None):
+    service = AIService()
+    service._request_chat_completion = AsyncMock(
+        side_effect=lambda messages, model, *args: {
+            "success": True,
+            "content": "Stream at peak hours",
+            "model": model,
+            "usage": usage or {"prompt_tokens": 40, "completion_tokens": 60},
+        }
+    )
+    return service
+
+
+MESSAGES = [{"role": "user", "content": "How do I earn more beans?"}]
+
+
+async def test_flush_rolls_calls_up_by_endpoint_call_site_user_and_model():
+    meter = UsageMeter(user_daily_tokens=0, endpoint_daily_tokens={})
+    db = FakeDB()
+    meter.set_db(db)
+
+    _attribute("/api/beangenie/chat", "u1")
+    meter.record("beangenie_chat", "m", {"prompt_tokens": 10, "completion_tokens": 5}, 0.2, True)
+    meter.record("beangenie_chat", "m", {"prompt_tokens": 20, "completion_tokens": 5}, 0.4, True)
+    meter.record("beangenie_chat", "m", None, 1.0, False)
+    _attribute("/api/academy/generate", "u2")
+    meter.record("academy_synthesis", "m", {"prompt_tokens": 100, "completion_tokens": 200}, 2.0, True)
+    await meter.flush()
+
+    assert db.llm_usage_daily.calls["bulk_write"] == 1
+    rows = {(d["endpoint"], d["user_id"]): d for d in db.llm_usage_daily.docs}
+    beangenie = rows[("/api/beangenie/chat", "u1")]
+    assert beangenie["call_site"] == "beangenie_chat"
+    assert beangenie["calls"] == 3
+    assert beangenie["errors"] == 1
+    assert beangenie["prompt_tokens"] == 30
+    assert beangenie["latency_ms_max"] == pytest.approx(1000)
+    assert rows[("/api/academy/generate", "u2")]["completion_tokens"] == 200
+    assert meter.stats()["buffered_rows"] == 0
+
+
+async def test_failed_flush_keeps_records_for_the_next_one():
+    meter = UsageMeter(user_daily_tokens=0, endpoint_daily_tokens={})
+    db = FakeDB()
+    meter.set_db(db)
+    _attribute("/api/beangenie/chat", "u1")
+    meter.record("beangenie_chat", "m", {"prompt_tokens": 10, "completion_tokens": 5}, 0.2, True)
+
+    db.llm_usage_daily.fail_next("bulk_write", RuntimeError("primary stepped down"))
+    await meter.flush()
+    assert meter.stats()["flush_errors"] == 1
+    meter.record("beangenie_chat", "m", {"prompt_tokens": 10, "completion_tokens": 5}, 0.2, True)
+    await meter.flush()
+
+    (doc,) = db.llm_usage_daily.docs
+    assert doc["calls"] == 2
+    assert doc["prompt_tokens"] == 20
+
+
+async def test_totals_refresh_from_every_workers_flushed_rollups():
+    db = FakeDB()
+    worker_a, worker_b = UsageMeter(user_daily_tokens=100), UsageMeter(user_daily_tokens=100)
+    worker_a.set_db(db)
+    worker_b.set_db(db)
+    _attribute("/api/beangenie/chat", "u1")
+    worker_a.record("beangenie_chat", "m", {"prompt_tokens": 80, "completion_tokens": 30}, 0.1, True)
+    await worker_a.flush()
+
+    assert not worker_b.over_budget()
+    await worker_b._refresh_totals()
+    assert worker_b.over_budget()
+    # One grouped aggregation per dimension, however many rollup rows today has
+    assert db.llm_usage_daily.calls["aggregate"] == 2
+    assert worker_b._endpoint_tokens == {"/api/beangenie/chat": 110}
+
+
+async def test_over_budget_user_is_served_by_fast_tier_and_cache():
+    service = _service()
+    service.usage_meter = UsageMeter(user_daily_tokens=150, endpoint_daily_tokens={})
+    _attribute("/api/beangenie/chat", "heavy-user")
+
+    first = await service.chat_completion(MESSAGES, call_site="beangenie_chat")
+    second = await service.chat_completion(MESSAGES, call_site="beangenie_chat")
+    assert first["model"] == second["model"] == service.default_chat_model
+
+    # 200 tokens used against a budget of 150: downgrade and cache from here on
+    third = await service.chat_completion(MESSAGES, call_site="beangenie_chat")
+    fourth = await service.chat_completion(MESSAGES, call_site="beangenie_chat")
+    assert third["model"] == DEFAULT_TIERS[FAST]
+    assert fourth.get("cached") is True
+    assert service._request_chat_completion.await_count == 3
+    assert service.usage_meter.stats()["degraded"] == 2
+
+    # Other users keep the standard model
+    _attribute("/api/beangenie/chat", "light-user")
+    other = await service.chat_completion(MESSAGES, call_site="beangenie_chat")
+    assert other["model"] == service.default_chat_model
+
+
+async def test_endpoint_budget_applies_to_every_user_of_the_endpoint():
+    service = _service()
+    service.usage_meter = UsageMeter(user_daily_tokens=0, endpoint_daily_tokens={"blog_scheduler": 100})
+    _attribute("blog_scheduler")
+    await service.chat_completion(MESSAGES, call_site="blog_generate")
+    degraded = await service.chat_completion(MESSAGES, call_site="blog_generate")
+    assert degraded["model"] == DEFAULT_TIERS[FAST]
+
+    _attribute("/api/academy/generate", "u1")
+    normal = await service.chat_completion(MESSAGES, call_site="academy_synthesis")
+    assert normal["model"] == service.default_chat_model
+
+
+async def test_explicit_model_is_never_downgraded():
+    service = _service()
+    service.usage_meter = UsageMeter(user_daily_tokens=1, endpoint_daily_tokens={})
+    _attribute("/api/ai/chat", "u1")
+    await service.chat_completion(MESSAGES, model="pinned-model")
+    result = await service.chat_completion(MESSAGES, model="pinned-model")
+    assert result["model"] == "pinned-model"
+
+
+async def test_attribution_is_scoped_to_the_task():
+    meter = UsageMeter(user_daily_tokens=0, endpoint_daily_tokens={})
+
+    async def handle(endpoint, user_id):
+        _attribute(endpoint, user_id)
+        await asyncio.sleep(0)
+        meter.record("call", "m", {"prompt_tokens": 1, "completion_tokens": 1}, 0.0, True)
+
+    await asyncio.gather(handle("/api/a", "u1"), handle("/api/b", "u2"))
+    keys = {(endpoint, user_id) for (_, endpoint, _, user_id, _) in meter._buffer}
+    assert keys == {("/api/a", "u1"), ("/api/b", "u2")}
+
+
+async def test_middleware_attributes_usage_to_the_route_template():
+    meter = UsageMeter(user_daily_tokens=0, endpoint_daily_tokens={})
+    app = FastAPI()
+    app.add_middleware(UsageAttributionMiddleware)
+
+    @app.post("/api/conversations/{conversation_id}/messages")
+    async def send(conversation_id: str):
+        meter.record("beangenie_chat", "m", {"prompt_tokens": 1, "completion_tokens": 1}, 0.0, True)
+        return {"ok": True}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        for conversation_id in ("c1", "c2", "c3"):
+            assert (await client.post(f"/api/conversations/{conversation_id}/messages")).status_code == 200
+
+    endpoints = {endpoint for (_, endpoint, _, _, _) in meter._buffer}
+    assert endpoints == {"/api/conversations/{conversation_id}/messages"}
+    assert meter._endpoint_tokens["/api/conversations/{conversation_id}/messages"] == 6
+
+
+async def test_admin_and_announcement_helpers_name_their_call_sites():
+    service = _service()
+    service.usage_meter = UsageMeter(user_daily_tokens=0, endpoint_daily_tokens={})
+    _attribute("/api/admin/announcements", "admin1")
+    await service.get_admin_assistant_response("How many hosts streamed today?", ["create_announcement"])
+    await service.generate_announcement_content("event", "hosts", "PK tournament on Friday")
+
+    call_sites = {call_site for (_, _, call_site, _, _) in service.usage_meter._buffer}
+    assert call_sites == {"admin_assistant", "announcement"}
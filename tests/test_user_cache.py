@@ -0,0 +1,90 @@
+"""
+Tests for the authenticated-user cache and its version-based invalidation
+"""
+import pytest
+
+from backend.services.user_cache import USERS_VERSION_ID, UserPrincipalCache
+from tests.conftest import FakeDB
+
+pytestmark = pytest.mark.anyio
+
+
+class Principal:
+    def __init__(self, user_id, role="host"):
+        self.id = user_id
+        self.role = role
+
+
+def _cache(**kwargs):
+    cache = UserPrincipalCache(**kwargs)
+    cache.set_db(FakeDB())
+    return cache
+
+
+def test_repeat_callers_are_served_from_the_cache_as_copies():
+    cache = _cache()
+    assert cache.get("u1") is None
+    cache.put("u1", Principal("u1"))
+    user = cache.get("u1")
+    user.role = "admin"
+    assert cache.get("u1").role == "host"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (2, 1, 0.6667)
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    from backend.services import user_cache as module
+
+    now = [1000.0]
+    monkeypatch.setattr(module.time, "monotonic", lambda: now[0])
+    cache = _cache(ttl=30)
+    cache.put("u1", Principal("u1"))
+    now[0] += 29
+    assert cache.get("u1") is not None
+    now[0] += 2
+    assert cache.get("u1") is None
+    assert cache.stats()["expired"] == 1
+
+
+def test_size_is_bounded_by_evicting_least_recently_used_users():
+    cache = _cache(max_entries=2)
+    cache.put("u1", Principal("u1"))
+    cache.put("u2", Principal("u2"))
+    cache.get("u1")
+    cache.put("u3", Principal("u3"))
+    assert cache.get("u2") is None
+    assert cache.get("u1") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+async def test_role_writes_bump_the_version_and_drop_reads_that_raced_them():
+    cache = _cache()
+    cache.put("u1", Principal("u1"))
+    read_version = cache.version
+    await cache.users_changed()
+    assert cache.version == 1
+    assert cache.get("u1") is None
+    # A read that started before the write must not repopulate the cache with the old role
+    cache.put("u1", Principal("u1"), read_version)
+    assert cache.get("u1") is None
+
+
+async def test_writes_from_other_processes_are_picked_up_by_the_version_poll():
+    cache = _cache()
+    await cache.start()
+    await cache.stop()
+    cache.put("u1", Principal("u1"))
+    assert await cache.sync_version() is False
+    cache.db.users_meta.docs.append({"_id": USERS_VERSION_ID, "version": 4})  # another process wrote a role
+    assert await cache.sync_version() is True
+    assert cache.get("u1") is None
+    assert cache.stats()["version"] == 4
+
+
+def test_single_user_invalidation_keeps_everyone_else():
+    cache = _cache()
+    cache.put("u1", Principal("u1"))
+    cache.put("u2", Principal("u2"))
+    cache.invalidate("u1")
+    assert cache.get("u1") is None
+    assert cache.get("u2") is not None
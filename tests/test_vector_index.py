@@ -0,0 +1,118 @@
+"""
+Tests for the hashed-embedding vector index and its fusion with BM25 knowledge search
+"""
+import numpy as np
+
+from backend.services.knowledge_index import SYNONYMS, KnowledgeIndex, analyze
+from backend.services.vector_index import HashingEmbedder, VectorIndex
+
+DOCS = [
+    {
+        "id": "beans",
+        "url": "https://www.bigo.tv/beans",
+        "title": "Bean Earnings Guide",
+        "content": "Beans convert to cash. Hosts earn beans from viewer gifts during live streams.",
+        "tags": ["beans", "monetization"],
+    },
+    {
+        "id": "pk",
+        "url": "https://www.bigo.tv/pk",
+        "title": "PK Battle Strategy",
+        "content": "Win PK battles by scheduling them at peak hours and rallying your fans before the match.",
+        "tags": ["pk"],
+    },
+    {
+        "id": "tiers",
+        "url": "https://www.bigo.tv/tiers",
+        "title": "Tier System",
+        "content": "Reaching S10 requires consistent streaming hours. Tier 5 hosts unlock weekly bonuses.",
+        "tags": ["tier"],
+    },
+]
+
+
+def _embedder():
+    return HashingEmbedder(analyze, SYNONYMS)
+
+
+def _vectors(path=None):
+    index = VectorIndex(_embedder(), path)
+    for doc in DOCS:
+        index.upsert(doc["id"], f"{doc['title']}\n{doc['content']}")
+    return index
+
+
+def test_embeddings_are_normalized_and_deterministic():
+    embedder = _embedder()
+    vector = embedder.embed("How do I earn more beans?")
+    assert vector.dtype == np.float32
+    assert np.isclose(np.linalg.norm(vector), 1.0)
+    assert np.array_equal(vector, embedder.embed("How do I earn more beans?"))
+    assert not embedder.embed("").any()
+
+
+def test_paraphrase_without_shared_words_finds_the_document():
+    index = _vectors()
+    # "paid"/"money" share no surface word with the bean earnings document
+    assert index.search("how do I get paid more money", limit=1, min_similarity=0.1)[0][0] == "beans"
+    assert index.search("ranking up a level", limit=1, min_similarity=0.1)[0][0] == "tiers"
+
+
+def test_off_topic_queries_fall_below_the_similarity_floor():
+    assert _vectors().search("recipe for chocolate cake", min_similarity=0.1) == []
+
+
+def test_unchanged_content_is_not_re_embedded_and_removal_frees_the_slot():
+    index = _vectors()
+    assert index.upsert("pk", f"{DOCS[1]['title']}\n{DOCS[1]['content']}") is False
+    index.remove("pk")
+    assert "pk" not in [doc_id for doc_id, _ in index.search("PK battles")]
+    index.upsert("collab", "Collaborate with other hosts")
+    assert index.slots["collab"] == 1
+    assert len(index) == 3
+
+
+def test_persisted_matrix_is_memory_mapped_and_reused(tmp_path):
+    _vectors(tmp_path).save()
+    loaded = VectorIndex(_embedder(), tmp_path)
+    assert loaded.load()
+    assert isinstance(loaded.matrix, np.memmap)
+    assert loaded.search("PK battles", limit=1)[0][0] == "pk"
+
+    # Same content is reused without embedding; a changed document copies the map before writing
+    assert loaded.upsert("beans", f"{DOCS[0]['title']}\n{DOCS[0]['content']}") is False
+    assert loaded.upsert("tiers", "Tier System\nNew requirements for S10") is True
+    assert not isinstance(loaded.matrix, np.memmap)
+    assert loaded.stats()["embedded"] == 1
+
+
+def test_embedder_changes_invalidate_the_persisted_matrix(tmp_path):
+    _vectors(tmp_path).save()
+    assert not VectorIndex(HashingEmbedder(analyze, SYNONYMS, dim=256), tmp_path).load()
+
+
+def test_ivf_probing_agrees_with_brute_force():
+    rng = np.random.default_rng(3)
+    words = "beans pk battle tier stream fans gifts cash schedule viewers host bonus".split()
+    index = VectorIndex(_embedder())
+    for i in range(400):
+        index.upsert(str(i), " ".join(rng.choice(words, 8)))
+    query = "pk battle with fans"
+    exact = index.search(query, limit=5)
+    index.train_ivf()
+    assert index.stats()["ivf_clusters"] == 20
+    probed = index.search(query, limit=5)
+    assert probed[0][1] == exact[0][1]
+
+
+def test_hybrid_search_fuses_bm25_and_vectors():
+    index = KnowledgeIndex()
+    index.load(DOCS)
+    results = index.hybrid_search("how do I get paid more money", limit=2, snippets=True)
+    assert results[0]["id"] == "beans"
+    assert set(results[0]) == {"id", "url", "title", "content", "tags", "score", "passages", "snippet"}
+    assert index.hybrid_search("zzz qqq") == []
+
+    index.remove("beans")
+    assert all(r["id"] != "beans" for r in index.hybrid_search("bean earnings"))
+    assert index.stats()["vectors"]["documents"] == 2